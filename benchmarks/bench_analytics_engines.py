@@ -0,0 +1,64 @@
+# benchmarks/bench_analytics_engines.py
+"""
+Benchmark degli aggregati di Reportistica: SQLite contro DuckDB (core/analytics_engine.py)
+su volumi crescenti, con verifica che i due motori restituiscano gli stessi numeri.
+
+Uso:  python benchmarks/bench_analytics_engines.py [n_dipendenti] [giorni ...]
+"""
+from __future__ import annotations
+import sys
+import time
+import tempfile
+import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from synthetic_data import build_crm_db
+from core.analytics_engine import DuckDBAnalyticsEngine
+
+# Le stesse viste della pagina Reportistica
+AGGREGATES = {
+    'totali': [],
+    'per squadra': ['squadra'],
+    'trend giornaliero': ['giorno'],
+    'pivot dipendente x giorno': ['squadra', 'dipendente_nome', 'giorno'],
+    'squadra storica x attività': ['squadra_storica', 'id_attivita'],
+}
+
+
+def _timeit(fn, repeat: int = 3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def run(n_dipendenti: int = 300, periodi=(30, 365)):
+    for giorni in periodi:
+        start = datetime.date(2025, 1, 1)
+        end = start + datetime.timedelta(days=giorni - 1)
+        with tempfile.TemporaryDirectory() as tmp:
+            print(f"\n⏳ Generazione dati sintetici ({n_dipendenti} dipendenti x {giorni} giorni)...")
+            db = build_crm_db(Path(tmp) / "crm.db", n_dipendenti=n_dipendenti, giorni=giorni, start=start)
+            engine = DuckDBAnalyticsEngine(db)
+            t0 = time.perf_counter()
+            engine.get_report_data_df(start, end, group_by=[])
+            print(f"🦆 DuckDB in modalità '{engine.mode}' (avvio/snapshot {time.perf_counter() - t0:.2f}s)")
+
+            print(f"{'Aggregato':<30}{'Gruppi':>10}{'SQLite (s)':>12}{'DuckDB (s)':>12}{'Speed-up':>10}")
+            for name, group_by in AGGREGATES.items():
+                t_sqlite, df_sqlite = _timeit(lambda: db.get_report_data_df(start, end, group_by=group_by))
+                t_duck, df_duck = _timeit(lambda: engine.get_report_data_df(start, end, group_by=group_by))
+                # Controllo di coerenza: stesse righe, stesso ordine, stessi totali
+                pd.testing.assert_frame_equal(df_sqlite, df_duck, check_dtype=False)
+                print(f"{name:<30}{len(df_sqlite):>10,}{t_sqlite:>12.3f}{t_duck:>12.3f}{t_sqlite / t_duck:>9.1f}x")
+            engine.close()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(args[0], tuple(args[1:]) or (30, 365)) if args else run()
@@ -0,0 +1,82 @@
+# benchmarks/bench_bottleneck.py
+"""
+Benchmark dell'analisi colli di bottiglia (NavalWorkflowEngine.get_bottleneck_analysis):
+versione vettoriale sui template compilati contro il ciclo per attività di riferimento.
+Controlli:
+  - il fabbisogno per ruolo coincide con il ciclo per attività (stima rapida, 40 ore per operaio);
+  - sul cronoprogramma sintetico (con date) get_weekly_bottleneck_analysis restituisce i colli di
+    bottiglia del piano di capacità settimanale (plan_capacity): stesse settimane in sofferenza e
+    stessa carenza per ruolo. Non è nel tempo misurato: costruisce il piano completo.
+
+Uso:  python benchmarks/bench_bottleneck.py [n_attivita]
+"""
+from __future__ import annotations
+import sys
+import time
+import random
+
+import datetime
+
+from synthetic_data import PREFISSI_ATTIVITA, build_schedule
+from core.workflow_engine import NavalWorkflowEngine, WorkRole
+
+
+def _reference_demand(engine: NavalWorkflowEngine, activities, worked_hours):
+    """Il calcolo per attività in puro Python (come prima della compilazione dei template)."""
+    demand = {role: 0.0 for role in WorkRole}
+    for act in activities:
+        act_id = act.get('id_attivita', '')
+        wf = engine.get_workflow_for_activity(act_id)
+        if not wf or worked_hours.get(act_id, 0) >= wf.get_total_hours(): continue
+        for role, hours in engine.calculate_remaining_hours_per_role(act_id, worked_hours.get(act_id, 0)).items():
+            demand[role] += hours
+    return demand
+
+
+def run(n_attivita: int = 50_000):
+    rnd = random.Random(3)
+    prefixes = PREFISSI_ATTIVITA + ["ELE", "XYZ"]  # XYZ: nessun workflow, deve essere ignorata
+    activities = [{'id_attivita': f"{rnd.choice(prefixes)}-{i:05d}"} for i in range(n_attivita)]
+    worked_hours = {a['id_attivita']: rnd.uniform(0, 320) for a in activities if rnd.random() < 0.7}
+    workers_by_role = {role: rnd.randint(0, 40) for role in WorkRole}
+    engine = NavalWorkflowEngine()
+    engine.compile_templates()
+
+    t0 = time.perf_counter()
+    reference = _reference_demand(engine, activities, worked_hours)
+    t_loop = time.perf_counter() - t0
+
+    best = float("inf")
+    for _ in range(5):
+        t0 = time.perf_counter()
+        analysis = engine.get_bottleneck_analysis(activities, workers_by_role, worked_hours)
+        best = min(best, time.perf_counter() - t0)
+
+    # Controllo 1: stesso fabbisogno arrotondato per ruolo
+    assert analysis['total_demand'] == {r.value: round(h) for r, h in reference.items() if h > 0}
+    assert all(b.keys() == {'role', 'severity', 'demand_hours', 'available_workers', 'shortage_hours'}
+               for b in analysis['bottlenecks']), "Formato dell'analisi rapida cambiato"
+
+    # Controllo 2: colli di bottiglia dal piano settimanale, con un ruolo senza operai (CRITICO)
+    workers = [{'id_dipendente': f"{role.value}-{k}", 'ruolo': role.value}
+               for i, role in enumerate(WorkRole) for k in range(0 if i == 0 else rnd.randint(1, 40))]
+    start = datetime.date(2025, 1, 1)
+    schedule = build_schedule(2000, start=start)
+    dated = engine.get_weekly_bottleneck_analysis(schedule, workers, worked_hours, start_date=start)
+    summary = engine.plan_capacity(schedule, workers, worked_hours, start_date=start).summary_by_role().set_index('ruolo')
+    attesi = summary[summary['settimane_critiche'] > 0]
+    assert {b['role'] for b in dated['bottlenecks']} == set(attesi.index), "Ruoli in sofferenza diversi dal piano"
+    for b in dated['bottlenecks']:
+        assert b['critical_weeks'] == attesi.loc[b['role'], 'settimane_critiche']
+        assert abs(b['shortage_hours'] - attesi.loc[b['role'], 'carenza']) < 1.0, f"Carenza diversa: {b['role']}"
+        assert (b['severity'] == 'CRITICO') == (b['available_workers'] == 0)
+    print(f"📋 {n_attivita:,} attività — colli di bottiglia sul cronoprogramma datato: "
+          f"{[(b['role'], b['severity'], b['critical_weeks']) for b in dated['bottlenecks']]}")
+    print(f"{'Ciclo per attività':<24}{t_loop * 1000:>10.1f} ms")
+    print(f"{'Matrici compilate':<24}{best * 1000:>10.1f} ms")
+    print(f"\n🚀 Speed-up: x{t_loop / best:.0f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    run(*args)
@@ -0,0 +1,167 @@
+# benchmarks/bench_calendar_view.py
+"""
+Benchmark del calendario turni (core/calendar_view.py, pagina 14): modello precalcolato con un groupby,
+stili per colonne e una pagina di righe disegnata, contro apply riga per riga + quattro pivot_table con
+aggregatore Python + Styler.map su tutta la tabella.
+Controlli:
+  - stesse matrici turni e ore delle pivot_table (righe, colonne, celle unite con " | "), nelle due viste;
+  - stessi stili cella per cella delle funzioni highlight/style della pagina;
+  - cache per (periodo, vista, versione dati): il secondo accesso non rilegge, una scrittura la invalida;
+  - accessi concorrenti (come le sessioni Streamlit): un solo modello per chiave, cache entro la dimensione massima.
+
+Uso:  python benchmarks/bench_calendar_view.py [n_dipendenti]
+"""
+from __future__ import annotations
+import sys
+import time
+import datetime
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import jinja2
+except ImportError:
+    jinja2 = None
+
+from synthetic_data import build_crm_db
+from core.shift_service import ShiftService, CALENDAR_CACHE_SIZE
+from core.calendar_view import build_calendar
+from core.crm_db import SQUADRA_STORICA_NON_ASSEGNATA
+
+RIGHE_PER_PAGINA = 50
+INDICI = {'squadra': ['squadra_storica'], 'dipendente': ['squadra_storica', 'dipendente_nome']}
+
+
+def highlight_cells_info(val):
+    if val != '-' and val != 0: return 'background-color: #1C2A44; color: white; white-space: pre-wrap;'
+    return ''
+
+
+def style_squadra_hours(val):
+    if isinstance(val, (int, float)):
+        if val == 0: return 'color: #e0e0e0'
+        if val < 20: return 'background-color: #dbeafe; color: black'
+        if val < 50: return 'background-color: #93c5fd; color: black'
+        return 'background-color: #2563eb; color: white'
+    return ''
+
+
+def style_dipendente_hours(val):
+    if isinstance(val, (int, float)):
+        if val == 0: return 'color: #e0e0e0'
+        if val > 10: return 'background-color: #fee2e2; color: black'
+        if val >= 8: return 'background-color: #dcfce7; color: black'
+        return 'background-color: #fef9c3; color: black'
+    return ''
+
+
+def _legacy_calendar(df_turni, start_date, end_date, vista):
+    """La pagina prima del modello: apply, pivot_table con join Python, Styler.map su tutte le celle."""
+    df_turni = df_turni.copy()
+    df_turni['giorno'] = pd.to_datetime(df_turni['data_ora_inizio_effettiva']).dt.date
+    df_turni['id_attivita'] = df_turni['id_attivita'].fillna("").astype(str)
+    df_turni['turno_info'] = df_turni.apply(
+        lambda row: f"{row['data_ora_inizio_effettiva'].strftime('%H:%M')}-"
+                    f"{row['data_ora_fine_effettiva'].strftime('%H:%M')} "
+                    f"({row['id_attivita']})", axis=1)
+    df_turni['squadra_storica'] = df_turni['nome_squadra'].fillna(SQUADRA_STORICA_NON_ASSEGNATA)
+    all_days = [start_date + datetime.timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    join_shifts = lambda x: " | ".join(sorted(list(set(x))))
+    piv_turni = df_turni.pivot_table(index=INDICI[vista], columns='giorno', values='turno_info',
+                                     aggfunc=join_shifts, fill_value='-').reindex(columns=all_days, fill_value='-')
+    piv_ore = df_turni.pivot_table(index=INDICI[vista], columns='giorno', values='durata_ore',
+                                   aggfunc='sum', fill_value=0).reindex(columns=all_days, fill_value=0)
+    piv_ore['TOTALE'] = piv_ore.sum(axis=1)
+    stile = style_squadra_hours if vista == 'squadra' else style_dipendente_hours
+    return piv_turni, piv_ore, (_styled(piv_turni, highlight_cells_info), _styled(piv_ore, stile, "{:.2f} h"))
+
+
+def _styled(values, css, fmt=None):
+    """
+    Tabella stilata come la riceve st.dataframe. Senza jinja2 (dipendenza di streamlit, qui assente)
+    si misurano solo gli stili: le chiamate cella per cella di Styler.map o le matrici già pronte.
+    """
+    if jinja2 is None:
+        return values.map(css) if callable(css) else css
+    styler = values.style.map(css) if callable(css) else values.style.apply(lambda _: css, axis=None)
+    return (styler.format(fmt) if fmt else styler).to_html()
+
+
+def _render_page(model):
+    """Quello che fa la pagina: una pagina di righe con gli stili precalcolati."""
+    righe = model.pagina(0, RIGHE_PER_PAGINA)
+    return [_styled(values.iloc[righe], css.iloc[righe], fmt)
+            for values, css, fmt in ((model.turni, model.stile_turni, None), (model.ore, model.stile_ore, "{:.2f} h"))]
+
+
+def run(n_dipendenti: int = 300):
+    start, end = datetime.date(2025, 3, 1), datetime.date(2025, 3, 31)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = build_crm_db(Path(tmp) / "crm.db", n_dipendenti=n_dipendenti, giorni=120)
+        service = ShiftService(db)
+        df_turni = db.get_turni_master_range_df(start, end)
+        timings = {}
+        for vista in ('squadra', 'dipendente'):
+            t0 = time.perf_counter()
+            piv_turni, piv_ore, _ = _legacy_calendar(df_turni, start, end, vista)
+            t_old = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            model = build_calendar(df_turni, start, end, vista)
+            t_build = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            _render_page(model)
+            t_page = time.perf_counter() - t0
+
+            # Controllo 1: stesse matrici delle pivot_table
+            assert model.turni.index.equals(piv_turni.index) and list(model.turni.columns) == list(piv_turni.columns)
+            assert (model.turni.to_numpy() == piv_turni.to_numpy()).all(), f"Turni diversi ({vista})"
+            assert model.ore.index.equals(piv_ore.index) and list(model.ore.columns) == list(piv_ore.columns)
+            assert np.allclose(model.ore.to_numpy(dtype=float), piv_ore.to_numpy(dtype=float)), f"Ore diverse ({vista})"
+            assert (model.turni.to_numpy() != '-').sum() < model.turni.size or " | " in "".join(model.turni.to_numpy().ravel())
+
+            # Controllo 2: stessi stili cella per cella
+            stile = style_squadra_hours if vista == 'squadra' else style_dipendente_hours
+            assert (model.stile_turni.to_numpy() == piv_turni.map(highlight_cells_info).to_numpy()).all()
+            assert (model.stile_ore.to_numpy() == piv_ore.map(stile).to_numpy()).all(), f"Stili ore diversi ({vista})"
+            timings[vista] = (t_old, t_build, t_page, model.n_righe)
+
+        # Controllo 3: cache per versione dati
+        t0 = time.perf_counter()
+        first = service.get_calendario(start, end, 'dipendente')
+        t_miss = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        hit = service.get_calendario(start, end, 'dipendente')
+        t_hit = time.perf_counter() - t0
+        assert hit is first, "Cache non usata"
+        db.add_dipendente("Nuovo", "Operaio", "Saldatore")
+        assert service.get_calendario(start, end, 'dipendente') is not first, "Cache non invalidata dalla scrittura"
+
+        # Controllo 4: accessi concorrenti su chiavi nuove e ripetute
+        periodi = [(start + datetime.timedelta(days=k % 20), end, ('squadra', 'dipendente')[k % 2]) for k in range(64)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            modelli = list(pool.map(lambda p: service.get_calendario(*p), periodi))
+            aggregati = list(pool.map(lambda k: service.get_report_aggregate(start, end, dimensions=('squadra',)), range(32)))
+        assert len(service._calendar_cache) <= CALENDAR_CACHE_SIZE and len(service._aggregate_cache) == 1
+        assert all(a.equals(aggregati[0]) for a in aggregati)
+        for p, m in zip(periodi, modelli):
+            assert m.vista == p[2] and m.giorni[0] == p[0], "Modello di un'altra chiave"
+
+    print(f"📊 {n_dipendenti} operai, marzo 2025: {len(df_turni):,} segmenti"
+          + ("" if jinja2 else " (senza jinja2: stili senza HTML)"))
+    print(f"\n{'Vista':<12}{'pivot+Styler':>14}{'modello':>12}{'pagina':>12}{'righe':>8}")
+    for vista, (t_old, t_build, t_page, n) in timings.items():
+        print(f"{vista:<12}{t_old * 1000:>11.1f} ms{t_build * 1000:>9.1f} ms{t_page * 1000:>9.1f} ms{n:>8}")
+    print(f"\n{'Servizio (lettura + modello)':<30}{t_miss * 1000:>10.1f} ms")
+    print(f"{'Servizio in cache':<30}{t_hit * 1000:>10.3f} ms")
+    t_old, t_build, t_page, _ = timings['dipendente']
+    print(f"\n🚀 Speed-up vista dipendente: x{t_old / (t_build + t_page):.1f}, x{t_old / t_page:.0f} in cache")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    run(*args)
@@ -0,0 +1,117 @@
+# benchmarks/bench_capacity_model.py
+"""
+Benchmark del modello di capacità settimanale (NavalWorkflowEngine.plan_capacity):
+turni reali per i primi mesi, calendario standard per il resto dei 12 mesi, domanda
+a fasi dal cronoprogramma sintetico. Confronto con un ciclo giorno per giorno di riferimento.
+
+Uso:  python benchmarks/bench_capacity_model.py [n_attivita] [n_dipendenti] [giorni_turni]
+"""
+from __future__ import annotations
+import sys
+import time
+import random
+import tempfile
+import datetime
+from pathlib import Path
+
+import numpy as np
+
+from synthetic_data import build_crm_db, build_schedule
+from core.workflow_engine import NavalWorkflowEngine, WorkRole
+from core.capacity_model import italian_holidays, DEFAULT_WEEKS
+
+
+def _reference(engine, schedule, workers, availability, worked_hours, start, weeks):
+    """Stesso modello con cicli Python: operaio per giorno e attività per giorno lavorativo."""
+    origin = start - datetime.timedelta(days=start.weekday())
+    n_days = weeks * 7
+    holidays = set(italian_holidays(range(origin.year, origin.year + 4)))
+    is_workday = lambda d: d.weekday() < 5 and d not in holidays
+    roles = list(WorkRole)
+    capacity = np.zeros((weeks, len(roles)))
+    demand = np.zeros((weeks, len(roles)))
+
+    planned = {(r.id_dipendente, str(r.giorno)[:10]): r.ore for r in availability.itertuples()}
+    last_planned = {}
+    for r in availability.itertuples():
+        g = datetime.date.fromisoformat(str(r.giorno)[:10])
+        last_planned[r.id_dipendente] = max(g, last_planned.get(r.id_dipendente, g))
+    for w in workers:
+        role = WorkRole.from_string(w['ruolo'])
+        if role is None: continue
+        fino_a = last_planned.get(w['id_dipendente'], datetime.date.min)
+        for k in range(start.weekday(), n_days):
+            day = origin + datetime.timedelta(days=k)
+            hours = planned.get((w['id_dipendente'], day.isoformat()), 0.0) if day <= fino_a else (8.0 if is_workday(day) else 0.0)
+            capacity[k // 7, roles.index(role)] += hours
+
+    for rec in schedule:
+        groups = engine.get_remaining_phases(rec['id_attivita'], worked_hours.get(rec['id_attivita'], 0.0))
+        if not groups: continue
+        s = max((datetime.date.fromisoformat(rec['data_inizio']) - origin).days, start.weekday())
+        e = (datetime.date.fromisoformat(rec['data_fine']) - origin).days
+        if e < start.weekday():
+            e = 6
+        days = [k for k in range(s, e + 1) if is_workday(origin + datetime.timedelta(days=k))] or list(range(s, e + 1))
+        rate = sum(max(g.values()) for g in groups) / len(days)
+        g, left = 0, max(groups[0].values())
+        for k in days:
+            budget = rate
+            while budget > 1e-9 and g < len(groups):
+                step = min(budget, left)
+                if k < n_days:
+                    for role in groups[g]:
+                        demand[k // 7, roles.index(role)] += step
+                budget -= step; left -= step
+                if left <= 1e-9:
+                    g += 1
+                    left = max(groups[g].values()) if g < len(groups) else 0.0
+    return capacity, demand
+
+
+def run(n_attivita: int = 5000, n_dipendenti: int = 300, giorni_turni: int = 120):
+    start = datetime.date(2025, 1, 1)
+    engine = NavalWorkflowEngine()
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"⏳ Generazione dati sintetici ({n_attivita} attività, {n_dipendenti} operai, {giorni_turni} giorni di turni)...")
+        db = build_crm_db(Path(tmp) / "crm.db", n_dipendenti=n_dipendenti, giorni=giorni_turni, start=start)
+        schedule = build_schedule(n_attivita, start=start)
+        workers = db.get_dipendenti_df(solo_attivi=True).reset_index().to_dict('records')
+        rnd = random.Random(5)
+        worked_hours = {r['id_attivita']: rnd.uniform(0, 200) for r in schedule if rnd.random() < 0.3}
+        end = start + datetime.timedelta(days=DEFAULT_WEEKS * 7)
+        availability = db.get_report_data_df(start, end, group_by=['id_dipendente', 'giorno'], measures=['ore_lavoro'])
+        availability = availability.rename(columns={'ore_lavoro': 'ore'})
+        # Un operaio con un solo turno molto avanti (fra 10 mesi): non deve togliere capacità agli altri
+        lontano = start + datetime.timedelta(days=300)
+        availability.loc[len(availability)] = {'id_dipendente': workers[0]['id_dipendente'], 'giorno': lontano.isoformat(), 'ore': 8.0}
+
+        best = float("inf")
+        for _ in range(3):
+            t0 = time.perf_counter()
+            plan = engine.plan_capacity(schedule, workers, worked_hours, availability, start_date=start)
+            best = min(best, time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        capacity, demand = _reference(engine, schedule, workers, availability, worked_hours, start, DEFAULT_WEEKS)
+        t_loop = time.perf_counter() - t0
+
+    # Controllo di coerenza: stesse matrici settimana x ruolo (anche con il turno lontano di un solo operaio)
+    assert np.allclose(plan.capacity, capacity, atol=1e-6), "Capacità diversa dal riferimento"
+    assert np.allclose(plan.demand, demand, atol=1e-6), "Domanda diversa dal riferimento"
+    # Controllo del turno lontano: nelle settimane fra fine turni e quel giorno resta il calendario standard
+    settimana = (giorni_turni + 30) // 7
+    attesi = sum(1 for w in workers if WorkRole.from_string(w['ruolo']) is not None) - 1
+    assert plan.capacity[settimana].sum() >= attesi * 8.0 * 3, "Capacità azzerata da un turno lontano di un altro operaio"
+
+    summary = plan.summary_by_role()
+    print(f"📅 {len(plan.weeks)} settimane x {len(summary)} ruoli — settimane in sofferenza: {len(plan.bottlenecks())}")
+    print(summary.to_string(index=False))
+    print(f"\n{'Ciclo giorno per giorno':<26}{t_loop * 1000:>10.1f} ms")
+    print(f"{'Matrici vettoriali':<26}{best * 1000:>10.1f} ms")
+    print(f"\n🚀 Speed-up: x{t_loop / best:.0f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    run(*args)
@@ -0,0 +1,50 @@
+# benchmarks/bench_critical_path.py
+"""
+Benchmark del motore CPM (core/critical_path.py): calcolo completo contro
+aggiornamento incrementale di una singola attività, con verifica che i due diano
+esattamente le stesse date e gli stessi float.
+
+Uso:  python benchmarks/bench_critical_path.py [n_attivita] [n_aggiornamenti]
+"""
+from __future__ import annotations
+import sys
+import time
+import random
+import datetime
+
+from synthetic_data import build_schedule
+from core.critical_path import CriticalPathEngine
+
+
+def run(n_attivita: int = 2000, n_aggiornamenti: int = 200):
+    status = datetime.date(2025, 3, 1)
+    records = build_schedule(n_attivita)
+    t0 = time.perf_counter()
+    engine = CriticalPathEngine(records, status_date=status)
+    t_full = time.perf_counter() - t0
+    print(f"📐 {n_attivita} attività, {len(engine.edge_table())} archi: calcolo completo {t_full * 1000:.1f} ms")
+    print(f"🏁 Fine prevista {engine.project_finish}, catena critica di {len(engine.critical_path())} attività")
+
+    rnd = random.Random(7)
+    t_incr = 0.0
+    for _ in range(n_aggiornamenti):
+        rec = rnd.choice(records)
+        if rnd.random() < 0.5:
+            fine = datetime.date.fromisoformat(rec['data_fine']) + datetime.timedelta(days=rnd.randint(0, 10))
+            changes = {'data_fine': fine.isoformat()}
+        else:
+            changes = {'stato_avanzamento': rnd.choice([0, 25, 50, 75, 100])}
+        rec.update(changes)
+        t0 = time.perf_counter()
+        engine.update_activity(rec['id_attivita'], **changes)
+        t_incr += time.perf_counter() - t0
+
+    # Controllo di coerenza: l'incrementale coincide con un ricalcolo da zero
+    assert engine.results().equals(CriticalPathEngine(records, status_date=status).results())
+    print(f"⚡ Aggiornamento incrementale medio: {t_incr / n_aggiornamenti * 1000:.2f} ms "
+          f"(x{t_full / (t_incr / n_aggiornamenti):.0f} rispetto al ricalcolo completo)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    run(*args)
@@ -0,0 +1,112 @@
+# benchmarks/bench_dependency_graph.py
+"""
+Benchmark dell'analisi d'impatto (core/dependency_graph.py): chiusure a valle / a monte con CTE
+ricorsive su dipendenze_attivita contro la visita in Python dopo il parsing del testo 'predecessori'.
+Controlli:
+  - stesse attività della visita in ampiezza sul testo, nelle due direzioni, e stessi legami diretti;
+  - dopo un import differenziale gli archi coincidono con quelli ricostruiti da tutto il testo;
+  - la cache per versione si invalida all'import (il nuovo legame compare subito), anche con un ciclo.
+
+Uso:  python benchmarks/bench_dependency_graph.py [n_attivita]
+"""
+from __future__ import annotations
+import sys
+import time
+import statistics
+import random
+import tempfile
+from collections import defaultdict, deque
+from pathlib import Path
+
+from synthetic_data import build_schedule
+from core.critical_path import parse_predecessors
+from core.schedule_db import ScheduleDBManager
+from core.dependency_graph import DependencyGraph
+
+
+def _python_closure(schedule_db, seed, direzione):
+    """Percorso senza tabella: rilegge il cronoprogramma, interpreta i predecessori e visita il grafo."""
+    succ, pred = defaultdict(set), defaultdict(set)
+    for rec in schedule_db.get_schedule_data():
+        for dep in parse_predecessors(rec['predecessori']):
+            succ[dep.predecessor].add(rec['id_attivita'])
+            pred[rec['id_attivita']].add(dep.predecessor)
+    graph = succ if direzione == 'valle' else pred
+    seen, queue = {seed}, deque([seed])
+    while queue:
+        for nxt in graph[queue.popleft()]:
+            if nxt not in seen:
+                seen.add(nxt)
+                queue.append(nxt)
+    return seen - {seed}, graph[seed]
+
+
+def run(n_attivita: int = 50_000):
+    rnd = random.Random(11)
+    schedule = build_schedule(n_attivita, giorni=700)
+    with tempfile.TemporaryDirectory() as tmp:
+        sdb = ScheduleDBManager(Path(tmp) / "schedule.db")
+        t0 = time.perf_counter()
+        sdb.update_schedule(schedule)
+        t_import = time.perf_counter() - t0
+        graph = DependencyGraph(sdb)
+        ids = [r['id_attivita'] for r in schedule]
+        seeds = [ids[0], ids[n_attivita // 2], ids[-10]] + rnd.sample(ids, 7)
+
+        # Controllo 1: CTE ricorsive contro la visita in Python
+        t_py, t_sql, t_hit = [], [], []
+        for seed in seeds:
+            for direzione in ('valle', 'monte'):
+                t0 = time.perf_counter()
+                expected, direct = _python_closure(sdb, seed, direzione)
+                t_py.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                df = graph.closure(seed, direzione)
+                t_sql.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                graph.closure(seed, direzione)
+                t_hit.append(time.perf_counter() - t0)
+                assert set(df['id_attivita']) == expected, f"Chiusura diversa: {seed} {direzione}"
+                assert set(df.loc[df['diretta'] == 1, 'id_attivita']) == direct, f"Legami diretti diversi: {seed} {direzione}"
+
+        n_down = len(graph.downstream(ids[0]))
+
+        # Controllo 2: import differenziale (predecessori cambiati, attività eliminate) e archi ricostruiti da zero
+        changed = rnd.sample(range(1, n_attivita), 200)
+        for k in changed:
+            schedule[k] = {**schedule[k], 'predecessori': f"{ids[rnd.randrange(k)]} SS+3"}
+        removed = set(rnd.sample(range(n_attivita), 50))
+        schedule = [r for k, r in enumerate(schedule) if k not in removed]
+        version = sdb.get_dependency_version()
+        t0 = time.perf_counter()
+        sdb.update_schedule(schedule, delete_missing=True)
+        t_update = time.perf_counter() - t0
+        stored = sorted((d['successore'], d['predecessore'], d['tipo'], d['ritardo']) for d in sdb.get_dependencies())
+        rebuilt = sorted(set(sdb._dependency_rows((r['id_attivita'], r['predecessori']) for r in schedule)))
+        assert stored == rebuilt, "Archi diversi da quelli ricostruiti dal testo"
+        assert sdb.get_dependency_version() == version + 1
+
+        # Controllo 3: cache invalidata dall'import, ciclo A -> B -> A senza ricorsione infinita
+        a, b = schedule[5]['id_attivita'], schedule[6]['id_attivita']
+        before = set(graph.downstream(b)['id_attivita'])
+        schedule[5] = {**schedule[5], 'predecessori': b}
+        schedule[6] = {**schedule[6], 'predecessori': a}
+        sdb.update_schedule(schedule)
+        after = graph.downstream(b)
+        assert a in set(after['id_attivita']) and a not in before, "Cache non invalidata dall'import"
+        assert b not in set(after['id_attivita'])
+
+    ms = lambda xs: f"{statistics.mean(xs) * 1000:>10.1f} ms{statistics.median(xs) * 1000:>10.1f} ms"
+    print(f"📊 {n_attivita} attività — a valle della prima: {n_down} attività")
+    print(f"\n{'Import (archi compresi)':<30}{t_import * 1000:>10.1f} ms")
+    print(f"{'Import 250 modifiche':<30}{t_update * 1000:>10.1f} ms")
+    print(f"\n{'Chiusura':<30}{'media':>13}{'mediana':>13}")
+    print(f"{'Parsing testo + visita':<30}{ms(t_py)}")
+    print(f"{'CTE ricorsiva':<30}{ms(t_sql)}")
+    print(f"{'CTE in cache':<30}{ms(t_hit)}")
+    print(f"\n🚀 Speed-up (mediana): x{statistics.median(t_py) / statistics.median(t_sql):.0f}, "
+          f"x{statistics.median(t_py) / statistics.median(t_hit):.0f} in cache")
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    run(*args)
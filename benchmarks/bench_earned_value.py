@@ -0,0 +1,120 @@
+# benchmarks/bench_earned_value.py
+"""
+Benchmark degli snapshot earned value (core/earned_value.py) su un progetto di due anni:
+ricostruzione completa, aggiornamento incrementale del giorno e lettura del trend per commessa.
+Controlli:
+  - PV e AC coincidono con un calcolo di riferimento attività per attività;
+  - dopo una serie di aggiornamenti giornalieri lo snapshot di oggi coincide con la ricostruzione completa.
+
+Uso:  python benchmarks/bench_earned_value.py [n_attivita] [n_dipendenti] [giorni]
+"""
+from __future__ import annotations
+import sys
+import time
+import random
+import tempfile
+import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import build_crm_db, build_schedule
+from core.workflow_engine import NavalWorkflowEngine, WorkRole
+from core.capacity_model import italian_holidays
+from core.earned_value import EarnedValueEngine, TOTALE
+
+
+def _assign_activities(db, schedule, seed=3):
+    """Sposta ogni registrazione su un'attività del cronoprogramma in corso quel giorno."""
+    rnd = random.Random(seed)
+    windows = [(datetime.date.fromisoformat(r['data_inizio']), datetime.date.fromisoformat(r['data_fine']), r['id_attivita']) for r in schedule]
+    with db.transaction() as cur:
+        rows = cur.execute("SELECT id_registrazione, data_ora_inizio FROM registrazioni_ore").fetchall()
+        cache, updates = {}, []
+        for id_reg, inizio in rows:
+            day = datetime.date.fromisoformat(inizio[:10])
+            if day not in cache:
+                cache[day] = [a for s, e, a in windows if s <= day <= e] or [None]
+            updates.append((rnd.choice(cache[day]), id_reg))
+        cur.executemany("UPDATE registrazioni_ore SET id_attivita = ? WHERE id_registrazione = ?", updates)
+
+
+def _reference(engine, schedule, rates, default_rate, db, oggi, sample):
+    """PV e AC di oggi per le attività campione, con cicli Python."""
+    holidays = set(italian_holidays(range(2020, 2031)))
+    is_workday = lambda d: d.weekday() < 5 and d not in holidays
+    raw = db.get_report_data_df(datetime.date(2000, 1, 1), oggi, columns=['id_attivita', 'ruolo', 'ore_lavoro'], solo_attivi=False)
+    pv, ac = {}, {}
+    for rec in sample:
+        wf = engine.get_workflow_for_activity(rec['id_attivita'])
+        bac = sum(p.hours_required * rates.get(p.role.value, default_rate) for p in wf.phases) if wf else 0.0
+        s, e = datetime.date.fromisoformat(rec['data_inizio']), datetime.date.fromisoformat(rec['data_fine'])
+        days = [s + datetime.timedelta(days=k) for k in range((e - s).days + 1)]
+        work = [d for d in days if is_workday(d)]
+        pv[rec['id_attivita']] = bac * (sum(d <= oggi for d in work) / len(work) if work else sum(d <= oggi for d in days) / len(days))
+        mine = raw[raw['id_attivita'] == rec['id_attivita']]
+        ac[rec['id_attivita']] = sum(o * rates.get(getattr(WorkRole.from_string(r), 'value', r), default_rate)
+                                     for r, o in zip(mine['ruolo'], mine['ore_lavoro']))
+    return pv, ac
+
+
+def run(n_attivita: int = 2000, n_dipendenti: int = 100, giorni: int = 730):
+    start = datetime.date(2024, 1, 1)
+    oggi = start + datetime.timedelta(days=giorni - 1)
+    engine = NavalWorkflowEngine()
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"⏳ Generazione dati sintetici ({n_attivita} attività, {n_dipendenti} operai, {giorni} giorni)...")
+        db = build_crm_db(Path(tmp) / "crm.db", n_dipendenti=n_dipendenti, giorni=giorni, start=start)
+        schedule = build_schedule(n_attivita, start=start, giorni=giorni - 40)
+        _assign_activities(db, schedule)
+        rnd = random.Random(9)
+        for rec in schedule:
+            if datetime.date.fromisoformat(rec['data_inizio']) < oggi:
+                rec['stato_avanzamento'] = rnd.choice([20, 50, 80, 100])
+        db.set_tariffa_ruolo("Saldatore", 42.0)
+        db.set_tariffa_ruolo("Capocantiere", 55.0)
+        evm = EarnedValueEngine(db, engine)
+
+        # Ricostruzione completa dei due anni
+        t0 = time.perf_counter()
+        info = evm.update_snapshots(schedule, oggi=oggi, rebuild=True)
+        t_full = time.perf_counter() - t0
+        full_today = evm.trend_commessa().query("giorno == @pd.Timestamp(@oggi)").set_index('commessa')
+
+        # Controllo 1: PV e AC di oggi contro il riferimento attività per attività
+        sample = rnd.sample([r for r in schedule if r['data_inizio'] <= oggi.isoformat()], 40)
+        pv_ref, ac_ref = _reference(engine, schedule, evm.role_rates(), evm.default_rate, db, oggi, sample)
+        status = evm.status().set_index('id_attivita')
+        for act_id in pv_ref:
+            got = status.loc[act_id] if act_id in status.index else pd.Series({'pv': 0.0, 'ac': 0.0})
+            assert abs(got['pv'] - round(pv_ref[act_id], 2)) < 0.011, f"PV diverso per {act_id}"
+            assert abs(got['ac'] - ac_ref[act_id]) < 0.011 * max(1.0, ac_ref[act_id] / 100), f"AC diverso per {act_id}"
+
+        # Controllo 2: ricostruzione fino a 10 giorni fa, poi aggiornamenti giornalieri
+        evm.update_snapshots(schedule, oggi=oggi - datetime.timedelta(days=10), rebuild=True)
+        t_incr = []
+        for k in range(9, -1, -1):
+            t0 = time.perf_counter()
+            evm.update_snapshots(schedule, oggi=oggi - datetime.timedelta(days=k))
+            t_incr.append(time.perf_counter() - t0)
+        incr_today = evm.trend_commessa().query("giorno == @pd.Timestamp(@oggi)").set_index('commessa')
+        cols = ['bac', 'pv', 'ev', 'ac']
+        assert np.allclose(incr_today[cols].to_numpy(), full_today.loc[incr_today.index, cols].to_numpy(), atol=0.05), \
+            "Snapshot incrementale diverso dalla ricostruzione"
+
+        t0 = time.perf_counter()
+        trend = evm.trend_commessa(TOTALE)
+        t_read = time.perf_counter() - t0
+
+    last = trend.iloc[-1]
+    print(f"📈 {info['giorni']} giorni, {info['righe_attivita']:,} righe attività — al {oggi:%d/%m/%Y}: "
+          f"CPI {last['cpi']:.2f}, SPI {last['spi']:.2f}")
+    print(f"\n{'Ricostruzione completa':<28}{t_full * 1000:>10.1f} ms")
+    print(f"{'Aggiornamento giornaliero':<28}{np.median(t_incr) * 1000:>10.1f} ms  (mediana di {len(t_incr)})")
+    print(f"{'Lettura trend (Totale)':<28}{t_read * 1000:>10.1f} ms  ({len(trend)} giorni)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    run(*args)
@@ -0,0 +1,139 @@
+# benchmarks/bench_gantt_view.py
+"""
+Benchmark dei dati del Gantt (core/gantt_view.py): costruzione vettoriale di barre e polilinee WebGL
+contro il ciclo iterrows della pagina 04 (una barra SVG di px.timeline per segmento).
+Controlli:
+  - vista per attività: stessi segmenti (inizio, fine, colore) del ciclo precedente, senza la barra
+    "Rimanente" doppia che quel ciclo disegnava per le attività a 0%;
+  - vista per commessa / tipo: date estreme, avanzamento pesato sulla durata e criticità come un calcolo gruppo per gruppo;
+  - drill-down: le attività del gruppo espanso compaiono subito sotto la sua riga.
+
+Uso:  python benchmarks/bench_gantt_view.py [n_attivita]
+"""
+from __future__ import annotations
+import sys
+import time
+import random
+from datetime import timedelta
+
+import pandas as pd
+
+from synthetic_data import build_schedule
+from core.workflow_engine import NavalWorkflowEngine
+from core.gantt_view import gantt_rows, gantt_bars, line_segments, group_keys
+
+LEGACY_RIMANENTE = {True: 'rgba(220, 38, 38, 0.45)', False: 'rgba(108, 117, 125, 0.5)'}
+
+
+def get_progress_color(progress):
+    """Colori della pagina prima della vista WebGL."""
+    progress = int(progress)
+    return "#28a745" if progress >= 100 else "#3B82F6" if progress >= 70 else "#EF4444" if progress >= 50 else "#F59E0B"
+
+
+def _legacy_gantt(df_filtered, show_critical=True):
+    """Il ciclo precedente della pagina, ridotto ai dati delle barre."""
+    gantt_data = []
+    for _, row in df_filtered.iterrows():
+        desc = f"🔴 {row['descrizione']}" if show_critical and row['critica'] else row['descrizione']
+        remaining_color = LEGACY_RIMANENTE[bool(show_critical and row['critica'])]
+        start, end, progress = row['data_inizio'], row['data_fine'], row['stato_avanzamento']
+        duration = (end - start).total_seconds()
+        progress_end_date = start + timedelta(seconds=(duration * (progress / 100))) if duration > 0 else start
+        if progress > 0:
+            gantt_data.append(dict(Task=desc, Start=start, Finish=progress_end_date,
+                                   Color=get_progress_color(progress), Progress=progress, Float=row['float_totale']))
+        if progress < 100:
+            gantt_data.append(dict(Task=desc, Start=progress_end_date, Finish=end, Color=remaining_color, Progress=progress, Float=row['float_totale']))
+        if progress == 0:
+            gantt_data.append(dict(Task=desc, Start=start, Finish=end, Color=remaining_color, Progress=progress, Float=row['float_totale']))
+    return pd.DataFrame(gantt_data)
+
+
+def _webgl_traces(bars):
+    """Le polilinee che la pagina passa a Scattergl: colore -> (x, y)."""
+    traces = {}
+    for part, start, end, col in ((bars[bars['stato_avanzamento'] > 0], 'data_inizio', 'fine_avanzamento', 'colore_avanzamento'),
+                                  (bars[bars['stato_avanzamento'] < 100], 'fine_avanzamento', 'data_fine', 'colore_rimanente')):
+        for color, seg in part.groupby(col):
+            traces.setdefault(color, []).append(line_segments(seg[start], seg[end], seg['y'], seg['etichetta']))
+    return traces
+
+
+def _segments_from_traces(traces, labels):
+    out = set()
+    for color, parts in traces.items():
+        for x, y, _ in parts:
+            for k in range(0, len(x), 3):
+                out.add((labels[y[k]], pd.Timestamp(x[k]).round('s'), pd.Timestamp(x[k + 1]).round('s'), color))
+    return out
+
+
+def _frame(n_attivita, seed=3):
+    rnd = random.Random(seed)
+    df = pd.DataFrame(build_schedule(n_attivita, giorni=700))
+    df['data_inizio'] = pd.to_datetime(df['data_inizio'])
+    df['data_fine'] = pd.to_datetime(df['data_fine'])
+    df['stato_avanzamento'] = [rnd.choice([0, 0, 20, 55, 75, 100]) for _ in range(n_attivita)]
+    df['critica'] = [rnd.random() < 0.08 for _ in range(n_attivita)]
+    df['float_totale'] = [rnd.randint(0, 30) for _ in range(n_attivita)]
+    return df
+
+
+def run(n_attivita: int = 5000):
+    engine = NavalWorkflowEngine()
+    df = _frame(n_attivita)
+
+    t0 = time.perf_counter()
+    legacy = _legacy_gantt(df)
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    bars = gantt_bars(gantt_rows(df))
+    traces = _webgl_traces(bars)
+    t_new = time.perf_counter() - t0
+
+    # Controllo 1: stessi segmenti del ciclo precedente (la barra doppia delle attività a 0% una volta sola)
+    expected = {(r.Task, r.Start.round('s'), r.Finish.round('s'), r.Color) for r in legacy.itertuples()}
+    got = _segments_from_traces(traces, bars['etichetta'].to_numpy())
+    assert got == expected, f"Segmenti diversi: {len(got ^ expected)}"
+    duplicates = len(legacy) - len(legacy.drop_duplicates(['Task', 'Start', 'Finish', 'Color']))
+    assert duplicates == int((df['stato_avanzamento'] == 0).sum())
+
+    # Controllo 2: gruppi contro il calcolo gruppo per gruppo
+    timings = {}
+    for by in ('commessa', 'tipo'):
+        t0 = time.perf_counter()
+        rows = gantt_rows(df, by, engine=engine)
+        grouped = gantt_bars(rows)
+        _webgl_traces(grouped)
+        timings[by] = (time.perf_counter() - t0, len(grouped))
+        keys = group_keys(df, by, engine)
+        for _, g in grouped.iterrows():
+            members = df[keys == g['chiave']]
+            durata = (members['data_fine'] - members['data_inizio']).dt.days.clip(lower=1)
+            assert g['data_inizio'] == members['data_inizio'].min() and g['data_fine'] == members['data_fine'].max()
+            assert abs(g['stato_avanzamento'] - round((durata * members['stato_avanzamento']).sum() / durata.sum(), 1)) < 1e-9
+            assert g['critica'] == members['critica'].any() and g['n_attivita'] == len(members)
+
+    # Controllo 3: drill-down di un gruppo
+    target = df['commessa'].iloc[0]
+    rows = gantt_rows(df, 'commessa', espandi=[target])
+    at = rows.index[(rows['livello'] == 0) & (rows['chiave'] == target)][0]
+    block = rows.iloc[at + 1: at + 1 + int((df['commessa'] == target).sum())]
+    assert (block['livello'] == 1).all() and set(block['chiave']) == set(df.loc[df['commessa'] == target, 'id_attivita'])
+    assert block['data_inizio'].is_monotonic_increasing
+
+    n_points = sum(len(x) for parts in traces.values() for x, _, _ in parts)
+    print(f"📊 {n_attivita} attività: {len(legacy)} barre SVG (altezza {n_attivita * 35:,} px) -> "
+          f"{len(traces)} tracce WebGL ({n_points:,} punti)")
+    print(f"\n{'iterrows (dati px.timeline)':<30}{t_old * 1000:>10.1f} ms")
+    print(f"{'Vettoriale, per attività':<30}{t_new * 1000:>10.1f} ms")
+    for by, (t, n) in timings.items():
+        print(f"{'Vettoriale, per ' + by:<30}{t * 1000:>10.1f} ms   ({n} righe)")
+    print(f"\n🚀 Speed-up: x{t_old / t_new:.1f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    run(*args)
@@ -0,0 +1,135 @@
+# benchmarks/bench_hour_sheets.py
+"""
+Benchmark delle stampe ore in blocco (core/hour_sheets.py): i fogli Riepilogo Ore di tutti gli operai del mese
+da una lettura sola, contro la pagina 15 ripetuta operaio per operaio (lettura, due cicli iterrows, celle della tabella).
+Controlli:
+  - un foglio per ogni operaio con ore nel mese, con le stesse celle e lo stesso totale della pagina;
+  - nomi file deterministici e ZIP identico byte per byte fra due generazioni e con o senza pool di processi;
+  - il documento unico contiene tutti i fogli nell'ordine dello ZIP.
+
+Uso:  python benchmarks/bench_hour_sheets.py [n_dipendenti] [processes]
+"""
+from __future__ import annotations
+import io
+import os
+import re
+import sys
+import time
+import zipfile
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from synthetic_data import build_crm_db
+from core.shift_service import ShiftService
+from core.hour_sheets import NOMI_MESI, month_range, sheet_table, table_html, table_rows
+
+
+def _legacy_table(df_w):
+    """La pagina prima del servizio: Smart Merge e classificazione a cicli, poi le celle della tabella."""
+    df_w = df_w.sort_values('data_ora_inizio')
+    merged_rows, buffer_row = [], None
+    for _, row in df_w.iterrows():
+        current_start, current_end = row['data_ora_inizio'], row['data_ora_fine']
+        if buffer_row:
+            diff_sec = (current_start - buffer_row['end']).total_seconds()
+            if (0 <= diff_sec <= 120) and (current_start.hour == 0):
+                buffer_row['end'] = current_end
+                buffer_row['hours'] += row['ore_presenza']
+                continue
+            merged_rows.append(buffer_row)
+        buffer_row = {'start': current_start, 'end': current_end, 'hours': row['ore_presenza'], 'activity': str(row['id_attivita'])}
+    if buffer_row:
+        merged_rows.append(buffer_row)
+
+    view_data, tot_ore, prev_shift_type = [], 0.0, None
+    for item in merged_rows:
+        d_s, d_e, ore, att_cod = item['start'], item['end'], item['hours'], item['activity']
+        tot_ore += ore
+        h = d_s.hour
+        if "OFF" in att_cod: curr_type, icon = "OFFICINA", "🔧"
+        elif "VIAGGIO" in att_cod: curr_type, icon = "TRASFERTA", "🚚"
+        elif h >= 20 or h < 6: curr_type, icon = "NOTTE", "🌙"
+        elif 18 <= h < 20: curr_type, icon = "SERA", "🌗"
+        else: curr_type, icon = "GIORNO", "☀️"
+        desc = att_cod if att_cod not in ["-1", "nan", "None"] else f"Turno {curr_type.capitalize()}"
+        if "OFF" in att_cod: desc = "Officina"
+        if "VIAGGIO" in att_cod: desc = "Trasferta"
+        tag_cambio = ""
+        if prev_shift_type and curr_type in ("GIORNO", "NOTTE") and prev_shift_type in ("GIORNO", "NOTTE") and curr_type != prev_shift_type:
+            tag_cambio = f" <span style='font-size:0.85em; opacity:0.8; margin-left:8px;'>🔀 <b>CAMBIO</b></span>"
+        if ore > 4: prev_shift_type = curr_type
+        orario_str = f"{d_s.strftime('%H:%M')} - {d_e.strftime('%H:%M')}"
+        if d_e.date() > d_s.date():
+            orario_str += " <small>(+1)</small>"
+        view_data.append({
+            "DATA": f"<b>{d_s.day}</b> <small>{d_s.strftime('%a')}</small>",
+            "ATTIVITÀ": f"<span style='font-size:1.1em'>{icon}</span> {desc} {tag_cambio}",
+            "ORARIO": orario_str,
+            "ORE": f"<b>{ore:g}</b>",
+            "VISTO": "<span style='color:#ccc'>......</span>",
+        })
+    return pd.DataFrame(view_data), tot_ore
+
+
+def run(n_dipendenti: int = 300, processes: int = max(2, os.cpu_count() or 1)):
+    anno, mese = 2025, 3
+    start, end = month_range(anno, mese)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = build_crm_db(Path(tmp) / "crm.db", n_dipendenti=n_dipendenti, giorni=120)
+        service = ShiftService(db)
+        ids = service.get_dipendenti_df().index.tolist()
+
+        # Pagina 15 operaio per operaio
+        t0 = time.perf_counter()
+        legacy = {i: _legacy_table(db.get_report_data_df(start, end, dipendenti=[i])) for i in ids}
+        t_old = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        nome_zip, dati = service.export_hour_sheets(anno, mese)
+        t_new = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        _, dati_pool = service.export_hour_sheets(anno, mese, processes=processes)
+        t_pool = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        nome_unico, unico = service.export_hour_sheets(anno, mese, unico=True)
+        t_unico = time.perf_counter() - t0
+
+        # Controllo 1: un foglio per operaio, stessa tabella e stesso totale della pagina
+        zf = zipfile.ZipFile(io.BytesIO(dati))
+        nomi = zf.namelist()
+        assert nomi == sorted(nomi) and len(nomi) == len(ids), f"{len(nomi)} fogli per {len(ids)} operai"
+        turni = service.get_riepilogo_turni(start, end)
+        for nome in nomi:
+            id_dip = int(nome.split('_')[1])
+            foglio = zf.read(nome).decode('utf-8')
+            celle, tot_ore = legacy[id_dip]
+            assert sheet_table(turni[turni['id_dipendente'] == id_dip]).reset_index(drop=True).equals(celle), f"Celle diverse: {nome}"
+            assert table_html(table_rows(celle)) in foglio, f"Tabella diversa: {nome}"
+            assert f"TOTALE ORE: {tot_ore:g}<" in foglio and f"Matr. #{id_dip:04d}" in foglio
+
+        # Controllo 2: generazione deterministica, con e senza pool
+        assert service.export_hour_sheets(anno, mese)[1] == dati, "ZIP non riproducibile"
+        assert dati_pool == dati, "Il pool di processi cambia lo ZIP"
+        assert nome_zip == "riepilogo_ore_2025-03.zip" and nome_unico == "riepilogo_ore_2025-03.html"
+
+        # Controllo 3: documento unico con tutti i fogli, nello stesso ordine
+        doc = unico.decode('utf-8')
+        matricole = [int(m) for m in re.findall(r"Matr\. #(\d{4})", doc)]
+        assert matricole == [int(n.split('_')[1]) for n in nomi]
+
+    print(f"📊 {n_dipendenti} operai, {NOMI_MESI[mese - 1]} {anno}: {len(nomi)} fogli, ZIP {len(dati) / 1024:.0f} KB, "
+          f"documento unico {len(unico) / 1024:.0f} KB")
+    print(f"\n{'Pagina 15 per operaio':<30}{t_old * 1000:>10.1f} ms")
+    print(f"{'Blocco (ZIP)':<30}{t_new * 1000:>10.1f} ms")
+    print(f"{f'Blocco (ZIP, {processes} processi)':<30}{t_pool * 1000:>10.1f} ms   ({os.cpu_count()} CPU)")
+    print(f"{'Blocco (documento unico)':<30}{t_unico * 1000:>10.1f} ms")
+    print(f"\n🚀 Speed-up: x{t_old / t_new:.1f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    run(*args)
@@ -0,0 +1,60 @@
+# benchmarks/bench_monte_carlo.py
+"""
+Benchmark della previsione Monte Carlo (NavalWorkflowEngine.forecast_completion):
+N attività x K simulazioni, in serie e su pool di processi, con due controlli:
+  - con tutti i fattori a 1 le date coincidono con il CPM deterministico;
+  - a parità di seme il risultato non dipende dal numero di processi.
+
+Uso:  python benchmarks/bench_monte_carlo.py [n_attivita] [n_simulazioni] [processi]
+"""
+from __future__ import annotations
+import os
+import sys
+import time
+import random
+import datetime
+import dataclasses
+
+from synthetic_data import build_schedule
+from core.workflow_engine import NavalWorkflowEngine
+from core.monte_carlo import MonteCarloForecaster
+
+
+def run(n_attivita: int = 2000, n_simulazioni: int = 10_000, processi: int = 0):
+    processi = processi or os.cpu_count() or 1
+    status = datetime.date(2025, 3, 1)
+    records = build_schedule(n_attivita)
+    rnd = random.Random(11)
+    for rec in records[: n_attivita // 3]:
+        rec['stato_avanzamento'] = rnd.choice([0, 50, 100])
+    engine = NavalWorkflowEngine()
+
+    t0 = time.perf_counter()
+    forecaster = MonteCarloForecaster(engine, records, status_date=status)
+    print(f"🧮 Modello di {n_attivita} attività pronto in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    # Controllo 1: fattori a 1 -> stesse date del passo in avanti CPM
+    unit = MonteCarloForecaster(engine, records, status_date=status)
+    unit.model = dataclasses.replace(unit.model, samplers=tuple(('tri', 1.0, 1.0) for _ in unit.model.samplers))
+    check = unit.run(100, seed=0)
+    assert (check.activities['p95'] == check.activities['fine_cpm']).all(), "Fattori unitari diversi dal CPM"
+    assert (check.commesse['p50'] == check.commesse['fine_cpm']).all(), "Commesse diverse dal CPM"
+
+    t0 = time.perf_counter()
+    serial = forecaster.run(n_simulazioni, seed=7)
+    t_serial = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    pooled = forecaster.run(n_simulazioni, seed=7, processes=processi)
+    t_pool = time.perf_counter() - t0
+
+    # Controllo 2: stesso seme, stesso risultato in serie e sul pool
+    assert serial.activities.equals(pooled.activities) and serial.commesse.equals(pooled.commesse)
+
+    print(serial.commesse.to_string(index=False))
+    print(f"\n{'In serie':<22}{t_serial:>8.2f} s   ({n_attivita * n_simulazioni / t_serial / 1e6:.1f} M attività-prova/s)")
+    print(f"{f'Pool ({processi} processi)':<22}{t_pool:>8.2f} s")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    run(*args)
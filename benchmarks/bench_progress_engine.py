@@ -0,0 +1,106 @@
+# benchmarks/bench_progress_engine.py
+"""
+Benchmark dell'avanzamento derivato dalle ore (core/progress_engine.py):
+calcolo completo del cronoprogramma contro la sync incrementale dopo una scrittura di turni.
+Controlli:
+  - avanzamento_derivato = min(100, ore registrate / monte ore del template), con un calcolo attività per attività;
+  - dopo inserimenti, modifiche e cancellazioni di registrazioni la sync incrementale dà lo stesso
+    risultato del ricalcolo completo e ricalcola solo le attività toccate;
+  - un nuovo import del cronoprogramma non cancella le colonne derivate.
+
+Uso:  python benchmarks/bench_progress_engine.py [n_attivita] [n_dipendenti] [giorni]
+"""
+from __future__ import annotations
+import sys
+import time
+import random
+import tempfile
+import datetime
+from pathlib import Path
+
+from synthetic_data import build_crm_db, build_schedule
+from bench_earned_value import _assign_activities
+from core.schedule_db import ScheduleDBManager
+from core.workflow_engine import NavalWorkflowEngine
+from core.progress_engine import ProgressEngine
+
+
+def _snapshot(schedule_db):
+    return {a: (r['ore_consuntivate'], r['avanzamento_derivato'], r['affidabilita_avanzamento'])
+            for a, r in schedule_db.get_avanzamento().items()}
+
+
+def run(n_attivita: int = 2000, n_dipendenti: int = 300, giorni: int = 365):
+    start = datetime.date(2025, 1, 1)
+    oggi = start + datetime.timedelta(days=giorni - 30)
+    engine = NavalWorkflowEngine()
+    rnd = random.Random(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"⏳ Generazione dati sintetici ({n_attivita} attività, {n_dipendenti} operai, {giorni} giorni)...")
+        db = build_crm_db(Path(tmp) / "crm.db", n_dipendenti=n_dipendenti, giorni=giorni, start=start)
+        schedule = build_schedule(n_attivita, start=start, giorni=giorni - 40)
+        _assign_activities(db, schedule)
+        for rec in schedule:
+            rec['stato_avanzamento'] = rnd.choice([0, 20, 50, 80, 100])
+        sdb = ScheduleDBManager(Path(tmp) / "schedule.db")
+        sdb.update_schedule(schedule)
+        progress = ProgressEngine(db, sdb, engine)
+
+        t0 = time.perf_counter()
+        info = progress.refresh_all(oggi)
+        t_full = time.perf_counter() - t0
+        assert info['ricalcolate'] == n_attivita and not db.get_attivita_da_ricalcolare()
+
+        # Controllo 1: derivato contro il calcolo attività per attività
+        raw = db.get_report_data_df(datetime.date(2000, 1, 1), oggi, columns=['id_attivita', 'ore_lavoro'], solo_attivi=False)
+        ore = raw.groupby('id_attivita')['ore_lavoro'].sum()
+        snap = _snapshot(sdb)
+        for rec in rnd.sample(schedule, 100):
+            wf = engine.get_workflow_for_activity(rec['id_attivita'])
+            got = snap[rec['id_attivita']]
+            if wf is None:
+                assert got[1] is None and got[2] == 'N/D'
+            else:
+                expected = min(100.0, ore.get(rec['id_attivita'], 0.0) / wf.get_total_hours() * 100)
+                assert abs(got[1] - round(expected, 1)) < 1e-9, f"Derivato diverso per {rec['id_attivita']}"
+
+        # Controllo 2: scritture sparse, poi sync incrementale contro ricalcolo completo
+        with db.transaction() as cur:
+            regs = cur.execute("SELECT id_registrazione, id_attivita FROM registrazioni_ore WHERE id_attivita IS NOT NULL "
+                               "AND data_ora_inizio < ?", (oggi.isoformat(),)).fetchall()
+            picks = rnd.sample(regs, 30)
+            cur.executemany("UPDATE registrazioni_ore SET ore_lavoro = ore_lavoro + 40 WHERE id_registrazione = ?", [(p[0],) for p in picks[:10]])
+            cur.executemany("DELETE FROM registrazioni_ore WHERE id_registrazione = ?", [(p[0],) for p in picks[10:20]])
+            cur.executemany("UPDATE registrazioni_ore SET id_attivita = ? WHERE id_registrazione = ?",
+                            [(rnd.choice(schedule)['id_attivita'], p[0]) for p in picks[20:]])
+        touched = {a for a, _ in db.get_attivita_da_ricalcolare()}
+
+        t0 = time.perf_counter()
+        info = progress.sync(oggi)
+        t_incr = time.perf_counter() - t0
+        assert info['ricalcolate'] == len(touched) and not info['completo'], info
+        incremental = _snapshot(sdb)
+        progress.refresh_all(oggi)
+        full = _snapshot(sdb)
+        assert incremental == full, "Sync incrementale diversa dal ricalcolo completo"
+
+        # Controllo 3: il re-import del cronoprogramma conserva le colonne derivate
+        sdb.update_schedule(schedule)
+        assert _snapshot(sdb) == full, "Colonne derivate perse al re-import"
+        t0 = time.perf_counter()
+        idle = progress.sync(oggi)
+        t_idle = time.perf_counter() - t0
+        assert idle['ricalcolate'] == 0
+
+    flags = {}
+    for _, _, f in full.values():
+        flags[f] = flags.get(f, 0) + 1
+    print(f"📊 Affidabilità: {flags} — attività toccate dalle scritture: {len(touched)}")
+    print(f"\n{'Ricalcolo completo':<26}{t_full * 1000:>10.1f} ms")
+    print(f"{'Sync dopo le scritture':<26}{t_incr * 1000:>10.1f} ms")
+    print(f"{'Sync senza novità':<26}{t_idle * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    run(*args)
@@ -0,0 +1,59 @@
+# benchmarks/bench_report_read.py
+"""
+Benchmark lettura dati Reportistica:
+percorso classico (read_sql_query + parse_dates) contro percorso colonnare
+(epoch interi da SQLite + categorie / Arrow).
+
+Uso:  python benchmarks/bench_report_read.py [n_dipendenti] [giorni]
+"""
+from __future__ import annotations
+import sys
+import time
+import tempfile
+import datetime
+from pathlib import Path
+
+from synthetic_data import build_crm_db
+
+
+def _timeit(fn, repeat: int = 3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def run(n_dipendenti: int = 300, giorni: int = 365):
+    start = datetime.date(2025, 1, 1)
+    end = start + datetime.timedelta(days=giorni - 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"⏳ Generazione dati sintetici ({n_dipendenti} dipendenti x {giorni} giorni)...")
+        db = build_crm_db(Path(tmp) / "crm.db", n_dipendenti=n_dipendenti, giorni=giorni, start=start)
+
+        t_classic, df_classic = _timeit(lambda: db.get_report_data_df(start, end))
+        t_compact, df_compact = _timeit(lambda: db.get_report_data_df_compact(start, end))
+        print(f"\n📊 Righe lette: {len(df_classic):,}")
+        print(f"{'Percorso':<28}{'Tempo (s)':>12}{'Memoria (MB)':>15}")
+        for name, t, df in (("read_sql_query (classico)", t_classic, df_classic), ("colonnare (compatto)", t_compact, df_compact)):
+            mem = df.memory_usage(deep=True).sum() / 1e6
+            print(f"{name:<28}{t:>12.3f}{mem:>15.1f}")
+
+        try:
+            t_arrow, table = _timeit(lambda: db.get_report_data_arrow(start, end))
+            print(f"{'tabella Arrow':<28}{t_arrow:>12.3f}{table.nbytes / 1e6:>15.1f}")
+        except RuntimeError as e:
+            print(f"⏩ Arrow saltato: {e}")
+
+        # Controllo di coerenza: stessi totali con entrambi i percorsi
+        assert len(df_classic) == len(df_compact)
+        assert abs(df_classic['ore_lavoro'].sum() - df_compact['ore_lavoro'].sum()) < 1e-6
+        assert (df_classic['data_ora_inizio'].values == df_compact['data_ora_inizio'].astype('datetime64[ns]').values).all()
+        print(f"\n🚀 Speed-up: x{t_classic / t_compact:.1f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    run(*args)
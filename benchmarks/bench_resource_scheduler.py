@@ -0,0 +1,71 @@
+# benchmarks/bench_resource_scheduler.py
+"""
+Benchmark dello schedulatore a risorse limitate (NavalWorkflowEngine.plan_resources):
+cronoprogramma sintetico di N attività, operai e disponibilità reali da turni_master.
+Verifica anche i vincoli: nessun operaio oltre le ore disponibili, precedenze rispettate.
+
+Uso:  python benchmarks/bench_resource_scheduler.py [n_attivita] [n_dipendenti]
+"""
+from __future__ import annotations
+import sys
+import time
+import tempfile
+import datetime
+from pathlib import Path
+
+import numpy as np
+
+from synthetic_data import build_crm_db, build_schedule
+from core.workflow_engine import NavalWorkflowEngine
+from core.resource_scheduler import PRIORITY_RULES, build_availability_matrix, parse_predecessor_ids, DEFAULT_HORIZON_DAYS
+
+
+def run(n_attivita: int = 2000, n_dipendenti: int = 300):
+    start = datetime.date(2025, 1, 1)
+    end = start + datetime.timedelta(days=364)
+    engine = NavalWorkflowEngine()
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"⏳ Generazione dati sintetici ({n_attivita} attività, {n_dipendenti} operai)...")
+        db = build_crm_db(Path(tmp) / "crm.db", n_dipendenti=n_dipendenti, giorni=365, start=start)
+        schedule = build_schedule(n_attivita, start=start)
+        workers = db.get_dipendenti_df(solo_attivi=True).reset_index().to_dict('records')
+
+        t0 = time.perf_counter()
+        availability = db.get_report_data_df(start, end, group_by=['id_dipendente', 'giorno'], measures=['ore_lavoro'])
+        availability = availability.rename(columns={'ore_lavoro': 'ore'})
+        print(f"📅 Disponibilità da turni: {len(availability):,} operaio-giorno in {time.perf_counter() - t0:.2f}s")
+
+        print(f"\n{'Regola':<8}{'Tempo (s)':>10}{'Assegnazioni':>14}{'Completate':>12}{'In ritardo':>12}{'Fine piano':>14}")
+        for rule in PRIORITY_RULES:
+            t0 = time.perf_counter()
+            plan = engine.plan_resources(schedule, workers, {}, availability, start_date=start, priority_rule=rule)
+            elapsed = time.perf_counter() - t0
+            acts = plan.activities
+            late = int((acts['ritardo_giorni'] > 0).sum())
+            print(f"{rule:<8}{elapsed:>10.2f}{len(plan.assignments):>14,}{int(acts['completata'].sum()):>12,}{late:>12,}{str(acts['fine'].max().date()):>14}")
+            _check_plan(plan, schedule, workers, availability, start)
+
+
+def _check_plan(plan, schedule, workers, availability, start):
+    """Vincoli del piano: capacità per operaio-giorno e precedenze fine-inizio."""
+    crew = [{'id_dipendente': w['id_dipendente'], 'nome': w['nome'], 'ruolo': w['ruolo']} for w in workers]
+    cap = build_availability_matrix(crew, start, DEFAULT_HORIZON_DAYS, availability)
+    row_of = {w['id_dipendente']: i for i, w in enumerate(crew)}
+    a = plan.assignments
+    used = np.zeros_like(cap)
+    days = (a['data'].values.astype('datetime64[D]') - np.datetime64(start, 'D')).astype(np.int64)
+    np.add.at(used, (a['id_dipendente'].map(row_of).values, days), a['ore'].values)
+    assert (used <= cap + 0.01).all(), "Operaio oltre le ore disponibili"
+
+    acts = plan.activities.set_index('id_attivita')
+    for rec in schedule:
+        if rec['id_attivita'] not in acts.index or not acts.at[rec['id_attivita'], 'completata']:
+            continue
+        for p in parse_predecessor_ids(rec['predecessori']):
+            if p in acts.index:
+                assert acts.at[p, 'fine'] < acts.at[rec['id_attivita'], 'inizio'], f"Precedenza violata {p} -> {rec['id_attivita']}"
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    run(*args)
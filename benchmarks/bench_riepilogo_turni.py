@@ -0,0 +1,146 @@
+# benchmarks/bench_riepilogo_turni.py
+"""
+Benchmark del riepilogo turni delle stampe operative (ShiftEngine.merge_night_segments / classify_shifts):
+una passata vettoriale su tutti gli operai del mese contro i due cicli iterrows della pagina 15,
+ripetuti operaio per operaio (una lettura ciascuno).
+Controlli:
+  - sul crm.db sintetico: stessi turni uniti (inizio, fine, ore, attività), tipi, descrizioni e cambi turno;
+  - su turni misti (orari casuali, officina, trasferta, codici vuoti, turni corti, notti spezzate)
+    gli stessi campi coincidono riga per riga, cambio turno compreso (riferimento = ultimo turno > 4 ore).
+
+Uso:  python benchmarks/bench_riepilogo_turni.py [n_dipendenti]
+"""
+from __future__ import annotations
+import sys
+import time
+import random
+import datetime
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from synthetic_data import build_crm_db
+from core.logic import ShiftEngine
+from core.shift_service import ShiftService
+
+COLONNE = ['id_dipendente', 'data_ora_inizio', 'data_ora_fine', 'ore_presenza', 'id_attivita']
+
+
+def _legacy_riepilogo(df_w):
+    """I due cicli della pagina prima del servizio, ridotti ai dati della tabella."""
+    df_w = df_w.sort_values('data_ora_inizio')
+    merged_rows, buffer_row = [], None
+    for _, row in df_w.iterrows():
+        current_start, current_end = row['data_ora_inizio'], row['data_ora_fine']
+        if buffer_row:
+            diff_sec = (current_start - buffer_row['end']).total_seconds()
+            if (0 <= diff_sec <= 120) and (current_start.hour == 0):
+                buffer_row['end'] = current_end
+                buffer_row['hours'] += row['ore_presenza']
+                continue
+            merged_rows.append(buffer_row)
+        buffer_row = {'start': current_start, 'end': current_end, 'hours': row['ore_presenza'], 'activity': str(row['id_attivita'])}
+    if buffer_row:
+        merged_rows.append(buffer_row)
+
+    out, prev_shift_type = [], None
+    for item in merged_rows:
+        att_cod, h = item['activity'], item['start'].hour
+        if "OFF" in att_cod: curr_type = "OFFICINA"
+        elif "VIAGGIO" in att_cod: curr_type = "TRASFERTA"
+        elif h >= 20 or h < 6: curr_type = "NOTTE"
+        elif 18 <= h < 20: curr_type = "SERA"
+        else: curr_type = "GIORNO"
+        desc = att_cod if att_cod not in ["-1", "nan", "None"] else f"Turno {curr_type.capitalize()}"
+        if "OFF" in att_cod: desc = "Officina"
+        if "VIAGGIO" in att_cod: desc = "Trasferta"
+        major_types = ["GIORNO", "NOTTE"]
+        cambio = bool(prev_shift_type and curr_type in major_types and prev_shift_type in major_types and curr_type != prev_shift_type)
+        if item['hours'] > 4: prev_shift_type = curr_type
+        out.append((item['start'], item['end'], item['hours'], curr_type, desc, cambio, item['end'].date() > item['start'].date()))
+    return out
+
+
+def _rows(df):
+    return list(zip(df['data_ora_inizio'], df['data_ora_fine'], df['ore_presenza'], df['tipo_turno'].astype(str),
+                    df['descrizione'], df['cambio_turno'].astype(bool), df['giorno_dopo'].astype(bool)))
+
+
+def _check(df_all, new, label):
+    n_righe = 0
+    for id_dip, expected in ((i, _legacy_riepilogo(g)) for i, g in df_all.groupby('id_dipendente')):
+        got = _rows(new[new['id_dipendente'] == id_dip])
+        assert len(got) == len(expected), f"{label}: operaio {id_dip}, {len(got)} turni invece di {len(expected)}"
+        for g, e in zip(got, expected):
+            assert g[:2] == e[:2] and abs(g[2] - e[2]) < 1e-9 and g[3:] == e[3:], f"{label}: operaio {id_dip}: {g} != {e}"
+        n_righe += len(expected)
+    return n_righe
+
+
+def _mixed_frame(n_dipendenti=120, giorni=31, seed=5):
+    """Turni misti non sovrapposti: orari casuali, notti spezzate a mezzanotte (anche con pochi minuti di pausa), codici speciali."""
+    rnd = random.Random(seed)
+    rows, start = [], datetime.datetime(2025, 3, 1)
+    codici = ["MON-001", "FAM-020", "OFF-01", "VIAGGIO-GE", "-1", None, float('nan')]
+    for id_dip in range(1, n_dipendenti + 1):
+        fine = start
+        for d in range(giorni):
+            s = start + datetime.timedelta(days=d, hours=rnd.choice([0, 5, 6, 8, 14, 18, 19, 20, 22]))
+            if rnd.random() < 0.15 or s < fine:  # giorno di riposo o turno sovrapposto al precedente
+                continue
+            e = s + datetime.timedelta(hours=rnd.choice([2, 4, 4.5, 8, 10]))
+            att = rnd.choice(codici)
+            mezzanotte = datetime.datetime.combine(s.date() + datetime.timedelta(days=1), datetime.time.min)
+            pausa = datetime.timedelta(minutes=rnd.choice([0, 0, 1, 3]))
+            parts = [(s, e)] if e <= mezzanotte else [(s, mezzanotte), (mezzanotte + pausa, e + pausa)]
+            for ps, pe in parts:
+                rows.append((id_dip, ps, pe, (pe - ps).total_seconds() / 3600, att))
+            fine = parts[-1][1]
+    df = pd.DataFrame(rows, columns=COLONNE)
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)  # ordine di lettura qualsiasi
+
+
+def run(n_dipendenti: int = 300):
+    start, end = datetime.date(2025, 3, 1), datetime.date(2025, 3, 31)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = build_crm_db(Path(tmp) / "crm.db", n_dipendenti=n_dipendenti, giorni=120)
+        service = ShiftService(db)
+        ids = list(range(1, n_dipendenti + 1))
+
+        # Pagina precedente: una lettura e due cicli per operaio
+        t0 = time.perf_counter()
+        for id_dip in ids:
+            _legacy_riepilogo(db.get_report_data_df(start, end, dipendenti=[id_dip]))
+        t_old = time.perf_counter() - t0
+
+        # Servizio: una lettura e una passata vettoriale per tutti
+        t0 = time.perf_counter()
+        riepilogo = service.get_riepilogo_turni(start, end)
+        t_new = time.perf_counter() - t0
+
+        # Controllo 1: crm.db sintetico (notti spezzate a mezzanotte)
+        df_all = db.get_report_data_df(start, end, columns=COLONNE)
+        n_seg = len(df_all)
+        n_turni = _check(df_all, riepilogo, "crm.db")
+        assert n_turni < n_seg, "Nessuna notte riunita"
+
+    # Controllo 2: turni misti
+    mixed = _mixed_frame()
+    t0 = time.perf_counter()
+    out = ShiftEngine.classify_shifts(ShiftEngine.merge_night_segments(mixed))
+    t_mixed = time.perf_counter() - t0
+    n_mixed = _check(mixed, out, "misti")
+    n_cambi = int(out['cambio_turno'].sum())
+    assert n_cambi > 0 and set(out['tipo_turno'].astype(str)) == set(ShiftEngine.TIPI_TURNO)
+
+    print(f"📊 {n_dipendenti} operai, marzo 2025: {n_seg:,} segmenti -> {n_turni:,} turni")
+    print(f"   turni misti: {len(mixed):,} segmenti -> {n_mixed:,} turni, {n_cambi} cambi turno ({t_mixed * 1000:.1f} ms)")
+    print(f"\n{'iterrows per operaio':<30}{t_old * 1000:>10.1f} ms")
+    print(f"{'Passata vettoriale unica':<30}{t_new * 1000:>10.1f} ms")
+    print(f"\n🚀 Speed-up: x{t_old / t_new:.1f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    run(*args)
@@ -0,0 +1,106 @@
+# benchmarks/bench_scenarios.py
+"""
+Benchmark degli scenari what-if (core/scenarios.py): valutazione incrementale (fork del CPM,
+domanda solo delle attività toccate) contro il ricalcolo completo di CPM e capacità per scenario.
+Controlli:
+  - date CPM e domanda settimanale identiche al ricalcolo completo;
+  - ore aggiunte dagli operai in più pari al calendario standard (ciclo giorno per giorno);
+  - le attività non toccate restano condivise con il cronoprogramma di base.
+
+Uso:  python benchmarks/bench_scenarios.py [n_attivita] [n_dipendenti] [giorni_turni]
+"""
+from __future__ import annotations
+import sys
+import time
+import tempfile
+import datetime
+from pathlib import Path
+
+import numpy as np
+
+from synthetic_data import build_crm_db, build_schedule
+from core.workflow_engine import NavalWorkflowEngine
+from core.capacity_model import CapacityModel, italian_holidays
+from core.critical_path import CriticalPathEngine
+from core.scenarios import Scenario, ScenarioDelta, ScenarioPlanner, SPOSTA, MODIFICA, RIMUOVI, OPERAI
+
+
+def _scenarios(schedule, lunedi):
+    ids = [r['id_attivita'] for r in schedule]
+    return [
+        Scenario("2 saldatori da lunedì", (ScenarioDelta.create(OPERAI, "Saldatore", {'numero': 2, 'dal': lunedi.isoformat()}),)),
+        Scenario(f"{ids[3]} +1 settimana", (ScenarioDelta.create(SPOSTA, ids[3], {'giorni': 7}),)),
+        Scenario("Mix", (
+            ScenarioDelta.create(SPOSTA, ids[100], {'giorni': 14}),
+            ScenarioDelta.create(MODIFICA, ids[200], {'data_fine': schedule[200]['data_fine'][:8] + '28'}),
+            ScenarioDelta.create(RIMUOVI, ids[300]),
+            ScenarioDelta.create(OPERAI, "Carpentiere", {'numero': -3, 'dal': lunedi.isoformat(),
+                                                         'al': (lunedi + datetime.timedelta(days=60)).isoformat()}),
+        )),
+    ]
+
+
+def run(n_attivita: int = 2000, n_dipendenti: int = 300, giorni_turni: int = 120):
+    start = datetime.date(2025, 1, 1)
+    oggi = datetime.date(2025, 2, 12)
+    lunedi = oggi + datetime.timedelta(days=7 - oggi.weekday())
+    engine = NavalWorkflowEngine()
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"⏳ Generazione dati sintetici ({n_attivita} attività, {n_dipendenti} operai, {giorni_turni} giorni di turni)...")
+        db = build_crm_db(Path(tmp) / "crm.db", n_dipendenti=n_dipendenti, giorni=giorni_turni, start=start)
+        schedule = build_schedule(n_attivita, start=start)
+        workers = db.get_dipendenti_df(solo_attivi=True).reset_index().to_dict('records')
+        availability = db.get_report_data_df(oggi, oggi + datetime.timedelta(days=400), group_by=['id_dipendente', 'giorno'],
+                                             measures=['ore_lavoro']).rename(columns={'ore_lavoro': 'ore'})
+        worked_hours = {r['id_attivita']: 40.0 for r in schedule[:300]}
+
+    t0 = time.perf_counter()
+    planner = ScenarioPlanner(engine, schedule, workers, worked_hours, availability, status_date=oggi)
+    t_base = time.perf_counter() - t0
+    scenarios = _scenarios(schedule, lunedi)
+
+    t_incr, t_full = [], []
+    for s in scenarios:
+        t0 = time.perf_counter()
+        res = planner.evaluate(s)
+        t_incr.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        full_cpm = CriticalPathEngine(res.view.records, status_date=oggi)
+        full_plan = CapacityModel(engine).build(res.view.records, workers, worked_hours, availability, start_date=oggi)
+        t_full.append(time.perf_counter() - t0)
+
+        # Controllo 1: stesse date CPM e stessa domanda del ricalcolo completo
+        assert res.cpm.results().equals(full_cpm.results()), f"CPM diverso: {s.nome}"
+        assert np.allclose(res.capacity.demand, full_plan.demand, atol=1e-6), f"Domanda diversa: {s.nome}"
+
+        # Controllo 2: capacità = base + operai dello scenario sul calendario standard
+        holidays = set(italian_holidays(range(2025, 2028)))
+        horizon_end = res.capacity.weeks[-1].date() + datetime.timedelta(days=6)
+        expected = 0.0
+        for ruolo, numero, dal, al in s.workforce():
+            day = max(dal, oggi)
+            while day <= min(al or horizon_end, horizon_end):
+                expected += numero * 8.0 if day.weekday() < 5 and day not in holidays else 0.0
+                day += datetime.timedelta(days=1)
+        extra = planner.capacity_model.workforce_capacity(planner.plan, s.workforce())
+        assert abs(extra.sum() - expected) < 1e-6, f"Ore operai diverse dal calendario: {s.nome}"
+        assert np.allclose(res.capacity.capacity, np.maximum(planner.plan.capacity + extra, 0.0)), f"Capacità diversa: {s.nome}"
+
+        # Controllo 3: copy-on-write, solo le attività toccate sono copie
+        base_ids = {id(r) for r in schedule}
+        copies = sum(1 for r in res.view.records if id(r) not in base_ids)
+        assert copies == len(res.view.changed), f"Copie inattese: {s.nome}"
+
+    cmp = planner.compare(scenarios)
+    print(cmp[['scenario', 'differenze', 'attivita_toccate', 'date_cpm_cambiate', 'fine_cpm', 'scostamento_giorni',
+               'settimane_critiche', 'carenza_ore']].to_string(index=False))
+    print(f"\n{'Caso base (una volta)':<30}{t_base * 1000:>10.1f} ms")
+    print(f"{'Ricalcolo completo / scenario':<30}{np.mean(t_full) * 1000:>10.1f} ms")
+    print(f"{'Incrementale / scenario':<30}{np.mean(t_incr) * 1000:>10.1f} ms")
+    print(f"\n🚀 Speed-up: x{np.mean(t_full) / np.mean(t_incr):.1f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    run(*args)
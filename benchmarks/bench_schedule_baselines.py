@@ -0,0 +1,122 @@
+# benchmarks/bench_schedule_baselines.py
+"""
+Benchmark delle baseline del cronoprogramma (ScheduleDBManager.create_baseline / diff_baselines):
+una serie di re-import con poche modifiche, una baseline per versione.
+Controlli:
+  - ogni baseline restituisce esattamente il cronoprogramma di quel momento;
+  - il diff tra due baseline qualsiasi (e contro l'attuale) coincide con il confronto record per record;
+  - lo spazio cresce con le righe cambiate, non con il numero di baseline.
+
+Uso:  python benchmarks/bench_schedule_baselines.py [n_attivita] [n_versioni] [modifiche_per_versione]
+"""
+from __future__ import annotations
+import sys
+import time
+import random
+import sqlite3
+import datetime
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from synthetic_data import build_schedule
+from core.schedule_db import ScheduleDBManager, SCHEDULE_COLUMNS
+
+
+def _reference_diff(prima, dopo):
+    before = {r['id_attivita']: r for r in prima}
+    after = {r['id_attivita']: r for r in dopo}
+    out = {}
+    for act_id in before.keys() | after.keys():
+        b, a = before.get(act_id), after.get(act_id)
+        if b is None:
+            out[act_id] = 'aggiunta'
+        elif a is None:
+            out[act_id] = 'rimossa'
+        elif any(b[c] != a[c] for c in SCHEDULE_COLUMNS):
+            out[act_id] = 'modificata'
+    return out
+
+
+def _bytes(conn, tables):
+    return sum(conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = ?", (t,)).fetchone()[0] or 0 for t in tables)
+
+
+def _revise(rnd, records, n_changes, version):
+    new = [dict(r) for r in records]
+    for k in rnd.sample(range(len(new)), n_changes):
+        shift = datetime.timedelta(days=rnd.randint(1, 10))
+        new[k]['data_fine'] = (datetime.date.fromisoformat(new[k]['data_fine']) + shift).isoformat()
+        if rnd.random() < 0.3:
+            new[k]['data_inizio'] = (datetime.date.fromisoformat(new[k]['data_inizio']) + shift).isoformat()
+    del new[rnd.randrange(len(new))]
+    new.append({**records[0], 'id_attivita': f"NEW-{version:04d}"})
+    return new
+
+
+def run(n_attivita: int = 10_000, n_versioni: int = 20, modifiche: int = 50):
+    rnd = random.Random(12)
+    versions = [build_schedule(n_attivita)]
+    for v in range(1, n_versioni):
+        versions.append(_revise(rnd, versions[-1], modifiche, v))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sdb = ScheduleDBManager(Path(tmp) / "schedule.db")
+        ids, t_create = [], []
+        for v, records in enumerate(versions):
+            sdb.update_schedule(records, delete_missing=True)
+            t0 = time.perf_counter()
+            ids.append(sdb.create_baseline(f"Rev. {v}"))
+            t_create.append(time.perf_counter() - t0)
+        current = _revise(rnd, versions[-1], modifiche, n_versioni)
+        sdb.update_schedule(current, delete_missing=True)
+
+        # Controllo 1: ogni baseline restituisce il cronoprogramma di quel momento
+        for v in rnd.sample(range(n_versioni), 5):
+            key = lambda r: r['id_attivita']
+            got = sorted(sdb.get_baseline_schedule(ids[v]), key=key)
+            expected = sorted(({c: r.get(c) for c in SCHEDULE_COLUMNS} for r in versions[v]), key=key)
+            assert got == expected, f"Baseline {v} diversa dal cronoprogramma salvato"
+
+        # Controllo 2: diff tra coppie di baseline e contro l'attuale
+        t_diff = []
+        pairs = [(0, n_versioni - 1), (n_versioni // 2, n_versioni // 2 + 1)] + [tuple(sorted(rnd.sample(range(n_versioni), 2))) for _ in range(3)]
+        for da, a in pairs:
+            t0 = time.perf_counter()
+            diff = sdb.diff_baselines(ids[da], ids[a])
+            t_diff.append(time.perf_counter() - t0)
+            assert {d['id_attivita']: d['stato'] for d in diff} == _reference_diff(versions[da], versions[a]), (da, a)
+        t0 = time.perf_counter()
+        diff_now = sdb.diff_baselines(ids[0])
+        t_now = time.perf_counter() - t0
+        assert {d['id_attivita']: d['stato'] for d in diff_now} == _reference_diff(versions[0], current)
+        slip = {d['id_attivita']: d['slittamento_fine'] for d in diff_now if d['stato'] == 'modificata'}
+        first = {r['id_attivita']: r for r in versions[0]}
+        for r in current:
+            if r['id_attivita'] in slip:
+                expected = (datetime.date.fromisoformat(r['data_fine']) - datetime.date.fromisoformat(first[r['id_attivita']]['data_fine'])).days
+                assert slip[r['id_attivita']] == expected
+
+        t0 = time.perf_counter()
+        overlay = sdb.get_baseline_schedule(ids[0])
+        t_overlay = time.perf_counter() - t0
+
+        # Controllo 3: spazio delle baseline contro copie complete
+        with sqlite3.connect(sdb.db_path) as conn:
+            stored = _bytes(conn, ['baseline_righe', 'baseline_attivita', 'sqlite_autoindex_baseline_righe_1'])
+            full_copy = _bytes(conn, ['cronoprogramma']) * n_versioni
+            n_righe = conn.execute("SELECT COUNT(*) FROM baseline_righe").fetchone()[0]
+
+    print(f"\n📌 {n_versioni} baseline di {n_attivita} attività ({modifiche} modifiche per versione): "
+          f"{n_righe:,} righe distinte salvate invece di {n_attivita * n_versioni:,}")
+    print(f"{'Spazio baseline':<32}{stored / 2**20:>10.1f} MB  (copie complete: {full_copy / 2**20:.1f} MB)")
+    print(f"{'Creazione baseline':<32}{np.median(t_create) * 1000:>10.1f} ms  (mediana)")
+    print(f"{'Diff tra due baseline':<32}{np.median(t_diff) * 1000:>10.1f} ms  (mediana, {len(diff)} differenze)")
+    print(f"{'Diff baseline / attuale':<32}{t_now * 1000:>10.1f} ms  ({len(diff_now)} differenze)")
+    print(f"{'Baseline per overlay Gantt':<32}{t_overlay * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    run(*args)
@@ -0,0 +1,174 @@
+# benchmarks/bench_schedule_formats.py
+"""
+Benchmark dei lettori multi-formato del cronoprogramma (tools/schedule_importers.py):
+MS Project XML (iterparse), Primavera XER (riga per riga) e CSV sullo stesso cronoprogramma sintetico.
+Controlli:
+  - record identici al cronoprogramma di partenza (predecessori confrontati come legami tipo/ritardo);
+  - task di riepilogo / WBS esclusi, righe senza date e legami verso attività assenti segnalati;
+  - MSPDI: la commessa viene solo da Title/Name figli di <Project>, mai dal Name di un calendario o di un campo;
+  - per l'XML la memoria di lavoro (picco meno i record restituiti) resta ben sotto l'albero completo (ET.parse);
+  - i record passano dall'upsert differenziale: primo import tutto inserito, re-import tutto invariato.
+
+Uso:  python benchmarks/bench_schedule_formats.py [n_attivita]
+"""
+from __future__ import annotations
+import csv
+import sys
+import time
+import random
+import tempfile
+import datetime
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from synthetic_data import build_schedule
+from core.critical_path import parse_predecessors
+from core.schedule_db import ScheduleDBManager
+from tools.schedule_importers import parse_schedule_file, IMPORTERS
+
+TIPI_MSPDI = {'FF': 0, 'FS': 1, 'SF': 2, 'SS': 3}
+
+
+def _links(rec):
+    return [(d.predecessor, d.tipo, d.lag) for d in parse_predecessors(rec['predecessori'])]
+
+
+def _write_mspdi(path, schedule, bad, rnd):
+    """MSPDI con task di riepilogo (UID 0), Baseline annidate, ritardi lavorativi e trascorsi, un legame orfano."""
+    uid = {rec['id_attivita']: str(k + 1) for k, rec in enumerate(schedule)}
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<Project xmlns="http://schemas.microsoft.com/project">\n'
+                '<Name>sintetico.mpp</Name><Title>C01</Title>\n<Tasks>\n'
+                '<Task><UID>0</UID><ID>0</ID><Name>Progetto</Name><Summary>1</Summary>'
+                '<Start>2025-01-01T08:00:00</Start><Finish>2026-12-31T17:00:00</Finish></Task>\n')
+        for k, rec in enumerate(schedule):
+            start = '' if k in bad else f"{rec['data_inizio']}T08:00:00"
+            parts = [f"<Task><UID>{k + 1}</UID><ID>{k + 1}</ID><Name>{escape(rec['descrizione'])}</Name>"
+                     f"<WBS>{rec['id_attivita']}</WBS><Summary>0</Summary><Start>{start}</Start>"
+                     f"<Finish>{rec['data_fine']}T17:00:00</Finish><PercentComplete>{rec['stato_avanzamento']}</PercentComplete>"
+                     "<Baseline><Number>0</Number><Start>2020-01-01T08:00:00</Start><Finish>2020-01-02T17:00:00</Finish></Baseline>"]
+            for pred, tipo, lag in _links(rec):
+                fmt, per_day = (8, 14400) if rnd.random() < 0.3 else (7, 4800)
+                parts.append(f"<PredecessorLink><PredecessorUID>{uid[pred]}</PredecessorUID><Type>{TIPI_MSPDI[tipo]}</Type>"
+                             f"<LinkLag>{lag * per_day}</LinkLag><LagFormat>{fmt}</LagFormat></PredecessorLink>")
+            if k == 10:
+                parts.append("<PredecessorLink><PredecessorUID>999999</PredecessorUID><Type>1</Type></PredecessorLink>")
+            f.write(''.join(parts) + "</Task>\n")
+        f.write('</Tasks>\n<Resources><Resource><UID>1</UID><Name>Saldatore</Name></Resource></Resources>\n</Project>\n')
+
+
+def _write_xer(path, schedule, bad):
+    """XER cp1252 con 4 progetti, una riga TT_WBS e date effettive / early / pianificate secondo lo stato."""
+    task_id = {rec['id_attivita']: str(1000 + k) for k, rec in enumerate(schedule)}
+    proj_id = {f"C{p:02d}": str(p) for p in range(1, 5)}
+    lines = ["ERMHDR\t19.12\t2025-01-01\tProject\tadmin\tadmin\tdbxDatabaseNoName\tProject Management\tEUR",
+             "%T\tPROJECT", "%F\tproj_id\tproj_short_name"]
+    lines += [f"%R\t{pid}\t{name}" for name, pid in proj_id.items()]
+    lines += ["%T\tTASK", "%F\ttask_id\tproj_id\ttask_code\ttask_name\ttask_type\tstatus_code\tphys_complete_pct\t"
+              "act_start_date\tact_end_date\tearly_start_date\tearly_end_date\ttarget_start_date\ttarget_end_date",
+              "%R\t999\t1\tWBS-1\tFase\tTT_WBS\tTK_NotStart\t0\t\t\t\t\t2025-01-01 08:00\t2025-01-02 17:00"]
+    for k, rec in enumerate(schedule):
+        s, e, stato = rec['data_inizio'] + ' 08:00', rec['data_fine'] + ' 17:00', rec['stato_avanzamento']
+        target = ('', '') if k in bad else ('2019-01-01 08:00', '2019-01-02 17:00')  # ripiego solo se mancano le altre date
+        if k in bad:
+            s = ''
+        dates = {100: (s, e, '', '', 'TK_Complete'), 0: ('', '', s, e, 'TK_NotStart')}.get(stato, (s, '', '', e, 'TK_Active'))
+        lines.append(f"%R\t{task_id[rec['id_attivita']]}\t{proj_id[rec['commessa']]}\t{rec['id_attivita']}\t{rec['descrizione']}\t"
+                     f"TT_Task\t{dates[4]}\t{stato}\t{dates[0]}\t{dates[1]}\t{dates[2]}\t{dates[3]}\t{target[0]}\t{target[1]}")
+    lines += ["%T\tTASKPRED", "%F\ttask_pred_id\ttask_id\tpred_task_id\tpred_type\tlag_hr_cnt"]
+    for rec in schedule:
+        for pred, tipo, lag in _links(rec):
+            lines.append(f"%R\t0\t{task_id[rec['id_attivita']]}\t{task_id[pred]}\tPR_{tipo}\t{lag * 8}")
+    lines.append(f"%R\t0\t{task_id[schedule[10]['id_attivita']]}\t424242\tPR_FS\t0")
+    lines.append("%E")
+    Path(path).write_bytes(("\r\n".join(lines) + "\r\n").encode('cp1252'))
+
+
+def _write_csv(path, schedule, bad):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        w = csv.writer(f, delimiter=';')
+        w.writerow(['ID_Attivita', 'Descrizione', 'Data_Inizio', 'Data_Fine', 'Stato_Avanzamento', 'Commessa', 'Predecessori'])
+        for k, rec in enumerate(schedule):
+            start = '' if k in bad else datetime.date.fromisoformat(rec['data_inizio']).strftime('%d/%m/%y')
+            end = datetime.date.fromisoformat(rec['data_fine']).strftime('%d/%m/%Y')
+            w.writerow([rec['id_attivita'], rec['descrizione'], start, end, rec['stato_avanzamento'], rec['commessa'], rec['predecessori']])
+
+
+def _normalized(records):
+    return [{**r, 'predecessori': _links(r)} for r in records]
+
+
+def _peak(fn, *args):
+    """(risultato, picco di memoria, memoria ancora occupata dal risultato)."""
+    tracemalloc.start()
+    out = fn(*args)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, peak, retained
+
+
+def run(n_attivita: int = 50_000):
+    rnd = random.Random(8)
+    schedule = build_schedule(n_attivita, giorni=700)
+    for rec in schedule:
+        rec['stato_avanzamento'] = rnd.choice([0, 0, 30, 60, 100])
+    bad = set(rnd.sample(range(n_attivita), 25))
+    expected = [r for k, r in enumerate(schedule) if k not in bad]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"⏳ Generazione file sintetici ({n_attivita} attività) — formati registrati: {', '.join(sorted(IMPORTERS))}")
+        files = {'xml': Path(tmp) / 'piano.xml', 'xer': Path(tmp) / 'piano.xer', 'csv': Path(tmp) / 'piano.csv'}
+        _write_mspdi(files['xml'], schedule, bad, rnd)
+        _write_xer(files['xer'], schedule, bad)
+        _write_csv(files['csv'], schedule, bad)
+
+        for fmt, path in files.items():
+            errors = []
+            t0 = time.perf_counter()
+            records = parse_schedule_file(path, path.name, errors=errors)
+            elapsed = time.perf_counter() - t0
+            _, peak, retained = _peak(parse_schedule_file, path, path.name)
+
+            # Controllo 1: stessi record del cronoprogramma di partenza (MSPDI: commessa = titolo del progetto)
+            want = [{**r, 'commessa': 'C01'} for r in expected] if fmt == 'xml' else expected
+            assert _normalized(records) == _normalized(want), f"Record diversi ({fmt})"
+            # Controllo 2: righe senza data scartate, legame orfano segnalato (non in CSV)
+            date_rows = {e['riga'] for e in errors if e['colonna'] == 'Data_Inizio'}
+            assert len(date_rows) == len(bad), f"Righe senza data non segnalate ({fmt})"
+            orphans = [e for e in errors if e['colonna'] == 'Predecessori']
+            assert len(orphans) == (0 if fmt == 'csv' else 1), f"Legame orfano non segnalato ({fmt})"
+            rows.append((fmt, path.stat().st_size, elapsed, peak, retained))
+
+        # Controllo 2b: Name di calendari e campi personalizzati prima dei Task non diventano la commessa
+        intestazioni = {'<Title>C02</Title>': 'C02', '<Name>piano.mpp</Name>': 'piano.mpp', '': ''}
+        for intestazione, commessa in intestazioni.items():
+            xml = ('<Project xmlns="http://schemas.microsoft.com/project"><ExtendedAttributes><ExtendedAttribute>'
+                   '<FieldName>Text1</FieldName><Alias>Reparto</Alias></ExtendedAttribute></ExtendedAttributes>'
+                   '<Calendars><Calendar><UID>1</UID><Name>Standard</Name></Calendar></Calendars>' + intestazione +
+                   '<Tasks><Task><UID>1</UID><Name>Scafo</Name><WBS>MON-0001</WBS><Start>2025-01-02T08:00:00</Start>'
+                   '<Finish>2025-01-10T17:00:00</Finish><PercentComplete>0</PercentComplete></Task></Tasks></Project>')
+            got = parse_schedule_file(xml.encode(), 'piano.xml')
+            assert [r['commessa'] for r in got] == [commessa], f"Commessa {got[0]['commessa']!r} invece di {commessa!r}"
+
+        # Controllo 3: oltre ai record restituiti, la lettura in streaming occupa molto meno dell'albero completo dell'XML
+        _, dom_peak, _ = _peak(ET.parse, files['xml'])
+        assert dom_peak > 3 * (rows[0][3] - rows[0][4]), "iterparse non riduce la memoria"
+
+        # Controllo 4: stesso percorso di upsert dell'import Excel
+        sdb = ScheduleDBManager(Path(tmp) / 'schedule.db')
+        records = parse_schedule_file(files['xer'].read_bytes(), 'piano.xer')
+        first = sdb.update_schedule(records, delete_missing=True)
+        again = sdb.update_schedule(records, delete_missing=True)
+        assert first['inserite'] == len(expected) and again['invariate'] == len(expected), (first, again)
+
+    print(f"\n{'formato':<10}{'file':>10}{'tempo':>10}{'picco memoria':>16}{'di cui record':>16}")
+    for fmt, size, elapsed, peak, retained in rows:
+        print(f"{fmt:<10}{size / 2**20:>7.1f} MB{elapsed:>9.2f}s{peak / 2**20:>13.1f} MB{retained / 2**20:>13.1f} MB")
+    print(f"{'xml (DOM)':<10}{'':>10}{'':>10}{dom_peak / 2**20:>13.1f} MB   <- ET.parse dell'intero albero, senza record")
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    run(*args)
@@ -0,0 +1,117 @@
+# benchmarks/bench_schedule_import.py
+"""
+Benchmark dell'import del cronoprogramma (tools/schedule_extractor.py): lettura in streaming
+con date vettoriali contro il percorso precedente (read_excel + apply per cella + iterrows).
+Il foglio mescola date testuali DD/MM/YY e DD/MM/YYYY, celle data di Excel e righe non valide.
+Controlli:
+  - sulle righe valide i record coincidono con il percorso precedente (celle vuote a parte);
+  - ogni riga non valida è segnalata con il suo numero di riga Excel.
+
+Uso:  python benchmarks/bench_schedule_import.py [n_attivita]
+"""
+from __future__ import annotations
+import io
+import sys
+import time
+import random
+import datetime
+import tracemalloc
+
+import pandas as pd
+from openpyxl import Workbook
+
+from synthetic_data import build_schedule
+from tools.schedule_extractor import parse_schedule_excel
+
+HEADER = ['ID_Attivita', 'Descrizione', 'Data_Inizio', 'Data_Fine', 'Stato_Avanzamento', 'Commessa', 'Predecessori']
+
+
+def _build_xlsx(n_attivita: int, seed: int = 4):
+    """Foglio sintetico; restituisce (bytes, numeri di riga Excel non validi)."""
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(HEADER)
+    bad = set()
+    for k, rec in enumerate(build_schedule(n_attivita), start=2):
+        dates = [datetime.date.fromisoformat(rec[c]) for c in ('data_inizio', 'data_fine')]
+        style = rnd.random()
+        if style < 0.6:
+            cells = [d.strftime('%d/%m/%y') for d in dates]
+        elif style < 0.8:
+            cells = [d.strftime('%d/%m/%Y') for d in dates]
+        else:
+            cells = [datetime.datetime.combine(d, datetime.time()) for d in dates]
+        if rnd.random() < 0.01:
+            cells[rnd.randrange(2)] = rnd.choice(['da definire', '31/02/25'])
+            bad.add(k)
+        ws.append([rec['id_attivita'], rec['descrizione'], *cells, rnd.choice([0, 20, 50, 100]), rec['commessa'], rec['predecessori']])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue(), bad
+
+
+def _legacy_parse(file_bytes: bytes):
+    """Percorso precedente, ridotto all'essenziale per il confronto."""
+    df = pd.read_excel(io.BytesIO(file_bytes), engine='openpyxl')
+    df.columns = df.columns.str.strip()
+    df.dropna(how='all', inplace=True)
+
+    def parse_date_format(date_str):
+        if pd.isna(date_str):
+            return pd.NaT
+        try:
+            return pd.to_datetime(date_str, format='%d/%m/%y')
+        except Exception:
+            try:
+                return pd.to_datetime(date_str, format='%d/%m/%Y')
+            except Exception:
+                return pd.to_datetime(date_str, errors='coerce')
+
+    df['Data_Inizio'] = df['Data_Inizio'].apply(parse_date_format)
+    df['Data_Fine'] = df['Data_Fine'].apply(parse_date_format)
+    df.dropna(subset=['Data_Inizio', 'Data_Fine'], inplace=True)
+    return [{
+        "id_attivita": str(row['ID_Attivita']), "descrizione": str(row['Descrizione']),
+        "data_inizio": row['Data_Inizio'].strftime('%Y-%m-%d'), "data_fine": row['Data_Fine'].strftime('%Y-%m-%d'),
+        "stato_avanzamento": int(row.get('Stato_Avanzamento', 0) or 0),
+        "commessa": str(row.get('Commessa', '') or ''), "predecessori": str(row.get('Predecessori', '') or ''),
+    } for _, row in df.iterrows()]
+
+
+def _timed(fn, *args, **kwargs):
+    """Tempo su una prima esecuzione, picco di memoria su una seconda (tracemalloc rallenta)."""
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def run(n_attivita: int = 20_000):
+    print(f"⏳ Generazione foglio sintetico ({n_attivita} attività)...")
+    data, bad = _build_xlsx(n_attivita)
+
+    legacy, t_old, m_old = _timed(_legacy_parse, data)
+    errors = []
+    records, t_new, m_new = _timed(parse_schedule_excel, data, errors=errors)
+
+    # Controllo 1: stessi record sulle righe valide (le celle vuote non diventano più il testo 'nan')
+    legacy = [{k: '' if v == 'nan' else v for k, v in r.items()} for r in legacy]
+    assert records == legacy, "Record diversi dal percorso precedente"
+    # Controllo 2: righe non valide segnalate con il numero di riga Excel
+    assert {e['riga'] for e in errors} == bad, "Errori di riga diversi da quelli attesi"
+
+    print(f"📄 {len(records)} attività valide, {len(errors)} righe segnalate (es. riga {errors[0]['riga']}: {errors[0]['errore']})")
+    print(f"\n{'':<26}{'tempo':>10}{'picco memoria':>16}")
+    print(f"{'read_excel + apply':<26}{t_old:>9.2f}s{m_old / 2**20:>14.1f} MB")
+    print(f"{'Streaming + vettoriale':<26}{t_new:>9.2f}s{m_new / 2**20:>14.1f} MB")
+    print(f"\n🚀 Speed-up: x{t_old / t_new:.1f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    run(*args)
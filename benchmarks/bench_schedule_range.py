@@ -0,0 +1,72 @@
+# benchmarks/bench_schedule_range.py
+"""
+Benchmark delle query per finestra sul cronoprogramma (ScheduleDBManager.get_schedule_range):
+caricamento completo + filtro pandas contro la query indicizzata sulle date, con e senza commessa.
+Controllo: per ogni finestra le attività restituite coincidono con il filtro pandas.
+
+Uso:  python benchmarks/bench_schedule_range.py [n_attivita] [giorni] [n_finestre]
+"""
+from __future__ import annotations
+import sys
+import time
+import random
+import datetime
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import build_schedule
+from core.schedule_db import ScheduleDBManager
+
+
+def _pandas_window(sdb, start, end, commessa=None):
+    """Percorso precedente: tutta la tabella in un DataFrame, poi il filtro sulle date."""
+    df = pd.DataFrame(sdb.get_schedule_data())
+    df['data_inizio'] = pd.to_datetime(df['data_inizio'])
+    df['data_fine'] = pd.to_datetime(df['data_fine'])
+    mask = (df['data_inizio'].dt.date <= end) & (df['data_fine'].dt.date >= start)
+    if commessa is not None:
+        mask &= df['commessa'] == commessa
+    return set(df.loc[mask, 'id_attivita'])
+
+
+def run(n_attivita: int = 100_000, giorni: int = 1825, n_finestre: int = 20):
+    rnd = random.Random(3)
+    start0 = datetime.date(2025, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        sdb = ScheduleDBManager(Path(tmp) / "schedule.db")
+        sdb.update_schedule(build_schedule(n_attivita, start=start0, giorni=giorni))
+        windows = []
+        for _ in range(n_finestre):
+            s = start0 + datetime.timedelta(days=rnd.randrange(giorni))
+            windows.append((s, s + datetime.timedelta(days=rnd.choice([0, 7, 30])), rnd.choice([None, 'C01', 'C03'])))
+
+        t_old, t_new, t_one, sizes = [], [], [], []
+        for s, e, commessa in windows:
+            t0 = time.perf_counter()
+            expected = _pandas_window(sdb, s, e, commessa)
+            t_old.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            rows = sdb.get_schedule_range(s, e, commessa=commessa)
+            t_new.append(time.perf_counter() - t0)
+            assert {r['id_attivita'] for r in rows} == expected, f"Finestra diversa: {s} - {e} ({commessa})"
+            sizes.append(len(rows))
+
+            # Selettore attività dei turni: un giorno, due colonne
+            t0 = time.perf_counter()
+            sdb.get_schedule_range(s, s, columns=['id_attivita', 'descrizione'])
+            t_one.append(time.perf_counter() - t0)
+
+    print(f"\n📅 {n_attivita:,} attività su {giorni} giorni, {n_finestre} finestre (mediana {int(np.median(sizes))} attività)")
+    print(f"{'Tabella completa + pandas':<32}{np.median(t_old) * 1000:>10.1f} ms")
+    print(f"{'get_schedule_range':<32}{np.median(t_new) * 1000:>10.1f} ms")
+    print(f"{'Selettore attività (1 giorno)':<32}{np.median(t_one) * 1000:>10.1f} ms")
+    print(f"\n🚀 Speed-up: x{np.median(t_old) / np.median(t_new):.0f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    run(*args)
@@ -0,0 +1,97 @@
+# benchmarks/bench_schedule_upsert.py
+"""
+Benchmark dell'import differenziale del cronoprogramma (ScheduleDBManager.update_schedule):
+re-import di un cronoprogramma con poche modifiche contro il ciclo INSERT OR REPLACE riga per riga.
+Controlli:
+  - dopo il re-import la tabella coincide con un caricamento da zero degli stessi record;
+  - il riepilogo conta esattamente le modifiche, nuove ed eliminate;
+  - le colonne derivate restano e l'affidabilità si azzera solo dove cambia lo stato importato.
+
+Uso:  python benchmarks/bench_schedule_upsert.py [n_attivita] [n_modifiche]
+"""
+from __future__ import annotations
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from synthetic_data import build_schedule
+from core.schedule_db import ScheduleDBManager, SCHEDULE_COLUMNS
+
+
+def _legacy_update(db_path, records):
+    """Percorso precedente: una INSERT OR REPLACE per record."""
+    with sqlite3.connect(db_path) as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN TRANSACTION")
+        for r in records:
+            cur.execute(f"INSERT OR REPLACE INTO cronoprogramma ({', '.join(SCHEDULE_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        tuple(r.get(c) for c in SCHEDULE_COLUMNS))
+        conn.commit()
+
+
+def _table(db_path, columns=SCHEDULE_COLUMNS):
+    with sqlite3.connect(db_path) as conn:
+        return sorted(conn.execute(f"SELECT {', '.join(columns)} FROM cronoprogramma").fetchall())
+
+
+def run(n_attivita: int = 10_000, n_modifiche: int = 20):
+    rnd = random.Random(8)
+    schedule = build_schedule(n_attivita)
+    with tempfile.TemporaryDirectory() as tmp:
+        sdb = ScheduleDBManager(Path(tmp) / "schedule.db")
+        sdb.update_schedule(schedule)
+        with sqlite3.connect(sdb.db_path) as conn:
+            conn.execute("UPDATE cronoprogramma SET avanzamento_derivato = 10, affidabilita_avanzamento = 'ALTA'")
+
+        new = [dict(r) for r in schedule]
+        picks = rnd.sample(range(n_attivita), n_modifiche)
+        for k in picks[: n_modifiche // 2]:
+            new[k]['stato_avanzamento'] = 50
+        for k in picks[n_modifiche // 2:]:
+            new[k]['descrizione'] += " (rev. B)"
+        removed = new.pop(next(k for k in range(n_attivita) if k not in picks))
+        new.append({**schedule[0], 'id_attivita': 'NEW-0001'})
+
+        t0 = time.perf_counter()
+        summary = sdb.update_schedule(new, delete_missing=True)
+        t_diff = time.perf_counter() - t0
+
+        # Controllo 1: stesso contenuto di un caricamento da zero
+        fresh = ScheduleDBManager(Path(tmp) / "fresh.db")
+        fresh.update_schedule(new)
+        assert _table(sdb.db_path) == _table(fresh.db_path), "Contenuto diverso dal caricamento da zero"
+        # Controllo 2: riepilogo delle modifiche
+        assert summary == {'inserite': 1, 'aggiornate': n_modifiche, 'eliminate': 1, 'invariate': n_attivita - n_modifiche - 1}, summary
+        # Controllo 3: derivato conservato, affidabilità azzerata solo dove cambia lo stato
+        derived = dict((a, (v, f)) for a, v, f in _table(sdb.db_path, ('id_attivita', 'avanzamento_derivato', 'affidabilita_avanzamento')))
+        stato_cambiato = {schedule[k]['id_attivita'] for k in picks[: n_modifiche // 2]}
+        for act_id, (value, flag) in derived.items():
+            if act_id == 'NEW-0001':
+                assert value is None and flag is None
+            else:
+                assert value == 10 and (flag is None) == (act_id in stato_cambiato), act_id
+
+        # Stesso re-import con il percorso precedente
+        legacy = ScheduleDBManager(Path(tmp) / "legacy.db")
+        _legacy_update(legacy.db_path, schedule)
+        t0 = time.perf_counter()
+        _legacy_update(legacy.db_path, new)
+        t_old = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        idle = sdb.update_schedule(new, delete_missing=True)
+        t_idle = time.perf_counter() - t0
+        assert idle['invariate'] == len(new)
+
+    print(f"\n🗂️  {n_attivita} attività, {n_modifiche} modifiche, 1 nuova, 1 rimossa ({removed['id_attivita']})")
+    print(f"{'INSERT OR REPLACE per riga':<30}{t_old * 1000:>10.1f} ms")
+    print(f"{'Differenziale':<30}{t_diff * 1000:>10.1f} ms")
+    print(f"{'Differenziale, nessuna modifica':<30}{t_idle * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    run(*args)
@@ -0,0 +1,81 @@
+# benchmarks/bench_workflow_registry.py
+"""
+Benchmark del registro template workflow (WorkflowTemplateRegistry): compilazione del file YAML
+e risoluzione per prefisso su molti ID attività.
+Controlli:
+  - un file YAML valido ma con la struttura sbagliata (roles/templates/phases come liste)
+    è scartato con TemplateRegistryError, all'avvio (ripiego sui default) e in hot reload;
+  - un file scartato non registra i suoi ruoli (nessun ruolo fantasma in WorkRole);
+  - in hot reload resta attivo lo snapshot precedente.
+
+Uso:  python benchmarks/bench_workflow_registry.py [n_attivita]
+"""
+from __future__ import annotations
+import os
+import sys
+import time
+import random
+import tempfile
+from pathlib import Path
+
+from synthetic_data import PREFISSI_ATTIVITA
+from core.workflow_registry import WorkflowTemplateRegistry, DEFAULT_TEMPLATES_FILE, WorkRole
+
+FILE_SCARTATI = {
+    "roles come lista": "roles: [A, B]\ntemplates:\n  MON:\n    phases:\n      - {role: CARPENTIERE, hours: 8}\n",
+    "template come lista": "templates:\n  MON: [1, 2]\n",
+    "phases non lista": "templates:\n  MON:\n    phases: {role: CARPENTIERE, hours: 8}\n",
+    "fase non mappa": "templates:\n  MON:\n    phases: [CARPENTIERE]\n",
+    "ruolo in file scartato": (
+        "roles: {ZZZ: Ruolo Fantasma}\n"
+        "templates:\n  MON:\n    phases:\n      - {role: ZZZ, hours: otto}\n"
+    ),
+}
+
+
+def _write(path: Path, text: str, mtime: float) -> None:
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def run(n_attivita: int = 200_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "templates.yaml"
+        mtime = time.time()
+
+        # Controllo 1: struttura sbagliata all'avvio → errore registrato e template di default
+        default = WorkflowTemplateRegistry(DEFAULT_TEMPLATES_FILE).snapshot
+        for caso, text in FILE_SCARTATI.items():
+            _write(path, text, mtime)
+            registry = WorkflowTemplateRegistry(path)
+            assert registry.last_error, f"File non scartato all'avvio: {caso}"
+            assert set(registry._snapshot.templates) == set(default.templates), caso
+
+        # Controllo 2: nessun ruolo fantasma da un file scartato
+        assert WorkRole.from_string('ZZZ') is None, "Ruolo registrato da un file scartato"
+
+        # Controllo 3: in hot reload resta lo snapshot precedente
+        _write(path, DEFAULT_TEMPLATES_FILE.read_text(encoding="utf-8"), mtime)
+        registry = WorkflowTemplateRegistry(path)
+        before = registry._snapshot
+        for k, (caso, text) in enumerate(FILE_SCARTATI.items(), start=1):
+            _write(path, text, mtime + k)
+            registry._last_check = 0.0
+            assert registry.maybe_reload() is False, f"Ricarica accettata: {caso}"
+            assert registry._snapshot is before and registry.last_error, caso
+        assert WorkRole.from_string('ZZZ') is None
+
+        rng = random.Random(7)
+        ids = [f"{rng.choice(PREFISSI_ATTIVITA)}-{i:06d}" for i in range(n_attivita)]
+        t0 = time.perf_counter()
+        risolti = sum(1 for a in ids if registry.resolve(a) is not None)
+        elapsed = time.perf_counter() - t0
+
+    print(f"🛡️  {len(FILE_SCARTATI)} file con struttura sbagliata scartati senza ruoli fantasma")
+    print(f"📋 {n_attivita:,} ID attività, {risolti:,} con template")
+    print(f"{'Risoluzione per prefisso':<26}{elapsed * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    run(*args)
@@ -0,0 +1,98 @@
+# benchmarks/synthetic_data.py
+"""
+Generatore di dati sintetici per i benchmark.
+Crea un crm.db temporaneo popolato con anagrafica, squadre e turni realistici
+(giorno 08-18 e notte 20-06 spezzata a mezzanotte, come fa ShiftService).
+"""
+from __future__ import annotations
+import os
+import sys
+import random
+import datetime
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from core.crm_db import CrmDBManager
+from core.logic import ShiftEngine
+
+RUOLI = ["Carpentiere", "Aiutante Carpentiere", "Saldatore", "Molatore", "Capocantiere"]
+PREFISSI_ATTIVITA = ["MON", "FAM"]
+
+
+def build_crm_db(db_path: str | Path, n_dipendenti: int = 300, giorni: int = 365,
+                 start: datetime.date = datetime.date(2025, 1, 1), seed: int = 42) -> CrmDBManager:
+    """Popola un database CRM con `n_dipendenti` operai per `giorni` giorni lavorativi (lun-ven)."""
+    rnd = random.Random(seed)
+    db = CrmDBManager(db_path)
+    n_squadre = max(1, n_dipendenti // 30)
+    with db.transaction() as cur:
+        cur.executemany(
+            "INSERT INTO anagrafica_dipendenti (nome, cognome, ruolo) VALUES (?, ?, ?)",
+            [(f"Nome{i}", f"Cognome{i:04d}", RUOLI[i % len(RUOLI)]) for i in range(n_dipendenti)],
+        )
+        cur.executemany("INSERT INTO squadre (nome_squadra) VALUES (?)", [(f"Squadra {s:02d}",) for s in range(n_squadre)])
+        cur.executemany(
+            "INSERT INTO membri_squadra (id_squadra, id_dipendente) VALUES (?, ?)",
+            [(1 + (i % n_squadre), 1 + i) for i in range(n_dipendenti)],
+        )
+
+        id_master = 0
+        masters, segments = [], []
+        for d in range(giorni):
+            day = start + datetime.timedelta(days=d)
+            if day.weekday() >= 5:
+                continue
+            for i in range(n_dipendenti):
+                id_dip = i + 1
+                id_sq = 1 + (i % n_squadre)
+                notte = (id_sq % 3 == 0)
+                att = f"{PREFISSI_ATTIVITA[id_sq % 2]}-{rnd.randint(1, 200):03d}"
+                if notte:
+                    s = datetime.datetime.combine(day, datetime.time(20, 0))
+                    e = s + datetime.timedelta(hours=10)
+                else:
+                    s = datetime.datetime.combine(day, datetime.time(8, 0))
+                    e = s + datetime.timedelta(hours=10)
+                id_master += 1
+                masters.append((id_master, id_dip, id_sq, s.isoformat(), e.isoformat(), att))
+                mezzanotte = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min)
+                parts = [(s, e)] if e <= mezzanotte else [(s, mezzanotte), (mezzanotte, e)]
+                for ps, pe in parts:
+                    presenza, lavoro = ShiftEngine.calculate_professional_hours(ps, pe)
+                    segments.append((id_master, id_dip, att, ps.isoformat(), pe.isoformat(), presenza, lavoro, ""))
+
+        cur.executemany(
+            "INSERT INTO turni_master (id_turno_master, id_dipendente, id_squadra, data_ora_inizio_effettiva, data_ora_fine_effettiva, id_attivita) VALUES (?, ?, ?, ?, ?, ?)",
+            masters,
+        )
+        db.create_registrazioni_segments(cur, segments)
+    return db
+
+
+def build_schedule(n_attivita: int = 2000, start: datetime.date = datetime.date(2025, 1, 1),
+                   giorni: int = 365, seed: int = 42) -> list[dict]:
+    """
+    Cronoprogramma sintetico (record come parse_schedule_excel): attività MON/FAM con
+    1-3 predecessori scelti tra le precedenti, così il grafo è sempre aciclico.
+    """
+    rnd = random.Random(seed)
+    records = []
+    for i in range(n_attivita):
+        act_id = f"{PREFISSI_ATTIVITA[i % 2]}-{i + 1:04d}"
+        inizio = start + datetime.timedelta(days=int(giorni * i / n_attivita))
+        fine = inizio + datetime.timedelta(days=rnd.randint(10, 40))
+        preds = []
+        if i > 0:
+            for j in rnd.sample(range(max(0, i - 50), i), k=min(i, rnd.randint(1, 3))):
+                tipo = rnd.choice(["", "", "FS+1", "SS+2"])
+                preds.append(f"{PREFISSI_ATTIVITA[j % 2]}-{j + 1:04d}{tipo}")
+        records.append({
+            "id_attivita": act_id,
+            "descrizione": f"Attività sintetica {i + 1}",
+            "data_inizio": inizio.isoformat(),
+            "data_fine": fine.isoformat(),
+            "stato_avanzamento": 0,
+            "commessa": f"C{1 + i % 4:02d}",
+            "predecessori": "; ".join(preds),
+        })
+    return records
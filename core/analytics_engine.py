@@ -0,0 +1,137 @@
+# file: core/analytics_engine.py (Versione 1.0 - Motore Analitico DuckDB)
+"""
+Motore analitico opzionale per i report pesanti (mesi/anni di registrazioni).
+
+SQLite resta la fonte della verità per le scritture; qui DuckDB esegue gli stessi
+GROUP BY del report (stessa query di core.crm_db.build_report_query, dialetto 'duckdb')
+con esecuzione vettoriale e parallela. Due modalità:
+  - 'sqlite_scanner': ATTACH diretto di crm.db in sola lettura (dati sempre live);
+  - 'parquet': se l'estensione sqlite di DuckDB non è disponibile (es. installazione
+    offline), snapshot Parquet delle tabelle del report, rigenerata al cambio di versione dati.
+Il motore si attiva con ANALYTICS_ENGINE=duckdb (vedi core/config.py); senza duckdb
+installato il report continua a girare su SQLite.
+"""
+from __future__ import annotations
+
+import datetime
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+from core.crm_db import CrmDBManager, REPORT_TIMESTAMP_COLUMNS, build_report_query
+
+# Tabelle lette dalla query dei report, con la normalizzazione dei tipi:
+# in SQLite i timestamp sono stringhe ISO e i booleani interi.
+ANALYTICS_VIEWS = {
+    'registrazioni_ore': """
+        SELECT id_registrazione, id_turno_master, id_dipendente, CAST(id_attivita AS VARCHAR) AS id_attivita,
+               CAST(data_ora_inizio AS TIMESTAMP) AS data_ora_inizio,
+               CAST(data_ora_fine AS TIMESTAMP) AS data_ora_fine,
+               CAST(ore_presenza AS DOUBLE) AS ore_presenza, CAST(ore_lavoro AS DOUBLE) AS ore_lavoro,
+               tipo_ore
+        FROM {src}""",
+    'anagrafica_dipendenti': """
+        SELECT id_dipendente, nome, cognome, ruolo, CAST(attivo AS INTEGER) AS attivo FROM {src}""",
+    'squadre': "SELECT id_squadra, nome_squadra FROM {src}",
+    'membri_squadra': "SELECT id_squadra, id_dipendente FROM {src}",
+    'turni_master': "SELECT id_turno_master, id_dipendente, id_squadra FROM {src}",
+}
+
+SNAPSHOT_DIRNAME = "analytics_snapshot"
+
+
+class AnalyticsEngineError(Exception):
+    """Il motore analitico non è utilizzabile (duckdb assente o sorgente non leggibile)."""
+    pass
+
+
+class DuckDBAnalyticsEngine:
+    def __init__(self, db_manager: CrmDBManager, snapshot_dir: Optional[Path] = None):
+        if duckdb is None:
+            raise AnalyticsEngineError("duckdb non installato (pip install duckdb)")
+        self.db_manager = db_manager
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else db_manager.db_path.parent / SNAPSHOT_DIRNAME
+        self.mode: Optional[str] = None
+        self._con = None
+        self._snapshot_version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    # --- CONNESSIONE ---
+    def _connect(self):
+        con = duckdb.connect()
+        try:
+            con.execute("INSTALL sqlite")
+            con.execute("LOAD sqlite")
+            con.execute(f"ATTACH '{self.db_manager.db_path}' AS crm (TYPE sqlite, READ_ONLY)")
+            self._create_views(con, lambda t: f"crm.{t}")
+            self.mode = 'sqlite_scanner'
+        except duckdb.Error:
+            self.mode = 'parquet'
+        self._con = con
+
+    def _create_views(self, con, source_of) -> None:
+        for table, sql in ANALYTICS_VIEWS.items():
+            con.execute(f"CREATE OR REPLACE VIEW {table} AS {sql.format(src=source_of(table))}")
+
+    # --- SNAPSHOT PARQUET ---
+    def _refresh_snapshot(self, version: int) -> None:
+        """Esporta le tabelle del report in Parquet (una cartella per versione dati)."""
+        target = self.snapshot_dir / f"v{version}"
+        if not target.exists():
+            tmp = self.snapshot_dir / f".v{version}.tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            tmp.mkdir(parents=True)
+            with sqlite3.connect(self.db_manager.db_path) as src:
+                for table in ANALYTICS_VIEWS:
+                    df = pd.read_sql_query(f"SELECT * FROM {table}", src)
+                    self._con.register('_export', df)
+                    self._con.execute(f"COPY _export TO '{tmp / (table + '.parquet')}' (FORMAT PARQUET)")
+                    self._con.unregister('_export')
+            try:
+                tmp.rename(target)
+            except OSError:  # un altro processo ha già pubblicato la stessa versione
+                shutil.rmtree(tmp, ignore_errors=True)
+        self._create_views(self._con, lambda t: f"read_parquet('{target / (t + '.parquet')}')")
+        for old in self.snapshot_dir.glob("v*"):
+            if old != target:
+                shutil.rmtree(old, ignore_errors=True)
+        self._snapshot_version = version
+
+    def _ensure_ready(self) -> None:
+        with self._lock:
+            if self._con is None:
+                self._connect()
+            if self.mode == 'parquet':
+                version = self.db_manager.get_data_version()
+                if version != self._snapshot_version:
+                    self._refresh_snapshot(version)
+
+    # --- QUERY ---
+    def get_report_data_df(self, start_date: datetime.date, end_date: datetime.date, **options) -> pd.DataFrame:
+        """Stessa firma e stesso risultato di CrmDBManager.get_report_data_df, eseguita su DuckDB."""
+        if options.get('columnar'):
+            raise ValueError("La lettura colonnare epoch è propria del percorso SQLite")
+        self._ensure_ready()
+        q, params = build_report_query(start_date, end_date, dialect='duckdb', **options)
+        with self._lock:
+            df = self._con.cursor().execute(q, params).df()
+        for col in REPORT_TIMESTAMP_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col]).astype('datetime64[ns]')
+        return df
+
+    def close(self) -> None:
+        with self._lock:
+            if self._con is not None:
+                self._con.close()
+                self._con = None
+                self._snapshot_version = None
@@ -0,0 +1,118 @@
+# file: core/calendar_view.py (Versione 1.1 - Squadra Storica Condivisa)
+"""
+Modello del calendario turni (pagina 14): matrici turni e ore per squadra o per dipendente x giorno.
+
+- turno_info ("08:00-18:00 (MON-012)") con operazioni vettoriali sulle stringhe, niente apply riga per riga.
+- Un solo groupby sui segmenti (chiavi della vista, giorno, turno): turni distinti ordinati e uniti con " | "
+  e somma delle ore; le due matrici escono dallo stesso risultato con unstack, invece di quattro pivot_table.
+- Gli stili delle celle (evidenza turni, scala colori delle ore) sono matrici CSS calcolate per colonne:
+  la pagina mostra una pagina di righe alla volta e applica solo quelle.
+ShiftService.get_calendario memorizza i modelli per (periodo, vista, versione dati).
+"""
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from core.crm_db import SQUADRA_STORICA_NON_ASSEGNATA
+
+VISTE_CALENDARIO = {'squadra': ('squadra_storica',), 'dipendente': ('squadra_storica', 'dipendente_nome')}
+CELLA_VUOTA = '-'
+SEPARATORE_TURNI = " | "
+TOTALE = 'TOTALE'
+ORARI_HHMM = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60)], dtype=object)
+
+STILE_TURNO = 'background-color: #1C2A44; color: white; white-space: pre-wrap;'
+STILE_ZERO = 'color: #e0e0e0'
+# Ore squadra: scala di blu (< 20, < 50, oltre); ore dipendente: semaforo (oltre 10, 8-10, parziale)
+STILI_ORE_SQUADRA = ('background-color: #dbeafe; color: black', 'background-color: #93c5fd; color: black',
+                     'background-color: #2563eb; color: white')
+STILI_ORE_DIPENDENTE = ('background-color: #fee2e2; color: black', 'background-color: #dcfce7; color: black',
+                        'background-color: #fef9c3; color: black')
+
+
+@dataclass
+class CalendarModel:
+    vista: str
+    giorni: List[datetime.date]
+    turni: pd.DataFrame         # righe = chiavi della vista, colonne = giorni; turni del giorno o CELLA_VUOTA
+    ore: pd.DataFrame           # stesse righe; ore per giorno + TOTALE
+    stile_turni: pd.DataFrame   # CSS per cella, stessa forma di turni
+    stile_ore: pd.DataFrame     # CSS per cella, stessa forma di ore
+
+    @property
+    def n_righe(self) -> int:
+        return len(self.turni)
+
+    def n_pagine(self, righe_per_pagina: int) -> int:
+        return max(1, -(-self.n_righe // righe_per_pagina))
+
+    def pagina(self, numero: int, righe_per_pagina: int) -> slice:
+        """Righe della pagina `numero` (da 0), da usare con .iloc su tutte le matrici."""
+        inizio = numero * righe_per_pagina
+        return slice(inizio, inizio + righe_per_pagina)
+
+
+def _hhmm(orari: pd.Series) -> np.ndarray:
+    """'HH:MM' per tabella sui minuti del giorno (strftime per riga costa più di tutto il resto)."""
+    return ORARI_HHMM[(orari.dt.hour * 60 + orari.dt.minute).to_numpy()]
+
+
+def turno_info(df_turni: pd.DataFrame) -> pd.Series:
+    """Testo del segmento: "08:00-18:00 (MON-012)"."""
+    attivita = df_turni['id_attivita'].fillna("").astype(str).to_numpy(dtype=object)
+    testo = (_hhmm(df_turni['data_ora_inizio_effettiva']) + "-" + _hhmm(df_turni['data_ora_fine_effettiva'])
+             + " (" + attivita + ")")
+    return pd.Series(testo, index=df_turni.index, dtype=object)
+
+
+def hours_style(ore: pd.DataFrame, vista: str) -> pd.DataFrame:
+    """CSS per cella delle ore, con le soglie della vista (zero in grigio chiaro)."""
+    v = ore.to_numpy(dtype=float)
+    if vista == 'squadra':
+        condizioni, stili = [v == 0, v < 20, v < 50], STILI_ORE_SQUADRA
+    else:
+        condizioni, stili = [v == 0, v > 10, v >= 8], STILI_ORE_DIPENDENTE
+    css = np.select(condizioni, (STILE_ZERO,) + stili[:2], stili[2])
+    return pd.DataFrame(css, index=ore.index, columns=ore.columns)
+
+
+def build_calendar(df_turni: pd.DataFrame, start_date: datetime.date, end_date: datetime.date,
+                   vista: str = 'squadra') -> CalendarModel:
+    """Matrici del calendario dai segmenti di get_turni_master_range_df (tutti i giorni del periodo come colonne)."""
+    if vista not in VISTE_CALENDARIO:
+        raise ValueError(f"Vista non supportata: {vista!r} ({', '.join(VISTE_CALENDARIO)})")
+    chiavi = list(VISTE_CALENDARIO[vista])
+    giorni = [start_date + datetime.timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+    work = pd.DataFrame({'squadra_storica': df_turni['nome_squadra'].fillna(SQUADRA_STORICA_NON_ASSEGNATA),
+                         'dipendente_nome': df_turni['dipendente_nome'],
+                         'giorno': df_turni['data_ora_inizio_effettiva'].dt.date,
+                         'turno_info': turno_info(df_turni),
+                         'durata_ore': df_turni['durata_ore']})[chiavi + ['giorno', 'turno_info', 'durata_ore']]
+    gruppi = chiavi + ['giorno']
+    # Unico groupby sui segmenti: per (chiavi, giorno, turno) già distinti e ordinati (prima la coda della
+    # notte 00-06, poi la sera). Ogni cella è un blocco contiguo del risultato: testi e ore si sommano con
+    # reduceat sugli inizi dei blocchi (per le stringhe la somma è la concatenazione), senza un groupby.agg in Python
+    per_turno = work.groupby(gruppi + ['turno_info'])['durata_ore'].sum()
+    celle = per_turno.index.droplevel('turno_info')
+    primo = ~celle.duplicated()
+    inizi = np.flatnonzero(primo)
+    testi = per_turno.index.get_level_values('turno_info').to_numpy(dtype=object)
+    pezzi = np.where(primo, testi, SEPARATORE_TURNI + testi)
+    turni = pd.Series(np.add.reduceat(pezzi, inizi) if len(inizi) else [], index=celle[inizi], dtype=object)
+    ore = pd.Series(np.add.reduceat(per_turno.to_numpy(dtype=float), inizi) if len(inizi) else [], index=celle[inizi], dtype=float)
+
+    m_turni = turni.unstack('giorno').reindex(columns=giorni).fillna(CELLA_VUOTA)
+    m_ore = ore.unstack('giorno').reindex(columns=giorni).fillna(0.0)
+    m_turni.columns.name = m_ore.columns.name = None
+    m_ore[TOTALE] = m_ore.sum(axis=1)
+
+    stile_turni = pd.DataFrame(np.where(m_turni.to_numpy() != CELLA_VUOTA, STILE_TURNO, ''),
+                               index=m_turni.index, columns=m_turni.columns)
+    return CalendarModel(vista=vista, giorni=giorni, turni=m_turni, ore=m_ore,
+                         stile_turni=stile_turni, stile_ore=hours_style(m_ore, vista))
@@ -0,0 +1,272 @@
+# file: core/capacity_model.py (Versione 1.1 - Piani Derivati per Scenari)
+"""
+Modello di capacità a fasi temporali (ruoli x settimane) per l'analisi dei colli di bottiglia.
+
+- Capacità: ore di lavoro dei turni pianificati (turni_master/registrazioni_ore) per operaio
+  e giorno; oltre l'ultimo giorno pianificato vale il calendario standard (lun-ven, festività
+  nazionali escluse). La matrice operai x giorni diventa ruoli x settimane con un prodotto
+  per la matrice ruolo-operaio e una somma a blocchi di 7 giorni.
+- Domanda: ore residue di ogni attività (template compilati) spalmate sui giorni lavorativi
+  tra data_inizio e data_fine; i blocchi di fasi si susseguono nella finestra in proporzione
+  alle ore, così i saldatori servono dopo i carpentieri e non in contemporanea.
+  Le attività già scadute con lavoro residuo pesano sulla prima settimana (arretrato).
+- Colli di bottiglia: settimane in cui la domanda di un ruolo supera la capacità.
+- Piani derivati (scenari what-if): la domanda è additiva per attività, quindi rebase() toglie
+  e aggiunge solo le attività cambiate e somma la capacità degli operai aggiunti o tolti.
+
+Nessun ciclo per attività, giorno o settimana: solo operazioni NumPy su matrici (un passo per template).
+"""
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.workflow_engine import NavalWorkflowEngine, WorkRole
+from core.resource_scheduler import build_availability_matrix, standard_workdays, DEFAULT_DAILY_HOURS
+
+EPS = 1e-6
+DEFAULT_WEEKS = 52
+WARNING_UTILIZATION = 0.9  # sopra questa soglia la settimana è segnalata come "ATTENZIONE"
+
+# Festività nazionali a data fissa (mese, giorno); Pasquetta si calcola per anno
+FESTIVITA_FISSE = ((1, 1), (1, 6), (4, 25), (5, 1), (6, 2), (8, 15), (11, 1), (12, 8), (12, 25), (12, 26))
+
+
+def _pasqua(anno: int) -> datetime.date:
+    """Domenica di Pasqua (algoritmo di Meeus/Jones/Butcher, calendario gregoriano)."""
+    a, b, c = anno % 19, anno // 100, anno % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mese = (h + l - 7 * m + 114) // 31
+    giorno = (h + l - 7 * m + 114) % 31 + 1
+    return datetime.date(anno, mese, giorno)
+
+
+def italian_holidays(years: Iterable[int]) -> List[datetime.date]:
+    """Festività nazionali italiane (incluso Lunedì dell'Angelo) per gli anni richiesti."""
+    days = []
+    for y in years:
+        days += [datetime.date(y, m, d) for m, d in FESTIVITA_FISSE]
+        days.append(_pasqua(y) + datetime.timedelta(days=1))
+    return sorted(days)
+
+
+@dataclass
+class CapacityPlan:
+    start_date: datetime.date
+    weeks: pd.DatetimeIndex            # lunedì di ogni settimana
+    roles: tuple                       # colonne delle matrici (ordine di WorkRole)
+    capacity: np.ndarray               # (settimane, ruoli) ore disponibili
+    demand: np.ndarray                 # (settimane, ruoli) ore richieste
+    workers_by_role: Dict[str, int]
+    beyond_horizon_hours: Dict[str, float]  # ore residue che cadono dopo l'ultima settimana
+    undated_hours: Dict[str, float]         # ore residue di attività senza date valide
+
+    @property
+    def utilization(self) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            util = self.demand / self.capacity
+        return np.where(self.capacity > EPS, util, np.where(self.demand > EPS, np.inf, 0.0))
+
+    @property
+    def shortage(self) -> np.ndarray:
+        return np.maximum(self.demand - self.capacity, 0.0)
+
+    def severity(self) -> np.ndarray:
+        cap, dem = self.capacity, self.demand
+        return np.select(
+            [(dem > EPS) & (cap <= EPS), dem > cap + EPS, (dem > EPS) & (dem >= WARNING_UTILIZATION * cap)],
+            ['CRITICO', 'ALTO', 'ATTENZIONE'], default='OK')
+
+    def to_frame(self) -> pd.DataFrame:
+        """Formato lungo: settimana, ruolo, capacita, domanda, utilizzo, carenza, severita (ruoli attivi)."""
+        active = (self.capacity > EPS).any(axis=0) | (self.demand > EPS).any(axis=0)
+        n_weeks, n_active = len(self.weeks), int(active.sum())
+        return pd.DataFrame({
+            'settimana': np.repeat(self.weeks.values, n_active),
+            'ruolo': np.tile(np.array([r.value for r in self.roles], dtype=object)[active], n_weeks),
+            'capacita': self.capacity[:, active].round(1).ravel(),
+            'domanda': self.demand[:, active].round(1).ravel(),
+            'utilizzo': self.utilization[:, active].round(3).ravel(),
+            'carenza': self.shortage[:, active].round(1).ravel(),
+            'severita': self.severity()[:, active].ravel(),
+        })
+
+    def bottlenecks(self) -> pd.DataFrame:
+        """Solo le settimane in cui la domanda supera la capacità (CRITICO/ALTO), in ordine cronologico."""
+        df = self.to_frame()
+        df = df[df['severita'].isin(['CRITICO', 'ALTO'])]
+        return df.sort_values(['settimana', 'carenza'], ascending=[True, False]).reset_index(drop=True)
+
+    def summary_by_role(self) -> pd.DataFrame:
+        """Per ruolo: ore totali, settimane in sofferenza, carenza complessiva e prima settimana critica."""
+        over = self.shortage > EPS
+        first = np.where(over.any(axis=0), over.argmax(axis=0), -1)
+        df = pd.DataFrame({
+            'ruolo': [r.value for r in self.roles],
+            'operai': [self.workers_by_role.get(r.value, 0) for r in self.roles],
+            'capacita': self.capacity.sum(axis=0).round(1),
+            'domanda': self.demand.sum(axis=0).round(1),
+            'settimane_critiche': over.sum(axis=0),
+            'carenza': self.shortage.sum(axis=0).round(1),
+            'prima_settimana_critica': [self.weeks[k] if k >= 0 else pd.NaT for k in first],
+        })
+        df = df[(df['capacita'] > 0) | (df['domanda'] > 0)]
+        return df.sort_values(['carenza', 'domanda'], ascending=False).reset_index(drop=True)
+
+
+class CapacityModel:
+    def __init__(self, engine: NavalWorkflowEngine, daily_hours: float = DEFAULT_DAILY_HOURS,
+                 holidays: Optional[Iterable[datetime.date]] = None):
+        self.engine = engine
+        self.daily_hours = daily_hours
+        self.holidays = None if holidays is None else sorted(holidays)  # None = festività nazionali
+
+    def _holidays(self, start: datetime.date, n_days: int) -> List[datetime.date]:
+        if self.holidays is not None:
+            return self.holidays
+        return italian_holidays(range(start.year, (start + datetime.timedelta(days=n_days)).year + 1))
+
+    def build(self, activities: List[Dict], workers: List[Dict], worked_hours: Dict[str, float],
+              availability: Optional[pd.DataFrame] = None, start_date: Optional[datetime.date] = None,
+              weeks: int = DEFAULT_WEEKS) -> CapacityPlan:
+        """
+        - workers: operai {'id_dipendente', 'ruolo'}; availability: (id_dipendente, giorno, ore) dai turni.
+        - start_date: giorno da cui si conta (default oggi); le settimane partono dal lunedì precedente.
+        """
+        today = start_date or datetime.date.today()
+        origin = today - datetime.timedelta(days=today.weekday())
+        n_days, t0 = weeks * 7, today.weekday()
+        roles = self.engine.compile_templates().roles
+        role_col = {r: k for k, r in enumerate(roles)}
+
+        capacity = self._weekly_capacity(workers, availability, origin, n_days, t0, role_col)
+        demand, beyond, undated = self._weekly_demand(activities, worked_hours, origin, n_days, t0)
+
+        members = pd.Series([w.get('ruolo') for w in workers], dtype=object).map(
+            lambda r: getattr(WorkRole.from_string(r), 'value', None)).value_counts()
+        label = lambda vec: {r.value: round(float(h), 1) for r, h in zip(roles, vec) if h > EPS}
+        return CapacityPlan(
+            start_date=today, weeks=pd.date_range(origin, periods=weeks, freq='7D'), roles=roles,
+            capacity=capacity, demand=demand, workers_by_role=members.to_dict(),
+            beyond_horizon_hours=label(beyond), undated_hours=label(undated))
+
+    def rebase(self, plan: CapacityPlan, removed: List[Dict], added: List[Dict], worked_hours: Dict[str, float],
+               workforce: Sequence[Tuple[str, float, datetime.date, Optional[datetime.date]]] = ()) -> CapacityPlan:
+        """
+        Piano derivato da `plan` senza ricalcolarlo: toglie la domanda delle attività `removed`
+        (versione di partenza), aggiunge quella di `added` (versione nuova) e somma la capacità di
+        `workforce` (ruolo, operai in più o in meno, dal, al) sul calendario standard.
+        """
+        origin = plan.weeks[0].date()
+        n_days, t0 = len(plan.weeks) * 7, plan.start_date.weekday()
+        roles = plan.roles
+        as_vec = lambda hours: np.array([hours.get(r.value, 0.0) for r in roles])
+        demand, beyond, undated = plan.demand.copy(), as_vec(plan.beyond_horizon_hours), as_vec(plan.undated_hours)
+        for activities, sign in ((removed, -1.0), (added, 1.0)):
+            if activities:
+                d, b, u = self._weekly_demand(activities, worked_hours, origin, n_days, t0)
+                demand += sign * d; beyond += sign * b; undated += sign * u
+
+        capacity, workers_by_role = plan.capacity, dict(plan.workers_by_role)
+        if workforce:
+            capacity = np.maximum(capacity + self.workforce_capacity(plan, workforce), 0.0)
+            for ruolo, numero, _, _ in workforce:
+                label = WorkRole.from_string(ruolo).value
+                workers_by_role[label] = max(0, workers_by_role.get(label, 0) + int(numero))
+        label = lambda vec: {r.value: round(float(h), 1) for r, h in zip(roles, vec) if h > EPS}
+        return replace(plan, capacity=capacity, demand=np.maximum(demand, 0.0), workers_by_role=workers_by_role,
+                       beyond_horizon_hours=label(beyond), undated_hours=label(undated))
+
+    def workforce_capacity(self, plan: CapacityPlan,
+                           workforce: Sequence[Tuple[str, float, datetime.date, Optional[datetime.date]]]) -> np.ndarray:
+        """
+        (settimane, ruoli) ore di `numero` operai in più (o in meno, se negativo) per ruolo tra `dal`
+        e `al` inclusi (None = fino alla fine dell'orizzonte), sul calendario standard dal giorno del piano.
+        """
+        origin = plan.weeks[0].date()
+        n_days = len(plan.weeks) * 7
+        hours = np.where(standard_workdays(origin, n_days, self._holidays(origin, n_days)), self.daily_hours, 0.0)
+        hours[:plan.start_date.weekday()] = 0.0  # giorni già trascorsi della prima settimana
+        role_col = {r: k for k, r in enumerate(plan.roles)}
+        extra = np.zeros((n_days, len(plan.roles)))
+        for ruolo, numero, dal, al in workforce:
+            role = WorkRole.from_string(ruolo)
+            if role not in role_col:
+                raise ValueError(f"Ruolo sconosciuto: {ruolo}")
+            a = max((dal - origin).days, 0)
+            b = min((al - origin).days + 1, n_days) if al else n_days
+            if a < b:
+                extra[a:b, role_col[role]] += numero * hours[a:b]
+        return extra.reshape(-1, 7, len(plan.roles)).sum(axis=1)
+
+    def _weekly_capacity(self, workers, availability, origin, n_days, t0, role_col) -> np.ndarray:
+        cap = build_availability_matrix(workers, origin, n_days, availability, self.daily_hours,
+                                        holidays=self._holidays(origin, n_days))
+        cap[:, :t0] = 0.0  # i giorni già trascorsi della prima settimana non sono più disponibili
+        cols = np.array([role_col.get(WorkRole.from_string(w.get('ruolo')), -1) for w in workers], dtype=np.int64)
+        by_role = np.zeros((len(role_col), len(workers)))
+        ok = cols >= 0  # operai senza un ruolo del registro non contribuiscono
+        by_role[cols[ok], np.flatnonzero(ok)] = 1.0
+        return (by_role @ cap).reshape(len(role_col), -1, 7).sum(axis=2).T
+
+    def _weekly_demand(self, activities, worked_hours, origin, n_days, t0):
+        compiled = self.engine.compile_templates()
+        ids = [a.get('id_attivita', '') for a in activities]
+        template_idx = self.engine.template_indices(ids)
+        worked = self.engine.worked_hours_array(ids, worked_hours)
+        blocks = compiled.remaining_blocks(template_idx, worked)  # (N, G) ore residue per blocco di fasi
+        base = np.datetime64(origin, 'D')
+
+        def day_offsets(key):
+            days = pd.to_datetime(pd.Series([a.get(key) for a in activities], dtype=object), errors='coerce')
+            days = days.values.astype('datetime64[D]')
+            return (days - base).astype(np.int64), ~np.isnat(days)
+
+        s, s_ok = day_offsets('data_inizio')
+        e, e_ok = day_offsets('data_fine')
+        pending = blocks.sum(axis=1) > EPS
+        dated = s_ok & e_ok & pending
+        undated = compiled.remaining_hours(template_idx[~dated], worked[~dated]).sum(axis=0)
+        template_idx, blocks, s, e = template_idx[dated], blocks[dated], s[dated], e[dated]
+        e = np.maximum(e, s)  # fine prima dell'inizio: attività di un giorno
+
+        # Il lavoro residuo parte da oggi; le attività scadute diventano arretrato della prima settimana
+        overdue = e < t0
+        s = np.where(overdue, t0, np.maximum(s, t0))
+        e = np.where(overdue, 6, e)
+
+        # Asse dei giorni lavorativi cumulati (fino alla fine dell'attività più lontana, anche oltre l'orizzonte):
+        # le finestre senza giorni lavorativi si ripartiscono sui giorni di calendario
+        length = max(n_days, int(e.max()) + 1 if e.size else 0)
+        cum = np.concatenate(([0], np.cumsum(standard_workdays(origin, length, self._holidays(origin, length)))))
+        calendar = (cum[e + 1] - cum[s]) == 0
+        axis_s = np.where(calendar, s, cum[s]).astype(np.float64)
+        axis_e = np.where(calendar, e + 1, cum[e + 1]).astype(np.float64)
+        week_edges = np.arange(n_days // 7 + 1) * 7
+        edges = np.where(calendar[:, None], week_edges[None, :], cum[week_edges][None, :]).astype(np.float64)
+
+        # I blocchi (fasi parallele, poi sequenziali) si susseguono nella finestra in proporzione alle ore:
+        # ogni giorno lavorativo della finestra consuma "rate" ore di avanzamento del workflow
+        pending_h = blocks.sum(axis=1)
+        rate = pending_h / (axis_e - axis_s)
+        bounds = axis_s[:, None] + np.concatenate((np.zeros((len(blocks), 1)), np.cumsum(blocks, axis=1)), axis=1) / rate[:, None]
+
+        demand = np.zeros((n_days // 7, len(compiled.roles)))
+        for t in range(len(compiled.prefixes)):
+            rows = np.flatnonzero(template_idx == t)
+            if not rows.size: continue
+            b, w = bounds[rows], edges[rows]
+            # (attività, blocchi, settimane): giorni del blocco che cadono nella settimana
+            overlap = np.clip(np.minimum(b[:, 1:, None], w[:, None, 1:]) - np.maximum(b[:, :-1, None], w[:, None, :-1]), 0.0, None)
+            demand += np.tensordot(rate[rows], overlap, axes=1).T @ compiled.membership[t]  # (settimane, ruoli)
+        beyond = compiled.remaining_hours(template_idx, worked[dated]).sum(axis=0) - demand.sum(axis=0)
+        return demand, np.maximum(beyond, 0.0), undated
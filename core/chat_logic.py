@@ -13,6 +13,7 @@ from core.config import OLLAMA_MODEL
 from core.db import db_manager
 from core.schedule_db import schedule_db_manager
 from core.workflow_engine import workflow_engine, WorkRole, analyze_resource_allocation
+from core.critical_path import CriticalPathEngine
 
 class SmartQuestionRouter:
     """Router intelligente che analizza l'intento delle domande dell'utente."""
@@ -271,6 +272,7 @@ class WorkflowAwareResponseGenerator:
                 response += "### 🟡 Criticità ALTE\n"
                 for bottleneck in high:
                     response += f"- **{bottleneck['role']}**: Carenza di {bottleneck['shortage_hours']:.0f} ore "
+                    response += f"in {bottleneck['critical_weeks']} settimane, dal {bottleneck['first_week'].strftime('%d/%m/%Y')} "
                     response += f"({bottleneck['available_workers']} operai disponibili)\n"
                 response += "\n"
             
@@ -281,7 +283,26 @@ class WorkflowAwareResponseGenerator:
             response += "2. Riorganizzare le priorità delle attività\n"
             response += "3. Considerare straordinari mirati per ruoli carenti\n"
         
+        response += self._critical_path_section(schedule_data["raw_records"])
         return response
+
+    def _critical_path_section(self, schedule_records: List[Dict]) -> str:
+        """Percorso critico del cronoprogramma (CPM sui predecessori) alla data di oggi."""
+        cpm = CriticalPathEngine(schedule_records, status_date=date.today())
+        chain = cpm.critical_path()
+        if not chain:
+            return ""
+        df = cpm.results().set_index('id_attivita')
+        planned_end = max(pd.to_datetime(r['data_fine']).date() for r in schedule_records if r.get('data_fine'))
+        section = "\n### 🛤️ Percorso Critico\n"
+        section += f"Fine prevista: **{cpm.project_finish.strftime('%d/%m/%Y')}** "
+        section += f"(pianificata {planned_end.strftime('%d/%m/%Y')}, {(cpm.project_finish - planned_end).days:+d} gg)\n"
+        for act_id in chain[:10]:
+            row = df.loc[act_id]
+            section += f"- **{act_id}**: {row['inizio_presto'].strftime('%d/%m')} → {row['fine_presto'].strftime('%d/%m')} (float {row['float_totale']:.0f} gg)\n"
+        if len(chain) > 10:
+            section += f"- ... altre {len(chain) - 10} attività critiche\n"
+        return section
     
     def generate_optimization_response(self, presence_data: Dict, schedule_data: Dict) -> str:
         """Genera suggerimenti di ottimizzazione."""
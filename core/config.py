@@ -50,4 +50,25 @@ EMBEDDING_MODEL = "nomic-embed-text"
 
 # Modello Cross-Encoder per il re-ranking dei risultati di ricerca.
 # È cruciale per la precisione del sistema RAG.
-CROSS_ENCODER_MODEL = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
\ No newline at end of file
+CROSS_ENCODER_MODEL = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+
+# --- 5. MOTORE ANALITICO REPORT ---
+# 'sqlite' (default) oppure 'duckdb' per i GROUP BY dei report su periodi lunghi.
+# Con 'duckdb' serve il pacchetto duckdb; se manca si resta su SQLite.
+ANALYTICS_ENGINE = os.getenv("ANALYTICS_ENGINE", "sqlite").lower()
+
+
+# --- 6. TEMPLATE WORKFLOW ---
+# File YAML con ruoli e template (ricaricato a caldo). Default: core/workflow_templates.yaml
+WORKFLOW_TEMPLATES_FILE = os.getenv("WORKFLOW_TEMPLATES_FILE")
+
+
+# --- 7. SIMULAZIONI MONTE CARLO ---
+# Processi per le previsioni di completamento: 1 = nel processo dell'app (default),
+# >1 = blocchi di prove su un pool di processi (utile sui server con più core).
+MONTE_CARLO_PROCESSES = int(os.getenv("MONTE_CARLO_PROCESSES", "1"))
+
+
+# --- 8. EARNED VALUE ---
+# Costo orario (€) dei ruoli senza una tariffa nella tabella tariffe_ruolo del CRM.
+COSTO_ORARIO_DEFAULT = float(os.getenv("COSTO_ORARIO_DEFAULT", "35.0"))
@@ -0,0 +1,376 @@
+# file: core/critical_path.py (Versione 1.1 - Copie per Scenari)
+"""
+Motore CPM (Critical Path Method) sul cronoprogramma.
+
+Il campo 'predecessori' (testo libero, es. "MON-001; FAM-002FS+2; ELE-003 SS-1")
+viene trasformato in una tabella di archi (predecessore, successore, tipo, ritardo):
+  - FS fine-inizio (default), SS inizio-inizio, FF fine-fine, SF inizio-fine;
+  - ritardo in giorni di calendario, anche negativo (anticipo).
+
+Calcolo a giorni interi con fine esclusiva (EF = ES + durata):
+  - passo in avanti in ordine topologico -> inizio/fine al più presto;
+  - passo all'indietro -> inizio/fine al più tardi, float totale e libero;
+  - percorso critico = attività con float totale <= 0.
+Con una data di stato: le attività completate restano ferme, quelle in corso
+finiscono a data_stato + durata residua, quelle non iniziate non partono prima
+della data di stato né prima dell'inizio pianificato (vincolo "non prima di").
+
+Le modifiche di una singola attività (date o avanzamento) si propagano solo ai
+successori toccati (avanti) e ai predecessori toccati (indietro): niente ricalcolo completo.
+I record non si modificano mai sul posto (si sostituiscono): fork() crea copie leggere
+per gli scenari what-if che condividono grafo e record con il motore di partenza.
+"""
+from __future__ import annotations
+
+import copy
+import datetime
+import heapq
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import pandas as pd
+
+RELATION_TYPES = ('FS', 'SS', 'FF', 'SF')
+_DEP_TOKEN = re.compile(
+    r"^\s*(?P<id>.+?)\s*(?:(?P<tipo>FS|SS|FF|SF)\s*(?:(?P<lag>[+-]\s*\d+)(?:[.,]\d+)?\s*(?:d|g|gg|days?|giorni)?)?)?\s*$",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class Dependency:
+    predecessor: str
+    tipo: str = 'FS'
+    lag: int = 0
+
+
+def parse_predecessors(value: Any) -> List[Dependency]:
+    """Testo del campo 'predecessori' -> lista di dipendenze (separatori ',' o ';')."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return []
+    deps = []
+    for piece in re.split(r"[,;]", str(value)):
+        piece = piece.strip()
+        if not piece or piece.lower() in ('nan', 'none'):
+            continue
+        m = _DEP_TOKEN.match(piece)
+        if not m:
+            continue
+        lag = int(m.group('lag').replace(' ', '')) if m.group('lag') else 0
+        deps.append(Dependency(m.group('id'), (m.group('tipo') or 'FS').upper(), lag))
+    return deps
+
+
+def _to_date(value: Any) -> Optional[datetime.date]:
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.date.fromisoformat(value[:10])
+        except ValueError:
+            pass
+    ts = pd.to_datetime(value, errors='coerce')
+    return None if pd.isna(ts) else ts.date()
+
+
+class CriticalPathEngine:
+    def __init__(self, activities: Iterable[Dict], status_date: Optional[datetime.date] = None,
+                 deadline: Optional[datetime.date] = None):
+        self.status_date = status_date
+        self.deadline = deadline
+        self._rebuild(activities)
+
+    def _rebuild(self, activities: Iterable[Dict]) -> None:
+        self._build([dict(r) for r in activities])
+        self.compute()
+
+    # --- COSTRUZIONE GRAFO ---
+    def _build(self, records: List[Dict]) -> None:
+        self.records: Dict[str, Dict] = {}
+        for rec in records:
+            act_id = str(rec.get('id_attivita', ''))
+            if act_id and _to_date(rec.get('data_inizio')) and _to_date(rec.get('data_fine')):
+                self.records[act_id] = dict(rec)
+        self.ids: List[str] = list(self.records)
+        self.index = {a: i for i, a in enumerate(self.ids)}
+        n = len(self.ids)
+
+        dates = [d for rec in self.records.values() for d in (_to_date(rec['data_inizio']), _to_date(rec['data_fine']))]
+        self.origin = min(dates + ([self.status_date] if self.status_date else [])) if dates else (self.status_date or datetime.date.today())
+
+        self.succ: List[List[tuple]] = [[] for _ in range(n)]   # (j, tipo, lag)
+        self.pred: List[List[tuple]] = [[] for _ in range(n)]   # (i, tipo, lag)
+        self.unknown_predecessors: Dict[str, List[str]] = {}
+        for act_id, rec in self.records.items():
+            j = self.index[act_id]
+            for dep in parse_predecessors(rec.get('predecessori')):
+                i = self.index.get(dep.predecessor)
+                if i is None or i == j:
+                    self.unknown_predecessors.setdefault(act_id, []).append(dep.predecessor)
+                    continue
+                self.succ[i].append((j, dep.tipo, dep.lag))
+                self.pred[j].append((i, dep.tipo, dep.lag))
+
+        self._topological_sort()
+        self.dur = [0] * n
+        self.planned_start = [0] * n
+        self.progress = [0.0] * n
+        for act_id in self.ids:
+            self._load_inputs(self.index[act_id])
+        self.es = [0] * n; self.ef = [0] * n
+        self.lf = [0] * n; self.ls = [0] * n
+
+    def _topological_sort(self) -> None:
+        """Kahn; gli archi che chiudono un ciclo vengono scartati e annotati in ignored_edges."""
+        n = len(self.ids)
+        indeg = [len(p) for p in self.pred]
+        ready = [i for i in range(n) if indeg[i] == 0]
+        heapq.heapify(ready)
+        order, placed = [], [False] * n
+        self.ignored_edges: List[tuple] = []
+        while len(order) < n:
+            if not ready:
+                # Ciclo: si sblocca il primo nodo rimasto scartando i suoi archi entranti non risolti
+                k = next(i for i in range(n) if not placed[i])
+                for (i, tipo, lag) in list(self.pred[k]):
+                    if not placed[i]:
+                        self.ignored_edges.append((self.ids[i], self.ids[k], tipo, lag))
+                        self.pred[k].remove((i, tipo, lag))
+                        self.succ[i].remove((k, tipo, lag))
+                indeg[k] = 0
+                heapq.heappush(ready, k)
+            i = heapq.heappop(ready)
+            if placed[i]:
+                continue
+            placed[i] = True
+            order.append(i)
+            for (j, _, _) in self.succ[i]:
+                indeg[j] -= 1
+                if indeg[j] == 0:
+                    heapq.heappush(ready, j)
+        self.order = order
+        self.position = [0] * n
+        for pos, i in enumerate(order):
+            self.position[i] = pos
+
+    def _load_inputs(self, i: int) -> None:
+        rec = self.records[self.ids[i]]
+        start, finish = _to_date(rec['data_inizio']), _to_date(rec['data_fine'])
+        self.planned_start[i] = (start - self.origin).days
+        self.dur[i] = max(0, (finish - start).days + 1)  # date del cronoprogramma inclusive
+        self.progress[i] = float(rec.get('stato_avanzamento') or 0)
+
+    def _status(self) -> Optional[int]:
+        return (self.status_date - self.origin).days if self.status_date else None
+
+    # --- PASSO IN AVANTI ---
+    def _forward_one(self, j: int) -> bool:
+        status = self._status()
+        d, p = self.dur[j], self.progress[j]
+        if p >= 100:  # completata: date effettive ferme
+            es, ef = self.planned_start[j], self.planned_start[j] + d
+        else:
+            bound_s, bound_f = self.planned_start[j], -10**9
+            for (i, tipo, lag) in self.pred[j]:
+                if tipo == 'FS':   bound_s = max(bound_s, self.ef[i] + lag)
+                elif tipo == 'SS': bound_s = max(bound_s, self.es[i] + lag)
+                elif tipo == 'FF': bound_f = max(bound_f, self.ef[i] + lag)
+                else:              bound_f = max(bound_f, self.es[i] + lag)   # SF
+            if p > 0:  # in corso: l'inizio è un fatto, si sposta solo la fine
+                es = self.planned_start[j]
+                remaining = math.ceil(d * (1 - p / 100))
+                ef = max(es, status) + remaining if status is not None else es + d
+                ef = max(ef, bound_f)
+            else:
+                if status is not None:
+                    bound_s = max(bound_s, status)
+                es = max(bound_s, bound_f - d)
+                ef = es + d
+        changed = (es, ef) != (self.es[j], self.ef[j])
+        self.es[j], self.ef[j] = es, ef
+        return changed
+
+    # --- PASSO ALL'INDIETRO ---
+    def _project_finish(self) -> int:
+        finish = max(self.ef) if self.ef else 0
+        if self.deadline:
+            finish = (self.deadline - self.origin).days + 1
+        return finish
+
+    def _backward_one(self, i: int, project_finish: int) -> bool:
+        lf = project_finish
+        d_eff = self.ef[i] - self.es[i]
+        for (j, tipo, lag) in self.succ[i]:
+            if self.progress[j] >= 100:
+                continue
+            if tipo == 'FS':   lf = min(lf, self.ls[j] - lag)
+            elif tipo == 'SS': lf = min(lf, self.ls[j] - lag + d_eff)
+            elif tipo == 'FF': lf = min(lf, self.lf[j] - lag)
+            else:              lf = min(lf, self.lf[j] - lag + d_eff)  # SF
+        ls = lf - d_eff
+        changed = (ls, lf) != (self.ls[i], self.lf[i])
+        self.ls[i], self.lf[i] = ls, lf
+        return changed
+
+    def compute(self) -> None:
+        """Calcolo completo: avanti in ordine topologico, indietro in ordine inverso."""
+        for j in self.order:
+            self._forward_one(j)
+        self._finish = self._project_finish()
+        for i in reversed(self.order):
+            self._backward_one(i, self._finish)
+
+    # --- AGGIORNAMENTO INCREMENTALE ---
+    def update_activity(self, activity_id: str, **changes) -> Set[str]:
+        """
+        Aggiorna date/avanzamento di una attività (data_inizio, data_fine, stato_avanzamento)
+        e propaga solo dove serve. Restituisce gli ID le cui date CPM sono cambiate.
+        Un cambio di 'predecessori' modifica il grafo: in quel caso si ricostruisce tutto.
+        """
+        if activity_id not in self.index:
+            raise KeyError(f"Attività sconosciuta: {activity_id}")
+        if 'predecessori' in changes:
+            self.records[activity_id] = {**self.records[activity_id], **changes}
+            self._rebuild(self.records.values())
+            return set(self.ids)
+        k = self.index[activity_id]
+        self.records[activity_id] = {**self.records[activity_id], **changes}
+        new_start = _to_date(self.records[activity_id]['data_inizio'])
+        if new_start < self.origin:  # l'origine deve restare la data minima: si ricalcola tutto
+            self._rebuild(self.records.values())
+            return set(self.ids)
+        self._load_inputs(k)
+
+        touched: Set[int] = set()
+        # Avanti: solo i successori raggiunti da un cambiamento, in ordine topologico
+        heap = [(self.position[k], k)]
+        queued = {k}
+        while heap:
+            _, j = heapq.heappop(heap)
+            if self._forward_one(j) or j == k:
+                touched.add(j)
+                for (s, _, _) in self.succ[j]:
+                    if s not in queued:
+                        queued.add(s)
+                        heapq.heappush(heap, (self.position[s], s))
+
+        new_finish = self._project_finish()
+        if new_finish != self._finish:  # cambia la fine progetto: tutte le date tardi si spostano
+            self._finish = new_finish
+            for i in reversed(self.order):
+                if self._backward_one(i, self._finish):
+                    touched.add(i)
+            return {self.ids[i] for i in touched}
+
+        # Indietro: dai nodi toccati verso i predecessori, in ordine topologico inverso
+        heap = [(-self.position[j], j) for j in touched]
+        heapq.heapify(heap)
+        queued = set(touched)
+        while heap:
+            _, i = heapq.heappop(heap)
+            if self._backward_one(i, self._finish) or i in touched:
+                touched.add(i)
+                for (p, _, _) in self.pred[i]:
+                    if p not in queued:
+                        queued.add(p)
+                        heapq.heappush(heap, (-self.position[p], p))
+        return {self.ids[i] for i in touched}
+
+    def sync(self, activities: Iterable[Dict]) -> Set[str]:
+        """
+        Allinea il motore a un nuovo elenco di attività: se cambiano solo date/avanzamento
+        di alcune righe si procede in modo incrementale, altrimenti si ricostruisce.
+        """
+        records = {str(r.get('id_attivita', '')): r for r in activities
+                   if r.get('id_attivita') and _to_date(r.get('data_inizio')) and _to_date(r.get('data_fine'))}
+        same_graph = set(records) == set(self.ids) and all(
+            str(records[a].get('predecessori') or '') == str(self.records[a].get('predecessori') or '') for a in self.ids)
+        if not same_graph:
+            self._rebuild(records.values())
+            return set(self.ids)
+        changed: Set[str] = set()
+        for act_id, rec in records.items():
+            old = self.records[act_id]
+            diff = {k: rec.get(k) for k in ('data_inizio', 'data_fine', 'stato_avanzamento') if str(rec.get(k)) != str(old.get(k))}
+            if diff:
+                changed |= self.update_activity(act_id, **diff)
+            if rec != self.records[act_id]:
+                self.records[act_id] = {**self.records[act_id], **rec}
+        return changed
+
+    def fork(self) -> "CriticalPathEngine":
+        """
+        Copia indipendente a basso costo: grafo, ordine topologico e record restano condivisi
+        (una ricostruzione o un aggiornamento li sostituiscono senza toccare l'originale),
+        si copiano solo i vettori per attività.
+        """
+        clone = copy.copy(self)
+        clone.records = dict(self.records)
+        for name in ('dur', 'planned_start', 'progress', 'es', 'ef', 'ls', 'lf'):
+            setattr(clone, name, list(getattr(self, name)))
+        return clone
+
+    # --- RISULTATI ---
+    def _day(self, offset: int) -> datetime.date:
+        return self.origin + datetime.timedelta(days=int(offset))
+
+    def _free_float(self, i: int) -> int:
+        if not self.succ[i]:
+            return self._finish - self.ef[i]
+        slack = []
+        for (j, tipo, lag) in self.succ[i]:
+            if tipo == 'FS':   slack.append(self.es[j] - (self.ef[i] + lag))
+            elif tipo == 'SS': slack.append(self.es[j] - (self.es[i] + lag))
+            elif tipo == 'FF': slack.append(self.ef[j] - (self.ef[i] + lag))
+            else:              slack.append(self.ef[j] - (self.es[i] + lag))
+        return min(slack)
+
+    def results(self) -> pd.DataFrame:
+        """Una riga per attività: date al più presto/tardi (fine inclusiva), float e criticità."""
+        rows = []
+        for i, act_id in enumerate(self.ids):
+            done = self.progress[i] >= 100
+            total_float = None if done else self.lf[i] - self.ef[i]
+            rows.append({
+                'id_attivita': act_id,
+                'durata_giorni': self.dur[i],
+                'inizio_presto': self._day(self.es[i]),
+                'fine_presto': self._day(self.ef[i] - 1 if self.ef[i] > self.es[i] else self.ef[i]),
+                'inizio_tardi': None if done else self._day(self.ls[i]),
+                'fine_tardi': None if done else self._day(self.lf[i] - 1 if self.lf[i] > self.ls[i] else self.lf[i]),
+                'float_totale': total_float,
+                'float_libero': None if done else self._free_float(i),
+                'critica': (not done) and total_float <= 0,
+            })
+        return pd.DataFrame(rows)
+
+    def critical_path(self) -> List[str]:
+        """Catena critica principale: dall'attività critica che finisce per ultima, a ritroso sui predecessori che la vincolano."""
+        critical = [i for i in range(len(self.ids)) if self.progress[i] < 100 and self.lf[i] - self.ef[i] <= 0]
+        if not critical:
+            return []
+        i = max(critical, key=lambda k: (self.ef[k], -self.position[k]))
+        chain = [i]
+        while True:
+            driving = [p for (p, _, _) in self.pred[i] if self.progress[p] < 100 and self.lf[p] - self.ef[p] <= 0]
+            if not driving:
+                break
+            i = max(driving, key=lambda k: self.ef[k])
+            chain.append(i)
+        return [self.ids[k] for k in reversed(chain)]
+
+    def edge_table(self) -> pd.DataFrame:
+        rows = [(self.ids[i], self.ids[j], tipo, lag) for i in range(len(self.ids)) for (j, tipo, lag) in self.succ[i]]
+        return pd.DataFrame(rows, columns=['predecessore', 'successore', 'tipo', 'ritardo_giorni'])
+
+    @property
+    def project_finish(self) -> Optional[datetime.date]:
+        if not self.ids:
+            return None
+        return self._day(max(self.ef) - 1)
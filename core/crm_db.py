@@ -1,16 +1,76 @@
-# file: core/crm_db.py (Versione 31.0 - Storicizzazione Squadra)
+# file: core/crm_db.py (Versione 36.2 - Flag Migrazione Ore)
 from __future__ import annotations
 import sqlite3
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
 import datetime
+import numpy as np
 import pandas as pd
-from contextlib import contextmanager
+from contextlib import contextmanager, closing
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow è opzionale: serve solo alla lettura colonnare dei report
+    pa = None
 
 from core.logic import ShiftEngine
 
 DB_FILE = Path(__file__).resolve().parents[1] / "data" / "crm.db"
 
+SQUADRA_NON_ASSEGNATA = "Non Assegnato"            # squadra corrente assente (report per squadra)
+SQUADRA_STORICA_NON_ASSEGNATA = "Non Assegnata"    # turno senza squadra storica (report storici, calendario)
+
+# Migrazioni una tantum registrate in db_meta (valore 1 = eseguita)
+META_ORE_REGISTRAZIONI_MIGRATE = 'ore_registrazioni_migrate'
+
+# Tabelle la cui modifica incrementa la versione dati (vedi get_data_version)
+VERSIONED_TABLES = ('anagrafica_dipendenti', 'squadre', 'membri_squadra', 'turni_master', 'registrazioni_ore')
+
+# Squadra corrente di ogni dipendente (a parità di più squadre vale l'ultima per nome, come nei report)
+SQUADRA_CORRENTE_SQL = """
+    SELECT ms.id_dipendente, MAX(s.nome_squadra) AS nome_squadra
+    FROM membri_squadra ms JOIN squadre s ON s.id_squadra = ms.id_squadra
+    GROUP BY ms.id_dipendente
+"""
+
+# Colonne esponibili dai report: nome -> espressione SQL
+REPORT_COLUMN_SQL = {
+    'id_registrazione': "r.id_registrazione",
+    'data_ora_inizio': "r.data_ora_inizio",
+    'data_ora_fine': "r.data_ora_fine",
+    'giorno': "date(r.data_ora_inizio)",
+    'id_attivita': "r.id_attivita",
+    'ore_presenza': "r.ore_presenza",
+    'ore_lavoro': "r.ore_lavoro",
+    'tipo_ore': "r.tipo_ore",
+    'id_dipendente': "a.id_dipendente",
+    'dipendente_nome': "a.cognome || ' ' || a.nome",
+    'ruolo': "a.ruolo",
+    'id_turno_master': "r.id_turno_master",
+    'squadra': f"COALESCE(sq.nome_squadra, '{SQUADRA_NON_ASSEGNATA}')",
+    'squadra_storica': f"COALESCE(ss.nome_squadra, '{SQUADRA_STORICA_NON_ASSEGNATA}')",
+}
+# Varianti per il motore DuckDB (timestamp tipizzati invece di stringhe ISO)
+REPORT_COLUMN_SQL_DUCKDB = {**REPORT_COLUMN_SQL, 'giorno': "CAST(r.data_ora_inizio AS DATE)"}
+# Misure aggregabili lato SQL: nome -> espressione di aggregazione
+# Le ore si sommano in centesimi interi: risultato identico a prescindere dall'ordine di somma (e dal motore)
+REPORT_MEASURE_SQL = {
+    'ore_presenza': "ROUND(SUM(ROUND(r.ore_presenza * 100)) / 100.0, 2)",
+    'ore_lavoro': "ROUND(SUM(ROUND(r.ore_lavoro * 100)) / 100.0, 2)",
+    'n_registrazioni': "COUNT(*)",
+    'n_dipendenti': "COUNT(DISTINCT r.id_dipendente)",
+}
+REPORT_DEFAULT_MEASURES = ('ore_presenza', 'ore_lavoro')
+REPORT_DEFAULT_COLUMNS = ('id_registrazione', 'data_ora_inizio', 'data_ora_fine', 'id_attivita', 'ore_presenza', 'ore_lavoro',
+                          'tipo_ore', 'id_dipendente', 'dipendente_nome', 'ruolo', 'id_turno_master')
+
+# Tipi per la lettura colonnare: le stringhe molto ripetute viaggiano come categorie (dizionario)
+REPORT_CATEGORICAL_COLUMNS = ('dipendente_nome', 'ruolo', 'tipo_ore', 'squadra', 'squadra_storica')
+REPORT_TIMESTAMP_COLUMNS = ('data_ora_inizio', 'data_ora_fine', 'giorno')
+REPORT_FLOAT_COLUMNS = ('ore_presenza', 'ore_lavoro')
+REPORT_INT_COLUMNS = ('id_registrazione', 'id_dipendente', 'id_turno_master', 'n_registrazioni', 'n_dipendenti')
+REPORT_CHUNK_SIZE = 5000  # righe per fetchmany negli export in streaming
+
 class CrmDBManager:
     def __init__(self, db_path: str | Path = DB_FILE):
         self.db_path = Path(db_path)
@@ -90,6 +150,72 @@ class CrmDBManager:
                 FOREIGN KEY (id_dipendente) REFERENCES anagrafica_dipendenti (id_dipendente),
                 FOREIGN KEY (id_turno_master) REFERENCES turni_master (id_turno_master) ON DELETE CASCADE
             )""")
+
+            # --- VERSIONE DATI (invalida le cache dei report a ogni scrittura) ---
+            cursor.execute("CREATE TABLE IF NOT EXISTS db_meta (chiave TEXT PRIMARY KEY, valore INTEGER NOT NULL)")
+            cursor.execute("INSERT OR IGNORE INTO db_meta (chiave, valore) VALUES ('data_version', 0)")
+            for table in VERSIONED_TABLES:
+                for op in ("INSERT", "UPDATE", "DELETE"):
+                    cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_version_{table}_{op.lower()} AFTER {op} ON {table}
+                    BEGIN UPDATE db_meta SET valore = valore + 1 WHERE chiave = 'data_version'; END""")
+
+            # --- CODA DELLE ATTIVITÀ CON ORE CAMBIATE (avanzamento derivato incrementale) ---
+            # seq cresce a ogni scrittura: chi svuota la coda toglie solo le voci che ha letto
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attivita_da_ricalcolare (
+                id_attivita TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL
+            )""")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_coda_avanzamento_seq ON attivita_da_ricalcolare (seq)")  # MAX(seq) nei trigger
+            for op, rows in (("INSERT", ("NEW",)), ("UPDATE", ("OLD", "NEW")), ("DELETE", ("OLD",))):
+                body = " ".join(
+                    f"INSERT OR REPLACE INTO attivita_da_ricalcolare (id_attivita, seq) SELECT {r}.id_attivita, "
+                    f"COALESCE((SELECT MAX(seq) FROM attivita_da_ricalcolare), 0) + 1 WHERE {r}.id_attivita IS NOT NULL;"
+                    for r in rows)
+                cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_coda_avanzamento_{op.lower()} AFTER {op} ON registrazioni_ore
+                BEGIN {body} END""")
+
+            # --- EARNED VALUE: TARIFFE E SNAPSHOT GIORNALIERI (fuori da VERSIONED_TABLES) ---
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tariffe_ruolo (
+                ruolo TEXT PRIMARY KEY,
+                costo_orario REAL NOT NULL
+            )""")
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS evm_snapshot_attivita (
+                id_attivita TEXT NOT NULL,
+                giorno DATE NOT NULL,
+                commessa TEXT,
+                bac REAL NOT NULL,
+                pv REAL NOT NULL,
+                ev REAL NOT NULL,
+                ac REAL NOT NULL,
+                ev_stimato BOOLEAN DEFAULT 0 NOT NULL,
+                PRIMARY KEY (id_attivita, giorno)
+            ) WITHOUT ROWID""")
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS evm_snapshot_commessa (
+                commessa TEXT NOT NULL,
+                giorno DATE NOT NULL,
+                bac REAL NOT NULL,
+                pv REAL NOT NULL,
+                ev REAL NOT NULL,
+                ac REAL NOT NULL,
+                ev_stimato BOOLEAN DEFAULT 0 NOT NULL,
+                PRIMARY KEY (commessa, giorno)
+            ) WITHOUT ROWID""")
+
+            # --- INDICI PER REPORT E RICERCHE PER INTERVALLO ---
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_registrazioni_inizio ON registrazioni_ore (data_ora_inizio)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_registrazioni_dip_inizio ON registrazioni_ore (id_dipendente, data_ora_inizio)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_registrazioni_attivita ON registrazioni_ore (id_attivita, data_ora_inizio)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_registrazioni_master ON registrazioni_ore (id_turno_master)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_turni_master_dip_inizio ON turni_master (id_dipendente, data_ora_inizio_effettiva)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_membri_dipendente ON membri_squadra (id_dipendente)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_evm_attivita_giorno ON evm_snapshot_attivita (giorno)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_evm_commessa_giorno ON evm_snapshot_commessa (giorno)")
             conn.commit()
 
     def _check_and_migrate(self):
@@ -106,6 +232,39 @@ class CrmDBManager:
                     print("✅ Migrazione completata.")
                 except Exception as e:
                     print(f"❌ Errore durante migrazione: {e}")
+        self._backfill_ore_registrazioni()
+
+    def _backfill_ore_registrazioni(self):
+        """
+        Calcola una volta per tutte ore_presenza/ore_lavoro sulle registrazioni storiche
+        che ne sono prive, così i report possono sommarle direttamente in SQL.
+        Il flag in db_meta evita la scansione di registrazioni_ore a ogni avvio: le nuove
+        registrazioni nascono già con le ore (create_registrazioni_segments).
+        """
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM db_meta WHERE chiave = ?", (META_ORE_REGISTRAZIONI_MIGRATE,)).fetchone():
+                return
+            rows = conn.execute("SELECT id_registrazione, data_ora_inizio, data_ora_fine FROM registrazioni_ore WHERE ore_presenza IS NULL OR ore_lavoro IS NULL").fetchall()
+            if rows:
+                print(f"⚠️ Migrazione DB: calcolo ore mancanti su {len(rows)} registrazioni...")
+            updates = []
+            for row in rows:
+                try:
+                    s = datetime.datetime.fromisoformat(row['data_ora_inizio'])
+                    e = datetime.datetime.fromisoformat(row['data_ora_fine'])
+                except (TypeError, ValueError):
+                    continue
+                presenza, lavoro = ShiftEngine.calculate_professional_hours(s, e)
+                updates.append((presenza, lavoro, row['id_registrazione']))
+            conn.executemany("UPDATE registrazioni_ore SET ore_presenza = ?, ore_lavoro = ? WHERE id_registrazione = ?", updates)
+            conn.execute("INSERT OR REPLACE INTO db_meta (chiave, valore) VALUES (?, 1)", (META_ORE_REGISTRAZIONI_MIGRATE,))
+            conn.commit()
+
+    def get_data_version(self) -> int:
+        """Contatore incrementato dai trigger a ogni scrittura sulle tabelle operative."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT valore FROM db_meta WHERE chiave = 'data_version'").fetchone()
+            return row['valore'] if row else 0
 
     @contextmanager
     def transaction(self):
@@ -308,10 +467,269 @@ class CrmDBManager:
         with self._connect() as conn:
             return pd.read_sql_query(q, conn, params=(start_str, end_str), parse_dates=['data_ora_inizio_effettiva', 'data_ora_fine_effettiva'])
 
-    def get_report_data_df(self, start_date: datetime.date, end_date: datetime.date) -> pd.DataFrame:
-        q = "SELECT r.id_registrazione, r.data_ora_inizio, r.data_ora_fine, r.id_attivita, r.ore_presenza, r.ore_lavoro, r.tipo_ore, a.id_dipendente, a.cognome || ' ' || a.nome AS dipendente_nome, a.ruolo, r.id_turno_master FROM registrazioni_ore r JOIN anagrafica_dipendenti a ON r.id_dipendente = a.id_dipendente WHERE date(r.data_ora_inizio) BETWEEN ? AND ? AND a.attivo = 1 AND r.data_ora_inizio IS NOT NULL AND r.data_ora_fine IS NOT NULL"
+    # --- CODA RICALCOLO AVANZAMENTO ---
+    def get_attivita_da_ricalcolare(self) -> List[Tuple[str, int]]:
+        """Attività con registrazioni inserite, modificate o cancellate dall'ultimo svuotamento: (id_attivita, seq)."""
+        with self._connect() as conn:
+            return [(r['id_attivita'], r['seq']) for r in conn.execute("SELECT id_attivita, seq FROM attivita_da_ricalcolare")]
+
+    def ack_attivita_da_ricalcolare(self, voci: Sequence[Tuple[str, int]]):
+        """Toglie dalla coda le voci elaborate; una voce riscritta nel frattempo (seq diverso) resta in coda."""
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM attivita_da_ricalcolare WHERE id_attivita = ? AND seq = ?", voci)
+            conn.commit()
+
+    # --- EARNED VALUE: TARIFFE E SNAPSHOT ---
+    def get_tariffe_ruolo(self) -> Dict[str, float]:
         with self._connect() as conn:
-            return pd.read_sql_query(q, conn, params=(start_date.isoformat(), end_date.isoformat()), parse_dates=['data_ora_inizio', 'data_ora_fine'])
+            return {r['ruolo']: float(r['costo_orario']) for r in conn.execute("SELECT ruolo, costo_orario FROM tariffe_ruolo")}
+
+    def set_tariffa_ruolo(self, ruolo: str, costo_orario: float):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO tariffe_ruolo (ruolo, costo_orario) VALUES (?, ?)", (ruolo, float(costo_orario)))
+            conn.commit()
+
+    def get_evm_last_day(self) -> Optional[datetime.date]:
+        """Ultimo giorno con snapshot earned value (None se non ce ne sono)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(giorno) AS giorno FROM evm_snapshot_commessa").fetchone()
+        return datetime.date.fromisoformat(row['giorno']) if row and row['giorno'] else None
+
+    def get_evm_snapshot_attivita(self, prima_di: Optional[datetime.date] = None) -> pd.DataFrame:
+        """Snapshot per attività dell'ultimo giorno registrato (strettamente prima di `prima_di`, se indicato)."""
+        cond, params = ("WHERE giorno < ?", [prima_di.isoformat()]) if prima_di else ("", [])
+        q = f"""
+            SELECT * FROM evm_snapshot_attivita
+            WHERE giorno = (SELECT MAX(giorno) FROM evm_snapshot_commessa {cond})
+        """
+        with self._connect() as conn:
+            return pd.read_sql_query(q, conn, params=params)
+
+    def save_evm_snapshots(self, attivita_rows: Sequence[tuple], commessa_rows: Sequence[tuple],
+                           dal_giorno: Optional[datetime.date] = None):
+        """
+        Sostituisce gli snapshot da `dal_giorno` in poi (tutti se None) in un'unica transazione.
+        - attivita_rows: (id_attivita, giorno, commessa, bac, pv, ev, ac, ev_stimato)
+        - commessa_rows: (commessa, giorno, bac, pv, ev, ac, ev_stimato)
+        """
+        cond, params = ("WHERE giorno >= ?", (dal_giorno.isoformat(),)) if dal_giorno else ("", ())
+        with self.transaction() as cur:
+            cur.execute(f"DELETE FROM evm_snapshot_attivita {cond}", params)
+            cur.execute(f"DELETE FROM evm_snapshot_commessa {cond}", params)
+            cur.executemany("INSERT INTO evm_snapshot_attivita (id_attivita, giorno, commessa, bac, pv, ev, ac, ev_stimato) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", attivita_rows)
+            cur.executemany("INSERT INTO evm_snapshot_commessa (commessa, giorno, bac, pv, ev, ac, ev_stimato) VALUES (?, ?, ?, ?, ?, ?, ?)", commessa_rows)
+
+    def get_evm_trend_commessa(self, commessa: Optional[str] = None) -> pd.DataFrame:
+        """Serie giornaliera (giorno, commessa, bac, pv, ev, ac, ev_stimato); senza commessa: tutte."""
+        cond, params = ("WHERE commessa = ?", [commessa]) if commessa else ("", [])
+        with self._connect() as conn:
+            return pd.read_sql_query(f"SELECT * FROM evm_snapshot_commessa {cond} ORDER BY commessa, giorno",
+                                     conn, params=params, parse_dates=['giorno'])
+
+    def get_evm_trend_attivita(self, id_attivita: str) -> pd.DataFrame:
+        with self._connect() as conn:
+            return pd.read_sql_query("SELECT * FROM evm_snapshot_attivita WHERE id_attivita = ? ORDER BY giorno",
+                                     conn, params=[id_attivita], parse_dates=['giorno'])
+
+    # --- LETTURA REPORT (FILTRI E COLONNE SPINTI IN SQL) ---
+    def _build_report_query(self, start_date: datetime.date, end_date: datetime.date, **options) -> Tuple[str, list]:
+        return build_report_query(start_date, end_date, **options)
+
+    def get_report_data_df(self, start_date: datetime.date, end_date: datetime.date, **filters) -> pd.DataFrame:
+        """
+        Dati del report come DataFrame. Accetta gli stessi argomenti opzionali di
+        _build_report_query (columns, dipendenti, squadre, attivita, group_by, measures, solo_attivi).
+        """
+        q, params = self._build_report_query(start_date, end_date, **filters)
+        with self._connect() as conn:
+            df = pd.read_sql_query(q, conn, params=params)
+        for col in REPORT_TIMESTAMP_COLUMNS:
+            if col in df.columns: df[col] = pd.to_datetime(df[col], format='ISO8601')
+        return df
+
+    def get_report_filter_options(self, start_date: datetime.date, end_date: datetime.date) -> Dict[str, List]:
+        """Valori distinti per i filtri del report, senza caricare le righe."""
+        opts = {}
+        with self._connect() as conn:
+            for key, cols in (('dipendenti', ['id_dipendente', 'dipendente_nome']), ('squadre', ['squadra']), ('attivita', ['id_attivita'])):
+                q, params = self._build_report_query(start_date, end_date, group_by=cols)
+                rows = conn.execute(q, params).fetchall()
+                opts[key] = [tuple(r)[:len(cols)] if len(cols) > 1 else r[0] for r in rows]
+        return opts
+
+    def iter_report_rows(self, start_date: datetime.date, end_date: datetime.date,
+                         chunk_size: int = REPORT_CHUNK_SIZE, **filters) -> Iterator[List[tuple]]:
+        """
+        Righe del report a blocchi (fetchmany) come tuple semplici, nell'ordine delle
+        colonne richieste (o group_by + measures): la memoria resta costante anche su un anno.
+        Valori grezzi SQLite: timestamp e giorno come stringhe ISO.
+        """
+        q, params = self._build_report_query(start_date, end_date, **filters)
+        with closing(self._connect()) as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(q, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows: break
+                yield rows
+
+    # --- LETTURA COLONNARE (ARROW) PER REPORT PESANTI ---
+    def _fetch_report_columns(self, q: str, params: list) -> Dict[str, tuple]:
+        """Esegue la query colonnare con sqlite3 e restituisce le colonne già trasposte."""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # Tuple semplici: niente sqlite3.Row per ogni riga
+            cursor.execute(q, params)
+            names = [d[0] for d in cursor.description]
+            rows = cursor.fetchall()
+        columns = list(zip(*rows)) if rows else [()] * len(names)
+        return dict(zip(names, columns))
+
+    def _fetch_report_arrow_native(self, q: str, params: list) -> Optional["pa.Table"]:
+        """
+        Lettura direttamente in Arrow tramite il driver ADBC SQLite (se installato):
+        le righe non passano mai per oggetti Python. Restituisce None se il driver
+        manca o non riesce a tipizzare le colonne, così si ripiega su sqlite3.
+        """
+        try:
+            import adbc_driver_sqlite.dbapi as adbc_sqlite
+        except ImportError:
+            return None
+        try:
+            with adbc_sqlite.connect(str(self.db_path)) as conn:
+                cursor = conn.cursor()
+                cursor.execute(q, params)
+                return cursor.fetch_arrow_table()
+        except Exception as e:
+            print(f"⚠️ Lettura ADBC non riuscita, uso sqlite3: {e}")
+            return None
+
+    def get_report_data_arrow(self, start_date: datetime.date, end_date: datetime.date, **filters) -> "pa.Table":
+        """Stessi dati di get_report_data_df come tabella Arrow (timestamp interi, nomi/ruoli dizionario)."""
+        if pa is None:
+            raise RuntimeError("pyarrow non installato: impossibile usare la lettura colonnare.")
+        q, params = self._build_report_query(start_date, end_date, columnar=True, **filters)
+        native = self._fetch_report_arrow_native(q, params)
+        if native is not None:
+            cols = {name: native.column(name).combine_chunks() for name in native.column_names}
+        else:
+            cols = self._fetch_report_columns(q, params)
+
+        def as_arrow(values, arrow_type):
+            # Le colonne ADBC sono già Arrow: basta un cast, senza ripassare da Python
+            return values.cast(arrow_type) if isinstance(values, pa.Array) else pa.array(values, type=arrow_type)
+
+        arrays = {}
+        for name, values in cols.items():
+            if name in REPORT_TIMESTAMP_COLUMNS:
+                arrays[name] = as_arrow(values, pa.int64()).cast(pa.timestamp('s'))
+            elif name in REPORT_CATEGORICAL_COLUMNS:
+                arrays[name] = as_arrow(values, pa.string()).dictionary_encode()
+            elif name in REPORT_FLOAT_COLUMNS:
+                arrays[name] = as_arrow(values, pa.float64())
+            elif name in REPORT_INT_COLUMNS:
+                arrays[name] = as_arrow(values, pa.int64())
+            else:
+                arrays[name] = as_arrow(values, pa.string())
+        return pa.table(arrays)
+
+    def get_report_data_df_compact(self, start_date: datetime.date, end_date: datetime.date, **filters) -> pd.DataFrame:
+        """
+        Variante compatta di get_report_data_df: stesse colonne, ma nomi/ruoli/squadre
+        come categoriali e date convertite in blocco dagli epoch interi.
+        Passa da Arrow se disponibile, altrimenti costruisce le colonne con NumPy.
+        """
+        if pa is not None:
+            return self.get_report_data_arrow(start_date, end_date, **filters).to_pandas()
+        q, params = self._build_report_query(start_date, end_date, columnar=True, **filters)
+        cols = self._fetch_report_columns(q, params)
+        data = {}
+        for name, values in cols.items():
+            if name in REPORT_TIMESTAMP_COLUMNS:
+                data[name] = pd.to_datetime(np.asarray(values, dtype='int64'), unit='s')
+            elif name in REPORT_CATEGORICAL_COLUMNS:
+                data[name] = pd.Categorical(values)
+            elif name in REPORT_FLOAT_COLUMNS:
+                data[name] = np.asarray(values, dtype='float64')
+            else:
+                data[name] = pd.Series(values, dtype=None if name in REPORT_INT_COLUMNS else 'object')
+        return pd.DataFrame(data)
+
+def build_report_query(start_date: datetime.date, end_date: datetime.date,
+                       columns: Optional[Sequence[str]] = None,
+                       dipendenti: Optional[Sequence[int]] = None,
+                       squadre: Optional[Sequence[str]] = None,
+                       attivita: Optional[Sequence[str]] = None,
+                       group_by: Optional[Sequence[str]] = None,
+                       measures: Optional[Sequence[str]] = None,
+                       solo_attivi: bool = True,
+                       columnar: bool = False,
+                       dialect: str = 'sqlite') -> Tuple[str, list]:
+    """
+    Costruisce la query parametrica dei report sulle registrazioni ore.
+    - Intervallo come range sull'inizio registrazione (usa idx_registrazioni_inizio, niente date() per riga).
+    - Filtri opzionali per dipendente (id), squadra (nome) e attività (id).
+    - Solo le colonne richieste; con group_by (anche vuoto = totale generale) restituisce
+      le misure aggregate (default: somme ore) per le dimensioni indicate.
+    - columnar=True: i timestamp escono come epoch interi (per la lettura Arrow).
+    - dialect='duckdb': stessa query per il motore analitico (vedi core/analytics_engine.py).
+    """
+    column_sql = REPORT_COLUMN_SQL_DUCKDB if dialect == 'duckdb' else REPORT_COLUMN_SQL
+    aggregate = group_by is not None
+    dims = list(group_by) if aggregate else list(columns or REPORT_DEFAULT_COLUMNS)
+    meas = list(measures or REPORT_DEFAULT_MEASURES) if aggregate else []
+    unknown = [c for c in dims if c not in column_sql] + [m for m in meas if m not in REPORT_MEASURE_SQL]
+    if unknown:
+        raise ValueError(f"Colonne report non supportate: {unknown}")
+
+    def select_expr(col: str) -> str:
+        expr = column_sql[col]
+        if columnar and col in REPORT_TIMESTAMP_COLUMNS:
+            expr = f"CAST(strftime('%s', {expr}) AS INTEGER)"
+        return f"{expr} AS {col}"
+
+    select = [select_expr(c) for c in dims] + [f"{REPORT_MEASURE_SQL[m]} AS {m}" for m in meas]
+
+    where = ["r.data_ora_inizio >= ?", "r.data_ora_inizio < ?", "r.data_ora_fine IS NOT NULL"]
+    if dialect == 'duckdb':
+        params: list = [datetime.datetime.combine(start_date, datetime.time.min),
+                        datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time.min)]
+    else:
+        params = [start_date.isoformat(), (end_date + datetime.timedelta(days=1)).isoformat()]
+    if solo_attivi:
+        where.append("a.attivo = 1")
+    if dipendenti:
+        where.append(f"r.id_dipendente IN ({','.join('?' * len(dipendenti))})")
+        params += [int(d) for d in dipendenti]
+    if squadre:
+        where.append(f"{column_sql['squadra']} IN ({','.join('?' * len(squadre))})")
+        params += list(squadre)
+    if attivita:
+        att_clause = f"r.id_attivita IN ({','.join('?' * len(attivita))})"
+        if "-1" in attivita:  # "-1" nel report rappresenta anche le registrazioni senza attività
+            att_clause = f"({att_clause} OR r.id_attivita IS NULL)"
+        where.append(att_clause)
+        params += list(attivita)
+
+    joins = f"LEFT JOIN ({SQUADRA_CORRENTE_SQL}) sq ON sq.id_dipendente = a.id_dipendente"
+    if 'squadra_storica' in dims:
+        # Squadra registrata sul turno master al momento della pianificazione
+        joins += """
+        LEFT JOIN turni_master tm ON tm.id_turno_master = r.id_turno_master
+        LEFT JOIN squadre ss ON ss.id_squadra = tm.id_squadra"""
+
+    q = f"""
+    SELECT {', '.join(select)}
+    FROM registrazioni_ore r
+    JOIN anagrafica_dipendenti a ON r.id_dipendente = a.id_dipendente
+    {joins}
+    WHERE {' AND '.join(where)}
+    """
+    if dims and aggregate:
+        # NULLS FIRST esplicito: SQLite e DuckDB hanno default opposti
+        q += f" GROUP BY {', '.join(column_sql[c] for c in dims)} ORDER BY {', '.join(column_sql[c] + ' NULLS FIRST' for c in dims)}"
+    return q, params
 
 def setup_initial_data():
     try:
@@ -0,0 +1,61 @@
+# file: core/dependency_graph.py (Versione 1.1 - Cache Thread-Safe)
+"""
+Analisi d'impatto sul grafo delle dipendenze del cronoprogramma.
+
+Gli archi stanno in dipendenze_attivita (scritti da ScheduleDBManager.update_schedule a ogni import):
+"cosa c'è a valle di MON-012" è una CTE ricorsiva sugli indici, senza rileggere il testo dei predecessori.
+Le chiusure si memorizzano per versione del cronoprogramma: ogni import che cambia qualcosa le invalida.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+from core.schedule_db import ScheduleDBManager, schedule_db_manager
+
+CLOSURE_CACHE_SIZE = 256
+
+
+class DependencyGraph:
+    def __init__(self, schedule_db: ScheduleDBManager):
+        self.schedule_db = schedule_db
+        self._cache: Dict[Tuple[str, Tuple[str, ...]], pd.DataFrame] = {}
+        self._cache_version: Optional[int] = None
+        self._lock = threading.Lock()  # istanza globale condivisa fra le sessioni Streamlit
+
+    def closure(self, ids: Iterable[str], direzione: str = 'valle') -> pd.DataFrame:
+        """Attività a valle ('valle') o a monte ('monte') di una o più attività, con date e commessa."""
+        if isinstance(ids, str):
+            ids = [ids]
+        version = self.schedule_db.get_dependency_version()
+        key = (direzione, tuple(sorted(set(ids))))
+        with self._lock:
+            if version != self._cache_version:
+                self._cache.clear()
+                self._cache_version = version
+            df = self._cache.get(key)
+        if df is None:
+            # La CTE gira fuori dal lock; se un'altra sessione ha già inserito la chiave si tiene la sua
+            rows = self.schedule_db.get_dependency_closure(key[1], direzione)
+            df = pd.DataFrame(rows, columns=['id_attivita', 'descrizione', 'data_inizio', 'data_fine',
+                                             'stato_avanzamento', 'commessa', 'diretta'])
+            with self._lock:
+                if version == self._cache_version:
+                    if key not in self._cache and len(self._cache) >= CLOSURE_CACHE_SIZE:
+                        self._cache.pop(next(iter(self._cache)))
+                    df = self._cache.setdefault(key, df)
+        return df.copy()
+
+    def downstream(self, ids: Iterable[str]) -> pd.DataFrame:
+        """Successori diretti e indiretti: le attività che slittano se queste ritardano."""
+        return self.closure(ids, 'valle')
+
+    def upstream(self, ids: Iterable[str]) -> pd.DataFrame:
+        """Predecessori diretti e indiretti: le attività da cui queste dipendono."""
+        return self.closure(ids, 'monte')
+
+
+# Istanza globale per un facile accesso
+dependency_graph = DependencyGraph(schedule_db_manager)
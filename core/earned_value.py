@@ -0,0 +1,242 @@
+# file: core/earned_value.py (Versione 1.1 - Snapshot su Richiesta)
+"""
+Earned Value Management per attività e commessa: PV, EV, AC e indici CPI/SPI.
+
+- BAC: ore standard delle fasi del workflow x costo orario del ruolo (tabella tariffe_ruolo,
+  altrimenti COSTO_ORARIO_DEFAULT). Le attività senza workflow hanno BAC 0: contano solo i costi.
+- PV al giorno t: BAC x quota dei giorni lavorativi tra data_inizio e data_fine trascorsi a fine giornata
+  (lun-ven senza festività; finestre senza giorni lavorativi: giorni di calendario).
+- EV: stato_avanzamento / 100 x BAC. L'avanzamento è noto solo alla data di aggiornamento: per i
+  giorni arretrati (primo calcolo o giorni senza aggiornamento) l'EV si interpola tra l'ultimo
+  snapshot e oggi in proporzione alle ore lavorate nel frattempo, e la riga è marcata ev_stimato.
+- AC al giorno t: ore_lavoro registrate fino a t x costo orario del ruolo dell'operaio.
+
+Gli snapshot giornalieri (evm_snapshot_attivita / evm_snapshot_commessa) si aggiornano in modo
+incrementale: si calcolano solo i giorni dall'ultimo snapshot a oggi, riscrivendo quello di oggi.
+I giorni passati restano congelati come un rapporto di avanzamento: le correzioni successive
+alle ore entrano nell'AC cumulato dei giorni seguenti. I trend si leggono dalla tabella per commessa.
+"""
+from __future__ import annotations
+
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from core.config import COSTO_ORARIO_DEFAULT
+from core.crm_db import CrmDBManager
+from core.capacity_model import italian_holidays
+from core.monte_carlo import SENZA_COMMESSA
+from core.resource_scheduler import standard_workdays
+from core.workflow_engine import NavalWorkflowEngine, WorkRole
+
+EPS = 1e-9
+MAX_BACKFILL_DAYS = 3 * 365                 # primo calcolo: al più tre anni di storico ricostruito
+STORICO_INIZIO = datetime.date(2000, 1, 1)  # inizio dello storico per i costi effettivi cumulati
+TOTALE = "Totale"
+
+
+def _role_key(ruolo: Any) -> str:
+    """Chiave tariffa: etichetta del ruolo del registro, altrimenti il testo così com'è."""
+    role = WorkRole.from_string(ruolo)
+    return role.value if role is not None else str(ruolo or '').strip()
+
+
+def _day_array(activities: List[Dict], key: str) -> np.ndarray:
+    days = pd.to_datetime(pd.Series([a.get(key) for a in activities], dtype=object), errors='coerce')
+    return days.values.astype('datetime64[D]')
+
+
+def performance_indices(df: pd.DataFrame) -> pd.DataFrame:
+    """Aggiunge varianze (cv, sv), indici (cpi, spi) e stima a finire (eac = bac / cpi); NaN se non definiti."""
+    out = df.copy()
+    out['cv'] = out['ev'] - out['ac']
+    out['sv'] = out['ev'] - out['pv']
+    out['cpi'] = out['ev'] / out['ac'].where(out['ac'] > EPS)
+    out['spi'] = out['ev'] / out['pv'].where(out['pv'] > EPS)
+    out['eac'] = out['bac'] / out['cpi'].where(out['cpi'] > EPS)
+    return out
+
+
+class EarnedValueEngine:
+    def __init__(self, db_manager: CrmDBManager, engine: NavalWorkflowEngine,
+                 default_rate: float = COSTO_ORARIO_DEFAULT, holidays: Optional[Iterable[datetime.date]] = None):
+        self.db_manager = db_manager
+        self.engine = engine
+        self.default_rate = default_rate
+        self.holidays = None if holidays is None else sorted(holidays)  # None = festività nazionali
+        self._last_update: Optional[tuple] = None
+
+    # --- INGRESSI ---
+    def role_rates(self) -> Dict[str, float]:
+        """Costo orario per ruolo dalla tabella tariffe_ruolo (chiavi normalizzate sul registro dei ruoli)."""
+        return {_role_key(r): c for r, c in self.db_manager.get_tariffe_ruolo().items()}
+
+    def budget(self, activity_ids: Sequence[str], rates: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """(N,) BAC: somma delle ore di ogni fase del workflow per il costo orario del suo ruolo."""
+        rates = self.role_rates() if rates is None else rates
+        compiled = self.engine.compile_templates()
+        per_template = np.array([
+            sum(p.hours_required * rates.get(p.role.value, self.default_rate) for group in groups for p in group)
+            for groups in compiled.block_phases])
+        idx = self.engine.template_indices(activity_ids)
+        return np.where(idx >= 0, per_template[np.maximum(idx, 0)] if per_template.size else 0.0, 0.0)
+
+    def planned_fraction(self, activities: List[Dict], first_day: datetime.date, n_days: int) -> np.ndarray:
+        """(N, n_days) quota pianificata completata a fine giornata, da first_day in avanti."""
+        start, end = _day_array(activities, 'data_inizio'), _day_array(activities, 'data_fine')
+        ok = ~np.isnat(start) & ~np.isnat(end)
+        first = np.datetime64(first_day, 'D')
+        if not ok.any():
+            return np.zeros((len(activities), n_days))
+        base = min(first, start[ok].min())
+        s = np.where(ok, (start - base).astype(np.int64), 0)
+        e = np.where(ok, np.maximum((end - base).astype(np.int64), s), 0)  # fine prima dell'inizio: un giorno
+        t = (first - base).astype(np.int64) + np.arange(n_days)
+        length = int(max(t[-1] + 1 if n_days else 0, e.max() + 1))
+        workdays = standard_workdays(base.astype(datetime.date), length, self._holidays(base.astype(datetime.date), length))
+        cum = np.concatenate(([0], np.cumsum(workdays)))
+
+        # Giorni lavorativi dell'attività trascorsi a fine giornata t / giorni lavorativi dell'attività
+        elapsed = np.clip(t[None, :] + 1, s[:, None], e[:, None] + 1)
+        work = cum[e + 1] - cum[s]
+        calendar = work == 0
+        done = np.where(calendar[:, None], elapsed - s[:, None], cum[elapsed] - cum[s][:, None])
+        span = np.where(calendar, e + 1 - s, work)
+        return np.where(ok[:, None], done / span[:, None], 0.0)
+
+    def actuals(self, activity_ids: Sequence[str], rates: Dict[str, float],
+                first_day: datetime.date, last_day: datetime.date):
+        """
+        Ore e costi effettivi da registrazioni_ore (GROUP BY in SQL):
+        totali fino al giorno prima di first_day (N,) e giornalieri da first_day a last_day (N, D).
+        """
+        index = pd.Index(activity_ids)
+        n_days = (last_day - first_day).days + 1
+        base_h, base_c = np.zeros(len(index)), np.zeros(len(index))
+        day_h, day_c = np.zeros((len(index), n_days)), np.zeros((len(index), n_days))
+
+        def rows_and_cost(df):
+            rows = index.get_indexer(df['id_attivita'])
+            keys = df['ruolo'].map({r: rates.get(_role_key(r), self.default_rate) for r in df['ruolo'].unique()})
+            ore = df['ore_lavoro'].to_numpy(dtype=np.float64)
+            return rows, ore, ore * keys.to_numpy(dtype=np.float64)
+
+        prima = first_day - datetime.timedelta(days=1)
+        if prima >= STORICO_INIZIO:
+            hist = self.db_manager.get_report_data_df(STORICO_INIZIO, prima, group_by=['id_attivita', 'ruolo'],
+                                                      measures=['ore_lavoro'], solo_attivi=False)
+            rows, ore, cost = rows_and_cost(hist)
+            keep = rows >= 0
+            np.add.at(base_h, rows[keep], ore[keep])
+            np.add.at(base_c, rows[keep], cost[keep])
+
+        daily = self.db_manager.get_report_data_df(first_day, last_day, group_by=['id_attivita', 'ruolo', 'giorno'],
+                                                   measures=['ore_lavoro'], solo_attivi=False)
+        rows, ore, cost = rows_and_cost(daily)
+        cols = (pd.to_datetime(daily['giorno']).values.astype('datetime64[D]') - np.datetime64(first_day, 'D')).astype(np.int64)
+        keep = rows >= 0
+        np.add.at(day_h, (rows[keep], cols[keep]), ore[keep])
+        np.add.at(day_c, (rows[keep], cols[keep]), cost[keep])
+        return base_h, base_c, day_h, day_c
+
+    def _holidays(self, start: datetime.date, n_days: int) -> List[datetime.date]:
+        if self.holidays is not None:
+            return self.holidays
+        return italian_holidays(range(start.year, (start + datetime.timedelta(days=n_days)).year + 1))
+
+    # --- SNAPSHOT ---
+    def _first_day(self, activities: List[Dict], oggi: datetime.date, rebuild: bool) -> datetime.date:
+        last = None if rebuild else self.db_manager.get_evm_last_day()
+        if last is not None:
+            first = min(last + datetime.timedelta(days=1), oggi)
+        else:
+            starts = _day_array(activities, 'data_inizio')
+            starts = starts[~np.isnat(starts)]
+            first = min(starts.min().astype(datetime.date), oggi) if starts.size else oggi
+        return max(first, oggi - datetime.timedelta(days=MAX_BACKFILL_DAYS))
+
+    def update_snapshots(self, activities: List[Dict], oggi: Optional[datetime.date] = None,
+                         rebuild: bool = False) -> Dict[str, Any]:
+        """
+        Porta gli snapshot a `oggi` (default: data corrente) calcolando solo i giorni mancanti.
+        rebuild=True ricostruisce tutto lo storico dall'inizio del cronoprogramma.
+        Senza cambi di cronoprogramma, ore o tariffe dall'ultima chiamata non riscrive nulla.
+        """
+        oggi = oggi or datetime.date.today()
+        rates = self.role_rates()
+        signature = (oggi, self.db_manager.get_data_version(), tuple(sorted(rates.items())), tuple(
+            (a.get('id_attivita'), str(a.get('data_inizio')), str(a.get('data_fine')),
+             a.get('stato_avanzamento'), a.get('commessa')) for a in activities))
+        if not rebuild and signature == self._last_update:
+            return {'dal': oggi, 'al': oggi, 'giorni': 0, 'righe_attivita': 0}
+
+        first_day = self._first_day(activities, oggi, rebuild)
+        n_days = (oggi - first_day).days + 1
+        ids = [str(a.get('id_attivita')) for a in activities]
+        commesse = [str(a.get('commessa') or SENZA_COMMESSA) for a in activities]
+
+        bac = self.budget(ids, rates)
+        pv = bac[:, None] * self.planned_fraction(activities, first_day, n_days)
+        base_h, base_c, day_h, day_c = self.actuals(ids, rates, first_day, oggi)
+        ac = base_c[:, None] + np.cumsum(day_c, axis=1)
+
+        # EV: avanzamento di oggi; i giorni arretrati interpolano dall'ultimo snapshot con le ore lavorate
+        progress = np.clip(pd.to_numeric(pd.Series([a.get('stato_avanzamento') for a in activities], dtype=object),
+                                         errors='coerce').fillna(0.0).to_numpy(dtype=np.float64) / 100.0, 0.0, 1.0)
+        ev_today = progress * bac
+        ev_prev = np.zeros(len(ids))
+        if not rebuild:
+            prev = self.db_manager.get_evm_snapshot_attivita(prima_di=first_day)
+            if not prev.empty:
+                ev_prev = pd.Series(ids).map(dict(zip(prev['id_attivita'], prev['ev']))).fillna(0.0).to_numpy(dtype=np.float64)
+        gained = np.cumsum(day_h, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = np.where(gained[:, -1:] > EPS, gained / gained[:, -1:], 0.0)
+        share[:, -1] = 1.0
+        ev = ev_prev[:, None] + (ev_today - ev_prev)[:, None] * share
+        estimated = np.arange(n_days) < n_days - 1
+
+        days = np.datetime_as_string(np.datetime64(first_day, 'D') + np.arange(n_days), unit='D')
+        r, c = np.nonzero((pv > EPS) | (ev > EPS) | (ac > EPS))
+        ids_arr, comm_arr = np.array(ids, dtype=object), np.array(commesse, dtype=object)
+        attivita_rows = list(zip(ids_arr[r].tolist(), days[c].tolist(), comm_arr[r].tolist(), bac[r].round(2).tolist(),
+                                 pv[r, c].round(2).tolist(), ev[r, c].round(2).tolist(), ac[r, c].round(2).tolist(),
+                                 estimated[c].astype(int).tolist()))
+
+        # Aggregato per commessa: una matrice di appartenenza commessa x attività
+        codes, labels = pd.factorize(pd.Series(commesse, dtype=object))
+        member = np.zeros((len(labels), len(ids)))
+        member[codes, np.arange(len(ids))] = 1.0
+        bac_c, pv_c, ev_c, ac_c = member @ bac, member @ pv, member @ ev, member @ ac
+        commessa_rows = [(str(labels[k]), days[d], round(float(bac_c[k]), 2), round(float(pv_c[k, d]), 2),
+                          round(float(ev_c[k, d]), 2), round(float(ac_c[k, d]), 2), int(estimated[d]))
+                         for k in range(len(labels)) for d in range(n_days)]
+
+        self.db_manager.save_evm_snapshots(attivita_rows, commessa_rows, None if rebuild else first_day)
+        self._last_update = signature
+        return {'dal': first_day, 'al': oggi, 'giorni': n_days, 'righe_attivita': len(attivita_rows)}
+
+    # --- LETTURA ---
+    def last_snapshot_day(self) -> Optional[datetime.date]:
+        """Giorno dell'ultimo snapshot salvato (None se non ce ne sono): le pagine lo mostrano senza aggiornare."""
+        return self.db_manager.get_evm_last_day()
+
+    def trend_commessa(self, commessa: Optional[str] = None) -> pd.DataFrame:
+        """Serie giornaliera con indici; commessa=TOTALE somma tutte le commesse."""
+        if commessa == TOTALE:
+            df = self.db_manager.get_evm_trend_commessa()
+            df = df.groupby('giorno', as_index=False).agg(
+                bac=('bac', 'sum'), pv=('pv', 'sum'), ev=('ev', 'sum'), ac=('ac', 'sum'), ev_stimato=('ev_stimato', 'max'))
+            df.insert(0, 'commessa', TOTALE)
+        else:
+            df = self.db_manager.get_evm_trend_commessa(commessa)
+        return performance_indices(df)
+
+    def trend_attivita(self, id_attivita: str) -> pd.DataFrame:
+        return performance_indices(self.db_manager.get_evm_trend_attivita(id_attivita))
+
+    def status(self) -> pd.DataFrame:
+        """Ultimo snapshot per attività, con indici."""
+        return performance_indices(self.db_manager.get_evm_snapshot_attivita())
@@ -0,0 +1,128 @@
+# file: core/gantt_view.py (Versione 1.0 - Gantt Vettoriale Raggruppato)
+"""
+Dati del Gantt del cronoprogramma, costruiti per colonne (niente iterrows) e pronti per il disegno WebGL.
+
+- Ogni riga del Gantt è un'attività oppure un gruppo (commessa o tipo di attività) che ne riassume
+  molte: inizio minimo, fine massima, avanzamento pesato sulla durata, critico se lo è almeno
+  un'attività, float minimo. I gruppi espansi (drill-down) mostrano le loro attività subito sotto.
+- Ogni barra ha due segmenti: avanzamento (colore per soglia di avanzamento) e rimanente
+  (rosso tenue sul percorso critico); line_segments() li traduce in polilinee separate da None,
+  una traccia Scattergl per colore invece di una barra SVG per segmento.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.monte_carlo import SENZA_COMMESSA
+from core.workflow_engine import NavalWorkflowEngine
+
+RAGGRUPPAMENTI = {'commessa': 'Commessa', 'tipo': 'Tipo attività'}
+GANTT_MAX_ATTIVITA = 150             # oltre, la vista predefinita raggruppa le attività
+COLORE_RIMANENTE = 'rgba(108, 117, 125, 0.5)'
+COLORE_RIMANENTE_CRITICO = 'rgba(220, 38, 38, 0.45)'
+SOGLIE_AVANZAMENTO = ((100, "#28a745"), (70, "#3B82F6"), (50, "#EF4444"))  # Completato, 70-99%, 50-69%
+COLORE_AVANZAMENTO_BASSO = "#F59E0B"                                        # 0-49%
+SENZA_TIPO = "Altro"
+
+
+def progress_colors(progress: pd.Series) -> np.ndarray:
+    """Colore del segmento di avanzamento per soglia: verde completato, azzurro 70-99%, rosso 50-69%, arancione sotto."""
+    p = progress.fillna(0).astype(float).astype(int).to_numpy()
+    return np.select([p >= soglia for soglia, _ in SOGLIE_AVANZAMENTO], [c for _, c in SOGLIE_AVANZAMENTO],
+                     COLORE_AVANZAMENTO_BASSO)
+
+
+def activity_types(ids: pd.Series, engine: Optional[NavalWorkflowEngine] = None) -> pd.Series:
+    """Tipo di attività: prefisso del template di workflow se c'è, altrimenti le lettere iniziali dell'ID."""
+    prefix = ids.astype(str).str.extract(r'^\s*([A-Za-z]+)', expand=False).str.upper().fillna(SENZA_TIPO)
+    if engine is not None:
+        template = engine.template_indices(ids.tolist())
+        prefixes = np.array(engine.compile_templates().prefixes + (None,), dtype=object)
+        prefix = pd.Series(prefixes[template], index=ids.index).fillna(prefix)
+    return prefix
+
+
+def group_keys(df: pd.DataFrame, by: str, engine: Optional[NavalWorkflowEngine] = None) -> pd.Series:
+    if by == 'commessa':
+        return df['commessa'].fillna('').astype(str).str.strip().replace('', SENZA_COMMESSA)
+    if by == 'tipo':
+        return activity_types(df['id_attivita'], engine)
+    raise ValueError(f"Raggruppamento non supportato: {by!r} ({', '.join(RAGGRUPPAMENTI)})")
+
+
+def aggregate(df: pd.DataFrame, keys: pd.Series) -> pd.DataFrame:
+    """Una riga per gruppo: date estreme, avanzamento pesato sui giorni di durata, criticità e float."""
+    durata = (df['data_fine'] - df['data_inizio']).dt.days.clip(lower=1).astype(float)
+    work = pd.DataFrame({'chiave': keys.to_numpy(), 'data_inizio': df['data_inizio'].to_numpy(),
+                         'data_fine': df['data_fine'].to_numpy(), 'peso': durata.to_numpy(),
+                         'fatto': (durata * df['stato_avanzamento'].fillna(0).astype(float).clip(0, 100) / 100).to_numpy(),
+                         'critica': df['critica'].fillna(False).astype(bool).to_numpy() if 'critica' in df else False,
+                         'float_totale': df['float_totale'].to_numpy() if 'float_totale' in df else np.nan})
+    groups = work.groupby('chiave', sort=False).agg(
+        data_inizio=('data_inizio', 'min'), data_fine=('data_fine', 'max'), peso=('peso', 'sum'), fatto=('fatto', 'sum'),
+        critica=('critica', 'any'), float_totale=('float_totale', 'min'), n_attivita=('chiave', 'size')).reset_index()
+    groups['stato_avanzamento'] = (groups['fatto'] / groups['peso'] * 100).round(1)
+    return groups.drop(columns=['peso', 'fatto'])
+
+
+def gantt_rows(df: pd.DataFrame, by: Optional[str] = None, espandi: Iterable[str] = (),
+               engine: Optional[NavalWorkflowEngine] = None) -> pd.DataFrame:
+    """
+    Righe del Gantt nell'ordine di disegno. by=None: una riga per attività; by='commessa'/'tipo':
+    una riga per gruppo e, per i gruppi in espandi, le loro attività subito sotto (livello 1).
+    Colonne: chiave, gruppo, livello, etichetta, data_inizio, data_fine, stato_avanzamento, critica, float_totale, n_attivita.
+    """
+    acts = pd.DataFrame({'chiave': df['id_attivita'].to_numpy(), 'etichetta': df['descrizione'].fillna('').astype(str).to_numpy(),
+                         'data_inizio': df['data_inizio'].to_numpy(), 'data_fine': df['data_fine'].to_numpy(),
+                         'stato_avanzamento': df['stato_avanzamento'].fillna(0).astype(float).to_numpy(),
+                         'critica': df['critica'].fillna(False).astype(bool).to_numpy() if 'critica' in df else False,
+                         'float_totale': df['float_totale'].to_numpy() if 'float_totale' in df else np.nan,
+                         'n_attivita': 1, 'livello': 1})
+    if by is None:
+        acts['gruppo'] = None
+        return acts.sort_values(['data_inizio', 'chiave'], kind='stable').reset_index(drop=True)
+
+    keys = group_keys(df, by, engine)
+    groups = aggregate(df, keys).sort_values(['data_inizio', 'chiave'], kind='stable').reset_index(drop=True)
+    groups['gruppo'] = groups['chiave']
+    groups['livello'] = 0
+    groups['etichetta'] = groups['chiave'] + " (" + groups['n_attivita'].astype(str) + " attività)"
+
+    acts['gruppo'] = keys.to_numpy()
+    acts = acts[acts['gruppo'].isin(set(espandi))].copy()
+    acts['etichetta'] = "   ↳ " + acts['etichetta']
+    order = pd.Series(np.arange(len(groups)), index=groups['chiave'])
+    rows = pd.concat([groups, acts], ignore_index=True)
+    rows['_ordine'] = rows['gruppo'].map(order)
+    rows = rows.sort_values(['_ordine', 'livello', 'data_inizio', 'chiave'], kind='stable').drop(columns='_ordine')
+    return rows.reset_index(drop=True)
+
+
+def gantt_bars(rows: pd.DataFrame, show_critical: bool = True) -> pd.DataFrame:
+    """Aggiunge posizione (y), fine del segmento di avanzamento, colori ed etichetta con 🔴 per le righe critiche."""
+    bars = rows.copy()
+    bars['y'] = np.arange(len(bars))
+    progress = bars['stato_avanzamento'].clip(0, 100)
+    bars['fine_avanzamento'] = bars['data_inizio'] + (bars['data_fine'] - bars['data_inizio']) * (progress / 100)
+    critical = bars['critica'].astype(bool) & show_critical
+    bars['colore_avanzamento'] = progress_colors(progress)
+    bars['colore_rimanente'] = np.where(critical, COLORE_RIMANENTE_CRITICO, COLORE_RIMANENTE)
+    bars['etichetta'] = np.where(critical, "🔴 " + bars['etichetta'], bars['etichetta'])
+    return bars
+
+
+def line_segments(start: pd.Series, end: pd.Series, y: pd.Series, text: Optional[pd.Series] = None
+                  ) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """Segmenti orizzontali come un'unica polilinea (inizio, fine, None, ...) per una traccia Scattergl."""
+    n = len(start)
+    x, yy = np.empty(3 * n, dtype=object), np.empty(3 * n, dtype=object)
+    x[0::3], x[1::3] = start.astype(object).to_numpy(), end.astype(object).to_numpy()  # Timestamp, non interi in ns
+    yy[0::3] = yy[1::3] = y.to_numpy()
+    hover = None
+    if text is not None:
+        hover = np.empty(3 * n, dtype=object)
+        hover[0::3] = hover[1::3] = text.to_numpy()
+    return x, yy, hover
@@ -0,0 +1,195 @@
+# file: core/hour_sheets.py (Versione 1.0 - Stampe Ore in Blocco)
+"""
+Fogli "Riepilogo Ore" mensili per tutta la forza lavoro, senza passare operaio per operaio dalla pagina 15.
+
+- Il mese si legge una volta sola (ShiftService.get_riepilogo_turni: Smart Merge e tipo turno già calcolati)
+  e si divide per operaio; i fogli HTML (o PDF, se c'è weasyprint) si generano a blocchi su un pool di processi.
+- Nomi file deterministici (AAAA-MM_matricola_cognome_nome), ZIP con date fisse: stesso mese, stessi byte.
+- In alternativa un unico documento multipagina (un foglio per pagina in stampa).
+
+Da riga di comando:  python -m core.hour_sheets 2025 3 -o riepilogo_2025-03.zip [--processes 4] [--pdf] [--unico]
+"""
+from __future__ import annotations
+
+import calendar
+import datetime
+import html
+import io
+import re
+import unicodedata
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+try:
+    from weasyprint import HTML as WeasyHTML
+except ImportError:
+    WeasyHTML = None
+
+NOMI_MESI = ["Gennaio", "Febbraio", "Marzo", "Aprile", "Maggio", "Giugno", "Luglio", "Agosto",
+             "Settembre", "Ottobre", "Novembre", "Dicembre"]
+FORMATI = ('html', 'pdf')
+COLONNE_FOGLIO = ("DATA", "ATTIVITÀ", "ORARIO", "ORE", "VISTO")
+SHEETS_PER_TASK = 25        # fogli per blocco inviato al pool
+TAG_CAMBIO = " <span style='font-size:0.85em; opacity:0.8; margin-left:8px;'>🔀 <b>CAMBIO</b></span>"
+VISTO = "<span style='color:#ccc'>......</span>"
+
+SHEET_CSS = """
+body { font-family: sans-serif; color: black; background: white; margin: 0; }
+.foglio { padding: 24px; page-break-after: always; break-after: page; }
+.foglio:last-child { page-break-after: auto; break-after: auto; }
+.intestazione { display: flex; justify-content: space-between; align-items: flex-end; border-bottom: 1px solid #555; padding-bottom: 10px; margin-bottom: 15px; }
+.intestazione h2 { margin: 0; }
+.clean-table { width: 100%; border-collapse: collapse; font-size: 14px; }
+.clean-table th { text-align: left; padding: 8px 10px; border-bottom: 2px solid black; font-size: 12px; text-transform: uppercase; letter-spacing: 1px; }
+.clean-table td { padding: 7px 10px; border-bottom: 1px solid #ddd; }
+.clean-table tr:nth-child(even) { background-color: #f9f9f9; }
+.totale { margin-top: 18px; font-size: 1.2em; font-weight: bold; }
+.firma { margin: 40px 0 0 auto; width: 60%; border-top: 1px solid #555; padding-top: 5px; text-align: center; }
+* { -webkit-print-color-adjust: exact; print-color-adjust: exact; }
+"""
+
+
+def month_range(anno: int, mese: int) -> Tuple[datetime.date, datetime.date]:
+    return datetime.date(anno, mese, 1), datetime.date(anno, mese, calendar.monthrange(anno, mese)[1])
+
+
+def sheet_table(turni: pd.DataFrame) -> pd.DataFrame:
+    """Celle del foglio (DATA, ATTIVITÀ, ORARIO, ORE, VISTO) in HTML, dai turni di get_riepilogo_turni."""
+    d_s, d_e = turni['data_ora_inizio'].dt, turni['data_ora_fine'].dt
+    cambio = turni['cambio_turno'].map({True: TAG_CAMBIO, False: ""})
+    return pd.DataFrame({
+        "DATA": "<b>" + d_s.day.astype(str) + "</b> <small>" + d_s.strftime('%a') + "</small>",
+        "ATTIVITÀ": "<span style='font-size:1.1em'>" + turni['icona'] + "</span> " + turni['descrizione'].map(html.escape) + " " + cambio,
+        "ORARIO": d_s.strftime('%H:%M') + " - " + d_e.strftime('%H:%M') + turni['giorno_dopo'].map({True: " <small>(+1)</small>", False: ""}),
+        "ORE": "<b>" + turni['ore_presenza'].map('{:g}'.format) + "</b>",
+        "VISTO": VISTO,
+    }, index=turni.index)
+
+
+def table_rows(celle: pd.DataFrame) -> pd.Series:
+    """Una riga <tr> per turno, concatenata per colonne (niente to_html per foglio)."""
+    riga = "<tr><td>" + celle[COLONNE_FOGLIO[0]]
+    for col in COLONNE_FOGLIO[1:]:
+        riga = riga + "</td><td>" + celle[col]
+    return riga + "</td></tr>"
+
+
+def table_html(righe: Sequence[str]) -> str:
+    intestazione = "".join(f"<th>{c}</th>" for c in COLONNE_FOGLIO)
+    return (f'<table class="clean-table">\n<thead><tr>{intestazione}</tr></thead>\n<tbody>\n'
+            + "\n".join(righe) + "\n</tbody>\n</table>")
+
+
+def sheet_filename(anno: int, mese: int, id_dipendente: int, cognome: str, nome: str, formato: str = 'html') -> str:
+    """Nome file stabile e sicuro: 2025-03_0042_rossi_mario.html."""
+    testo = unicodedata.normalize('NFKD', f"{cognome} {nome}").encode('ascii', 'ignore').decode()
+    slug = re.sub(r'[^a-z0-9]+', '_', testo.lower()).strip('_') or 'operaio'
+    return f"{anno}-{mese:02d}_{int(id_dipendente):04d}_{slug}.{formato}"
+
+
+def sheet_body(info: Dict, righe: Sequence[str], tot_ore: float, anno: int, mese: int) -> str:
+    """Un foglio (intestazione, tabella, totale, firma) come frammento HTML."""
+    nominativo = html.escape(f"{info['cognome']} {info['nome']}")
+    return f"""<section class="foglio">
+<div class="intestazione">
+  <div><h2>{nominativo}</h2><div>{html.escape(str(info['ruolo']))} | Matr. #{int(info['id_dipendente']):04d}</div></div>
+  <div style="text-align:right;"><div style="font-size:1.2em; font-weight:bold;">{NOMI_MESI[mese - 1].upper()} {anno}</div><div>Riepilogo Ore</div></div>
+</div>
+{table_html(righe)}
+<div class="totale">TOTALE ORE: {tot_ore:g}</div>
+<div class="firma"><small>Firma per accettazione</small></div>
+</section>"""
+
+
+def sheet_document(bodies: Sequence[str], titolo: str) -> str:
+    return (f"<!DOCTYPE html>\n<html lang=\"it\"><head><meta charset=\"utf-8\"><title>{html.escape(titolo)}</title>"
+            f"<style>{SHEET_CSS}</style></head>\n<body>\n" + "\n".join(bodies) + "\n</body></html>\n")
+
+
+def _to_bytes(document: str, formato: str) -> bytes:
+    if formato == 'pdf':
+        return WeasyHTML(string=document).write_pdf()
+    return document.encode('utf-8')
+
+
+def _render_chunk(items: List[Tuple[str, Dict, List[str], float]], anno: int, mese: int, formato: str) -> List[Tuple[str, bytes]]:
+    """Blocco di fogli per un processo del pool: (nome file, contenuto)."""
+    return [(nome, _to_bytes(sheet_document([sheet_body(info, righe, tot, anno, mese)], nome), formato))
+            for nome, info, righe, tot in items]
+
+
+def build_hour_sheets(turni: pd.DataFrame, anagrafica: pd.DataFrame, anno: int, mese: int,
+                      formato: str = 'html', unico: bool = False, processes: Optional[int] = None) -> Dict[str, bytes]:
+    """
+    Fogli del mese per gli operai presenti in `turni` (get_riepilogo_turni), ordinati per nome file.
+    - anagrafica: get_dipendenti_df (indice id_dipendente; nome, cognome, ruolo).
+    - unico: un solo documento multipagina invece di un file per operaio.
+    - processes: None/1 = in questo processo; >1 = blocchi di fogli su un pool di processi.
+    Le celle si calcolano una volta per tutto il mese; per operaio restano solo le righe <tr> già pronte.
+    """
+    if formato not in FORMATI:
+        raise ValueError(f"Formato non supportato: {formato!r} ({', '.join(FORMATI)})")
+    if formato == 'pdf' and WeasyHTML is None:
+        raise RuntimeError("Per i PDF serve weasyprint (pip install weasyprint); usare il formato 'html'")
+
+    righe = table_rows(sheet_table(turni)).groupby(turni['id_dipendente'], sort=False).agg(list)
+    totali = turni.groupby('id_dipendente', sort=False)['ore_presenza'].sum()
+    items = []
+    for id_dip, righe_dip in righe.items():
+        info = {'id_dipendente': id_dip, 'nome': '', 'cognome': f"Operaio {id_dip}", 'ruolo': ''}
+        if id_dip in anagrafica.index:
+            info.update(anagrafica.loc[id_dip, ['nome', 'cognome', 'ruolo']].fillna('').to_dict())
+        nome = sheet_filename(anno, mese, id_dip, info['cognome'], info['nome'], formato)
+        items.append((nome, info, righe_dip, float(totali[id_dip])))
+    items.sort(key=lambda it: it[0])
+
+    if unico:
+        nome = f"riepilogo_ore_{anno}-{mese:02d}.{formato}"
+        bodies = [sheet_body(info, righe_dip, tot, anno, mese) for _, info, righe_dip, tot in items]
+        return {nome: _to_bytes(sheet_document(bodies, nome), formato)}
+
+    chunks = [items[k:k + SHEETS_PER_TASK] for k in range(0, len(items), SHEETS_PER_TASK)]
+    if processes and processes > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            parts = list(pool.map(partial(_render_chunk, anno=anno, mese=mese, formato=formato), chunks))
+    else:
+        parts = [_render_chunk(c, anno, mese, formato) for c in chunks]
+    return dict(item for part in parts for item in part)
+
+
+def zip_hour_sheets(files: Dict[str, bytes], anno: int, mese: int) -> bytes:
+    """ZIP riproducibile: file in ordine di nome, data fissata al primo del mese."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for nome in sorted(files):
+            info = zipfile.ZipInfo(nome, date_time=(anno, mese, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            zf.writestr(info, files[nome])
+    return buffer.getvalue()
+
+
+if __name__ == "__main__":
+    import argparse
+    from core.shift_service import shift_service
+
+    parser = argparse.ArgumentParser(description="Fogli Riepilogo Ore del mese per tutti gli operai")
+    parser.add_argument("anno", type=int)
+    parser.add_argument("mese", type=int)
+    parser.add_argument("-o", "--output", help="file di uscita (default: nome deterministico nella cartella corrente)")
+    parser.add_argument("--dipendenti", type=int, nargs="*", help="matricole (default: tutti gli operai con ore nel mese)")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--pdf", action="store_true", help="PDF invece di HTML (richiede weasyprint)")
+    parser.add_argument("--unico", action="store_true", help="un solo documento multipagina invece dello ZIP")
+    args = parser.parse_args()
+
+    nome, dati = shift_service.export_hour_sheets(args.anno, args.mese, dipendenti=args.dipendenti,
+                                                  formato='pdf' if args.pdf else 'html',
+                                                  unico=args.unico, processes=args.processes)
+    with open(args.output or nome, 'wb') as f:
+        f.write(dati)
+    print(f"✅ {args.output or nome} ({len(dati) / 1024:.0f} KB)")
@@ -1,7 +1,8 @@
-# core/logic.py (Versione 7.0 - Logica di Squadra & Eccezioni)
+# core/logic.py (Versione 8.0 - Smart Merge Vettoriale per le Stampe)
 from __future__ import annotations
 from datetime import datetime, time
 from typing import Dict, Tuple, Optional
+import numpy as np
 import pandas as pd
 
 class ShiftEngine:
@@ -39,6 +40,65 @@ class ShiftEngine:
         
         return presenza, round(max(0, lavoro), 2)
 
+    # --- STAMPE OPERATIVE: SMART MERGE E TIPO TURNO ---
+    # Tipi di turno (categorie) e icone; GIORNO <-> NOTTE è il cambio turno da segnalare
+    TIPI_TURNO = ("GIORNO", "SERA", "NOTTE", "OFFICINA", "TRASFERTA")
+    ICONE_TURNO = {"GIORNO": "☀️", "SERA": "🌗", "NOTTE": "🌙", "OFFICINA": "🔧", "TRASFERTA": "🚚"}
+    TURNI_PRINCIPALI = ("GIORNO", "NOTTE")
+    MERGE_GAP_SECONDS = 120   # un segmento che riparte a mezzanotte entro 2 minuti continua il turno precedente
+    ORE_TURNO_PIENO = 4       # solo i turni oltre 4 ore fissano il turno di riferimento per il cambio
+
+    @classmethod
+    def merge_night_segments(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Smart Merge: riunisce i turni notturni spezzati a mezzanotte, per tutti gli operai in un colpo.
+        Per operaio e in ordine di inizio, una riga continua la precedente se inizia alle 00:xx entro
+        MERGE_GAP_SECONDS dalla sua fine (shift() sul gruppo, niente cicli). Il turno unito tiene inizio e
+        attività del primo segmento, fine dell'ultimo e la somma delle ore di presenza.
+        Colonne richieste: id_dipendente, data_ora_inizio, data_ora_fine, ore_presenza, id_attivita.
+        """
+        cols = ['id_dipendente', 'data_ora_inizio', 'data_ora_fine', 'ore_presenza', 'id_attivita']
+        if df.empty:
+            return df[cols].reset_index(drop=True)
+        df = df[cols].sort_values(['id_dipendente', 'data_ora_inizio'], kind='mergesort').reset_index(drop=True)
+        gap = (df['data_ora_inizio'] - df.groupby('id_dipendente')['data_ora_fine'].shift()).dt.total_seconds()
+        continues = gap.between(0, cls.MERGE_GAP_SECONDS) & (df['data_ora_inizio'].dt.hour == 0)
+        turno = (~continues).cumsum()  # il primo segmento di ogni operaio non ha precedente: apre sempre un turno
+        coda = df.groupby(turno, sort=False).agg(data_ora_fine=('data_ora_fine', 'last'), ore_presenza=('ore_presenza', 'sum'))
+        # Inizio e attività dalla riga di testa (non 'first' del groupby, che salterebbe le attività vuote)
+        merged = df.loc[~continues, ['id_dipendente', 'data_ora_inizio', 'id_attivita']].reset_index(drop=True)
+        merged['data_ora_fine'] = coda['data_ora_fine'].to_numpy()
+        merged['ore_presenza'] = coda['ore_presenza'].to_numpy()
+        return merged[cols]
+
+    @classmethod
+    def classify_shifts(cls, merged: pd.DataFrame) -> pd.DataFrame:
+        """
+        Tipo di turno per riga (OFFICINA / TRASFERTA dal codice attività, altrimenti dall'ora di inizio:
+        NOTTE 20-06, SERA 18-20, GIORNO), descrizione, icona, giorno_dopo (fine il giorno seguente) e
+        cambio_turno: GIORNO <-> NOTTE rispetto all'ultimo turno pieno (oltre ORE_TURNO_PIENO ore) dello stesso operaio.
+        """
+        out = merged.copy()
+        codice = out['id_attivita'].astype(str)
+        ora = out['data_ora_inizio'].dt.hour
+        officina, viaggio = codice.str.contains("OFF", regex=False), codice.str.contains("VIAGGIO", regex=False)
+        tipo = np.select([officina, viaggio, (ora >= 20) | (ora < 6), (ora >= 18) & (ora < 20)],
+                         ["OFFICINA", "TRASFERTA", "NOTTE", "SERA"], "GIORNO")
+        out['tipo_turno'] = pd.Categorical(tipo, categories=cls.TIPI_TURNO)
+        out['icona'] = out['tipo_turno'].map(cls.ICONE_TURNO).astype(str)
+
+        generico = codice.isin(["-1", "nan", "None"])
+        descrizione = codice.where(~generico, "Turno " + pd.Series(tipo, index=out.index).str.capitalize())
+        out['descrizione'] = descrizione.mask(officina, "Officina").mask(viaggio, "Trasferta")
+
+        # Turno di riferimento = ultimo turno pieno precedente dello stesso operaio
+        pieno = pd.Series(tipo, index=out.index, dtype=object).where(out['ore_presenza'] > cls.ORE_TURNO_PIENO)
+        precedente = pieno.groupby(out['id_dipendente']).shift().groupby(out['id_dipendente']).ffill()
+        principale = lambda s: s.isin(cls.TURNI_PRINCIPALI)
+        out['cambio_turno'] = principale(pd.Series(tipo, index=out.index)) & principale(precedente) & (precedente != tipo)
+        out['giorno_dopo'] = out['data_ora_fine'].dt.normalize() > out['data_ora_inizio'].dt.normalize()
+        return out
+
 # Funzione di compatibilità per mantenere il vecchio calcolo se necessario
 def calculate_duration_hours(start_time, end_time) -> float:
     presenza, _ = ShiftEngine.calculate_professional_hours(start_time, end_time)
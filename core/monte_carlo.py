@@ -0,0 +1,294 @@
+# file: core/monte_carlo.py (Versione 1.0 - Previsione Probabilistica di Completamento)
+"""
+Simulazione Monte Carlo delle date di fine per attività e commessa.
+
+Per ogni prova la durata residua di un'attività (dal motore CPM: date del cronoprogramma,
+avanzamento e data di stato) viene moltiplicata per un fattore aleatorio costruito dalle
+fasi residue del suo workflow:
+  - ogni fase ha il suo fattore: dallo storico del ruolo (rapporto ore effettive / ore
+    standard sulle attività concluse, da registrazioni_ore) se ci sono abbastanza casi,
+    altrimenti da una triangolare [minimo, 1, massimo] ('uncertainty' della WorkPhase);
+  - un blocco di fasi parallele dura quanto la più lenta; i blocchi pesano per le ore residue;
+  - attività senza workflow: triangolare di default su tutta la durata.
+Le durate campionate si propagano sul grafo dei predecessori (FS/SS/FF/SF con ritardo)
+con la stessa logica del passo in avanti CPM, su tutte le prove insieme (vettori NumPy).
+
+Le prove si dividono in blocchi indipendenti (semi derivati da un unico SeedSequence):
+in serie o su un pool di processi il risultato è identico.
+"""
+from __future__ import annotations
+
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.critical_path import CriticalPathEngine, _to_date
+from core.workflow_engine import NavalWorkflowEngine, WorkRole
+from core.workflow_registry import DEFAULT_PHASE_UNCERTAINTY
+
+DEFAULT_TRIALS = 10_000
+DEFAULT_CHUNK_TRIALS = 2_500
+PERCENTILES = (50, 80, 95)
+MIN_HISTORY_SAMPLES = 5             # casi minimi per usare lo storico di un ruolo
+PRODUCTIVITY_RANGE = (0.25, 4.0)    # rapporti ore effettive/standard fuori range = dati sporchi, scartati
+SENZA_COMMESSA = "Senza commessa"
+
+_DONE, _IN_PROGRESS, _NOT_STARTED = 0, 1, 2
+_RELATION_CODES = {'FS': 0, 'SS': 1, 'FF': 2, 'SF': 3}
+
+
+def role_productivity_history(engine: NavalWorkflowEngine, activities: List[Dict],
+                              hours_by_role: pd.DataFrame) -> Dict[WorkRole, np.ndarray]:
+    """
+    Rapporti ore effettive / ore standard per ruolo sulle attività concluse (stato_avanzamento >= 100).
+    - hours_by_role: (id_attivita, ruolo, ore_lavoro) da registrazioni_ore.
+    Restituisce solo i ruoli con almeno MIN_HISTORY_SAMPLES casi validi.
+    """
+    done = {str(a.get('id_attivita')) for a in activities if float(a.get('stato_avanzamento') or 0) >= 100}
+    if hours_by_role is None or hours_by_role.empty or not done:
+        return {}
+    df = hours_by_role[hours_by_role['id_attivita'].isin(done)]
+    samples: Dict[WorkRole, List[float]] = {}
+    standard_cache: Dict[str, Dict[WorkRole, float]] = {}
+    for act_id, ruolo, ore in zip(df['id_attivita'], df['ruolo'], df['ore_lavoro']):
+        role = WorkRole.from_string(ruolo)
+        wf = engine.get_workflow_for_activity(act_id)
+        if role is None or wf is None:
+            continue
+        if wf.activity_type not in standard_cache:
+            std: Dict[WorkRole, float] = {}
+            for p in wf.phases:
+                std[p.role] = std.get(p.role, 0.0) + p.hours_required
+            standard_cache[wf.activity_type] = std
+        standard = standard_cache[wf.activity_type].get(role)
+        if standard:
+            ratio = float(ore) / standard
+            if PRODUCTIVITY_RANGE[0] <= ratio <= PRODUCTIVITY_RANGE[1]:
+                samples.setdefault(role, []).append(ratio)
+    return {r: np.array(v) for r, v in samples.items() if len(v) >= MIN_HISTORY_SAMPLES}
+
+
+@dataclass
+class _SimulationModel:
+    """Tutto ciò che serve a una prova, in array semplici (serializzabile verso i processi del pool)."""
+    order: np.ndarray               # ordine topologico
+    kind: np.ndarray                # _DONE / _IN_PROGRESS / _NOT_STARTED
+    start: np.ndarray               # inizio pianificato (giorni dall'origine)
+    anchor: np.ndarray              # da dove riparte il residuo delle attività in corso
+    base: np.ndarray                # durata (o residuo) deterministica in giorni
+    status: Optional[int]
+    indptr: np.ndarray              # predecessori in formato CSR
+    pred: np.ndarray
+    rel: np.ndarray
+    lag: np.ndarray
+    template_idx: np.ndarray        # (N,) -1 = nessun workflow residuo
+    weights: np.ndarray             # (N, G) peso dei blocchi residui (somma 1)
+    template_blocks: tuple          # per template, per blocco: id dei campionatori delle fasi
+    samplers: tuple                 # ('tri', minimo, massimo) | ('emp', rapporti storici)
+    default_sampler: int
+    group_perm: np.ndarray          # attività ordinate per commessa
+    group_starts: np.ndarray        # inizio di ogni commessa in group_perm
+
+
+def _sample(spec: tuple, rng: np.random.Generator, shape: tuple) -> np.ndarray:
+    if spec[0] == 'emp':
+        return rng.choice(spec[1], size=shape)
+    low, high = spec[1], spec[2]
+    if high - low < 1e-12:
+        return np.full(shape, low)
+    return rng.triangular(low, min(max(1.0, low), high), high, size=shape)
+
+
+def _sample_factors(model: _SimulationModel, rng: np.random.Generator, n_trials: int) -> np.ndarray:
+    """Fattore sulla durata per attività e prova: (N, prove)."""
+    n = len(model.kind)
+    factors = np.ones((n, n_trials))
+    rows_default = np.flatnonzero((model.template_idx < 0) & (model.kind != _DONE))
+    if rows_default.size:
+        factors[rows_default] = _sample(model.samplers[model.default_sampler], rng, (rows_default.size, n_trials))
+    for t, blocks in enumerate(model.template_blocks):
+        rows = np.flatnonzero((model.template_idx == t) & (model.kind != _DONE))
+        if not rows.size:
+            continue
+        total = np.zeros((rows.size, n_trials))
+        for g, sampler_ids in enumerate(blocks):
+            w = model.weights[rows, g]
+            live = np.flatnonzero(w > 0)
+            if not live.size:
+                continue
+            # Blocco parallelo: finisce con la fase più lenta
+            block = _sample(model.samplers[sampler_ids[0]], rng, (live.size, n_trials))
+            for sid in sampler_ids[1:]:
+                np.maximum(block, _sample(model.samplers[sid], rng, (live.size, n_trials)), out=block)
+            total[live] += w[live, None] * block
+        factors[rows] = total
+    return factors
+
+
+def _simulate_chunk(model: _SimulationModel, seed: np.random.SeedSequence, n_trials: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Un blocco di prove: giorno di fine (inclusivo) per attività e per commessa."""
+    rng = np.random.default_rng(seed)
+    factors = _sample_factors(model, rng, n_trials)
+    n = len(model.kind)
+    es = np.zeros((n, n_trials)); ef = np.zeros((n, n_trials))
+    for j in model.order:
+        if model.kind[j] == _DONE:
+            es[j] = model.start[j]; ef[j] = model.start[j] + model.base[j]
+            continue
+        d = model.base[j] * factors[j]
+        bound_s = np.full(n_trials, float(model.start[j]))
+        bound_f = None
+        for e in range(model.indptr[j], model.indptr[j + 1]):
+            i, rel, lag = model.pred[e], model.rel[e], model.lag[e]
+            ref = ef[i] if rel in (0, 2) else es[i]      # FS/FF dalla fine, SS/SF dall'inizio
+            if rel in (0, 1):
+                np.maximum(bound_s, ref + lag, out=bound_s)
+            else:
+                bound_f = ref + lag if bound_f is None else np.maximum(bound_f, ref + lag)
+        if model.kind[j] == _IN_PROGRESS:  # l'inizio è un fatto, si sposta solo la fine
+            es[j] = model.start[j]
+            ef[j] = model.anchor[j] + d if bound_f is None else np.maximum(model.anchor[j] + d, bound_f)
+        else:
+            if model.status is not None:
+                np.maximum(bound_s, model.status, out=bound_s)
+            es[j] = bound_s if bound_f is None else np.maximum(bound_s, bound_f - d)
+            ef[j] = es[j] + d
+    # Fine esclusiva -> ultimo giorno di lavoro (come CriticalPathEngine.results)
+    last = np.ceil(ef - 1e-9)
+    finish = np.where(ef > es, last - 1, last).astype(np.int32)
+    by_group = np.maximum.reduceat(finish[model.group_perm], model.group_starts, axis=0) if len(model.group_starts) else np.zeros((0, n_trials), np.int32)
+    return finish, by_group
+
+
+@dataclass
+class ForecastResult:
+    n_trials: int
+    status_date: datetime.date
+    activities: pd.DataFrame    # id_attivita, commessa, fine_pianificata, fine_cpm, p50, p80, p95, prob_entro_fine
+    commesse: pd.DataFrame      # commessa, n_attivita, fine_pianificata, fine_cpm, p50, p80, p95, prob_entro_fine
+    productivity_roles: List[str]  # ruoli per cui si è usato lo storico
+
+
+class MonteCarloForecaster:
+    def __init__(self, engine: NavalWorkflowEngine, activities: Iterable[Dict],
+                 worked_hours: Optional[Dict[str, float]] = None,
+                 productivity: Optional[Dict[WorkRole, np.ndarray]] = None,
+                 status_date: Optional[datetime.date] = None,
+                 default_uncertainty: Tuple[float, float] = DEFAULT_PHASE_UNCERTAINTY,
+                 cpm: Optional[CriticalPathEngine] = None):
+        """cpm: motore già allineato ad `activities` e alla data di stato (es. la copia di uno scenario), riusato senza ricostruirlo."""
+        self.engine = engine
+        self.status_date = status_date or (cpm.status_date if cpm is not None else None) or datetime.date.today()
+        self.cpm = cpm if cpm is not None else CriticalPathEngine(activities, status_date=self.status_date)
+        self.productivity = productivity or {}
+        self.model = self._build_model(worked_hours or {}, default_uncertainty)
+
+    def _build_model(self, worked_hours: Dict[str, float], default_uncertainty) -> _SimulationModel:
+        cpm = self.cpm
+        n = len(cpm.ids)
+        status = (self.status_date - cpm.origin).days
+        progress = np.array(cpm.progress, dtype=np.float64)
+        dur = np.array(cpm.dur, dtype=np.float64)
+        start = np.array(cpm.planned_start, dtype=np.float64)
+        kind = np.where(progress >= 100, _DONE, np.where(progress > 0, _IN_PROGRESS, _NOT_STARTED)).astype(np.int8)
+        # Stessi residui del passo in avanti CPM: così con fattore 1 si ritrovano le date deterministiche
+        base = np.where(kind == _IN_PROGRESS, np.ceil(dur * (1 - progress / 100)), dur)
+        anchor = np.maximum(start, status)
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        pred, rel, lag = [], [], []
+        for j in range(n):
+            for (i, tipo, lg) in cpm.pred[j]:
+                pred.append(i); rel.append(_RELATION_CODES[tipo]); lag.append(lg)
+            indptr[j + 1] = len(pred)
+
+        compiled = self.engine.compile_templates()
+        template_idx = self.engine.template_indices(cpm.ids)
+        blocks = compiled.remaining_blocks(template_idx, self.engine.worked_hours_array(cpm.ids, worked_hours))
+        left = blocks.sum(axis=1)
+        weights = np.divide(blocks, left[:, None], out=np.zeros_like(blocks), where=left[:, None] > 0)
+        template_idx = np.where(left > 0, template_idx, -1)  # workflow già consumato: incertezza di default
+
+        samplers: List[tuple] = []
+        ids_of: Dict[tuple, int] = {}
+
+        def sampler_id(key: tuple, spec: tuple) -> int:
+            if key not in ids_of:
+                ids_of[key] = len(samplers)
+                samplers.append(spec)
+            return ids_of[key]
+
+        def phase_sampler(phase) -> int:
+            if phase.role in self.productivity:
+                return sampler_id(('emp', phase.role.name), ('emp', self.productivity[phase.role]))
+            return sampler_id(('tri',) + tuple(phase.uncertainty), ('tri',) + tuple(phase.uncertainty))
+
+        template_blocks = tuple(
+            tuple(tuple(phase_sampler(p) for p in group) for group in groups)
+            for groups in compiled.block_phases
+        )
+        default_sampler = sampler_id(('tri',) + tuple(default_uncertainty), ('tri',) + tuple(default_uncertainty))
+
+        commesse = pd.Series([cpm.records[a].get('commessa') or SENZA_COMMESSA for a in cpm.ids], dtype=object)
+        codes, self.commesse = pd.factorize(commesse.astype(str), sort=True)
+        group_perm = np.argsort(codes, kind='stable')
+        group_starts = np.flatnonzero(np.r_[True, np.diff(codes[group_perm]) != 0]) if n else np.zeros(0, np.int64)
+
+        return _SimulationModel(
+            order=np.array(cpm.order, dtype=np.int64), kind=kind, start=start, anchor=anchor, base=base, status=status,
+            indptr=indptr, pred=np.array(pred, dtype=np.int64), rel=np.array(rel, dtype=np.int8),
+            lag=np.array(lag, dtype=np.float64), template_idx=template_idx, weights=weights,
+            template_blocks=template_blocks, samplers=tuple(samplers), default_sampler=default_sampler,
+            group_perm=group_perm, group_starts=group_starts)
+
+    def run(self, n_trials: int = DEFAULT_TRIALS, seed: Optional[int] = None, processes: Optional[int] = None,
+            chunk_size: int = DEFAULT_CHUNK_TRIALS) -> ForecastResult:
+        """
+        - processes: None/1 = in questo processo; >1 = blocchi di prove su un pool di processi.
+        - seed: a parità di seme (e di chunk_size) il risultato non dipende da processes.
+        """
+        sizes = [min(chunk_size, n_trials - k) for k in range(0, n_trials, chunk_size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        if processes and processes > 1 and len(sizes) > 1:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                chunks = list(pool.map(_simulate_chunk, [self.model] * len(sizes), seeds, sizes))
+        else:
+            chunks = [_simulate_chunk(self.model, s, k) for s, k in zip(seeds, sizes)]
+        finish = np.concatenate([c[0] for c in chunks], axis=1)
+        by_group = np.concatenate([c[1] for c in chunks], axis=1)
+        return self._summarize(finish, by_group, n_trials)
+
+    def _summarize(self, finish: np.ndarray, by_group: np.ndarray, n_trials: int) -> ForecastResult:
+        cpm = self.cpm
+        day = lambda offsets: [cpm.origin + datetime.timedelta(days=int(o)) for o in offsets]
+        planned = np.array([(_to_date(cpm.records[a]['data_fine']) - cpm.origin).days for a in cpm.ids], dtype=np.int64)
+        det = cpm.results()
+        det_finish = np.array([(d - cpm.origin).days for d in det['fine_presto']], dtype=np.int64) if len(det) else np.zeros(0, np.int64)
+        q = np.percentile(finish, PERCENTILES, axis=1, method='inverted_cdf') if finish.size else np.zeros((len(PERCENTILES), 0))
+
+        activities = pd.DataFrame({
+            'id_attivita': cpm.ids,
+            'commessa': [str(cpm.records[a].get('commessa') or SENZA_COMMESSA) for a in cpm.ids],
+            'fine_pianificata': day(planned),
+            'fine_cpm': day(det_finish),
+            **{f"p{p}": day(q[k]) for k, p in enumerate(PERCENTILES)},
+            'prob_entro_fine': (finish <= planned[:, None]).mean(axis=1).round(3) if finish.size else [],
+        })
+
+        perm, starts = self.model.group_perm, self.model.group_starts
+        g_planned = np.maximum.reduceat(planned[perm], starts) if len(starts) else planned[:0]
+        g_det = np.maximum.reduceat(det_finish[perm], starts) if len(starts) else det_finish[:0]
+        gq = np.percentile(by_group, PERCENTILES, axis=1, method='inverted_cdf') if by_group.size else np.zeros((len(PERCENTILES), 0))
+        commesse = pd.DataFrame({
+            'commessa': list(self.commesse),
+            'n_attivita': np.diff(np.r_[starts, len(perm)]) if len(starts) else [],
+            'fine_pianificata': day(g_planned),
+            'fine_cpm': day(g_det),
+            **{f"p{p}": day(gq[k]) for k, p in enumerate(PERCENTILES)},
+            'prob_entro_fine': (by_group <= g_planned[:, None]).mean(axis=1).round(3) if by_group.size else [],
+        })
+        return ForecastResult(n_trials, self.status_date, activities, commesse, sorted(r.value for r in self.productivity))
@@ -0,0 +1,118 @@
+# file: core/progress_engine.py (Versione 1.2 - Ricalcolo alla Lettura)
+"""
+Avanzamento delle attività derivato dalle ore effettivamente registrate.
+
+- avanzamento_derivato = min(100, ore_lavoro cumulate sull'attività fino a oggi / monte ore del template x 100).
+  Lo stato_avanzamento importato dal cronoprogramma non viene toccato: il derivato è una colonna a parte.
+- affidabilita_avanzamento:
+    'N/D'   nessun template per l'attività (avanzamento_derivato resta NULL);
+    'BASSA' ore registrate oltre il monte ore standard (il template sottostima il lavoro);
+    'MEDIA' scarto oltre SOGLIA_SCOSTAMENTO punti dallo stato_avanzamento importato;
+    'ALTA'  altrimenti.
+
+Il calcolo è incrementale: i trigger su registrazioni_ore accodano le attività toccate
+(attivita_da_ricalcolare) e sync() ricalcola solo quelle, più le attività mai calcolate e,
+al cambio di giorno, quelle con turni pianificati diventati consuntivo. Un cambio dei template
+(monte ore) ricalcola tutto. Le voci di coda si tolgono solo dopo la scrittura dei risultati.
+Le scritture dei turni non ricalcolano nulla (la coda le registra): sync() si chiama dove
+l'avanzamento derivato si legge (pagina 04) e dopo l'import del cronoprogramma.
+"""
+from __future__ import annotations
+
+import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from core.crm_db import CrmDBManager
+from core.schedule_db import ScheduleDBManager, schedule_db_manager
+from core.shift_service import shift_service
+from core.workflow_engine import NavalWorkflowEngine, workflow_engine
+
+STORICO_INIZIO = datetime.date(2000, 1, 1)  # inizio dello storico delle ore registrate
+SOGLIA_SCOSTAMENTO = 25.0                   # punti percentuali oltre i quali il derivato è 'MEDIA'
+ATTIVITA_PER_QUERY = 500                    # ID per filtro IN (...) nelle query sulle ore
+META_GIORNO = 'avanzamento_ultimo_giorno'
+META_TEMPLATE = 'avanzamento_firma_template'
+
+
+class ProgressEngine:
+    def __init__(self, crm_db: CrmDBManager, schedule_db: ScheduleDBManager, engine: NavalWorkflowEngine):
+        self.crm_db = crm_db
+        self.schedule_db = schedule_db
+        self.engine = engine
+
+    def _template_signature(self) -> str:
+        compiled = self.engine.compile_templates()
+        return repr(list(zip(compiled.prefixes, np.round(compiled.totals, 6).tolist())))
+
+    def _hours(self, ids: List[str], oggi: datetime.date) -> Dict[str, float]:
+        """Ore di lavoro cumulate fino a oggi per attività (GROUP BY in SQL, a blocchi di ID)."""
+        hours: Dict[str, float] = {}
+        for k in range(0, len(ids), ATTIVITA_PER_QUERY):
+            df = self.crm_db.get_report_data_df(STORICO_INIZIO, oggi, attivita=ids[k:k + ATTIVITA_PER_QUERY],
+                                                group_by=['id_attivita'], measures=['ore_lavoro'], solo_attivi=False)
+            hours.update(zip(df['id_attivita'], df['ore_lavoro'].astype(float)))
+        return hours
+
+    def compute(self, ids: List[str], stato: Dict[str, Any], oggi: datetime.date) -> List[tuple]:
+        """Righe per ScheduleDBManager.update_avanzamento_derivato; stato: id -> stato_avanzamento importato."""
+        if not ids: return []
+        hours = self._hours(ids, oggi)
+        totals = self.engine.compile_templates().totals
+        template = self.engine.template_indices(ids)
+        ore = np.array([hours.get(i, 0.0) for i in ids])
+        monte_ore = np.where(template >= 0, totals[np.maximum(template, 0)], 0.0)
+        derived = np.minimum(100.0, ore / np.where(monte_ore > 0, monte_ore, 1.0) * 100.0)
+        stamp = datetime.datetime.now().isoformat(timespec='seconds')
+
+        rows = []
+        for i, act_id in enumerate(ids):
+            if monte_ore[i] <= 0:
+                rows.append((round(ore[i], 2), None, 'N/D', stamp, act_id))
+                continue
+            manual = stato.get(act_id)
+            if ore[i] > monte_ore[i] + 1e-6:
+                flag = 'BASSA'
+            elif manual is not None and abs(derived[i] - float(manual)) > SOGLIA_SCOSTAMENTO:
+                flag = 'MEDIA'
+            else:
+                flag = 'ALTA'
+            rows.append((round(ore[i], 2), round(float(derived[i]), 1), flag, stamp, act_id))
+        return rows
+
+    def sync(self, oggi: Optional[datetime.date] = None, full: bool = False) -> Dict[str, int]:
+        """Ricalcola le attività toccate dall'ultima chiamata; full=True ricalcola tutto il cronoprogramma."""
+        oggi = oggi or datetime.date.today()
+        current = self.schedule_db.get_avanzamento()
+        queue = self.crm_db.get_attivita_da_ricalcolare()
+        signature = self._template_signature()
+        last_day = self.schedule_db.get_meta(META_GIORNO)
+
+        full = full or last_day is None or self.schedule_db.get_meta(META_TEMPLATE) != signature
+        if full:
+            dirty = set(current)
+        else:
+            dirty = {a for a, _ in queue} | {a for a, r in current.items() if r['affidabilita_avanzamento'] is None}
+            last_day = datetime.date.fromisoformat(last_day)
+            if last_day < oggi:
+                new_days = self.crm_db.get_report_data_df(last_day + datetime.timedelta(days=1), oggi, group_by=['id_attivita'],
+                                                          measures=['ore_lavoro'], solo_attivi=False)
+                dirty.update(new_days['id_attivita'].dropna())
+            dirty &= current.keys()
+
+        ids = sorted(dirty)
+        rows = self.compute(ids, {a: current[a]['stato_avanzamento'] for a in ids}, oggi)
+        self.schedule_db.update_avanzamento_derivato(rows)
+        self.crm_db.ack_attivita_da_ricalcolare(queue)
+        self.schedule_db.set_meta(META_GIORNO, oggi.isoformat())
+        self.schedule_db.set_meta(META_TEMPLATE, signature)
+        return {'ricalcolate': len(rows), 'in_coda': len(queue), 'completo': int(full)}
+
+    def refresh_all(self, oggi: Optional[datetime.date] = None) -> Dict[str, int]:
+        """Ricalcolo completo (l'import differenziale azzera già l'affidabilità delle attività cambiate)."""
+        return self.sync(oggi, full=True)
+
+
+# Istanza globale: chi legge l'avanzamento derivato chiama sync() prima della lettura
+progress_engine = ProgressEngine(shift_service.db_manager, schedule_db_manager, workflow_engine)
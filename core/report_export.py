@@ -0,0 +1,196 @@
+# file: core/report_export.py (Versione 1.1 - Dettaglio su Più Fogli)
+"""
+Export Excel dei report a memoria costante.
+
+Le righe arrivano a blocchi dal cursore SQLite (CrmDBManager.iter_report_rows) e
+vengono scritte subito su file: con xlsxwriter in modalità constant_memory ogni riga
+finisce sul disco appena completata, con openpyxl (write_only) come ripiego.
+Il workbook non esiste mai per intero in RAM: a un anno di dati serve solo il file.
+
+Fogli prodotti:
+  - Dettaglio:          una riga per registrazione (Data, Squadra, Nome, Ruolo, Attività, Presenza, Lavoro);
+                        oltre il limite di righe di Excel prosegue su "Dettaglio (2)", "Dettaglio (3)", ...
+  - Statino Interno:    ore di presenza per dipendente x giorno, con totali
+  - Report Cantiere:    ore di lavoro per dipendente x giorno, con totali
+"""
+from __future__ import annotations
+
+import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+from core.crm_db import CrmDBManager, REPORT_CHUNK_SIZE
+
+DETAIL_COLUMNS = ['giorno', 'squadra', 'dipendente_nome', 'ruolo', 'id_attivita', 'ore_presenza', 'ore_lavoro']
+DETAIL_HEADERS = ['Data', 'Squadra', 'Nome', 'Ruolo', 'Attività', 'Presenza', 'Lavoro']
+PIVOT_DIMENSIONS = ['squadra', 'dipendente_nome', 'giorno']
+TOTAL_LABEL = 'Totale'
+DETAIL_SHEET = 'Dettaglio'
+MAX_SHEET_ROWS = 1_048_576      # righe di un foglio Excel, intestazione compresa
+MAX_SHEET_COLUMNS = 16_384
+
+
+def _check_room(name: str, row_index: int) -> None:
+    """Oltre l'ultima riga xlsxwriter scarta la cella (write_row restituisce -1) e openpyxl scrive un file illeggibile."""
+    if row_index >= MAX_SHEET_ROWS:
+        raise ValueError(f"Il foglio '{name}' supera il limite di {MAX_SHEET_ROWS:,} righe di Excel: ridurre il periodo o i filtri")
+
+
+class _XlsxWriterBook:
+    """Backend xlsxwriter: righe scritte in sequenza e scaricate su disco (constant_memory)."""
+
+    def __init__(self, path: Path):
+        self.wb = xlsxwriter.Workbook(str(path), {'constant_memory': True, 'default_date_format': 'dd/mm/yyyy'})
+        self.header_fmt = self.wb.add_format({'bold': True, 'bg_color': '#DDDDDD', 'border': 1})
+        self.bold_fmt = self.wb.add_format({'bold': True, 'num_format': '0.00'})
+        self.date_header_fmt = self.wb.add_format({'bold': True, 'bg_color': '#DDDDDD', 'border': 1, 'num_format': 'dd/mm'})
+        self.sheets: Dict[str, list] = {}
+
+    def add_sheet(self, name: str, header: Sequence) -> None:
+        ws = self.wb.add_worksheet(name)
+        ws.freeze_panes(1, 0)
+        for col, value in enumerate(header):
+            fmt = self.date_header_fmt if isinstance(value, datetime.date) else self.header_fmt
+            ws.write(0, col, value, fmt)
+        self.sheets[name] = [ws, 1]
+
+    def append(self, name: str, row: Sequence, bold: bool = False) -> None:
+        ws, r = self.sheets[name]
+        _check_room(name, r)
+        if bold:
+            for col, value in enumerate(row):
+                ws.write(r, col, value, self.bold_fmt)
+        else:
+            ws.write_row(r, 0, row)
+        self.sheets[name][1] = r + 1
+
+    def close(self) -> None:
+        self.wb.close()
+
+
+class _OpenpyxlBook:
+    """Backend di ripiego: openpyxl in modalità write_only (righe in streaming, niente celle in memoria)."""
+
+    def __init__(self, path: Path):
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        self.path = path
+        self.wb = Workbook(write_only=True)
+        self._cell, self._bold = WriteOnlyCell, Font(bold=True)
+        self.sheets: Dict[str, list] = {}
+
+    def add_sheet(self, name: str, header: Sequence) -> None:
+        ws = self.wb.create_sheet(name)
+        ws.freeze_panes = 'A2'
+        self.sheets[name] = [ws, 0]
+        self.append(name, header, bold=True)
+
+    def append(self, name: str, row: Sequence, bold: bool = False) -> None:
+        ws, r = self.sheets[name]
+        _check_room(name, r)
+        self.sheets[name][1] = r + 1
+        if bold:
+            cells = []
+            for value in row:
+                cell = self._cell(ws, value=value)
+                cell.font = self._bold
+                cells.append(cell)
+            row = cells
+        ws.append(row)
+
+    def close(self) -> None:
+        self.wb.save(str(self.path))
+
+
+def _open_book(path: Path, engine: Optional[str] = None):
+    engine = engine or ('xlsxwriter' if xlsxwriter is not None else 'openpyxl')
+    if engine == 'xlsxwriter':
+        if xlsxwriter is None:
+            raise ImportError("xlsxwriter non installato")
+        return _XlsxWriterBook(path)
+    return _OpenpyxlBook(path)
+
+
+def _to_date(value: Optional[str]) -> Optional[datetime.date]:
+    return datetime.date.fromisoformat(value[:10]) if value else None
+
+
+def export_report_xlsx(db_manager: CrmDBManager, path: str | Path,
+                       start_date: datetime.date, end_date: datetime.date,
+                       activity_label: Optional[Callable[[Optional[str]], str]] = None,
+                       engine: Optional[str] = None,
+                       chunk_size: int = REPORT_CHUNK_SIZE,
+                       **filters) -> Dict[str, int]:
+    """
+    Scrive il report Excel su `path` leggendo il DB a blocchi.
+    - activity_label: traduce id_attivita in descrizione (default: id grezzo).
+    - engine: 'xlsxwriter' (default se installato) oppure 'openpyxl'.
+    - filters: dipendenti, squadre, attivita (come get_report_data_df).
+    Restituisce un riepilogo {'righe': ..., 'dipendenti': ..., 'giorni': ..., 'fogli_dettaglio': ...}.
+    ValueError se le pivot non entrano in un foglio (troppi giorni o dipendenti): il messaggio è per l'utente.
+    """
+    path = Path(path)
+    label = activity_label or (lambda a: a)
+    filters = {k: v for k, v in filters.items() if k in ('dipendenti', 'squadre', 'attivita')}
+
+    # Colonne delle pivot: i soli giorni con registrazioni (come pivot_table), lista piccola
+    giorni: List[datetime.date] = [
+        _to_date(r[0]) for chunk in db_manager.iter_report_rows(start_date, end_date, group_by=['giorno'], measures=['n_registrazioni'], **filters)
+        for r in chunk
+    ]
+    day_index = {g: i for i, g in enumerate(giorni)}
+    if len(giorni) + 3 > MAX_SHEET_COLUMNS:
+        raise ValueError(f"{len(giorni):,} giorni non entrano nelle colonne di un foglio Excel: ridurre il periodo")
+
+    book = _open_book(path, engine)
+    summary = {'righe': 0, 'dipendenti': 0, 'giorni': len(giorni), 'fogli_dettaglio': 1}
+    try:
+        # 1. DETTAGLIO: a foglio pieno si prosegue su "Dettaglio (2)", con la stessa intestazione
+        sheet, room = DETAIL_SHEET, MAX_SHEET_ROWS - 1
+        book.add_sheet(sheet, DETAIL_HEADERS)
+        for chunk in db_manager.iter_report_rows(start_date, end_date, chunk_size=chunk_size, columns=DETAIL_COLUMNS, **filters):
+            for giorno, squadra, nome, ruolo, id_att, presenza, lavoro in chunk:
+                if not room:
+                    summary['fogli_dettaglio'] += 1
+                    sheet, room = f"{DETAIL_SHEET} ({summary['fogli_dettaglio']})", MAX_SHEET_ROWS - 1
+                    book.add_sheet(sheet, DETAIL_HEADERS)
+                book.append(sheet, (_to_date(giorno), squadra, nome, ruolo, label(id_att), presenza, lavoro))
+                room -= 1
+            summary['righe'] += len(chunk)
+
+        # 2-3. STATINO INTERNO / REPORT CANTIERE: una sola passata sul GROUP BY ordinato
+        # (squadra, dipendente, giorno); si tiene in memoria solo la riga del dipendente corrente.
+        sheets = (('Statino Interno', 0), ('Report Cantiere', 1))
+        for name, _ in sheets:
+            book.add_sheet(name, ['Squadra', 'Nome'] + giorni + [TOTAL_LABEL])
+        col_totals = [[0.0] * len(giorni) for _ in sheets]
+        current, values = None, None
+
+        def flush():
+            for (name, m), vals in zip(sheets, values):
+                book.append(name, [current[0], current[1]] + vals + [round(sum(vals), 2)])
+            summary['dipendenti'] += 1
+
+        for chunk in db_manager.iter_report_rows(start_date, end_date, chunk_size=chunk_size, group_by=PIVOT_DIMENSIONS,
+                                                 measures=['ore_presenza', 'ore_lavoro'], **filters):
+            for squadra, nome, giorno, presenza, lavoro in chunk:
+                if (squadra, nome) != current:
+                    if current is not None: flush()
+                    current, values = (squadra, nome), [[0.0] * len(giorni) for _ in sheets]
+                i = day_index[_to_date(giorno)]
+                for m, ore in enumerate((presenza or 0.0, lavoro or 0.0)):
+                    values[m][i] = ore
+                    col_totals[m][i] += ore
+        if current is not None: flush()
+        for (name, m), tot in zip(sheets, col_totals):
+            tot = [round(t, 2) for t in tot]
+            book.append(name, [TOTAL_LABEL, ''] + tot + [round(sum(tot), 2)], bold=True)
+    finally:
+        book.close()
+    return summary
@@ -0,0 +1,307 @@
+# file: core/resource_scheduler.py (Versione 1.1 - Pianificazione per Operaio)
+"""
+Schedulatore a risorse limitate (RCPSP) per il cronoprogramma.
+
+Schema generativo seriale (Serial SGS) con regole di priorità:
+  1. le attività diventano "eleggibili" quando tutti i predecessori sono pianificati;
+  2. tra le eleggibili si prende quella con priorità più alta (regola configurabile);
+  3. le sue fasi residue (dal WorkflowTemplate) vengono piazzate al primo giorno utile,
+     consumando le ore realmente disponibili degli operai del ruolo richiesto.
+
+La capacità è una matrice NumPy operai x giorni (ore disponibili, da turni_master);
+per ogni ruolo si tiene anche la capacità giornaliera aggregata, così i giorni saturi
+si saltano con una sola ricerca vettoriale invece di un ciclo giorno per giorno.
+"""
+from __future__ import annotations
+
+import datetime
+import heapq
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.workflow_engine import NavalWorkflowEngine, WorkRole
+from core.critical_path import parse_predecessors
+
+EPS = 1e-6
+DEFAULT_HORIZON_DAYS = 730
+DEFAULT_DAILY_HOURS = 8.0
+DEFAULT_MAX_CREW = 4  # operai per ruolo contemporaneamente sulla stessa attività
+
+def parse_predecessor_ids(value: Any) -> List[str]:
+    """ID dei predecessori dal campo 'predecessori' (tipo e ritardo ignorati: precedenze fine-inizio)."""
+    return [dep.predecessor for dep in parse_predecessors(value)]
+
+
+# --- PRIORITÀ (valore più basso = pianificata prima) ---
+def _rule_edd(act: "_Activity") -> tuple:          # Earliest Due Date: scadenza del cronoprogramma
+    return (act.due, act.release, -act.work)
+
+def _rule_mts(act: "_Activity") -> tuple:          # Most Total Successors: sblocca più lavoro a valle
+    return (-act.n_successors, act.due, act.release)
+
+def _rule_mwr(act: "_Activity") -> tuple:          # Most Work Remaining
+    return (-act.work, act.due)
+
+def _rule_fifo(act: "_Activity") -> tuple:         # Ordine di inizio pianificato
+    return (act.release, act.due)
+
+PRIORITY_RULES = {'EDD': _rule_edd, 'MTS': _rule_mts, 'MWR': _rule_mwr, 'FIFO': _rule_fifo}
+
+
+@dataclass
+class _Activity:
+    id: str
+    index: int
+    groups: List[Dict[WorkRole, float]]
+    requires: Dict[WorkRole, List[WorkRole]]
+    release: int
+    due: int
+    work: float
+    raw_predecessors: List[str] = field(default_factory=list)
+    predecessors: List[int] = field(default_factory=list)
+    successors: List[int] = field(default_factory=list)
+    n_successors: int = 0
+
+
+@dataclass
+class ScheduleResult:
+    start_date: datetime.date
+    activities: pd.DataFrame       # id_attivita, inizio, fine, scadenza, ritardo_giorni, ore_residue, completata
+    assignments: pd.DataFrame      # data, id_attivita, ruolo, id_dipendente, nome, ore
+    unscheduled_hours: Dict[str, float]
+
+
+class ResourceConstrainedScheduler:
+    def __init__(self, engine: NavalWorkflowEngine, priority_rule: str = 'EDD',
+                 max_crew: int = DEFAULT_MAX_CREW, respect_planned_start: bool = True):
+        if priority_rule not in PRIORITY_RULES:
+            raise ValueError(f"Regola di priorità sconosciuta: {priority_rule} (disponibili: {list(PRIORITY_RULES)})")
+        self.engine = engine
+        self.priority = PRIORITY_RULES[priority_rule]
+        self.max_crew = max_crew
+        self.respect_planned_start = respect_planned_start
+
+    # --- COSTRUZIONE DEL PROBLEMA ---
+    def _build_activities(self, activities: Iterable[Dict], worked_hours: Dict[str, float],
+                          start_date: datetime.date, horizon: int) -> List[_Activity]:
+        acts: List[_Activity] = []
+        for rec in activities:
+            act_id = str(rec.get('id_attivita', ''))
+            groups = self.engine.get_remaining_phases(act_id, worked_hours.get(act_id, 0.0))
+            if not groups:
+                continue
+            wf = self.engine.get_workflow_for_activity(act_id)
+            requires = {p.role: p.requires_roles for p in wf.phases if p.requires_roles}
+            release = _day_offset(rec.get('data_inizio'), start_date, default=0) if self.respect_planned_start else 0
+            due = _day_offset(rec.get('data_fine'), start_date, default=horizon)
+            acts.append(_Activity(act_id, len(acts), groups, requires, max(0, release), due,
+                                  sum(sum(g.values()) for g in groups),
+                                  raw_predecessors=parse_predecessor_ids(rec.get('predecessori'))))
+
+        by_id = {a.id: a.index for a in acts}
+        for a in acts:
+            a.predecessors = sorted({by_id[p] for p in a.raw_predecessors if p in by_id and by_id[p] != a.index})
+            for p in a.predecessors:
+                acts[p].successors.append(a.index)
+        for a in acts:  # successori diretti + di secondo livello: stima economica del lavoro sbloccato
+            a.n_successors = len(a.successors) + sum(len(acts[s].successors) for s in a.successors)
+        return acts
+
+    # --- SGS SERIALE ---
+    def schedule(self, activities: Iterable[Dict], workers: List[Dict], availability: np.ndarray,
+                 start_date: datetime.date, worked_hours: Optional[Dict[str, float]] = None) -> ScheduleResult:
+        """
+        activities: record del cronoprogramma (id_attivita, data_inizio, data_fine, predecessori).
+        workers: [{'id_dipendente', 'nome', 'ruolo'}] nello stesso ordine delle righe di availability.
+        availability: matrice operai x giorni con le ore disponibili (da build_availability_matrix).
+        """
+        cap = np.array(availability, dtype=np.float64, copy=True)
+        n_workers, horizon = cap.shape
+        acts = self._build_activities(activities, worked_hours or {}, start_date, horizon)
+
+        roles = np.array([WorkRole.from_string(w.get('ruolo')) for w in workers], dtype=object)
+        role_workers = {r: np.flatnonzero(roles == r) for r in WorkRole}
+        role_cap = {r: cap[idx].sum(axis=0) for r, idx in role_workers.items()}
+
+        # Output accumulato in liste di colonne (niente DataFrame riga per riga)
+        out_day, out_act, out_role, out_worker, out_hours = [], [], [], [], []
+        starts = np.full(len(acts), -1)
+        finishes = np.full(len(acts), -1)
+        leftover = np.zeros(len(acts))
+
+        def place_group(act: _Activity, group: Dict[WorkRole, float], t: int, crew: Dict[WorkRole, List[int]]) -> int:
+            """Piazza un blocco di fasi da t in avanti; restituisce l'ultimo giorno usato (o -1)."""
+            rem = dict(group)
+            last = -1
+            while t < horizon:
+                pending = [r for r, h in rem.items() if h > EPS]
+                if not pending:
+                    break
+                # Salta direttamente al primo giorno in cui almeno un ruolo pendente ha capacità
+                nxt = horizon
+                for r in pending:
+                    free = np.flatnonzero(role_cap[r][t:] > EPS)
+                    if free.size:
+                        nxt = min(nxt, t + free[0])
+                if nxt >= horizon:
+                    break
+                t = nxt
+                for r in pending:
+                    if role_cap[r][t] <= EPS:
+                        continue
+                    if any(role_cap[req][t] <= EPS for req in act.requires.get(r, ())):
+                        continue  # es. il carpentiere non lavora senza l'aiutante
+                    idx = role_workers[r]
+                    cand = idx[cap[idx, t] > EPS]
+                    prev = crew.setdefault(r, [])
+                    if prev:  # continuità: prima gli operai già sull'attività
+                        cand = sorted(cand.tolist(), key=lambda w: w not in prev)
+                    for w in cand[:self.max_crew]:
+                        h = min(cap[w, t], rem[r])
+                        cap[w, t] -= h
+                        role_cap[r][t] -= h
+                        rem[r] -= h
+                        out_day.append(t); out_act.append(act.index); out_role.append(r.value)
+                        out_worker.append(w); out_hours.append(h)
+                        if w not in prev: prev.append(w)
+                        last = t
+                        if rem[r] <= EPS:
+                            break
+                t += 1
+            act_left = sum(h for h in rem.values() if h > EPS)
+            leftover[act.index] += act_left
+            return last if act_left <= EPS else -1
+
+        # Coda di priorità delle attività eleggibili
+        missing = np.array([len(a.predecessors) for a in acts])
+        heap = [(self.priority(a), a.index) for a in acts if missing[a.index] == 0]
+        heapq.heapify(heap)
+        done = np.zeros(len(acts), dtype=bool)
+        scheduled = 0
+        while scheduled < len(acts):
+            if not heap:
+                # Predecessori ciclici: si sblocca l'attività a priorità più alta tra le rimanenti
+                rest = [a for a in acts if not done[a.index]]
+                a = min(rest, key=self.priority)
+                heapq.heappush(heap, (self.priority(a), a.index))
+                missing[a.index] = 0
+            _, i = heapq.heappop(heap)
+            if done[i]:
+                continue
+            act = acts[i]
+            t = act.release
+            for p in act.predecessors:
+                if finishes[p] >= 0:
+                    t = max(t, finishes[p] + 1)
+                elif done[p]:
+                    t = horizon  # predecessore non completato nell'orizzonte
+            crew: Dict[WorkRole, List[int]] = {}
+            first = len(out_day)
+            for gi, group in enumerate(act.groups):
+                last = place_group(act, group, t, crew)
+                if last < 0:  # orizzonte esaurito: le fasi successive restano tutte da fare
+                    leftover[i] += sum(sum(g.values()) for g in act.groups[gi + 1:])
+                    break
+                t = last  # la fase successiva può partire lo stesso giorno (ore residue)
+            else:
+                finishes[i] = t
+            if len(out_day) > first:
+                starts[i] = min(out_day[first:])
+            done[i] = True
+            scheduled += 1
+            for s in act.successors:
+                missing[s] -= 1
+                if missing[s] == 0:
+                    heapq.heappush(heap, (self.priority(acts[s]), s))
+
+        return self._build_result(acts, workers, start_date, starts, finishes, leftover,
+                                  out_day, out_act, out_role, out_worker, out_hours)
+
+    def _build_result(self, acts, workers, start_date, starts, finishes, leftover,
+                      out_day, out_act, out_role, out_worker, out_hours) -> ScheduleResult:
+        base = np.datetime64(start_date, 'D')
+        ids = np.array([a.id for a in acts], dtype=object)
+        worker_ids = np.array([w.get('id_dipendente') for w in workers], dtype=object)
+        worker_names = np.array([w.get('nome') for w in workers], dtype=object)
+        w_idx = np.array(out_worker, dtype=np.int64)
+        assignments = pd.DataFrame({
+            'data': (base + np.array(out_day, dtype='timedelta64[D]')).astype('datetime64[ns]'),
+            'id_attivita': ids[np.array(out_act, dtype=np.int64)] if out_act else np.array([], dtype=object),
+            'ruolo': out_role,
+            'id_dipendente': worker_ids[w_idx] if out_worker else np.array([], dtype=object),
+            'nome': worker_names[w_idx] if out_worker else np.array([], dtype=object),
+            'ore': np.round(np.array(out_hours, dtype=np.float64), 2),
+        })
+
+        def to_date(offsets: np.ndarray) -> pd.Series:
+            dates = pd.Series((base + offsets.astype('timedelta64[D]')).astype('datetime64[ns]'))
+            return dates.where(offsets >= 0)
+
+        due = np.array([a.due for a in acts], dtype=np.int64)
+        completed = finishes >= 0
+        summary = pd.DataFrame({
+            'id_attivita': ids,
+            'inizio': to_date(starts),
+            'fine': to_date(finishes),
+            'scadenza': to_date(due),
+            'ritardo_giorni': np.where(completed, np.maximum(finishes - due, 0), np.nan),
+            'ore_residue': np.round(leftover, 1),
+            'completata': completed,
+        })
+        unscheduled = {a.id: round(float(leftover[a.index]), 1) for a in acts if leftover[a.index] > EPS}
+        return ScheduleResult(start_date, summary, assignments, unscheduled)
+
+
+def _day_offset(value: Any, start_date: datetime.date, default: int) -> int:
+    if value is None or value == '' or (isinstance(value, float) and np.isnan(value)):
+        return default
+    if isinstance(value, str):
+        try:  # formato del DB (YYYY-MM-DD): evita il parser generico di pandas per ogni attività
+            return (datetime.date.fromisoformat(value[:10]) - start_date).days
+        except ValueError:
+            pass
+    ts = pd.to_datetime(value, errors='coerce')
+    if pd.isna(ts):
+        return default
+    return (ts.date() - start_date).days
+
+
+def standard_workdays(start_date: datetime.date, n_days: int,
+                      holidays: Optional[Iterable[datetime.date]] = None) -> np.ndarray:
+    """Calendario standard (n_days,): True nei giorni lun-ven che non sono festivi."""
+    days = np.datetime64(start_date, 'D') + np.arange(n_days)
+    is_workday = ((days.view('int64') + 3) % 7) < 5  # 1970-01-01 era giovedì
+    if holidays:
+        is_workday &= ~np.isin(days, np.array(sorted(holidays), dtype='datetime64[D]'))
+    return is_workday
+
+
+def build_availability_matrix(workers: List[Dict], start_date: datetime.date, horizon_days: int,
+                              planned: Optional[pd.DataFrame] = None,
+                              default_daily_hours: float = DEFAULT_DAILY_HOURS,
+                              holidays: Optional[Iterable[datetime.date]] = None) -> np.ndarray:
+    """
+    Matrice operai x giorni delle ore disponibili.
+    - planned: DataFrame (id_dipendente, giorno, ore) dai turni pianificati (turni_master):
+      fino all'ultimo giorno pianificato DI CIASCUN operaio valgono solo i suoi turni reali
+      (nessun turno = non disponibile).
+    - oltre quel giorno (e per chi non ha turni) si assume il calendario standard (lun-ven,
+      default_daily_hours), esclusi gli eventuali giorni festivi (holidays): un turno isolato
+      molto avanti di un operaio non toglie capacità agli altri.
+    """
+    is_workday = standard_workdays(start_date, horizon_days, holidays)
+    cap = np.tile(np.where(is_workday, default_daily_hours, 0.0), (len(workers), 1))
+    if planned is not None and not planned.empty:
+        row_of = {w.get('id_dipendente'): i for i, w in enumerate(workers)}
+        giorni = (pd.to_datetime(planned['giorno']).values.astype('datetime64[D]') - np.datetime64(start_date, 'D')).astype(np.int64)
+        rows = planned['id_dipendente'].map(row_of)
+        known = rows.notna().values
+        last_planned = np.full(len(workers), -1, dtype=np.int64)
+        np.maximum.at(last_planned, rows.values[known].astype(np.int64), giorni[known])
+        cap[np.arange(horizon_days)[None, :] <= last_planned[:, None]] = 0.0
+        ok = known & (giorni >= 0) & (giorni < horizon_days)
+        np.add.at(cap, (rows.values[ok].astype(np.int64), giorni[ok]), planned['ore'].values[ok].astype(np.float64))
+    return cap
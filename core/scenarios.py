@@ -0,0 +1,246 @@
+# file: core/scenarios.py (Versione 1.0 - Scenari What-If)
+"""
+Scenari what-if sul cronoprogramma e sulla forza lavoro, senza toccare i dati reali.
+
+Uno scenario è un elenco ordinato di differenze (tabella scenario_delta del database cronoprogrammi):
+  - 'sposta'    chiave=id_attivita, valori={'giorni': n}           data_inizio e data_fine + n giorni
+  - 'modifica'  chiave=id_attivita, valori={campo: valore}         date, avanzamento, predecessori, ...
+  - 'aggiungi'  chiave=id_attivita, valori=record del cronoprogramma
+  - 'rimuovi'   chiave=id_attivita
+  - 'operai'    chiave=ruolo, valori={'numero': n, 'dal': data, 'al': data o None}   (n < 0: operai in meno)
+Le differenze si applicano in copy-on-write: le attività non toccate restano gli stessi oggetti del
+cronoprogramma di base, si copiano solo quelle cambiate.
+
+ScenarioPlanner calcola una volta il caso base e per ogni scenario ricalcola solo ciò che cambia:
+  - CPM: copia leggera del motore base (fork) e propagazione incrementale delle attività toccate;
+  - colli di bottiglia: piano di capacità base - domanda delle attività toccate (versione base)
+    + domanda delle stesse nella versione dello scenario + ore degli operai aggiunti o tolti;
+  - previsione Monte Carlo (opzionale): stesso seme per tutti gli scenari, così le differenze
+    non dipendono dal rumore di campionamento. Gli operai non entrano nella simulazione.
+I risultati restano in cache per contenuto dello scenario: modificandone uno si ricalcola solo quello.
+"""
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.capacity_model import CapacityModel, CapacityPlan, DEFAULT_WEEKS
+from core.critical_path import CriticalPathEngine, _to_date
+from core.monte_carlo import ForecastResult, MonteCarloForecaster, role_productivity_history
+from core.workflow_engine import NavalWorkflowEngine, WorkRole, _normalize_workers
+
+SPOSTA, MODIFICA, AGGIUNGI, RIMUOVI, OPERAI = 'sposta', 'modifica', 'aggiungi', 'rimuovi', 'operai'
+DELTA_TYPES = (SPOSTA, MODIFICA, AGGIUNGI, RIMUOVI, OPERAI)
+SCHEDULE_FIELDS = ('descrizione', 'data_inizio', 'data_fine', 'stato_avanzamento', 'commessa', 'predecessori')
+BASE = "Base"
+
+
+class ScenarioError(ValueError):
+    """Differenza di scenario non valida (tipo, campi o valori)."""
+
+
+@dataclass(frozen=True)
+class ScenarioDelta:
+    tipo: str
+    chiave: str
+    valori: Tuple[Tuple[str, Any], ...] = ()   # coppie ordinate: la differenza resta hashabile (chiave di cache)
+
+    def __post_init__(self):
+        v = dict(self.valori)
+        if self.tipo not in DELTA_TYPES:
+            raise ScenarioError(f"Tipo di differenza sconosciuto: {self.tipo}")
+        if not self.chiave:
+            raise ScenarioError(f"Differenza '{self.tipo}' senza chiave")
+        if self.tipo == SPOSTA and not isinstance(v.get('giorni'), int):
+            raise ScenarioError(f"'sposta' {self.chiave}: serve 'giorni' intero")
+        if self.tipo in (MODIFICA, AGGIUNGI):
+            unknown = set(v) - set(SCHEDULE_FIELDS)
+            if unknown:
+                raise ScenarioError(f"'{self.tipo}' {self.chiave}: campi non modificabili {sorted(unknown)}")
+        if self.tipo == AGGIUNGI and not (_to_date(v.get('data_inizio')) and _to_date(v.get('data_fine'))):
+            raise ScenarioError(f"'aggiungi' {self.chiave}: servono data_inizio e data_fine")
+        if self.tipo == OPERAI:
+            if WorkRole.from_string(self.chiave) is None:
+                raise ScenarioError(f"'operai': ruolo sconosciuto {self.chiave}")
+            if not isinstance(v.get('numero'), (int, float)) or _to_date(v.get('dal')) is None:
+                raise ScenarioError(f"'operai' {self.chiave}: servono 'numero' e 'dal'")
+
+    @classmethod
+    def create(cls, tipo: str, chiave: str, valori: Optional[Mapping[str, Any]] = None) -> "ScenarioDelta":
+        return cls(tipo, str(chiave), tuple(sorted((valori or {}).items())))
+
+    @property
+    def values(self) -> Dict[str, Any]:
+        return dict(self.valori)
+
+
+@dataclass(frozen=True)
+class ScenarioView:
+    records: List[Dict]                 # cronoprogramma dello scenario (attività non toccate condivise con la base)
+    changed: FrozenSet[str]             # attività modificate o aggiunte
+    removed: FrozenSet[str]             # attività della base tolte dallo scenario
+    ignored: Tuple[ScenarioDelta, ...]  # differenze su attività che non esistono (più) nella base
+
+
+@dataclass(frozen=True)
+class Scenario:
+    nome: str
+    deltas: Tuple[ScenarioDelta, ...] = ()
+    id_scenario: Optional[int] = None
+
+    @classmethod
+    def from_rows(cls, nome: str, rows: Sequence[Dict[str, Any]], id_scenario: Optional[int] = None) -> "Scenario":
+        """Da righe scenario_delta (tipo, chiave, valori) nell'ordine di inserimento."""
+        return cls(nome, tuple(ScenarioDelta.create(r['tipo'], r['chiave'], r.get('valori')) for r in rows), id_scenario)
+
+    def apply(self, base: Sequence[Dict]) -> ScenarioView:
+        """Cronoprogramma dello scenario: si copiano solo le attività toccate dalle differenze."""
+        records: Dict[str, Dict] = {str(r.get('id_attivita')): r for r in base}
+        base_ids = set(records)
+        touched: Set[str] = set()
+        ignored = []
+        for d in self.deltas:
+            v = d.values
+            if d.tipo == OPERAI:
+                continue
+            if d.tipo == AGGIUNGI:
+                records[d.chiave] = {'stato_avanzamento': 0, **v, 'id_attivita': d.chiave}
+                touched.add(d.chiave)
+                continue
+            rec = records.get(d.chiave)
+            if rec is None:
+                ignored.append(d)
+            elif d.tipo == RIMUOVI:
+                del records[d.chiave]
+            elif d.tipo == SPOSTA:
+                records[d.chiave] = {**rec, **{k: _shift(rec.get(k), v['giorni']) for k in ('data_inizio', 'data_fine')}}
+                touched.add(d.chiave)
+            else:
+                records[d.chiave] = {**rec, **v}
+                touched.add(d.chiave)
+        return ScenarioView(records=list(records.values()), changed=frozenset(touched & set(records)),
+                            removed=frozenset(base_ids - set(records)), ignored=tuple(ignored))
+
+    def workforce(self) -> List[Tuple[str, float, datetime.date, Optional[datetime.date]]]:
+        """Variazioni di forza lavoro (ruolo, operai, dal, al) per il modello di capacità."""
+        return [(d.chiave, float(d.values['numero']), _to_date(d.values['dal']), _to_date(d.values.get('al')))
+                for d in self.deltas if d.tipo == OPERAI]
+
+
+def _shift(value: Any, days: int) -> Any:
+    day = _to_date(value)
+    return (day + datetime.timedelta(days=days)).isoformat() if day else value
+
+
+def load_scenarios(db_manager) -> List[Scenario]:
+    """Scenari salvati nel database dei cronoprogrammi (vedi ScheduleDBManager)."""
+    return [Scenario.from_rows(s['nome'], db_manager.get_scenario_deltas(s['id_scenario']), s['id_scenario'])
+            for s in db_manager.get_scenari()]
+
+
+@dataclass
+class ScenarioResult:
+    scenario: Scenario
+    view: ScenarioView
+    cpm: CriticalPathEngine
+    cpm_changed: Set[str]                   # attività con date CPM diverse dal caso base
+    capacity: Optional[CapacityPlan] = None
+    forecast: Optional[ForecastResult] = None
+
+    def summary(self) -> Dict[str, Any]:
+        row: Dict[str, Any] = {
+            'scenario': self.scenario.nome,
+            'differenze': len(self.scenario.deltas),
+            'attivita_toccate': len(self.view.changed) + len(self.view.removed),
+            'date_cpm_cambiate': len(self.cpm_changed),
+            'fine_cpm': self.cpm.project_finish,
+            'attivita_critiche': sum(1 for i in range(len(self.cpm.ids))
+                                     if self.cpm.progress[i] < 100 and self.cpm.lf[i] - self.cpm.ef[i] <= 0),
+        }
+        if self.capacity is not None:
+            util = self.capacity.utilization
+            row.update({
+                'settimane_critiche': len(self.capacity.bottlenecks()),
+                'carenza_ore': round(float(self.capacity.shortage.sum()), 1),
+                'picco_utilizzo': round(float(util[np.isfinite(util)].max()), 3) if np.isfinite(util).any() else 0.0,
+            })
+        if self.forecast is not None and not self.forecast.commesse.empty:
+            row.update({
+                'p50': self.forecast.commesse['p50'].max(),
+                'p80': self.forecast.commesse['p80'].max(),
+                'prob_entro_fine': float(self.forecast.commesse['prob_entro_fine'].min()),
+            })
+        return row
+
+
+class ScenarioPlanner:
+    def __init__(self, engine: NavalWorkflowEngine, activities: Sequence[Dict],
+                 workers: Optional[List[Dict]] = None, worked_hours: Optional[Dict[str, float]] = None,
+                 availability: Optional[pd.DataFrame] = None, hours_by_role: Optional[pd.DataFrame] = None,
+                 status_date: Optional[datetime.date] = None, weeks: int = DEFAULT_WEEKS,
+                 n_trials: int = 0, seed: int = 42):
+        """
+        Caso base calcolato una volta: CPM alla data di stato e, se ci sono gli operai, piano di capacità.
+        - n_trials > 0 aggiunge la previsione Monte Carlo a ogni scenario (stesso seme per tutti).
+        """
+        self.engine = engine
+        self.base = list(activities)
+        self.worked_hours = worked_hours or {}
+        self.status_date = status_date or datetime.date.today()
+        self.n_trials, self.seed = n_trials, seed
+        self._base_by_id = {str(r.get('id_attivita')): r for r in self.base}
+        self.cpm = CriticalPathEngine(self.base, status_date=self.status_date)
+        self.capacity_model = CapacityModel(engine)
+        self.plan = None if workers is None else self.capacity_model.build(
+            self.base, _normalize_workers(workers), self.worked_hours, availability, start_date=self.status_date, weeks=weeks)
+        self.productivity = None
+        if n_trials and hours_by_role is not None:
+            self.productivity = role_productivity_history(engine, self.base, hours_by_role)
+        self._cache: Dict[Tuple[ScenarioDelta, ...], ScenarioResult] = {}
+
+    def evaluate(self, scenario: Scenario) -> ScenarioResult:
+        """Risultati dello scenario, ricalcolando solo le attività toccate (in cache per contenuto)."""
+        cached = self._cache.get(scenario.deltas)
+        if cached is not None:
+            return cached if cached.scenario == scenario else ScenarioResult(scenario, **{
+                k: getattr(cached, k) for k in ('view', 'cpm', 'cpm_changed', 'capacity', 'forecast')})
+
+        view = scenario.apply(self.base)
+        cpm = self.cpm.fork()
+        cpm_changed = cpm.sync(view.records) if view.changed or view.removed else set()
+
+        plan = None
+        if self.plan is not None:
+            before = [self._base_by_id[a] for a in view.changed | view.removed if a in self._base_by_id]
+            after = [r for r in view.records if str(r.get('id_attivita')) in view.changed]
+            plan = self.capacity_model.rebase(self.plan, before, after, self.worked_hours, scenario.workforce())
+
+        forecast = None
+        if self.n_trials:
+            forecast = MonteCarloForecaster(self.engine, view.records, self.worked_hours, self.productivity,
+                                            self.status_date, cpm=cpm).run(self.n_trials, seed=self.seed)
+        result = ScenarioResult(scenario, view, cpm, cpm_changed, plan, forecast)
+        self._cache[scenario.deltas] = result
+        return result
+
+    def compare(self, scenarios: Sequence[Scenario]) -> pd.DataFrame:
+        """Una riga per scenario (prima il caso base), con lo scostamento della fine CPM dal base in giorni."""
+        rows = [self.evaluate(s).summary() for s in (Scenario(BASE), *scenarios)]
+        df = pd.DataFrame(rows)
+        base_finish = df.loc[0, 'fine_cpm']
+        df['scostamento_giorni'] = [(f - base_finish).days if f and base_finish else None for f in df['fine_cpm']]
+        return df
+
+    def weekly_shortage(self, scenarios: Sequence[Scenario]) -> pd.DataFrame:
+        """Carenza di ore per settimana e scenario (somma sui ruoli), per il confronto affiancato."""
+        frames = []
+        for s in (Scenario(BASE), *scenarios):
+            plan = self.evaluate(s).capacity
+            if plan is not None:
+                frames.append(pd.DataFrame({'settimana': plan.weeks, 'scenario': s.nome,
+                                            'carenza': plan.shortage.sum(axis=1).round(1)}))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['settimana', 'scenario', 'carenza'])
@@ -1,12 +1,36 @@
 # core/schedule_db.py
 from __future__ import annotations
+import json
+import hashlib
 import sqlite3
+import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional
+
+from core.critical_path import parse_predecessors
 
 # Definiamo un percorso dedicato per il database dei cronoprogrammi
 DB_FILE = Path(__file__).resolve().parents[1] / "data" / "schedule.db"
 
+# Colonne importate dal file del cronoprogramma: row_hash ne riassume i valori per l'import differenziale
+SCHEDULE_COLUMNS = ('id_attivita', 'descrizione', 'data_inizio', 'data_fine', 'stato_avanzamento', 'commessa', 'predecessori')
+
+# Avanzamento derivato dalle ore registrate: affianca stato_avanzamento (che resta quello importato)
+DERIVED_PROGRESS_COLUMNS = {
+    'ore_consuntivate': 'REAL',
+    'avanzamento_derivato': 'REAL',
+    'affidabilita_avanzamento': 'TEXT',
+    'avanzamento_aggiornato_il': 'TEXT',
+}
+
+# Versione del grafo delle dipendenze (schedule_meta): cambia a ogni import che tocca il cronoprogramma
+META_VERSIONE_DIPENDENZE = 'versione_dipendenze'
+META_DIPENDENZE_MIGRATE = 'dipendenze_migrate'  # archi ricostruiti dal testo 'predecessori' (una volta per database)
+DIREZIONI_DIPENDENZE = {'valle': ('predecessore', 'successore'), 'monte': ('successore', 'predecessore')}
+
+# CTE materializzate (diff tra baseline calcolato una volta sola) solo da SQLite 3.35: prima, CTE normali
+CTE_MATERIALIZZATA = "AS MATERIALIZED" if sqlite3.sqlite_version_info >= (3, 35, 0) else "AS"
+
 class ScheduleDBManager:
     """
     Gestore dedicato esclusivamente alle operazioni sul database dei cronoprogrammi.
@@ -39,39 +63,157 @@ class ScheduleDBManager:
                 commessa TEXT,
                 predecessori TEXT
             )""")
+            # Scenari what-if: solo le differenze rispetto al cronoprogramma e alla forza lavoro reali
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scenari (
+                id_scenario INTEGER PRIMARY KEY AUTOINCREMENT,
+                nome TEXT UNIQUE NOT NULL,
+                descrizione TEXT,
+                creato_il DATETIME DEFAULT CURRENT_TIMESTAMP
+            )""")
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scenario_delta (
+                id_delta INTEGER PRIMARY KEY AUTOINCREMENT,
+                id_scenario INTEGER NOT NULL,
+                tipo TEXT NOT NULL,
+                chiave TEXT NOT NULL,
+                valori TEXT,
+                FOREIGN KEY (id_scenario) REFERENCES scenari (id_scenario) ON DELETE CASCADE
+            )""")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_scenario_delta ON scenario_delta (id_scenario, id_delta)")
+            # Finestre temporali: per commessa e per date (le date ISO si confrontano come testo)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_cronoprogramma_commessa_date ON cronoprogramma (commessa, data_inizio, data_fine)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_cronoprogramma_date ON cronoprogramma (data_inizio, data_fine)")
+            # Durata massima in O(log n): limita dal basso data_inizio nelle ricerche per finestra
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_cronoprogramma_durata ON cronoprogramma (julianday(data_fine) - julianday(data_inizio))")
+            cursor.execute("CREATE TABLE IF NOT EXISTS schedule_meta (chiave TEXT PRIMARY KEY, valore TEXT)")
+            # Baseline: righe indirizzate per contenuto (row_hash), salvate una volta sola e condivise
+            # tra le versioni; una baseline è l'elenco degli id_riga validi in quel momento
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS baseline (
+                id_baseline INTEGER PRIMARY KEY AUTOINCREMENT,
+                nome TEXT UNIQUE NOT NULL,
+                note TEXT,
+                n_attivita INTEGER NOT NULL DEFAULT 0,
+                creata_il DATETIME DEFAULT CURRENT_TIMESTAMP
+            )""")
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS baseline_righe (
+                id_riga INTEGER PRIMARY KEY,
+                row_hash TEXT UNIQUE NOT NULL,
+                id_attivita TEXT NOT NULL,
+                descrizione TEXT,
+                data_inizio DATE,
+                data_fine DATE,
+                stato_avanzamento INTEGER,
+                commessa TEXT,
+                predecessori TEXT
+            )""")
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS baseline_attivita (
+                id_baseline INTEGER NOT NULL,
+                id_riga INTEGER NOT NULL,
+                PRIMARY KEY (id_baseline, id_riga)
+            ) WITHOUT ROWID""")
+            # Grafo delle dipendenze: il campo 'predecessori' normalizzato in archi, scritto da update_schedule.
+            # La chiave primaria serve la risalita (a monte), l'indice sul predecessore la discesa (a valle)
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS dipendenze_attivita (
+                successore TEXT NOT NULL,
+                predecessore TEXT NOT NULL,
+                tipo TEXT NOT NULL DEFAULT 'FS',
+                ritardo INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (successore, predecessore, tipo)
+            ) WITHOUT ROWID""")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_dipendenze_predecessore ON dipendenze_attivita (predecessore, successore)")
+            conn.commit()
+        self._check_and_migrate()
+
+    def _check_and_migrate(self):
+        """Colonne aggiunte: hash delle righe importate e avanzamento derivato dalle ore (scritto solo dal motore di avanzamento)."""
+        with self._connect() as conn:
+            cols = {r['name'] for r in conn.execute("PRAGMA table_info(cronoprogramma)")}
+            for col, decl in {'row_hash': 'TEXT', **DERIVED_PROGRESS_COLUMNS}.items():
+                if col not in cols:
+                    conn.execute(f"ALTER TABLE cronoprogramma ADD COLUMN {col} {decl}")
+            # Cronoprogrammi importati prima della tabella delle dipendenze: archi ricostruiti una volta sola.
+            # Il flag in schedule_meta (non la tabella vuota) dice se è già fatto: un cronoprogramma senza
+            # predecessori non rilegge tutte le righe a ogni avvio
+            migrated = conn.execute("SELECT 1 FROM schedule_meta WHERE chiave = ?", (META_DIPENDENZE_MIGRATE,)).fetchone()
+            if migrated is None:
+                if conn.execute("SELECT 1 FROM dipendenze_attivita LIMIT 1").fetchone() is None:
+                    rows = conn.execute("SELECT id_attivita, predecessori FROM cronoprogramma "
+                                        "WHERE predecessori IS NOT NULL AND predecessori != ''").fetchall()
+                    conn.executemany("INSERT OR REPLACE INTO dipendenze_attivita VALUES (?, ?, ?, ?)", self._dependency_rows(rows))
+                conn.execute("INSERT OR REPLACE INTO schedule_meta (chiave, valore) VALUES (?, ?)",
+                             (META_DIPENDENZE_MIGRATE, datetime.date.today().isoformat()))
             conn.commit()
 
-    def update_schedule(self, records: List[Dict[str, Any]]):
+    @staticmethod
+    def _row_hash(row: tuple) -> str:
+        return hashlib.blake2b(repr(row).encode(), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _dependency_rows(rows: Iterable[tuple]) -> List[tuple]:
+        """(id_attivita, predecessori) -> archi (successore, predecessore, tipo, ritardo) per dipendenze_attivita."""
+        return [(act_id, dep.predecessor, dep.tipo, dep.lag)
+                for act_id, text in rows for dep in parse_predecessors(text) if dep.predecessor != act_id]
+
+    def update_schedule(self, records: List[Dict[str, Any]], delete_missing: bool = False) -> Optional[Dict[str, int]]:
         """
-        Aggiorna il cronoprogramma in modo transazionale.
-        Usa INSERT OR REPLACE per inserire nuove attività o aggiornare quelle esistenti
-        basandosi sulla chiave primaria 'id_attivita'.
+        Aggiorna il cronoprogramma in modo transazionale e differenziale: confronta l'hash di ogni
+        record con quelli salvati (una sola query) e scrive solo le attività nuove o cambiate.
+        Con delete_missing=True elimina le attività assenti dai record (import del file completo).
+        Le colonne dell'avanzamento derivato restano; l'affidabilità si azzera se cambia lo
+        stato importato, così il motore di avanzamento ricalcola solo quelle attività.
+        Restituisce il riepilogo delle modifiche (None se la transazione è annullata).
         """
         if not records:
             return
 
+        incoming: Dict[str, tuple] = {}
+        for record in records:
+            row = (record['id_attivita'], record['descrizione'], record['data_inizio'], record['data_fine'],
+                   record.get('stato_avanzamento', 0), record.get('commessa'), record.get('predecessori'))
+            incoming[row[0]] = row + (self._row_hash(row),)
+
         with self._connect() as conn:
             cursor = conn.cursor()
             try:
                 cursor.execute("BEGIN TRANSACTION")
-                for record in records:
-                    cursor.execute("""
-                        INSERT OR REPLACE INTO cronoprogramma (id_attivita, descrizione, data_inizio, data_fine, stato_avanzamento, commessa, predecessori)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        record['id_attivita'],
-                        record['descrizione'],
-                        record['data_inizio'],
-                        record['data_fine'],
-                        record.get('stato_avanzamento', 0),
-                        record.get('commessa'),
-                        record.get('predecessori')
-                    ))
+                stored = dict(cursor.execute("SELECT id_attivita, row_hash FROM cronoprogramma").fetchall())
+                changed = [row for act_id, row in incoming.items() if stored.get(act_id) != row[-1]]
+                deleted = [(act_id,) for act_id in stored if act_id not in incoming] if delete_missing else []
+                cursor.executemany(f"""
+                    INSERT INTO cronoprogramma ({', '.join(SCHEDULE_COLUMNS)}, row_hash)
+                    VALUES ({', '.join('?' * (len(SCHEDULE_COLUMNS) + 1))})
+                    ON CONFLICT(id_attivita) DO UPDATE SET
+                        descrizione = excluded.descrizione, data_inizio = excluded.data_inizio,
+                        data_fine = excluded.data_fine, stato_avanzamento = excluded.stato_avanzamento,
+                        commessa = excluded.commessa, predecessori = excluded.predecessori, row_hash = excluded.row_hash,
+                        affidabilita_avanzamento = CASE WHEN stato_avanzamento IS excluded.stato_avanzamento
+                                                        THEN affidabilita_avanzamento END
+                """, changed)
+                cursor.executemany("DELETE FROM cronoprogramma WHERE id_attivita = ?", deleted)
+                # Archi: si riscrivono solo quelli delle attività cambiate o eliminate
+                cursor.executemany("DELETE FROM dipendenze_attivita WHERE successore = ?", [(row[0],) for row in changed] + deleted)
+                cursor.executemany("INSERT OR REPLACE INTO dipendenze_attivita VALUES (?, ?, ?, ?)",
+                                   self._dependency_rows((row[0], row[6]) for row in changed))
+                if changed or deleted:
+                    cursor.execute("""INSERT INTO schedule_meta (chiave, valore) VALUES (?, '1')
+                                      ON CONFLICT(chiave) DO UPDATE SET valore = valore + 1""", (META_VERSIONE_DIPENDENZE,))
                 conn.commit()
-                print(f"{len(records)} record del cronoprogramma sono stati aggiornati/inseriti.")
             except Exception as e:
                 print(f"ERRORE: La transazione del cronoprogramma è stata annullata. {e}")
                 conn.rollback()
+                return None
+
+        inserted = sum(1 for row in changed if row[0] not in stored)
+        summary = {'inserite': inserted, 'aggiornate': len(changed) - inserted,
+                   'eliminate': len(deleted), 'invariate': len(incoming) - len(changed)}
+        print(f"Cronoprogramma: {summary['inserite']} inserite, {summary['aggiornate']} aggiornate, "
+              f"{summary['eliminate']} eliminate, {summary['invariate']} invariate.")
+        return summary
 
     def get_schedule_data(self, commessa: str = None) -> List[Dict[str, Any]]:
         """
@@ -89,5 +231,229 @@ class ScheduleDBManager:
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
 
+    def get_schedule_range(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None,
+                           commessa: Optional[str] = None, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Attività che si sovrappongono alla finestra [start, end] (estremi inclusi, None = aperto),
+        opzionalmente di una sola commessa, con le sole colonne richieste. Usa gli indici sulle date.
+        """
+        with self._connect() as conn:
+            available = [r['name'] for r in conn.execute("PRAGMA table_info(cronoprogramma)")]
+            columns = list(columns or available)
+            unknown = set(columns) - set(available)
+            if unknown:
+                raise ValueError(f"Colonne del cronoprogramma non valide: {sorted(unknown)}")
+            where, params = [], []
+            if commessa is not None:
+                where.append("commessa = ?"); params.append(commessa)
+            if end is not None:
+                where.append("data_inizio <= ?"); params.append(end.isoformat())
+            if start is not None:
+                where.append("data_fine >= ?"); params.append(start.isoformat())
+                max_days = conn.execute("SELECT MAX(julianday(data_fine) - julianday(data_inizio)) FROM cronoprogramma").fetchone()[0]
+                if max_days is not None:
+                    # Un'attività che finisce dopo start non può iniziare prima di start - durata massima
+                    where.append("data_inizio >= date(?, ?)"); params += [start.isoformat(), f"-{int(max_days) + 1} days"]
+            query = f"SELECT {', '.join(columns)} FROM cronoprogramma"
+            if where:
+                query += " WHERE " + " AND ".join(where)
+            return [dict(r) for r in conn.execute(query + " ORDER BY data_inizio, id_attivita", params)]
+
+    def get_schedule_bounds(self, commessa: Optional[str] = None) -> Optional[tuple]:
+        """(prima data di inizio, ultima data di fine) come date; None se il cronoprogramma è vuoto."""
+        query = "SELECT MIN(data_inizio), MAX(data_fine) FROM cronoprogramma"
+        params = (commessa,) if commessa is not None else ()
+        with self._connect() as conn:
+            lo, hi = conn.execute(query + (" WHERE commessa = ?" if params else ""), params).fetchone()
+        if lo is None:
+            return None
+        return datetime.date.fromisoformat(lo[:10]), datetime.date.fromisoformat(hi[:10])
+
+    # --- AVANZAMENTO DERIVATO ---
+    def get_avanzamento(self) -> Dict[str, Dict[str, Any]]:
+        """id_attivita -> avanzamento importato e derivato dalle ore, per tutto il cronoprogramma."""
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT id_attivita, stato_avanzamento, {', '.join(DERIVED_PROGRESS_COLUMNS)} FROM cronoprogramma")
+            return {r['id_attivita']: dict(r) for r in rows}
+
+    def update_avanzamento_derivato(self, rows: List[tuple]):
+        """rows: (ore_consuntivate, avanzamento_derivato, affidabilita_avanzamento, aggiornato_il, id_attivita)."""
+        with self._connect() as conn:
+            conn.executemany("""
+                UPDATE cronoprogramma SET ore_consuntivate = ?, avanzamento_derivato = ?,
+                       affidabilita_avanzamento = ?, avanzamento_aggiornato_il = ?
+                WHERE id_attivita = ?""", rows)
+            conn.commit()
+
+    def get_meta(self, chiave: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT valore FROM schedule_meta WHERE chiave = ?", (chiave,)).fetchone()
+            return row['valore'] if row else None
+
+    def set_meta(self, chiave: str, valore: str):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO schedule_meta (chiave, valore) VALUES (?, ?)", (chiave, valore))
+            conn.commit()
+
+    # --- GRAFO DELLE DIPENDENZE ---
+    def get_dependency_version(self) -> int:
+        """Versione del cronoprogramma per le cache delle chiusure (0 = mai importato)."""
+        return int(self.get_meta(META_VERSIONE_DIPENDENZE) or 0)
+
+    def get_dependencies(self, id_attivita: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Archi del grafo (tutti, o quelli in entrata e in uscita di un'attività)."""
+        query, params = "SELECT predecessore, successore, tipo, ritardo FROM dipendenze_attivita", ()
+        if id_attivita is not None:
+            query += " WHERE successore = ? UNION ALL " + query + " WHERE predecessore = ?"
+            params = (id_attivita, id_attivita)
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute(query, params)]
+
+    def get_dependency_closure(self, ids: Iterable[str], direzione: str = 'valle') -> List[Dict[str, Any]]:
+        """
+        Chiusura transitiva con una CTE ricorsiva: tutte le attività a valle (successori diretti e indiretti)
+        o a monte (predecessori) delle attività date, esclusi i punti di partenza. 'diretta' = 1 se c'è
+        un arco con un punto di partenza. UNION sull'ID visita ogni attività una sola volta, anche nei grafi con cicli.
+        """
+        if direzione not in DIREZIONI_DIPENDENZE:
+            raise ValueError(f"Direzione non valida: {direzione!r} (valle o monte)")
+        da, verso = DIREZIONI_DIPENDENZE[direzione]
+        with self._connect() as conn:
+            rows = conn.execute(f"""
+                WITH RECURSIVE
+                    partenza(id) AS (SELECT value FROM json_each(?)),
+                    chiusura(id) AS (
+                        SELECT id FROM partenza
+                        UNION
+                        SELECT d.{verso} FROM dipendenze_attivita d JOIN chiusura c ON d.{da} = c.id
+                    )
+                SELECT c.id_attivita, c.descrizione, c.data_inizio, c.data_fine, c.stato_avanzamento, c.commessa,
+                       EXISTS (SELECT 1 FROM dipendenze_attivita d
+                               WHERE d.{verso} = c.id_attivita AND d.{da} IN (SELECT id FROM partenza)) AS diretta
+                FROM chiusura x JOIN cronoprogramma c ON c.id_attivita = x.id
+                WHERE x.id NOT IN (SELECT id FROM partenza)
+                ORDER BY c.data_inizio, c.id_attivita""", (json.dumps(sorted(set(ids))),))
+            return [dict(r) for r in rows]
+
+    # --- BASELINE (PIANIFICATO VS ATTUALE) ---
+    def _ensure_row_hashes(self, cursor: sqlite3.Cursor):
+        """Calcola row_hash per le righe importate prima dell'import differenziale."""
+        rows = cursor.execute(f"SELECT {', '.join(SCHEDULE_COLUMNS)} FROM cronoprogramma WHERE row_hash IS NULL").fetchall()
+        cursor.executemany("UPDATE cronoprogramma SET row_hash = ? WHERE id_attivita = ?",
+                           [(self._row_hash(tuple(r)), r['id_attivita']) for r in rows])
+
+    def create_baseline(self, nome: str, note: Optional[str] = None) -> int:
+        """Congela il cronoprogramma attuale: salva solo le righe mai viste prima in nessuna baseline."""
+        cols = ', '.join(SCHEDULE_COLUMNS)
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            self._ensure_row_hashes(cursor)
+            cursor.execute(f"INSERT OR IGNORE INTO baseline_righe (row_hash, {cols}) SELECT row_hash, {cols} FROM cronoprogramma")
+            cursor.execute("INSERT INTO baseline (nome, note, n_attivita) SELECT ?, ?, COUNT(*) FROM cronoprogramma", (nome, note))
+            id_baseline = cursor.lastrowid
+            cursor.execute("INSERT INTO baseline_attivita (id_baseline, id_riga) SELECT ?, r.id_riga FROM cronoprogramma c "
+                           "JOIN baseline_righe r ON r.row_hash = c.row_hash", (id_baseline,))
+            conn.commit()
+            return id_baseline
+
+    def get_baselines(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute("SELECT * FROM baseline ORDER BY id_baseline")]
+
+    def delete_baseline(self, id_baseline: int):
+        """Elimina la baseline e le righe non più usate da nessun'altra."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM baseline_attivita WHERE id_baseline = ?", (id_baseline,))
+            conn.execute("DELETE FROM baseline WHERE id_baseline = ?", (id_baseline,))
+            conn.execute("DELETE FROM baseline_righe WHERE id_riga NOT IN (SELECT id_riga FROM baseline_attivita)")
+            conn.commit()
+
+    def get_baseline_schedule(self, id_baseline: int) -> List[Dict[str, Any]]:
+        """Le attività della baseline, con le stesse colonne del cronoprogramma importato."""
+        with self._connect() as conn:
+            rows = conn.execute(f"""
+                SELECT {', '.join('r.' + c for c in SCHEDULE_COLUMNS)} FROM baseline_attivita a
+                JOIN baseline_righe r ON r.id_riga = a.id_riga
+                WHERE a.id_baseline = ?""", (id_baseline,))
+            return [dict(r) for r in rows]
+
+    def diff_baselines(self, da: int, a: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Attività diverse tra la baseline 'da' e la baseline 'a' (None = cronoprogramma attuale):
+        stato 'aggiunta', 'rimossa' o 'modificata', date dei due lati e slittamenti in giorni.
+        Il confronto è una differenza tra insiemi di righe: i dettagli si leggono solo per quelle cambiate.
+        """
+        with self._connect() as conn:
+            if a is None:
+                # Contro l'attuale si confrontano gli hash; tra due baseline bastano gli id_riga
+                self._ensure_row_hashes(conn.cursor())
+                conn.commit()
+                chiave, righe_dopo, params = 'row_hash', 'cronoprogramma', (da,)
+                prima_h = ("SELECT r.row_hash FROM baseline_attivita a "
+                           "JOIN baseline_righe r ON r.id_riga = a.id_riga WHERE a.id_baseline = ?")
+                dopo_h = "SELECT row_hash FROM cronoprogramma"
+            else:
+                chiave, righe_dopo, params = 'id_riga', 'baseline_righe', (da, a)
+                prima_h = dopo_h = "SELECT id_riga FROM baseline_attivita WHERE id_baseline = ?"
+            colonne = lambda p, d: f"""
+                       COALESCE({d}.descrizione, {p}.descrizione) AS descrizione, COALESCE({d}.commessa, {p}.commessa) AS commessa,
+                       {p}.data_inizio AS data_inizio_prima, {p}.data_fine AS data_fine_prima,
+                       {d}.data_inizio AS data_inizio_dopo, {d}.data_fine AS data_fine_dopo,
+                       {p}.stato_avanzamento AS stato_avanzamento_prima, {d}.stato_avanzamento AS stato_avanzamento_dopo,
+                       CAST(julianday({d}.data_inizio) - julianday({p}.data_inizio) AS INTEGER) AS slittamento_inizio,
+                       CAST(julianday({d}.data_fine) - julianday({p}.data_fine) AS INTEGER) AS slittamento_fine"""
+            rows = conn.execute(f"""
+                WITH prima_h AS ({prima_h}),
+                     dopo_h AS ({dopo_h}),
+                     solo_prima {CTE_MATERIALIZZATA} (SELECT * FROM baseline_righe WHERE {chiave} IN
+                        (SELECT {chiave} FROM prima_h EXCEPT SELECT {chiave} FROM dopo_h)),
+                     solo_dopo {CTE_MATERIALIZZATA} (SELECT * FROM {righe_dopo} WHERE {chiave} IN
+                        (SELECT {chiave} FROM dopo_h EXCEPT SELECT {chiave} FROM prima_h))
+                SELECT p.id_attivita, CASE WHEN d.id_attivita IS NULL THEN 'rimossa' ELSE 'modificata' END AS stato, {colonne('p', 'd')}
+                FROM solo_prima p LEFT JOIN solo_dopo d ON d.id_attivita = p.id_attivita
+                UNION ALL
+                SELECT d.id_attivita, 'aggiunta', {colonne('p', 'd')}
+                FROM solo_dopo d LEFT JOIN solo_prima p ON p.id_attivita = d.id_attivita
+                WHERE p.id_attivita IS NULL
+                ORDER BY 1""", params)
+            return [dict(r) for r in rows]
+
+    # --- SCENARI WHAT-IF ---
+    def create_scenario(self, nome: str, descrizione: Optional[str] = None) -> int:
+        with self._connect() as conn:
+            cursor = conn.execute("INSERT INTO scenari (nome, descrizione) VALUES (?, ?)", (nome, descrizione))
+            conn.commit()
+            return cursor.lastrowid
+
+    def get_scenari(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute("SELECT * FROM scenari ORDER BY nome")]
+
+    def delete_scenario(self, id_scenario: int):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM scenario_delta WHERE id_scenario = ?", (id_scenario,))
+            conn.execute("DELETE FROM scenari WHERE id_scenario = ?", (id_scenario,))
+            conn.commit()
+
+    def add_scenario_delta(self, id_scenario: int, tipo: str, chiave: str, valori: Optional[Dict[str, Any]] = None) -> int:
+        """Registra una differenza dello scenario; i valori sono salvati come JSON."""
+        with self._connect() as conn:
+            cursor = conn.execute("INSERT INTO scenario_delta (id_scenario, tipo, chiave, valori) VALUES (?, ?, ?, ?)",
+                                  (id_scenario, tipo, chiave, json.dumps(valori or {}, default=str)))
+            conn.commit()
+            return cursor.lastrowid
+
+    def delete_scenario_delta(self, id_delta: int):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM scenario_delta WHERE id_delta = ?", (id_delta,))
+            conn.commit()
+
+    def get_scenario_deltas(self, id_scenario: int) -> List[Dict[str, Any]]:
+        """Differenze dello scenario nell'ordine di inserimento (id_delta, tipo, chiave, valori)."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id_delta, tipo, chiave, valori FROM scenario_delta WHERE id_scenario = ? ORDER BY id_delta",
+                                (id_scenario,)).fetchall()
+        return [{**dict(r), 'valori': json.loads(r['valori'] or '{}')} for r in rows]
+
 # Istanza globale per un facile accesso
 schedule_db_manager = ScheduleDBManager()
\ No newline at end of file
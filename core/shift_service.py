@@ -1,15 +1,51 @@
-# core/shift_service.py (Versione 31.0 - Storicizzazione Squadra)
+# core/shift_service.py (Versione 40.2 - Cache Thread-Safe)
 from __future__ import annotations
 import datetime
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 import pandas as pd
 
 from core.crm_db import CrmDBManager, DB_FILE, setup_initial_data
 from core.logic import ShiftEngine
+from core.calendar_view import CalendarModel, build_calendar
+from core.config import ANALYTICS_ENGINE
+
+AGGREGATE_CACHE_SIZE = 128
+CALENDAR_CACHE_SIZE = 16               # modelli del calendario (periodo, vista) per versione dati
+RESOURCE_WINDOW_DAYS = 30               # operai "in forza": con ore registrate negli ultimi 30 giorni
+STORICO_INIZIO = datetime.date(2000, 1, 1)  # inizio dello storico per il consuntivo ore per attività
+
+# Dimensioni "parlanti" per i grafici -> colonne del report
+REPORT_DIMENSIONS = {
+    'squadra': ('squadra',),
+    'dipendente': ('squadra', 'dipendente_nome'),
+    'giorno': ('giorno',),
+    'attivita': ('id_attivita',),
+    'squadra_storica': ('squadra_storica',),
+    'ruolo': ('ruolo',),
+}
 
 class ShiftService:
-    def __init__(self, db_manager: CrmDBManager):
+    def __init__(self, db_manager: CrmDBManager, analytics_engine: str = ANALYTICS_ENGINE):
         self.db_manager = db_manager
+        self._aggregate_cache: Dict[tuple, pd.DataFrame] = {}
+        self._aggregate_cache_version: Optional[int] = None
+        self._calendar_cache: Dict[tuple, CalendarModel] = {}
+        self._calendar_cache_version: Optional[int] = None
+        self._cache_lock = threading.Lock()  # cache condivise fra le sessioni Streamlit (thread diversi)
+        self._analytics = self._init_analytics(analytics_engine)
+        self._earned_value = None
+
+    def _init_analytics(self, engine: str):
+        """Motore per gli aggregati dei report: None = SQLite (default)."""
+        if engine != 'duckdb':
+            return None
+        try:
+            from core.analytics_engine import DuckDBAnalyticsEngine, AnalyticsEngineError
+            return DuckDBAnalyticsEngine(self.db_manager)
+        except (ImportError, AnalyticsEngineError) as e:
+            print(f"Motore analitico non disponibile, uso SQLite: {e}")
+            return None
 
     # --- CORE LOGIC ---
     def _split_and_prepare_segments(self, id_turno_master: int, shift_data: Dict[str, Any]) -> List[tuple]:
@@ -69,7 +105,7 @@ class ShiftService:
                 segments = self._split_and_prepare_segments(master_id, shift)
                 self.db_manager.create_registrazioni_segments(cursor, segments)
                 results['created'] += len(segments)
-                
+
         return results
 
     # --- TRANSITION & HR (Con Squadra Target) ---
@@ -140,6 +176,169 @@ class ShiftService:
                 mid = self.db_manager.create_turno_master(cur, {'id_dipendente':orig['id_dipendente'], 'id_squadra':sq, 'data_ora_inizio':e, 'data_ora_fine':e_orig, 'id_attivita':orig['id_attivita'], 'note':f"{orig.get('note')} (Post)"})
                 self.db_manager.create_registrazioni_segments(cur, self._split_and_prepare_segments(mid, {'id_dipendente':orig['id_dipendente'], 'data_ora_inizio':e, 'data_ora_fine':e_orig, 'id_attivita':orig['id_attivita'], 'note':f"{orig.get('note')} (Post)"}))
 
+    # --- REPORT (FILTRI SPINTI IN SQL) ---
+    def get_report_data_df(self, start_date: datetime.date, end_date: datetime.date,
+                           dipendenti: Optional[Sequence[int]] = None,
+                           squadre: Optional[Sequence[str]] = None,
+                           attivita: Optional[Sequence[str]] = None,
+                           columns: Optional[Sequence[str]] = None,
+                           group_by: Optional[Sequence[str]] = None,
+                           compact: bool = False) -> pd.DataFrame:
+        """
+        Dati del report filtrati direttamente in SQL.
+        - dipendenti: id_dipendente; squadre: nomi squadra (anche 'Non Assegnato'); attivita: id_attivita.
+        - columns: solo le colonne richieste (vedi REPORT_COLUMN_SQL).
+        - group_by: dimensioni per cui restituire le somme di ore_presenza e ore_lavoro.
+        - compact: lettura colonnare (categorie + timestamp interi).
+        """
+        filters = dict(dipendenti=dipendenti, squadre=squadre, attivita=attivita, columns=columns, group_by=group_by)
+        if compact:
+            return self.db_manager.get_report_data_df_compact(start_date, end_date, **filters)
+        return self.db_manager.get_report_data_df(start_date, end_date, **filters)
+
+    def get_riepilogo_turni(self, start_date: datetime.date, end_date: datetime.date,
+                            dipendenti: Optional[Sequence[int]] = None) -> pd.DataFrame:
+        """
+        Turni per le stampe operative (riepilogo ore mensile): segmenti notturni riuniti e tipo di turno
+        classificato per tutti gli operai richiesti (None = tutti) con una sola lettura e una passata vettoriale.
+        """
+        df = self.db_manager.get_report_data_df(start_date, end_date, dipendenti=dipendenti, columns=[
+            'id_dipendente', 'data_ora_inizio', 'data_ora_fine', 'ore_presenza', 'id_attivita'])
+        return ShiftEngine.classify_shifts(ShiftEngine.merge_night_segments(df))
+
+    def get_calendario(self, start_date: datetime.date, end_date: datetime.date, vista: str = 'squadra') -> CalendarModel:
+        """
+        Matrici turni/ore del calendario (vedi core/calendar_view.py) per vista 'squadra' o 'dipendente'.
+        Memorizzate per (periodo, vista) e versione dati: ogni scrittura sul CRM le invalida.
+        Il modello è condiviso fra le chiamate: va letto, non modificato.
+        """
+        version = self.db_manager.get_data_version()
+        key = (start_date, end_date, vista)
+        with self._cache_lock:
+            if version != self._calendar_cache_version:
+                self._calendar_cache.clear()
+                self._calendar_cache_version = version
+            model = self._calendar_cache.get(key)
+        if model is None:
+            df = self.db_manager.get_turni_master_range_df(start_date, end_date)
+            model = build_calendar(df, start_date, end_date, vista)
+            with self._cache_lock:
+                if version == self._calendar_cache_version:
+                    model = self._cache_insert(self._calendar_cache, key, model, CALENDAR_CACHE_SIZE)
+        return model
+
+    def get_report_aggregate(self, start_date: datetime.date, end_date: datetime.date,
+                             dimensions: Sequence[str] = (),
+                             measures: Sequence[str] = ('ore_presenza', 'ore_lavoro'),
+                             dipendenti: Optional[Sequence[int]] = None,
+                             squadre: Optional[Sequence[str]] = None,
+                             attivita: Optional[Sequence[str]] = None,
+                             solo_attivi: bool = True) -> pd.DataFrame:
+        """
+        Un solo GROUP BY in SQL per grafico/pivot: restituisce le misure aggregate
+        per le dimensioni richieste (squadra, dipendente, giorno, attivita, squadra_storica, ruolo).
+        I risultati sono memorizzati per versione dati: ogni scrittura sul CRM li invalida.
+        Con ANALYTICS_ENGINE=duckdb il GROUP BY gira sul motore analitico.
+        """
+        unknown = [d for d in dimensions if d not in REPORT_DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Dimensioni non supportate: {unknown}")
+        group_by: List[str] = []
+        for d in dimensions:
+            group_by += [c for c in REPORT_DIMENSIONS[d] if c not in group_by]
+
+        version = self.db_manager.get_data_version()
+        key = (start_date, end_date, tuple(group_by), tuple(measures),
+               tuple(dipendenti or ()), tuple(squadre or ()), tuple(attivita or ()), solo_attivi)
+        with self._cache_lock:
+            if version != self._aggregate_cache_version:
+                self._aggregate_cache.clear()
+                self._aggregate_cache_version = version
+            df = self._aggregate_cache.get(key)
+        if df is None:
+            query = dict(group_by=group_by, measures=measures, solo_attivi=solo_attivi,
+                         dipendenti=dipendenti, squadre=squadre, attivita=attivita)
+            df = self._run_aggregate(start_date, end_date, query)
+            with self._cache_lock:
+                if version == self._aggregate_cache_version:
+                    df = self._cache_insert(self._aggregate_cache, key, df, AGGREGATE_CACHE_SIZE)
+        return df.copy()
+
+    @staticmethod
+    def _cache_insert(cache: Dict[tuple, Any], key: tuple, value: Any, size: int) -> Any:
+        """
+        Inserimento FIFO (da chiamare con _cache_lock): la query gira fuori dal lock, quindi due sessioni
+        possono calcolare la stessa chiave; vince la prima e tutte restituiscono lo stesso oggetto.
+        """
+        if key in cache:
+            return cache[key]
+        if len(cache) >= size:
+            cache.pop(next(iter(cache)))
+        cache[key] = value
+        return value
+
+    def _run_aggregate(self, start_date, end_date, query: Dict[str, Any]) -> pd.DataFrame:
+        if self._analytics is not None:
+            try:
+                return self._analytics.get_report_data_df(start_date, end_date, **query)
+            except Exception as e:
+                print(f"Errore motore analitico, ripiego su SQLite: {e}")
+        return self.db_manager.get_report_data_df(start_date, end_date, **query)
+
+    def export_report_xlsx(self, path, start_date: datetime.date, end_date: datetime.date, **options) -> Dict[str, int]:
+        """Export Excel a memoria costante (vedi core/report_export.py)."""
+        from core.report_export import export_report_xlsx
+        return export_report_xlsx(self.db_manager, path, start_date, end_date, **options)
+
+    def export_hour_sheets(self, anno: int, mese: int, dipendenti: Optional[Sequence[int]] = None,
+                           **options) -> Tuple[str, bytes]:
+        """
+        Fogli Riepilogo Ore del mese in blocco (vedi core/hour_sheets.py): una lettura per tutti gli operai.
+        Restituisce (nome file, contenuto): lo ZIP dei fogli, oppure il documento multipagina con unico=True.
+        """
+        from core.hour_sheets import build_hour_sheets, month_range, zip_hour_sheets
+        turni = self.get_riepilogo_turni(*month_range(anno, mese), dipendenti=dipendenti)
+        files = build_hour_sheets(turni, self.get_dipendenti_df(), anno, mese, **options)
+        if options.get('unico'):
+            return next(iter(files.items()))
+        return f"riepilogo_ore_{anno}-{mese:02d}.zip", zip_hour_sheets(files, anno, mese)
+
+    def get_disponibilita_operai(self, start_date: datetime.date, end_date: datetime.date) -> pd.DataFrame:
+        """Ore di lavoro pianificate per operaio attivo e giorno (id_dipendente, giorno, ore), dai turni."""
+        df = self.db_manager.get_report_data_df(start_date, end_date, group_by=['id_dipendente', 'giorno'], measures=['ore_lavoro'])
+        return df.rename(columns={'ore_lavoro': 'ore'})
+
+    def get_resource_allocation_data(self, fino_a: Optional[datetime.date] = None,
+                                     finestra_giorni: int = RESOURCE_WINDOW_DAYS) -> Dict[str, Any]:
+        """
+        Dati per l'analisi risorse, aggregati in SQL su registrazioni_ore (cache per versione dati):
+        - worked_hours: ore di lavoro consuntivate per id_attivita fino a `fino_a` (default oggi);
+        - workers_by_role: operai attivi distinti per ruolo con ore negli ultimi `finestra_giorni`.
+        """
+        fino_a = fino_a or datetime.date.today()
+        df_att = self.get_report_aggregate(STORICO_INIZIO, fino_a, dimensions=('attivita',),
+                                           measures=('ore_lavoro',), solo_attivi=False).dropna(subset=['id_attivita'])
+        da = fino_a - datetime.timedelta(days=finestra_giorni - 1)
+        df_ruoli = self.get_report_aggregate(da, fino_a, dimensions=('ruolo',), measures=('n_dipendenti',))
+        return {
+            'worked_hours': dict(zip(df_att['id_attivita'], df_att['ore_lavoro'].astype(float))),
+            'workers_by_role': {r: int(n) for r, n in zip(df_ruoli['ruolo'], df_ruoli['n_dipendenti']) if r},
+        }
+
+    def get_ore_per_attivita_ruolo(self, fino_a: Optional[datetime.date] = None) -> pd.DataFrame:
+        """Ore di lavoro consuntivate per (id_attivita, ruolo): storico di produttività per le simulazioni."""
+        df = self.get_report_aggregate(STORICO_INIZIO, fino_a or datetime.date.today(), dimensions=('attivita', 'ruolo'),
+                                       measures=('ore_lavoro',), solo_attivi=False)
+        return df.dropna(subset=['id_attivita'])
+
+    def get_earned_value_engine(self, workflow_engine):
+        """Motore earned value sul DAO del servizio (snapshot giornalieri, vedi core/earned_value.py)."""
+        if self._earned_value is None or self._earned_value.engine is not workflow_engine:
+            from core.earned_value import EarnedValueEngine
+            self._earned_value = EarnedValueEngine(self.db_manager, workflow_engine)
+        return self._earned_value
+
+    def get_data_version(self) -> int: return self.db_manager.get_data_version()
     def get_turni_standard(self): return self.db_manager.get_turni_standard()
     def get_squadre(self): return self.db_manager.get_squadre()
     def get_dipendenti_df(self, solo_attivi=False): return self.db_manager.get_dipendenti_df(solo_attivi)
@@ -147,7 +346,8 @@ class ShiftService:
     def check_for_master_overlaps(self, id_d, s, e, ex=None): return self.db_manager.check_for_master_overlaps(id_d, s, e, ex)
     def get_turni_master_giorno_df(self, g): return self.db_manager.get_turni_master_giorno_df(g)
     def get_turni_master_range_df(self, s, e): return self.db_manager.get_turni_master_range_df(s, e)
-    def get_report_data_df(self, s, e): return self.db_manager.get_report_data_df(s, e)
+    def get_report_data_arrow(self, s, e, **f): return self.db_manager.get_report_data_arrow(s, e, **f)
+    def get_report_filter_options(self, s, e): return self.db_manager.get_report_filter_options(s, e)
     def add_dipendente(self, n, c, r): return self.db_manager.add_dipendente(n, c, r)
     def update_dipendente_field(self, i, f, v): return self.db_manager.update_dipendente_field(i, f, v)
     def add_squadra(self, n, c): return self.db_manager.add_squadra(n, c)
@@ -155,6 +355,8 @@ class ShiftService:
     def update_squadra_details(self, i, n, c): return self.db_manager.update_squadra_details(i, n, c)
     def delete_squadra(self, i): return self.db_manager.delete_squadra(i)
     def get_turni_by_dipendente_date(self, d, t): return self.db_manager.get_turni_by_dipendente_date(d, t)
+    def get_tariffe_ruolo(self): return self.db_manager.get_tariffe_ruolo()
+    def set_tariffa_ruolo(self, r, c): return self.db_manager.set_tariffa_ruolo(r, c)
 
 setup_initial_data()
 _db_dao = CrmDBManager(DB_FILE)
@@ -1,4 +1,4 @@
-# core/workflow_engine.py (Versione con Typo Corretto)
+# core/workflow_engine.py (Versione 3.4 - Analisi Rapida e Settimanale)
 """
 Workflow Engine per CapoCantiere AI
 Sistema professionale per la gestione delle fasi di lavoro navali
@@ -6,93 +6,78 @@ con dipendenze tra ruoli e calcolo strategico del fabbisogno di ore residue.
 """
 
 from __future__ import annotations
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, field
-from datetime import datetime
-from enum import Enum
+from typing import Dict, List, Any, Mapping, Optional, Sequence
+from dataclasses import dataclass
+from datetime import datetime, date
+import numpy as np
 import pandas as pd
 
-class WorkRole(Enum):
-    CARPENTIERE = "Carpentiere"  # <-- ERRORE CORRETTO QUI
-    AIUTANTE_CARPENTIERE = "Aiutante Carpentiere"
-    SALDATORE = "Saldatore"
-    MOLATORE = "Molatore"
-    CAPOCANTIERE = "Capocantiere"
-    
-    @classmethod
-    def from_string(cls, role_str: str) -> Optional['WorkRole']:
-        if not isinstance(role_str, str): return None
-        role_str_upper = role_str.upper().replace(' ', '_')
-        for role in cls:
-            if role.name == role_str_upper: return role
-        return None
-
-@dataclass
-class WorkPhase:
-    role: WorkRole
-    hours_required: float
-    can_parallel: bool = False
-    requires_roles: List[WorkRole] = field(default_factory=list)
-
-@dataclass
-class WorkflowTemplate:
-    name: str
-    activity_type: str
-    phases: List[WorkPhase]
-    description: str = ""
-    
-    def get_total_hours(self) -> float:
-        """Calcola il monte ore totale standard (considera la durata, non la somma delle ore parallele)."""
-        total_duration = 0
-        parallel_phase_duration = 0
-        for p in self.phases:
-            if p.can_parallel:
-                parallel_phase_duration = max(parallel_phase_duration, p.hours_required)
-            else:
-                total_duration += p.hours_required
-        return total_duration + parallel_phase_duration
+# Ruoli e template vivono nel registro data-driven (core/workflow_templates.yaml)
+from core.workflow_registry import WorkRole, WorkPhase, WorkflowTemplate, WorkflowTemplateRegistry, RegistrySnapshot
+
+@dataclass(frozen=True)
+class CompiledTemplates:
+    """
+    Template compilati in matrici NumPy per l'analisi di massa.
+    Ogni template è una sequenza di blocchi (fasi parallele, poi sequenziali) con
+    breakpoint cumulativi: ore residue del blocco g = clip(ends[g] - ore_lavorate, 0, durata[g]).
+    """
+    prefixes: tuple                 # prefisso attività per riga di template
+    roles: tuple                    # ordine dei ruoli nelle colonne
+    starts: np.ndarray              # (T, G) ore cumulative a inizio blocco
+    ends: np.ndarray                # (T, G) ore cumulative a fine blocco (blocchi mancanti: durata 0)
+    membership: np.ndarray          # (T, G, R) 1.0 se il ruolo lavora nel blocco
+    totals: np.ndarray              # (T,) monte ore standard
+    block_phases: tuple = ()        # per template, per blocco: le WorkPhase che lo compongono
+
+    def _pending_blocks(self, template_idx: np.ndarray, worked: np.ndarray):
+        """Per ogni template: righe delle attività non concluse e loro ore residue per blocco."""
+        for t in range(len(self.prefixes)):
+            rows = np.flatnonzero((template_idx == t) & (worked < self.totals[t]))
+            if rows.size:
+                yield t, rows, np.clip(self.ends[t] - worked[rows, None], 0.0, self.ends[t] - self.starts[t])
+
+    def remaining_blocks(self, template_idx: np.ndarray, worked: np.ndarray) -> np.ndarray:
+        """(N,) indici template (-1 = nessun workflow) e ore lavorate -> (N, G) ore residue per blocco."""
+        left = np.zeros((len(template_idx), self.ends.shape[1]))
+        for _, rows, block_left in self._pending_blocks(template_idx, worked):
+            left[rows] = block_left
+        return left
+
+    def remaining_hours(self, template_idx: np.ndarray, worked: np.ndarray) -> np.ndarray:
+        """(N,) indici template (-1 = nessun workflow) e ore lavorate -> (N, R) ore residue per ruolo."""
+        per_role = np.zeros((len(template_idx), len(self.roles)))
+        for t, rows, block_left in self._pending_blocks(template_idx, worked):
+            per_role[rows] = block_left @ self.membership[t]
+        # Attività senza workflow o già concluse restano a zero: non generano domanda
+        return per_role
 
 class NavalWorkflowEngine:
-    def __init__(self):
-        self.templates: Dict[str, WorkflowTemplate] = {}
-        self._initialize_default_templates()
-    
-    def _initialize_default_templates(self):
-        self.templates["MON"] = WorkflowTemplate(
-            name="Montaggio Scafo", activity_type="MON",
-            description="Workflow standard per il montaggio dello scafo basato su ore di lavoro per fase.",
-            phases=[
-                WorkPhase(role=WorkRole.CARPENTIERE, hours_required=80.0, can_parallel=True, requires_roles=[WorkRole.AIUTANTE_CARPENTIERE]),
-                WorkPhase(role=WorkRole.AIUTANTE_CARPENTIERE, hours_required=80.0, can_parallel=True),
-                WorkPhase(role=WorkRole.SALDATORE, hours_required=64.0, can_parallel=False),
-                WorkPhase(role=WorkRole.MOLATORE, hours_required=40.0, can_parallel=False),
-                WorkPhase(role=WorkRole.CAPOCANTIERE, hours_required=8.0, can_parallel=False)
-            ]
-        )
-        self.templates["FAM"] = WorkflowTemplate(
-            name="Fuori Apparato Motore", activity_type="FAM",
-            description="Workflow standard per attività FAM, include collaudo.",
-            phases=[
-                WorkPhase(role=WorkRole.CARPENTIERE, hours_required=88.0, can_parallel=True, requires_roles=[WorkRole.AIUTANTE_CARPENTIERE]),
-                WorkPhase(role=WorkRole.AIUTANTE_CARPENTIERE, hours_required=88.0, can_parallel=True),
-                WorkPhase(role=WorkRole.SALDATORE, hours_required=72.0, can_parallel=False),
-                WorkPhase(role=WorkRole.MOLATORE, hours_required=48.0, can_parallel=False),
-                WorkPhase(role=WorkRole.CAPOCANTIERE, hours_required=16.0, can_parallel=False)
-            ]
-        )
-    
+    def __init__(self, registry: Optional[WorkflowTemplateRegistry] = None):
+        self.registry = registry or WorkflowTemplateRegistry()
+        self._compiled: Optional[CompiledTemplates] = None
+        self._compiled_for: Optional[RegistrySnapshot] = None
+
+    @property
+    def templates(self) -> Mapping[str, WorkflowTemplate]:
+        """Template correnti (sola lettura; si aggiornano da soli se il file YAML cambia)."""
+        return self.registry.snapshot.templates
+
     def get_workflow_for_activity(self, activity_id: str) -> Optional[WorkflowTemplate]:
-        if not activity_id or '-' not in activity_id: return None
-        prefix = activity_id.split('-')[0].upper()
-        return self.templates.get(prefix)
+        return self.registry.resolve(activity_id)
 
-    def calculate_remaining_hours_per_role(self, activity_id: str, hours_already_worked: float) -> Dict[WorkRole, float]:
+    def get_remaining_phases(self, activity_id: str, hours_already_worked: float) -> List[Dict[WorkRole, float]]:
+        """
+        Ore residue per ruolo raggruppate per fase, nell'ordine di esecuzione:
+        prima il blocco delle fasi parallele (tutti i ruoli insieme), poi le fasi sequenziali.
+        Le fasi già coperte dalle ore lavorate non compaiono.
+        """
         workflow = self.get_workflow_for_activity(activity_id)
-        if not workflow: return {}
+        if not workflow: return []
 
-        remaining_hours: Dict[WorkRole, float] = {}
+        groups: List[Dict[WorkRole, float]] = []
         accumulated_duration = 0.0
-        
+
         # Gestione fasi parallele
         parallel_phase_duration = 0
         for p in workflow.phases:
@@ -104,9 +89,7 @@ class NavalWorkflowEngine:
             hours_covered = max(0, hours_already_worked - accumulated_duration)
             remaining_duration = max(0, parallel_phase_duration - hours_covered)
             if remaining_duration > 0:
-                parallel_roles = [p.role for p in workflow.phases if p.can_parallel]
-                for role in set(parallel_roles):
-                    remaining_hours[role] = remaining_hours.get(role, 0) + remaining_duration
+                groups.append({p.role: remaining_duration for p in workflow.phases if p.can_parallel})
             accumulated_duration += parallel_phase_duration
 
         # Poi le fasi sequenziali
@@ -115,21 +98,90 @@ class NavalWorkflowEngine:
                 hours_covered = max(0, hours_already_worked - accumulated_duration)
                 remaining_duration = max(0, phase.hours_required - hours_covered)
                 if remaining_duration > 0:
-                    remaining_hours[phase.role] = remaining_hours.get(phase.role, 0) + remaining_duration
+                    groups.append({phase.role: remaining_duration})
                 accumulated_duration += phase.hours_required
-        
+
+        return groups
+
+    def calculate_remaining_hours_per_role(self, activity_id: str, hours_already_worked: float) -> Dict[WorkRole, float]:
+        remaining_hours: Dict[WorkRole, float] = {}
+        for group in self.get_remaining_phases(activity_id, hours_already_worked):
+            for role, hours in group.items():
+                remaining_hours[role] = remaining_hours.get(role, 0) + hours
         return remaining_hours
 
+    def compile_templates(self) -> CompiledTemplates:
+        """Compila i template in matrici fasi x ruoli; si ricompila solo se cambia lo snapshot del registro."""
+        snapshot = self.registry.snapshot
+        if self._compiled is not None and self._compiled_for is snapshot:
+            return self._compiled
+        templates = snapshot.templates
+        roles = tuple(WorkRole)
+        role_col = {r: k for k, r in enumerate(roles)}
+        blocks = {}
+        for prefix, wf in templates.items():
+            parallel = [p for p in wf.phases if p.can_parallel]
+            seq = [[p] for p in wf.phases if not p.can_parallel]
+            blocks[prefix] = ([parallel] if parallel else []) + seq
+        n_t, n_g = len(blocks), max((len(b) for b in blocks.values()), default=0)
+        starts = np.zeros((n_t, n_g)); ends = np.zeros((n_t, n_g))
+        membership = np.zeros((n_t, n_g, len(roles)))
+        totals = np.zeros(n_t)
+        for t, (prefix, groups) in enumerate(blocks.items()):
+            cum = 0.0
+            for g, phases in enumerate(groups):
+                starts[t, g] = cum
+                cum += max(p.hours_required for p in phases)
+                ends[t, g] = cum
+                for p in phases:
+                    membership[t, g, role_col[p.role]] = 1.0
+            starts[t, len(groups):] = ends[t, len(groups):] = cum
+            totals[t] = templates[prefix].get_total_hours()
+        block_phases = tuple(tuple(tuple(g) for g in groups) for groups in blocks.values())
+        self._compiled = CompiledTemplates(tuple(blocks), roles, starts, ends, membership, totals, block_phases)
+        self._compiled_for = snapshot
+        return self._compiled
+
+    def template_indices(self, activity_ids: Sequence[str]) -> np.ndarray:
+        """Indice del template compilato per ogni ID attività (-1 se nessun workflow)."""
+        compiled = self.compile_templates()
+        trie = self._compiled_for.trie
+        index = {p: k for k, p in enumerate(compiled.prefixes)}
+        depth = trie.max_depth + 1  # il match dipende solo dai primi caratteri: si memorizza su quelli
+        cache: Dict[str, int] = {}
+
+        def lookup(act_id) -> int:
+            if not isinstance(act_id, str): return -1
+            head = act_id[:depth]
+            if head not in cache:
+                key = trie.longest_match(head)
+                cache[head] = index[key] if key else -1
+            return cache[head]
+
+        return np.fromiter(map(lookup, activity_ids), dtype=np.int64, count=len(activity_ids))
+
+    def worked_hours_array(self, activity_ids: Sequence[str], worked_hours: Dict[str, float]) -> np.ndarray:
+        """Ore già lavorate allineate agli ID attività (0 se assenti)."""
+        return pd.Series(list(activity_ids), dtype=object).map(worked_hours).fillna(0.0).to_numpy(dtype=np.float64)
+
+    def remaining_hours_matrix(self, activity_ids: Sequence[str], worked_hours: Dict[str, float]) -> np.ndarray:
+        """Ore residue (N attività x ruoli, nell'ordine di WorkRole) con un'unica operazione vettoriale."""
+        worked = self.worked_hours_array(activity_ids, worked_hours)
+        return self.compile_templates().remaining_hours(self.template_indices(activity_ids), worked)
+
+    def _total_demand(self, activities: List[Dict], worked_hours: Dict[str, float]) -> Dict[WorkRole, float]:
+        ids = [act.get('id_attivita', '') for act in activities]
+        compiled = self.compile_templates()
+        totals = self.remaining_hours_matrix(ids, worked_hours).sum(axis=0) if ids else np.zeros(len(compiled.roles))
+        return {role: float(h) for role, h in zip(compiled.roles, totals)}
+
     def get_bottleneck_analysis(self, activities: List[Dict], available_workers: Dict[WorkRole, int], worked_hours: Dict[str, float]) -> Dict[str, Any]:
-        demand = {role: 0.0 for role in WorkRole}
-        for act in activities:
-            act_id = act.get('id_attivita', '')
-            wf = self.get_workflow_for_activity(act_id)
-            if not wf or worked_hours.get(act_id, 0) >= wf.get_total_hours(): continue
-            rem_hours = self.calculate_remaining_hours_per_role(act_id, worked_hours.get(act_id, 0))
-            for role, hours in rem_hours.items():
-                demand[role] += hours
-        
+        """
+        Stima rapida sul fabbisogno residuo totale contro 40 ore per operaio (solo matrici compilate).
+        Per le settimane in sofferenza da turni e date attività vedi get_weekly_bottleneck_analysis.
+        """
+        demand = self._total_demand(activities, worked_hours)
+
         bottlenecks = []
         for role, demand_h in demand.items():
             if demand_h <= 0: continue
@@ -139,14 +191,141 @@ class NavalWorkflowEngine:
                 bottlenecks.append({'role': role.value, 'severity': 'CRITICO', 'demand_hours': demand_h, 'available_workers': 0, 'shortage_hours': demand_h})
             elif demand_h > available_h:
                 bottlenecks.append({'role': role.value, 'severity': 'ALTO', 'demand_hours': demand_h, 'available_workers': workers, 'shortage_hours': demand_h - available_h})
-        
+
         return {'bottlenecks': sorted(bottlenecks, key=lambda x: x['shortage_hours'], reverse=True), 'total_demand': {r.value: round(h) for r, h in demand.items() if h > 0}}
 
-    def suggest_optimal_schedule(self, activities: List[Dict], workers: List[Dict], worked_hours: Dict[str, float]) -> List[Dict]:
+    def get_weekly_bottleneck_analysis(self, activities: List[Dict], workers: List[Dict], worked_hours: Dict[str, float],
+                                       availability: Optional[pd.DataFrame] = None, start_date: Optional[date] = None,
+                                       weeks: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Colli di bottiglia per ruolo dal piano di capacità settimanale (plan_capacity): un ruolo è in
+        sofferenza se in almeno una settimana la domanda supera le ore dei turni (o del calendario).
+        - severity: CRITICO se nelle settimane in sofferenza il ruolo non ha mai ore disponibili, altrimenti ALTO;
+        - demand_hours / shortage_hours: domanda e carenza sommate sulle settimane in sofferenza;
+        - total_demand: ore residue per ruolo di tutte le attività (anche senza date o oltre l'orizzonte).
+        """
+        demand = self._total_demand(activities, worked_hours)
+        plan = self.plan_capacity(activities, workers, worked_hours, availability, start_date=start_date, weeks=weeks)
+        weekly = plan.bottlenecks()
+        bottlenecks = []
+        for role, g in weekly.groupby('ruolo', sort=False):
+            bottlenecks.append({
+                'role': role, 'severity': 'CRITICO' if (g['severita'] == 'CRITICO').all() else 'ALTO',
+                'demand_hours': float(g['domanda'].sum()), 'available_workers': int(plan.workers_by_role.get(role, 0)),
+                'shortage_hours': float(g['carenza'].sum()), 'critical_weeks': len(g),
+                'first_week': g['settimana'].min().date(),
+            })
+        return {'bottlenecks': sorted(bottlenecks, key=lambda x: x['shortage_hours'], reverse=True),
+                'total_demand': {r.value: round(h) for r, h in demand.items() if h > 0}}
+
+    def plan_resources(self, activities: List[Dict], workers: List[Dict], worked_hours: Optional[Dict[str, float]] = None,
+                       availability: Optional[pd.DataFrame] = None, start_date: Optional[date] = None,
+                       horizon_days: Optional[int] = None, priority_rule: str = 'EDD'):
+        """
+        Piano risorse completo (vedi core/resource_scheduler.py): assegnazioni operaio -> attività per giorno.
+        - workers: anagrafica (id_dipendente, nome, cognome, ruolo) o righe presenze (operaio, ruolo).
+        - availability: ore pianificate (id_dipendente, giorno, ore) da turni_master; None = calendario standard.
+        """
+        from core.resource_scheduler import (ResourceConstrainedScheduler, build_availability_matrix,
+                                             DEFAULT_HORIZON_DAYS)
+        start_date = start_date or date.today()
+        crew = _normalize_workers(workers)
+        if worked_hours is None:
+            worked_hours = _worked_hours_from_presence(workers)
+        cap = build_availability_matrix(crew, start_date, horizon_days or DEFAULT_HORIZON_DAYS, availability)
+        scheduler = ResourceConstrainedScheduler(self, priority_rule=priority_rule)
+        return scheduler.schedule(activities, crew, cap, start_date, worked_hours)
+
+    def plan_capacity(self, activities: List[Dict], workers: List[Dict], worked_hours: Optional[Dict[str, float]] = None,
+                      availability: Optional[pd.DataFrame] = None, start_date: Optional[date] = None,
+                      weeks: Optional[int] = None):
+        """
+        Capacità e domanda per ruolo e settimana (vedi core/capacity_model.py), al posto della stima
+        piatta di 40 ore per operaio: turni reali, calendario e date delle attività.
+        """
+        from core.capacity_model import CapacityModel, DEFAULT_WEEKS
+        if worked_hours is None:
+            worked_hours = _worked_hours_from_presence(workers)
+        return CapacityModel(self).build(activities, _normalize_workers(workers), worked_hours, availability,
+                                         start_date=start_date, weeks=weeks or DEFAULT_WEEKS)
+
+    def forecast_completion(self, activities: List[Dict], worked_hours: Optional[Dict[str, float]] = None,
+                            hours_by_role: Optional[pd.DataFrame] = None, status_date: Optional[date] = None,
+                            n_trials: Optional[int] = None, seed: Optional[int] = None, processes: Optional[int] = None):
+        """
+        Date di fine P50/P80/P95 per attività e commessa (vedi core/monte_carlo.py).
+        - hours_by_role: (id_attivita, ruolo, ore_lavoro) da registrazioni_ore, per la produttività storica dei ruoli.
+        """
+        from core.monte_carlo import MonteCarloForecaster, role_productivity_history, DEFAULT_TRIALS
+        productivity = role_productivity_history(self, activities, hours_by_role) if hours_by_role is not None else None
+        forecaster = MonteCarloForecaster(self, activities, worked_hours, productivity, status_date)
+        return forecaster.run(n_trials or DEFAULT_TRIALS, seed=seed, processes=processes)
+
+    def suggest_optimal_schedule(self, activities: List[Dict], workers: List[Dict], worked_hours: Optional[Dict[str, float]] = None,
+                                 **plan_options) -> List[Dict]:
+        """
+        Suggerimenti operativi dal piano risorse, in ordine di partenza pianificata:
+        per ogni attività la prossima fase, i ruoli richiesti e gli operai consigliati nel primo giorno.
+        """
+        if not activities or not workers: return []
+        if worked_hours is None:
+            worked_hours = _worked_hours_from_presence(workers)
+        plan = self.plan_resources(activities, workers, worked_hours, **plan_options)
+        if plan.assignments.empty: return []
+
+        first_day = plan.assignments.groupby('id_attivita', sort=False)['data'].transform('min')
+        starting_crew = plan.assignments[plan.assignments['data'] == first_day]
+        crew_by_act = {
+            act: [{'id': r.id_dipendente, 'name': r.nome, 'role': r.ruolo} for r in grp.drop_duplicates('id_dipendente').itertuples()]
+            for act, grp in starting_crew.groupby('id_attivita', sort=False)
+        }
+
         suggestions = []
-        # Implementazione disabilitata per stabilità, da riattivare in futuro
+        for row in plan.activities.dropna(subset=['inizio']).sort_values(['inizio', 'scadenza']).itertuples():
+            act_id = row.id_attivita
+            worked = worked_hours.get(act_id, 0.0)
+            full = self.get_remaining_phases(act_id, 0.0)
+            remaining = self.get_remaining_phases(act_id, worked)
+            total = self.get_workflow_for_activity(act_id).get_total_hours()
+            idx = len(full) - len(remaining)
+            next_group = remaining[0]
+            phase_start = sum(max(g.values()) for g in full[:idx]) / total * 100 if total else 0
+            started = any(h < full[idx][r] - 1e-6 for r, h in next_group.items())
+            suggestions.append({
+                'activity_id': act_id,
+                'current_progress': round(min(worked / total, 1.0) * 100) if total else 0,
+                'action': 'CONTINUA' if started else 'INIZIA_FASE',
+                'next_phase_role': ' + '.join(r.value for r in next_group),
+                'next_phase_start': round(phase_start),
+                'required_roles': [r.value for r in next_group],
+                'workers_assigned': crew_by_act.get(act_id, []),
+                'planned_start': row.inizio.date(),
+                'planned_finish': row.fine.date() if pd.notna(row.fine) else None,
+                'delay_days': int(row.ritardo_giorni) if pd.notna(row.ritardo_giorni) else None,
+            })
         return suggestions
 
+def _normalize_workers(workers: List[Dict]) -> List[Dict]:
+    """Anagrafica o righe presenze -> operai unici {'id_dipendente', 'nome', 'ruolo'}."""
+    crew, seen = [], set()
+    for w in workers:
+        if 'id_dipendente' in w:
+            wid = w['id_dipendente']
+            name = f"{w.get('cognome', '')} {w.get('nome', '')}".strip() if 'cognome' in w else w.get('nome')
+        else:
+            wid = name = w.get('operaio')
+        if wid is None or wid in seen: continue
+        seen.add(wid)
+        crew.append({'id_dipendente': wid, 'nome': name, 'ruolo': w.get('ruolo')})
+    return crew
+
+def _worked_hours_from_presence(records: List[Dict]) -> Dict[str, float]:
+    worked: Dict[str, float] = {}
+    for r in records:
+        if r.get('id_attivita') and r.get('ore_lavorate'):
+            worked[r['id_attivita']] = worked.get(r['id_attivita'], 0.0) + float(r['ore_lavorate'])
+    return worked
+
 # Istanza globale
 workflow_engine = NavalWorkflowEngine()
 
@@ -160,20 +339,36 @@ def get_workflow_info(activity_id: str) -> Dict[str, Any]:
     }
 
 def analyze_resource_allocation(presence_data: List[Dict], schedule_data: List[Dict]) -> Dict[str, Any]:
+    """Analisi da record di presenza grezzi (operaio, ruolo, id_attivita, ore_lavorate)."""
     if not presence_data or not schedule_data: return {'error': 'Dati mancanti.'}
-    df_presence = pd.DataFrame(presence_data)
-    worked_hours = df_presence.groupby('id_attivita')['ore_lavorate'].sum().to_dict()
-    unique_workers = {(r.get('operaio'), r.get('ruolo')) for r in presence_data if r.get('operaio')}
-    workers_count = {}
-    for _, role_str in unique_workers:
+    worked_hours = _worked_hours_from_presence(presence_data)
+    workers_by_role: Dict[str, int] = {}
+    for _, role_str in {(r.get('operaio'), r.get('ruolo')) for r in presence_data if r.get('operaio')}:
+        workers_by_role[role_str] = workers_by_role.get(role_str, 0) + 1
+    return analyze_resource_aggregates(schedule_data, worked_hours, workers_by_role, presence_data)
+
+def analyze_resource_aggregates(schedule_data: List[Dict], worked_hours: Dict[str, float], workers_by_role: Dict[str, int],
+                                workers: Optional[List[Dict]] = None, availability: Optional[pd.DataFrame] = None,
+                                suggest: bool = True) -> Dict[str, Any]:
+    """
+    Analisi da dati già aggregati (vedi ShiftService.get_resource_allocation_data):
+    ore lavorate per attività e operai distinti per ruolo. Con gli operai (e le ore pianificate dai turni)
+    la capacità settimanale è quella reale e, se `suggest`, si calcolano i suggerimenti (piano risorse);
+    senza, i colli di bottiglia usano gli operai per ruolo sul calendario standard.
+    """
+    if not schedule_data: return {'error': 'Dati mancanti.'}
+    workers_count: Dict[WorkRole, int] = {}
+    for role_str, n in workers_by_role.items():
         role = WorkRole.from_string(role_str)
-        if role: workers_count[role] = workers_count.get(role, 0) + 1
-    
-    analysis = workflow_engine.get_bottleneck_analysis(schedule_data, workers_count, worked_hours)
-    suggestions = workflow_engine.suggest_optimal_schedule(schedule_data, presence_data, worked_hours)
-    
+        if role: workers_count[role] = workers_count.get(role, 0) + int(n)
+
+    crew = workers or [{'id_dipendente': f"{role.value}-{k}", 'ruolo': role.value}
+                       for role, n in workers_count.items() for k in range(n)]
+    analysis = workflow_engine.get_weekly_bottleneck_analysis(schedule_data, crew, worked_hours, availability)
+    suggestions = workflow_engine.suggest_optimal_schedule(schedule_data, workers, worked_hours, availability=availability) if workers and suggest else []
+
     return {
         'workers_by_role': {r.value: c for r, c in workers_count.items()},
         'bottleneck_analysis': analysis,
         'schedule_suggestions': suggestions
-    }
\ No newline at end of file
+    }
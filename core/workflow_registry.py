@@ -0,0 +1,317 @@
+# file: core/workflow_registry.py (Versione 1.2 - Validazione Prima della Registrazione)
+"""
+Registro di ruoli e template di workflow caricati da file YAML versionato
+(default: core/workflow_templates.yaml, sovrascrivibile con WORKFLOW_TEMPLATES_FILE).
+
+- WorkRole è un registro aperto: i ruoli dichiarati nel file si aggiungono a quelli base,
+  ma si usano come prima (WorkRole.SALDATORE, .name, .value, iterazione, from_string).
+- Al caricamento i template diventano strutture immutabili (dataclass frozen + tuple)
+  raccolte in uno snapshot che viene sostituito in blocco: chi sta leggendo non vede mai
+  uno stato a metà.
+- Gli ID attività si risolvono con un trie dei prefissi (vince il prefisso più lungo),
+  non con split('-')[0].
+- Hot reload: se il file cambia (mtime) lo snapshot viene ricaricato al primo accesso;
+  un file non valido viene segnalato e si continua con lo snapshot precedente.
+  All'avvio non c'è uno snapshot precedente: un file personalizzato non valido viene segnalato
+  (last_error) e si parte dai template di default, finché il file non viene corretto.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+import yaml
+
+from core.config import WORKFLOW_TEMPLATES_FILE
+
+DEFAULT_TEMPLATES_FILE = Path(__file__).resolve().parent / "workflow_templates.yaml"
+RELOAD_CHECK_SECONDS = 1.0  # al massimo una stat() del file al secondo
+# Incertezza di default sulla durata di una fase: fattore (minimo, massimo) rispetto allo standard, moda 1.0
+DEFAULT_PHASE_UNCERTAINTY = (0.9, 1.3)
+
+# Ruoli base: disponibili anche senza file (e con lo stesso significato di sempre)
+BASE_ROLES = {
+    'CARPENTIERE': "Carpentiere",
+    'AIUTANTE_CARPENTIERE': "Aiutante Carpentiere",
+    'SALDATORE': "Saldatore",
+    'MOLATORE': "Molatore",
+    'CAPOCANTIERE': "Capocantiere",
+}
+
+
+class TemplateRegistryError(ValueError):
+    """File dei template non valido (ruolo sconosciuto, fasi mancanti, YAML malformato)."""
+    pass
+
+
+# --- RUOLI (REGISTRO APERTO) ---
+class _WorkRoleMeta(type):
+    """Rende la classe WorkRole iterabile e indicizzabile come un Enum, ma estendibile a runtime."""
+
+    def __iter__(cls) -> Iterator["WorkRole"]:
+        return iter(tuple(cls._registry.values()))
+
+    def __len__(cls) -> int:
+        return len(cls._registry)
+
+    def __contains__(cls, item) -> bool:
+        return isinstance(item, cls) and cls._registry.get(item.name) is item
+
+    def __getattr__(cls, name: str) -> "WorkRole":
+        try:
+            return cls._registry[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(cls, name: str) -> "WorkRole":
+        return cls._registry[name]
+
+
+class WorkRole(metaclass=_WorkRoleMeta):
+    __slots__ = ('name', 'value')
+    _registry: Dict[str, "WorkRole"] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, name: str, value: str):
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'value', value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("WorkRole è immutabile")
+
+    def __repr__(self) -> str:
+        return f"<WorkRole.{self.name}: {self.value!r}>"
+
+    def __reduce__(self):  # pickle (es. process pool): si ricollega al ruolo registrato
+        return (WorkRole.register, (self.name, self.value))
+
+    @classmethod
+    def register(cls, name: str, value: str) -> "WorkRole":
+        """Registra (o restituisce) il ruolo: lo stesso nome è sempre lo stesso oggetto."""
+        name = name.strip().upper().replace(' ', '_')
+        with cls._lock:
+            role = cls._registry.get(name)
+            if role is None:
+                role = cls._registry[name] = cls(name, value)
+            return role
+
+    @classmethod
+    def from_string(cls, role_str: str) -> Optional["WorkRole"]:
+        if not isinstance(role_str, str): return None
+        return cls._registry.get(role_str.strip().upper().replace(' ', '_'))
+
+
+for _name, _label in BASE_ROLES.items():
+    WorkRole.register(_name, _label)
+
+
+# --- TEMPLATE IMMUTABILI ---
+@dataclass(frozen=True)
+class WorkPhase:
+    role: WorkRole
+    hours_required: float
+    can_parallel: bool = False
+    requires_roles: Tuple[WorkRole, ...] = ()
+    uncertainty: Tuple[float, float] = DEFAULT_PHASE_UNCERTAINTY
+
+
+@dataclass(frozen=True)
+class WorkflowTemplate:
+    name: str
+    activity_type: str
+    phases: Tuple[WorkPhase, ...]
+    description: str = ""
+
+    def get_total_hours(self) -> float:
+        """Calcola il monte ore totale standard (considera la durata, non la somma delle ore parallele)."""
+        total_duration = 0
+        parallel_phase_duration = 0
+        for p in self.phases:
+            if p.can_parallel:
+                parallel_phase_duration = max(parallel_phase_duration, p.hours_required)
+            else:
+                total_duration += p.hours_required
+        return total_duration + parallel_phase_duration
+
+
+# --- TRIE DEI PREFISSI ---
+class PrefixTrie:
+    """Trie immutabile dopo la costruzione: longest match del prefisso su un confine (separatore o cifra)."""
+
+    def __init__(self, keys: List[str]):
+        self._root: Dict[str, Any] = {}
+        self.max_depth = 0
+        for key in keys:
+            node = self._root
+            for ch in key.upper():
+                node = node.setdefault(ch, {})
+            node[None] = key  # marcatore di fine chiave
+            self.max_depth = max(self.max_depth, len(key))
+
+    def longest_match(self, text: str) -> Optional[str]:
+        node, best = self._root, None
+        text = text.upper()
+        for pos, ch in enumerate(text):
+            node = node.get(ch)
+            if node is None:
+                break
+            if None in node and pos + 1 < len(text) and not text[pos + 1].isalpha():
+                best = node[None]
+        return best
+
+
+@dataclass(frozen=True)
+class RegistrySnapshot:
+    version: Any
+    templates: Mapping[str, WorkflowTemplate]
+    trie: PrefixTrie
+    source_mtime: Optional[float] = None
+    roles: Tuple[WorkRole, ...] = field(default_factory=tuple)
+
+
+def _uncertainty_of(value: Any, where: str) -> Tuple[float, float]:
+    if value is None:
+        return DEFAULT_PHASE_UNCERTAINTY
+    try:
+        low, high = (float(v) for v in value)
+    except (TypeError, ValueError):
+        raise TemplateRegistryError(f"{where}: 'uncertainty' deve essere [minimo, massimo]") from None
+    if not 0 < low <= 1.0 <= high:
+        raise TemplateRegistryError(f"{where}: 'uncertainty' deve rispettare 0 < minimo <= 1 <= massimo")
+    return (low, high)
+
+
+def _role_key(name: Any) -> str:
+    return str(name).strip().upper().replace(' ', '_')
+
+
+def _compile_snapshot(data: Dict[str, Any], mtime: Optional[float]) -> RegistrySnapshot:
+    """
+    Valida tutto il file prima di toccare il registro globale dei ruoli: i ruoli dichiarati
+    si registrano solo se ogni template compila, così un file scartato non lascia ruoli fantasma.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('templates'), dict):
+        raise TemplateRegistryError("Il file deve contenere una sezione 'templates'")
+    declared = data.get('roles') or {}
+    if not isinstance(declared, dict):
+        raise TemplateRegistryError("'roles' deve essere una mappa NOME: etichetta")
+    pending = {_role_key(name): str(label) for name, label in declared.items()}
+
+    def role_of(name: Any, where: str) -> str:
+        key = _role_key(name)
+        if key not in pending and WorkRole.from_string(key) is None:
+            raise TemplateRegistryError(f"{where}: ruolo sconosciuto '{name}' (dichiararlo in 'roles')")
+        return key
+
+    # 1. Validazione: fasi con i soli nomi dei ruoli
+    specs = {}
+    for prefix, spec in data['templates'].items():
+        prefix = str(prefix).strip().upper()
+        if not isinstance(spec, dict):
+            raise TemplateRegistryError(f"Template {prefix}: deve essere una mappa (name, description, phases)")
+        raw_phases = spec.get('phases') or []
+        if not isinstance(raw_phases, list):
+            raise TemplateRegistryError(f"Template {prefix}: 'phases' deve essere una lista")
+        phases = []
+        for k, ph in enumerate(raw_phases):
+            where = f"Template {prefix}, fase {k + 1}"
+            if not isinstance(ph, dict):
+                raise TemplateRegistryError(f"{where}: la fase deve essere una mappa (role, hours, ...)")
+            try:
+                hours = float(ph['hours'])
+            except (KeyError, TypeError, ValueError):
+                raise TemplateRegistryError(f"{where}: 'hours' mancante o non numerico") from None
+            requires = ph.get('requires') or []
+            if not isinstance(requires, list):
+                raise TemplateRegistryError(f"{where}: 'requires' deve essere una lista di ruoli")
+            phases.append((role_of(ph.get('role'), where), hours, bool(ph.get('parallel', False)),
+                           tuple(role_of(r, where) for r in requires), _uncertainty_of(ph.get('uncertainty'), where)))
+        if not phases:
+            raise TemplateRegistryError(f"Template {prefix}: nessuna fase definita")
+        specs[prefix] = (spec, phases)
+
+    # 2. File valido: registrazione dei ruoli e strutture immutabili
+    roles = [WorkRole.register(name, label) for name, label in pending.items()]
+    templates = {
+        prefix: WorkflowTemplate(
+            name=str(spec.get('name', prefix)), activity_type=prefix, description=str(spec.get('description', '')),
+            phases=tuple(WorkPhase(role=WorkRole[role], hours_required=hours, can_parallel=parallel,
+                                   requires_roles=tuple(WorkRole[r] for r in requires), uncertainty=uncertainty)
+                         for role, hours, parallel, requires, uncertainty in phases),
+        )
+        for prefix, (spec, phases) in specs.items()
+    }
+    return RegistrySnapshot(data.get('version'), MappingProxyType(templates), PrefixTrie(list(templates)),
+                            mtime, tuple(roles))
+
+
+class WorkflowTemplateRegistry:
+    def __init__(self, path: Optional[str | Path] = None):
+        self.path = Path(path or WORKFLOW_TEMPLATES_FILE or DEFAULT_TEMPLATES_FILE)
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self.last_error: Optional[str] = None
+        self._snapshot = self._load_initial()
+
+    def _load(self, path: Optional[Path] = None) -> RegistrySnapshot:
+        path = path or self.path
+        mtime = path.stat().st_mtime
+        with open(path, encoding="utf-8") as f:
+            try:
+                data = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise TemplateRegistryError(f"YAML non valido: {e}") from e
+        return _compile_snapshot(data, mtime)
+
+    def _load_initial(self) -> RegistrySnapshot:
+        """
+        Primo caricamento (all'import del motore): un file personalizzato non valido non blocca l'applicazione.
+        Si usano i template di default con l'mtime del file scartato, così l'hot reload riprova solo quando cambia.
+        """
+        try:
+            return self._load()
+        except (OSError, TemplateRegistryError) as e:
+            if self.path.resolve() == DEFAULT_TEMPLATES_FILE:
+                raise  # nessun ripiego: il file di default fa parte del pacchetto
+            self.last_error = str(e)
+            print(f"ERRORE template workflow in {self.path}, uso i template di default: {e}")
+            try:
+                failed_mtime = self.path.stat().st_mtime
+            except OSError:
+                failed_mtime = None
+            return replace(self._load(DEFAULT_TEMPLATES_FILE), source_mtime=failed_mtime)
+
+    def maybe_reload(self) -> bool:
+        """Ricarica se il file è cambiato. Restituisce True se lo snapshot è stato sostituito."""
+        now = time.monotonic()
+        if now - self._last_check < RELOAD_CHECK_SECONDS:
+            return False
+        with self._lock:
+            self._last_check = now
+            try:
+                if self.path.stat().st_mtime == self._snapshot.source_mtime:
+                    return False
+                self._snapshot = self._load()
+                self.last_error = None
+                print(f"Template workflow ricaricati (versione {self._snapshot.version}).")
+                return True
+            except (OSError, TemplateRegistryError) as e:
+                if str(e) != self.last_error:  # stesso errore (es. file mancante): segnalato una volta sola
+                    print(f"ERRORE ricarica template workflow, resta attiva la versione {self._snapshot.version}: {e}")
+                self.last_error = str(e)
+                return False
+
+    @property
+    def snapshot(self) -> RegistrySnapshot:
+        self.maybe_reload()
+        return self._snapshot
+
+    def resolve(self, activity_id: str) -> Optional[WorkflowTemplate]:
+        if not activity_id or not isinstance(activity_id, str): return None
+        snap = self.snapshot
+        key = snap.trie.longest_match(activity_id)
+        return snap.templates.get(key) if key else None
@@ -1,4 +1,4 @@
-# file: server/pages/01_Reportistica.py (Versione 38.0 - DIRECTOR'S CUT: Perfected Audit)
+# file: server/pages/01_Reportistica.py (Versione 39.1 - Export oltre il Limite di Righe)
 
 from __future__ import annotations
 import os
@@ -8,7 +8,7 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import date
-import io 
+import tempfile
 
 # Setup path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
@@ -16,7 +16,6 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../.
 try:
     from core.shift_service import shift_service
     from core.schedule_db import schedule_db_manager
-    from core.logic import ShiftEngine 
 except ImportError as e:
     st.error(f"Errore critico moduli: {e}")
     st.stop()
@@ -110,44 +109,39 @@ def load_activities_map():
     except: pass
     return activities_map
 
-@st.cache_data(ttl=50)
-def load_squadra_map():
-    try:
-        squadre = shift_service.get_squadre()
-        d_map = {}
-        for sq in squadre:
-            mems = shift_service.get_membri_squadra(sq['id_squadra'])
-            for mid in mems: d_map[mid] = sq['nome_squadra']
-        return d_map
-    except: return {}
-
 def map_activity_id(id_att, activities_map):
     if pd.isna(id_att) or id_att == "-1": return "N/A"
     return activities_map.get(id_att, f"Attività {id_att}")
 
 @st.cache_data(ttl=60)
-def load_processed_data(start_date, end_date):
-    df = shift_service.get_report_data_df(start_date, end_date)
-    if df.empty: return pd.DataFrame()
-    act_map = load_activities_map()
-    sq_map = load_squadra_map()
-    df['desc_attivita'] = df['id_attivita'].apply(map_activity_id, args=(act_map,))
-    df['squadra'] = df['id_dipendente'].map(sq_map).fillna("Non Assegnato")
-    df['giorno'] = df['data_ora_inizio'].dt.date
-    if 'ore_presenza' not in df.columns: df['ore_presenza'] = 0.0
-    if 'ore_lavoro' not in df.columns: df['ore_lavoro'] = 0.0
-    mask = df['ore_presenza'].isna()
-    if mask.any():
-        calc = df[mask].apply(lambda r: ShiftEngine.calculate_professional_hours(r['data_ora_inizio'], r['data_ora_fine']), axis=1, result_type='expand')
-        df.loc[mask, 'ore_presenza'] = calc[0]
-        df.loc[mask, 'ore_lavoro'] = calc[1]
+def load_filter_options(start_date, end_date):
+    return shift_service.get_report_filter_options(start_date, end_date)
+
+def load_aggregate(*dimensions, measures=('ore_presenza', 'ore_lavoro')):
+    """GROUP BY lato SQL con i filtri correnti (memorizzato per versione dati dal service)."""
+    df = shift_service.get_report_aggregate(
+        st.session_state.rep_start, st.session_state.rep_end, dimensions=dimensions, measures=measures,
+        dipendenti=s_dip, squadre=s_sq, attivita=s_act
+    )
+    if 'giorno' in df.columns: df['giorno'] = pd.to_datetime(df['giorno']).dt.date
     return df
 
-def to_excel(df):
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Report')
-    return output.getvalue()
+def export_excel(start_date, end_date, dipendenti, squadre, attivita):
+    """Export in streaming su file temporaneo: in memoria arriva solo il file finito, da scaricare."""
+    act_map = load_activities_map()
+    with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
+        path = tmp.name
+    try:
+        summary = shift_service.export_report_xlsx(
+            path, start_date, end_date,
+            activity_label=lambda a: map_activity_id(a, act_map),
+            dipendenti=dipendenti, squadre=squadre, attivita=attivita
+        )
+        with open(path, "rb") as f:
+            data = f.read()
+    finally:
+        os.remove(path)
+    return data, summary
 
 # --- FILTRI ---
 st.subheader("Pannello di Controllo")
@@ -173,62 +167,73 @@ if not st.session_state.report_loaded:
     st.stop()
 
 try:
-    with st.spinner("Elaborazione..."):
-        df_proc = load_processed_data(st.session_state.rep_start, st.session_state.rep_end)
-        if df_proc.empty: st.warning("Nessun dato."); st.stop()
+    filter_opts = load_filter_options(st.session_state.rep_start, st.session_state.rep_end)
 except Exception as e: st.error(f"Errore: {e}"); st.stop()
+if not filter_opts['dipendenti']: st.warning("Nessun dato."); st.stop()
 
 st.header(f"Report dal {st.session_state.rep_start.strftime('%d/%m/%Y')} al {st.session_state.rep_end.strftime('%d/%m/%Y')}")
 
 with st.expander("Filtri Avanzati", expanded=False):
+    act_map = load_activities_map()
+    dip_names = dict(filter_opts['dipendenti'])
+    act_ids = sorted({a if a is not None else "-1" for a in filter_opts['attivita']}, key=lambda a: map_activity_id(a, act_map))
     f1, f2, f3 = st.columns(3)
-    with f1: s_dip = st.multiselect("Dipendente", sorted(df_proc['dipendente_nome'].unique()))
-    with f2: s_sq = st.multiselect("Squadra", sorted(df_proc['squadra'].unique()))
-    with f3: s_act = st.multiselect("Attività", sorted(df_proc['desc_attivita'].unique()))
+    with f1: s_dip = st.multiselect("Dipendente", sorted(dip_names, key=dip_names.get), format_func=dip_names.get)
+    with f2: s_sq = st.multiselect("Squadra", sorted(filter_opts['squadre']))
+    with f3: s_act = st.multiselect("Attività", act_ids, format_func=lambda a: map_activity_id(a, act_map))
 
-df_filtered = df_proc.copy()
-if s_dip: df_filtered = df_filtered[df_filtered['dipendente_nome'].isin(s_dip)]
-if s_sq: df_filtered = df_filtered[df_filtered['squadra'].isin(s_sq)]
-if s_act: df_filtered = df_filtered[df_filtered['desc_attivita'].isin(s_act)]
+try:
+    with st.spinner("Elaborazione..."):
+        df_tot = load_aggregate(measures=('ore_presenza', 'ore_lavoro', 'n_registrazioni'))
+except Exception as e: st.error(f"Errore: {e}"); st.stop()
 
-if df_filtered.empty: st.warning("Nessun dato con i filtri attuali."); st.stop()
+if df_tot.empty or not df_tot['n_registrazioni'].iloc[0]: st.warning("Nessun dato con i filtri attuali."); st.stop()
 
 # --- TABS ---
 tab1, tab2, tab3, tab_audit = st.tabs(["📊 Dashboard", "🔍 Pivot", "📥 Export", "⚖️ AUDIT & SIMULATORE"])
 
 # TAB 1: DASHBOARD
 with tab1:
-    tot_p, tot_l = df_filtered['ore_presenza'].sum(), df_filtered['ore_lavoro'].sum()
+    tot_p, tot_l = df_tot['ore_presenza'].iloc[0], df_tot['ore_lavoro'].iloc[0]
     k1, k2, k3 = st.columns(3)
     k1.metric("Ore Presenza", f"{tot_p:,.1f}")
     k2.metric("Ore Lavoro", f"{tot_l:,.1f}")
     k3.metric("Delta", f"{tot_p-tot_l:,.1f}", delta="Non Produttive", delta_color="inverse")
     st.divider()
     c1, c2 = st.columns(2)
-    c1.plotly_chart(px.pie(df_filtered.groupby('squadra')['ore_lavoro'].sum().reset_index(), names='squadra', values='ore_lavoro', title="Ore per Squadra"), use_container_width=True)
-    c2.plotly_chart(px.bar(df_filtered.groupby('giorno')[['ore_presenza', 'ore_lavoro']].sum().reset_index(), x='giorno', y=['ore_presenza', 'ore_lavoro'], title="Trend"), use_container_width=True)
+    c1.plotly_chart(px.pie(load_aggregate('squadra', measures=('ore_lavoro',)), names='squadra', values='ore_lavoro', title="Ore per Squadra"), use_container_width=True)
+    c2.plotly_chart(px.bar(load_aggregate('giorno'), x='giorno', y=['ore_presenza', 'ore_lavoro'], title="Trend"), use_container_width=True)
 
 # TAB 2: PIVOT
 with tab2:
+    # Un solo GROUP BY (squadra, dipendente, giorno) alimenta entrambi gli statini
+    df_piv = load_aggregate('dipendente', 'giorno')
     st.subheader("1. STATINO INTERNO")
     try:
-        p1 = pd.pivot_table(df_filtered, index=['squadra', 'dipendente_nome'], columns='giorno', values='ore_presenza', aggfunc='sum', fill_value=0, margins=True)
+        p1 = pd.pivot_table(df_piv, index=['squadra', 'dipendente_nome'], columns='giorno', values='ore_presenza', aggfunc='sum', fill_value=0, margins=True)
         st.dataframe(p1.style.format("{:.1f}").map(style_internal), use_container_width=True)
     except: st.error("Errore pivot")
     st.divider()
     st.subheader("2. REPORT CANTIERE")
     try:
-        p2 = pd.pivot_table(df_filtered, index=['squadra', 'dipendente_nome'], columns='giorno', values='ore_lavoro', aggfunc='sum', fill_value=0, margins=True)
+        p2 = pd.pivot_table(df_piv, index=['squadra', 'dipendente_nome'], columns='giorno', values='ore_lavoro', aggfunc='sum', fill_value=0, margins=True)
         st.dataframe(p2.style.format("{:.1f}").map(style_external), use_container_width=True)
     except: pass
 
 # TAB 3: EXPORT
 with tab3:
-    col_map = {'giorno': 'Data', 'squadra': 'Squadra', 'dipendente_nome': 'Nome', 'ruolo': 'Ruolo', 'desc_attivita': 'Attività', 'ore_presenza': 'Presenza', 'ore_lavoro': 'Lavoro'}
-    cols = [c for c in col_map.keys() if c in df_filtered.columns]
-    df_exp = df_filtered[cols].rename(columns=col_map)
-    st.download_button("Scarica Excel", to_excel(df_exp), f"Report_{date.today()}.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheet_ml.sheet", type="primary")
-    st.dataframe(df_exp, hide_index=True)
+    # Il file si genera solo su richiesta, leggendo il DB a blocchi
+    st.caption("Fogli: Dettaglio registrazioni, Statino Interno (presenza), Report Cantiere (lavoro).")
+    if st.button("Prepara Export Dettagliato"):
+        try:
+            with st.spinner("Generazione Excel..."):
+                xlsx, summary = export_excel(st.session_state.rep_start, st.session_state.rep_end, s_dip, s_sq, s_act)
+        except ValueError as e:  # limiti di righe/colonne di Excel
+            st.error(f"Export non generato: {e}")
+        else:
+            fogli = f" (dettaglio su {summary['fogli_dettaglio']} fogli)" if summary['fogli_dettaglio'] > 1 else ""
+            st.success(f"{summary['righe']:,} registrazioni{fogli}, {summary['dipendenti']} dipendenti, {summary['giorni']} giorni.")
+            st.download_button("Scarica Excel", xlsx, f"Report_{date.today()}.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", type="primary")
 
 # ==============================================================================
 # ★ TAB 4: AUDIT UNIFICATO (VISUAL DIRECTOR'S CUT) ★
@@ -1,4 +1,4 @@
-# server/pages/04_📈_Cronoprogramma.py (Versione Definitiva e Corretta)
+# server/pages/04_📈_Cronoprogramma.py (Versione Gantt WebGL)
 
 from __future__ import annotations
 import os
@@ -6,29 +6,73 @@ import sys
 from datetime import date, datetime, timedelta
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
 
 # Aggiungiamo la root del progetto al path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
-from core.schedule_db import schedule_db_manager
-from tools.schedule_extractor import parse_schedule_excel
+from core.schedule_db import schedule_db_manager, DERIVED_PROGRESS_COLUMNS
+from core.progress_engine import progress_engine
+from core.critical_path import CriticalPathEngine
+from core.dependency_graph import dependency_graph
+from core.gantt_view import GANTT_MAX_ATTIVITA, RAGGRUPPAMENTI, gantt_bars, gantt_rows, group_keys, line_segments
+from core.config import MONTE_CARLO_PROCESSES
+from core.monte_carlo import DEFAULT_TRIALS
+from core.earned_value import TOTALE
+from core.shift_service import shift_service
+from core.workflow_engine import workflow_engine
+from tools.schedule_importers import IMPORTERS, parse_schedule_file
 
 st.set_page_config(page_title="Control Room Cronoprogramma", page_icon="📈", layout="wide")
 
 st.title("📈 Control Room Cronoprogramma")
 st.markdown("Dashboard avanzata per il monitoraggio e l'analisi delle attività di cantiere.")
 
-# --- FUNZIONE PER LA TUA LOGICA DEI COLORI ---
-def get_progress_color(progress):
-    progress = int(progress)
-    if progress >= 100:
-        return "#28a745"  # Verde (Completato)
-    elif progress >= 70:
-        return "#3B82F6"  # Azzurro (70-99%)
-    elif progress >= 50:
-        return "#EF4444"  # Rosso (50-69%)
-    else: # 0-49
-        return "#F59E0B"  # Arancione
+# --- GANTT WEBGL (la TUA logica dei colori per avanzamento è in core/gantt_view.py) ---
+def gantt_figure(bars, base=None):
+    """Gantt WebGL: una traccia Scattergl per colore, ogni barra è un segmento spesso; base = righe della baseline (con y)."""
+    fig = go.Figure()
+    n = len(bars)
+    width = max(3.0, min(18.0, 600 / max(n, 1)))
+    float_txt = np.where(bars['float_totale'].isna(), "N/D", bars['float_totale'].round(1).astype(str) + " gg")
+    hover = ("<b>" + bars['etichetta'] + "</b><br>Progresso: " + bars['stato_avanzamento'].round(0).astype(int).astype(str)
+             + "%<br>Float totale: " + float_txt + np.where(bars['livello'] == 0, "<br>Attività: " + bars['n_attivita'].astype(str), ""))
+    segments = [(bars[bars['stato_avanzamento'] > 0], 'data_inizio', 'fine_avanzamento', 'colore_avanzamento'),
+                (bars[bars['stato_avanzamento'] < 100], 'fine_avanzamento', 'data_fine', 'colore_rimanente')]
+    for part, start, end, color_col in segments:
+        for color, seg in part.groupby(color_col):
+            x, y, text = line_segments(seg[start], seg[end], seg['y'], hover[seg.index])
+            fig.add_trace(go.Scattergl(x=x, y=y, mode='lines', line=dict(color=color, width=width),
+                                       hovertext=text, hoverinfo='text', showlegend=False))
+    if base is not None and not base.empty:
+        # Barre sottili della baseline sovrapposte alle barre attuali
+        periodo = ("<b>" + base['etichetta'] + "</b><br>Baseline: " + base['data_inizio'].dt.strftime('%d/%m/%Y')
+                   + " → " + base['data_fine'].dt.strftime('%d/%m/%Y'))
+        x, y, text = line_segments(base['data_inizio'], base['data_fine'], base['y'], periodo)
+        fig.add_trace(go.Scattergl(x=x, y=y, mode='lines', line=dict(color='rgba(17, 24, 39, 0.85)', width=max(1.5, width / 4)),
+                                   hovertext=text, hoverinfo='text', showlegend=False))
+    fig.update_yaxes(range=[n - 0.5, -0.5], tickmode='array', tickvals=bars['y'], ticktext=bars['etichetta'],
+                     showticklabels=n <= 2 * GANTT_MAX_ATTIVITA, showgrid=False, zeroline=False)
+    fig.update_layout(
+        height=max(400, min(n * 28, 1400)),
+        yaxis_title=None, xaxis_title="Linea del Tempo", hovermode='closest',
+        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor=st.get_option("theme.secondaryBackgroundColor"),
+        font_color=st.get_option("theme.textColor"),
+        showlegend=False,
+        xaxis_type='date'
+    )
+    return fig
+
+def get_cpm_engine(records):
+    """Motore CPM tenuto in sessione: ai rerun si aggiornano solo le attività cambiate."""
+    engine = st.session_state.get('cpm_engine')
+    if engine is None or engine.status_date != date.today():
+        engine = CriticalPathEngine(records, status_date=date.today())
+        st.session_state.cpm_engine = engine
+    else:
+        engine.sync(records)
+    return engine
 
 # --- LEGGE I DATI DALLA MEMORIA CENTRALE ---
 df_schedule_original = st.session_state.get('df_schedule', pd.DataFrame())
@@ -38,10 +82,16 @@ def process_schedule_file_on_page():
     uploaded_file = st.session_state.get("cronoprogramma_uploader_on_page")
     if uploaded_file:
         try:
-            records = parse_schedule_excel(uploaded_file.getvalue())
-            schedule_db_manager.update_schedule(records)
+            import_errors = []
+            records = parse_schedule_file(uploaded_file, uploaded_file.name, errors=import_errors)  # Excel, MS Project XML, Primavera XER, CSV
+            st.session_state['schedule_import_errors'] = import_errors
+            summary = schedule_db_manager.update_schedule(
+                records, delete_missing=st.session_state.get("cronoprogramma_delete_missing", False))
+            progress_engine.sync()  # ricalcola le attività nuove o con stato importato cambiato
             st.session_state['force_rerun'] = True # Segnala alla Home Page che deve ricaricare tutto
-            st.toast("✅ Cronoprogramma importato!", icon="📈")
+            if summary:
+                st.toast(f"✅ Cronoprogramma importato: {summary['inserite']} nuove, {summary['aggiornate']} aggiornate, "
+                         f"{summary['eliminate']} eliminate, {summary['invariate']} invariate", icon="📈")
             # Resetta l'uploader dopo l'uso per permettere un nuovo caricamento
             st.session_state.cronoprogramma_uploader_on_page = None
             st.rerun() # Forza il refresh della pagina per mostrare i nuovi dati
@@ -51,23 +101,23 @@ def process_schedule_file_on_page():
 if df_schedule_original.empty:
     with st.expander("➕ Carica un nuovo file di Cronoprogramma"):
         st.file_uploader(
-            "Seleziona file Excel", 
-            type=["xlsx"], 
+            "Seleziona file (Excel, MS Project XML, Primavera XER o CSV)", 
+            type=sorted(IMPORTERS), 
             key="cronoprogramma_uploader_on_page", 
             on_change=process_schedule_file_on_page
         )
     st.warning("Nessun dato del cronoprogramma trovato. Carica un file per iniziare.")
 else:
-    df_schedule = df_schedule_original.copy()
-    df_schedule['data_inizio'] = pd.to_datetime(df_schedule['data_inizio'])
-    df_schedule['data_fine'] = pd.to_datetime(df_schedule['data_fine'])
+    # --- PERCORSO CRITICO (CPM sui predecessori: serve tutto il cronoprogramma) ---
+    cpm = get_cpm_engine(df_schedule_original.to_dict('records'))
+    df_cpm = cpm.results()[['id_attivita', 'inizio_presto', 'fine_presto', 'float_totale', 'critica']]
+    bounds = schedule_db_manager.get_schedule_bounds() or (date.today(), date.today())
 
     # --- PANNELLO DI CONTROLLO CON BOTTONE "APPLICA" ---
     st.subheader("Pannello di Controllo")
     with st.container(border=True):
         c1, c2, c3 = st.columns([1, 1, 2])
-        min_date_filter = df_schedule['data_inizio'].min().date()
-        max_date_filter = df_schedule['data_fine'].max().date()
+        min_date_filter, max_date_filter = bounds
 
         # Inizializza le date in session_state se non presenti o fuori range
         if 'cron_date_from' not in st.session_state or st.session_state.cron_date_from < min_date_filter:
@@ -88,11 +138,13 @@ else:
                 st.session_state.cron_date_to = date_to
                 st.rerun()
 
-    # --- FILTRAGGIO DATI BASATO SUI VALORI IN SESSIONE ---
-    df_filtered = df_schedule[
-        (df_schedule['data_inizio'].dt.date <= st.session_state.cron_date_to) &
-        (df_schedule['data_fine'].dt.date >= st.session_state.cron_date_from)
-    ].copy()
+    # --- SOLO LE ATTIVITÀ DELLA FINESTRA (query indicizzata sulle date) ---
+    df_filtered = pd.DataFrame(schedule_db_manager.get_schedule_range(st.session_state.cron_date_from, st.session_state.cron_date_to),
+                               columns=list(df_schedule_original.columns))
+    df_filtered['data_inizio'] = pd.to_datetime(df_filtered['data_inizio'])
+    df_filtered['data_fine'] = pd.to_datetime(df_filtered['data_fine'])
+    df_filtered = df_filtered.merge(df_cpm, on='id_attivita', how='left')
+    df_filtered['critica'] = df_filtered['critica'].fillna(False).astype(bool)
 
     st.header(f"Analisi dal {st.session_state.cron_date_from.strftime('%d/%m/%Y')} al {st.session_state.cron_date_to.strftime('%d/%m/%Y')}")
     st.divider()
@@ -100,6 +152,19 @@ else:
     if df_filtered.empty:
         st.info("Nessuna attività trovata nell'intervallo di date selezionato.")
     else:
+        # --- AVANZAMENTO: IMPORTATO O DERIVATO DALLE ORE REGISTRATE ---
+        use_derived = st.toggle("Avanzamento da ore registrate", value=False,
+                                help="Ore di lavoro registrate sull'attività / monte ore del template. "
+                                     "Le attività senza template mantengono l'avanzamento importato.")
+        if use_derived:
+            progress_engine.sync()
+            df_derived = pd.DataFrame.from_dict(schedule_db_manager.get_avanzamento(), orient='index')
+            df_filtered = df_filtered.drop(columns=list(DERIVED_PROGRESS_COLUMNS), errors='ignore').merge(
+                df_derived[list(DERIVED_PROGRESS_COLUMNS)], left_on='id_attivita', right_index=True, how='left')
+            df_filtered['stato_avanzamento'] = df_filtered['avanzamento_derivato'].fillna(df_filtered['stato_avanzamento'])
+        else:
+            df_filtered = df_filtered.drop(columns=list(DERIVED_PROGRESS_COLUMNS), errors='ignore')
+
         # --- PREPARAZIONE DATI PER IL GRAFICO E KPI ---
         def get_status(p): return "Completato" if int(p) >= 100 else "In Corso" if int(p) > 0 else "Non Iniziato"
         df_filtered['stato'] = df_filtered['stato_avanzamento'].apply(get_status)
@@ -107,50 +172,37 @@ else:
         # --- GANTT CHART CON LOGICA COLORE CORRETTA ---
         st.subheader("Gantt Chart Interattivo con Avanzamento")
         
-        gantt_data = []
-        for _, row in df_filtered.iterrows():
-            desc = row['descrizione']
-            start = row['data_inizio']
-            end = row['data_fine']
-            progress = row['stato_avanzamento']
-            
-            duration = (end - start).total_seconds()
-            if duration > 0:
-                progress_end_date = start + timedelta(seconds=(duration * (progress / 100)))
-            else:
-                progress_end_date = start
+        baselines = schedule_db_manager.get_baselines()
+        g1, g2 = st.columns([1, 2])
+        with g1:
+            show_critical = st.toggle("Evidenzia percorso critico", value=True)
+        with g2:
+            overlay_baseline = st.selectbox("Confronta con baseline", [None] + [b['id_baseline'] for b in baselines],
+                                            format_func=lambda i: "Nessuna" if i is None else next(b['nome'] for b in baselines if b['id_baseline'] == i))
+        # Vista raggruppata per commessa o tipo (predefinita oltre GANTT_MAX_ATTIVITA attività), con dettaglio per gruppo
+        viste = {"Per attività": None, **{f"Per {label.lower()}": by for by, label in RAGGRUPPAMENTI.items()}}
+        vista = st.radio("Vista del Gantt", list(viste), index=int(len(df_filtered) > GANTT_MAX_ATTIVITA),
+                         horizontal=True, key="gantt_vista")
+        by = viste[vista]
+        espandi = []
+        if by is not None:
+            gruppi = sorted(group_keys(df_filtered, by, workflow_engine).unique())
+            espandi = st.multiselect("Espandi gruppi (dettaglio delle attività)", gruppi, key=f"gantt_espandi_{by}")
+        bars = gantt_bars(gantt_rows(df_filtered, by, espandi, workflow_engine), show_critical)
 
-            if progress > 0:
-                gantt_data.append(dict(Task=desc, Start=start, Finish=progress_end_date, Segmento=f'Avanzamento', Color=get_progress_color(progress), Progress=progress))
-            if progress < 100:
-                gantt_data.append(dict(Task=desc, Start=progress_end_date, Finish=end, Segmento='Rimanente', Color='rgba(108, 117, 125, 0.5)', Progress=progress))
-            if progress == 0:
-                gantt_data.append(dict(Task=desc, Start=start, Finish=end, Segmento='Rimanente', Color='rgba(108, 117, 125, 0.5)', Progress=progress))
+        base = None
+        if overlay_baseline is not None:
+            df_base = pd.DataFrame(schedule_db_manager.get_baseline_schedule(overlay_baseline))
+            df_base = df_base[df_base['id_attivita'].isin(df_filtered['id_attivita'])] if not df_base.empty else df_base
+            if not df_base.empty:
+                for col in ('data_inizio', 'data_fine'):
+                    df_base[col] = pd.to_datetime(df_base[col])
+                # Stesse righe del Gantt (gruppi o attività), allineate per chiave e livello
+                base = gantt_rows(df_base, by, espandi, workflow_engine)[['chiave', 'livello', 'data_inizio', 'data_fine']].merge(
+                    bars[['chiave', 'livello', 'y', 'etichetta']], on=['chiave', 'livello'])
 
-        if gantt_data:
-            df_gantt = pd.DataFrame(gantt_data)
-            
-            color_map = {color: color for color in df_gantt['Color'].unique()}
-
-            fig = px.timeline(
-                df_gantt,
-                x_start="Start", x_end="Finish", y="Task",
-                color="Color",
-                custom_data=['Progress'],
-                color_discrete_map=color_map
-            )
-            
-            fig.update_traces(hovertemplate="<b>%{y}</b><br>Progresso: %{customdata[0]}%<extra></extra>")
-            fig.update_layout(
-                height=max(400, len(df_filtered['descrizione'].unique()) * 35),
-                yaxis_title=None, xaxis_title="Linea del Tempo",
-                paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor=st.get_option("theme.secondaryBackgroundColor"),
-                font_color=st.get_option("theme.textColor"),
-                showlegend=False,
-                xaxis_type='date'
-            )
-            fig.update_yaxes(autorange="reversed")
-            st.plotly_chart(fig, use_container_width=True)
+        if not bars.empty:
+            st.plotly_chart(gantt_figure(bars, base), use_container_width=True)
         else:
             st.info("Nessuna attività da visualizzare nel grafico.")
             
@@ -168,11 +220,115 @@ else:
             ((df_filtered['stato'] == 'Non Iniziato') & (df_filtered['data_inizio'] < oggi))
         ])
 
-        kpi1, kpi2, kpi3, kpi4 = st.columns(4)
+        kpi1, kpi2, kpi3, kpi4, kpi5, kpi6 = st.columns(6)
         kpi1.metric("Totale Attività", total_tasks)
         kpi2.metric("✅ Completate", completed, f"{round(completed/total_tasks*100) if total_tasks > 0 else 0}%")
         kpi3.metric("⏳ In Corso", in_progress, f"{round(in_progress/total_tasks*100) if total_tasks > 0 else 0}%")
         kpi4.metric("🚨 In Ritardo", delayed, delta_color="inverse")
+        kpi5.metric("🔴 Critiche", int(df_filtered['critica'].sum()))
+        planned_end = bounds[1]
+        forecast_end = cpm.project_finish
+        kpi6.metric("🏁 Fine Prevista (CPM)", forecast_end.strftime('%d/%m/%Y') if forecast_end else "N/D",
+                    f"{(forecast_end - planned_end).days:+d} gg" if forecast_end else None, delta_color="inverse")
+
+        critical_chain = cpm.critical_path()
+        if critical_chain:
+            st.caption("Percorso critico: " + " → ".join(critical_chain))
+        if cpm.ignored_edges:
+            st.warning(f"Predecessori ciclici ignorati: {', '.join(f'{a}→{b}' for a, b, _, _ in cpm.ignored_edges)}")
+
+        with st.expander("🎲 Previsione probabilistica di completamento (Monte Carlo)"):
+            st.caption("Durate residue campionate per fase (storico produttività dei ruoli dalle ore registrate, "
+                       "altrimenti incertezza dei template) e propagate sui predecessori.")
+            mc1, mc2 = st.columns([1, 3])
+            n_trials = mc1.number_input("Simulazioni", 1000, 50000, DEFAULT_TRIALS, step=1000)
+            if mc1.button("Simula", type="primary"):
+                with st.spinner("Simulazione in corso..."):
+                    alloc = shift_service.get_resource_allocation_data()
+                    st.session_state.mc_forecast = workflow_engine.forecast_completion(
+                        df_schedule_original.to_dict('records'), alloc['worked_hours'],
+                        shift_service.get_ore_per_attivita_ruolo(), status_date=date.today(),
+                        n_trials=int(n_trials), seed=42, processes=MONTE_CARLO_PROCESSES)
+            forecast = st.session_state.get('mc_forecast')
+            if forecast is not None:
+                date_cols = {c: st.column_config.DateColumn(label, format="DD/MM/YYYY") for c, label in (
+                    ('fine_pianificata', 'Fine Pianificata'), ('fine_cpm', 'Fine CPM'), ('p50', 'P50'), ('p80', 'P80'), ('p95', 'P95'))}
+                prob_col = st.column_config.ProgressColumn("Prob. entro Fine Pianificata", format="%.0f%%", min_value=0, max_value=100)
+                mc2.markdown(f"**Per commessa** ({forecast.n_trials:,} simulazioni al {forecast.status_date.strftime('%d/%m/%Y')})")
+                mc2.dataframe(forecast.commesse.assign(prob_entro_fine=forecast.commesse['prob_entro_fine'] * 100),
+                              use_container_width=True, hide_index=True,
+                              column_config={**date_cols, "commessa": "Commessa", "n_attivita": "Attività", "prob_entro_fine": prob_col})
+                if forecast.productivity_roles:
+                    st.caption("Produttività da storico per: " + ", ".join(forecast.productivity_roles))
+                acts = forecast.activities[forecast.activities['id_attivita'].isin(df_filtered['id_attivita'])]
+                st.dataframe(acts.assign(prob_entro_fine=acts['prob_entro_fine'] * 100).sort_values('p80'),
+                             use_container_width=True, hide_index=True,
+                             column_config={**date_cols, "id_attivita": "ID", "commessa": "Commessa", "prob_entro_fine": prob_col})
+
+        with st.expander("🔗 Analisi d'impatto sulle dipendenze"):
+            st.caption("Attività a valle (che slittano se queste ritardano) o a monte (da cui dipendono), "
+                       "sui predecessori diretti e indiretti di tutto il cronoprogramma.")
+            i1, i2 = st.columns([3, 1])
+            selezione = i1.multiselect("Attività", df_schedule_original['id_attivita'].tolist(), key="impatto_attivita")
+            verso = i2.radio("Direzione", ["A valle", "A monte"], horizontal=True, key="impatto_direzione")
+            if selezione:
+                df_impatto = dependency_graph.closure(selezione, 'valle' if verso == "A valle" else 'monte')
+                st.markdown(f"**{len(df_impatto)} attività** {verso.lower()}, di cui {int(df_impatto['diretta'].sum())} collegate direttamente")
+                st.dataframe(df_impatto.merge(df_cpm[['id_attivita', 'float_totale', 'critica']], on='id_attivita', how='left'),
+                             use_container_width=True, hide_index=True,
+                             column_config={"id_attivita": "ID", "descrizione": "Descrizione", "data_inizio": "Inizio",
+                                            "data_fine": "Fine", "stato_avanzamento": st.column_config.ProgressColumn("Avanzamento", format="%d%%", min_value=0, max_value=100),
+                                            "commessa": "Commessa", "diretta": st.column_config.CheckboxColumn("Diretta"),
+                                            "float_totale": "Float (gg)", "critica": "Critica"})
+
+        with st.expander("💶 Earned Value per commessa (PV / EV / AC)"):
+            st.caption("PV dalle date del cronoprogramma e dalle ore dei template, EV da avanzamento x budget, "
+                       "AC dalle ore registrate x costo orario del ruolo. Snapshot giornalieri aggiornati in modo incrementale.")
+            evm = shift_service.get_earned_value_engine(workflow_engine)
+            # La pagina legge solo gli snapshot salvati: l'aggiornamento (scrittura su DB) è un'azione esplicita
+            ultimo = evm.last_snapshot_day()
+            u1, u2 = st.columns([3, 1])
+            if ultimo is None:
+                u1.info("Nessuno snapshot salvato: premere 'Aggiorna snapshot' per calcolare lo storico.")
+            elif ultimo < date.today():
+                u1.warning(f"Ultimo snapshot al {ultimo.strftime('%d/%m/%Y')}: aggiornare per includere i giorni mancanti.")
+            else:
+                u1.caption(f"Snapshot aggiornati a oggi ({ultimo.strftime('%d/%m/%Y')}).")
+            if u2.button("Aggiorna snapshot", key="evm_update"):
+                with st.spinner("Aggiornamento snapshot earned value..."):
+                    esito = evm.update_snapshots(df_schedule_original.to_dict('records'))
+                u1.success(f"Snapshot aggiornati: {esito['giorni']} giorni, {esito['righe_attivita']:,} righe attività.")
+            commesse = sorted(df_schedule_original['commessa'].dropna().astype(str).unique())
+            scelta = st.selectbox("Commessa", [TOTALE] + commesse, key="evm_commessa")
+            trend = evm.trend_commessa(scelta)
+            if trend.empty:
+                st.info("Nessuno snapshot disponibile.")
+            else:
+                last = trend.iloc[-1]
+                e1, e2, e3, e4, e5 = st.columns(5)
+                e1.metric("BAC", f"€ {last['bac']:,.0f}")
+                e2.metric("EV / PV", f"€ {last['ev']:,.0f}", f"€ {last['sv']:+,.0f}")
+                e3.metric("AC", f"€ {last['ac']:,.0f}", f"€ {last['cv']:+,.0f}")
+                e4.metric("CPI", f"{last['cpi']:.2f}" if pd.notna(last['cpi']) else "N/D")
+                e5.metric("SPI", f"{last['spi']:.2f}" if pd.notna(last['spi']) else "N/D")
+                fig_evm = px.line(trend.melt(id_vars='giorno', value_vars=['pv', 'ev', 'ac'], var_name='Serie', value_name='€'),
+                                  x='giorno', y='€', color='Serie', title="Curve PV / EV / AC")
+                st.plotly_chart(fig_evm, use_container_width=True)
+                fig_idx = px.line(trend.melt(id_vars='giorno', value_vars=['cpi', 'spi'], var_name='Indice', value_name='Valore'),
+                                  x='giorno', y='Valore', color='Indice', title="Indici CPI / SPI")
+                fig_idx.add_hline(y=1.0, line_dash="dot")
+                st.plotly_chart(fig_idx, use_container_width=True)
+                if trend['ev_stimato'].any():
+                    st.caption("I giorni precedenti al primo aggiornamento hanno EV stimato dalle ore lavorate.")
+            status = evm.status()
+            status = status[status['id_attivita'].isin(df_filtered['id_attivita'])]
+            if not status.empty:
+                st.dataframe(status[['id_attivita', 'commessa', 'bac', 'pv', 'ev', 'ac', 'cpi', 'spi', 'eac']].sort_values('cpi'),
+                             use_container_width=True, hide_index=True,
+                             column_config={"id_attivita": "ID", "commessa": "Commessa",
+                                            **{c: st.column_config.NumberColumn(c.upper(), format="€ %.0f") for c in ('bac', 'pv', 'ev', 'ac', 'eac')},
+                                            "cpi": st.column_config.NumberColumn("CPI", format="%.2f"),
+                                            "spi": st.column_config.NumberColumn("SPI", format="%.2f")})
 
         with st.expander("Mostra dettaglio tabellare"):
             st.dataframe(
@@ -186,15 +342,66 @@ else:
                     "stato_avanzamento": st.column_config.ProgressColumn("Avanzamento", format="%d%%", width="medium"),
                     "commessa": "Commessa",
                     "predecessori": "Predecessori",
-                    "stato": "Stato"
+                    "stato": "Stato",
+                    "inizio_presto": st.column_config.DateColumn("Inizio al più presto", format="DD/MM/YYYY"),
+                    "fine_presto": st.column_config.DateColumn("Fine al più presto", format="DD/MM/YYYY"),
+                    "float_totale": "Float (gg)",
+                    "critica": "Critica",
+                    "ore_consuntivate": st.column_config.NumberColumn("Ore registrate", format="%.1f"),
+                    "avanzamento_derivato": None,
+                    "affidabilita_avanzamento": "Affidabilità",
+                    "avanzamento_aggiornato_il": None,
+                    "row_hash": None
                 }
             )
 
+        with st.expander("📌 Baseline e scostamenti dal piano"):
+            b1, b2 = st.columns([3, 1])
+            nome_baseline = b1.text_input("Nome della nuova baseline", placeholder=f"Baseline {date.today():%d/%m/%Y}")
+            b2.write("")
+            if b2.button("Salva baseline", use_container_width=True):
+                try:
+                    schedule_db_manager.create_baseline(nome_baseline or f"Baseline {datetime.now():%d/%m/%Y %H:%M}")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Baseline non salvata: {e}")
+
+            if baselines:
+                nomi = {b['id_baseline']: f"{b['nome']} ({b['n_attivita']} attività)" for b in baselines}
+                d1, d2 = st.columns(2)
+                da = d1.selectbox("Dalla baseline", list(nomi), format_func=nomi.get)
+                a = d2.selectbox("Alla versione", [None] + list(nomi), format_func=lambda i: "Cronoprogramma attuale" if i is None else nomi[i])
+                df_diff = pd.DataFrame(schedule_db_manager.diff_baselines(da, a))
+                if df_diff.empty:
+                    st.success("Nessuna differenza tra le due versioni.")
+                else:
+                    modificate = df_diff[df_diff['stato'] == 'modificata']
+                    m1, m2, m3, m4 = st.columns(4)
+                    m1.metric("Modificate", len(modificate))
+                    m2.metric("Aggiunte", int((df_diff['stato'] == 'aggiunta').sum()))
+                    m3.metric("Rimosse", int((df_diff['stato'] == 'rimossa').sum()))
+                    m4.metric("Slittamento medio fine", f"{modificate['slittamento_fine'].mean():+.1f} gg" if not modificate.empty else "N/D")
+                    st.dataframe(df_diff, use_container_width=True, hide_index=True,
+                                 column_config={"id_attivita": "ID", "stato": "Variazione", "descrizione": "Descrizione",
+                                                "slittamento_inizio": st.column_config.NumberColumn("Δ Inizio (gg)", format="%+d"),
+                                                "slittamento_fine": st.column_config.NumberColumn("Δ Fine (gg)", format="%+d")})
+                if st.button("🗑️ Elimina la baseline selezionata"):
+                    schedule_db_manager.delete_baseline(da)
+                    st.rerun()
+
+    import_errors = st.session_state.get('schedule_import_errors')
+    if import_errors:
+        with st.expander(f"⚠️ Righe con segnalazioni nell'ultimo import: {len({e['riga'] for e in import_errors})}"):
+            st.dataframe(pd.DataFrame(import_errors).astype({'valore': str}), use_container_width=True, hide_index=True,
+                         column_config={"riga": "Riga / Task", "colonna": "Colonna", "valore": "Valore", "errore": "Errore"})
+
     # --- UPLOADER IN FONDO ALLA PAGINA ---
     with st.expander("➕ Carica o aggiorna file di Cronoprogramma", expanded=False):
+        st.checkbox("Rimuovi le attività assenti dal file (import del cronoprogramma completo)",
+                    key="cronoprogramma_delete_missing")
         st.file_uploader(
             "Seleziona file", 
-            type=["xlsx"], 
+            type=sorted(IMPORTERS), 
             key="cronoprogramma_uploader_on_page", 
             on_change=process_schedule_file_on_page,
             label_visibility="collapsed"
@@ -1,4 +1,4 @@
-# server/pages/05_⚙️_Workflow_Analysis.py (VERSIONE SINCRONIZZATA E STABILE)
+# server/pages/05_⚙️_Workflow_Analysis.py (VERSIONE SCENARI WHAT-IF)
 
 from __future__ import annotations
 import os
@@ -9,27 +9,58 @@ import plotly.graph_objects as go
 import plotly.express as px
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
-from core.workflow_engine import get_workflow_info, analyze_resource_allocation
+from datetime import date, timedelta
+from core.workflow_engine import get_workflow_info, analyze_resource_aggregates, workflow_engine, WorkRole
+from core.resource_scheduler import PRIORITY_RULES, DEFAULT_HORIZON_DAYS
+from core.capacity_model import DEFAULT_WEEKS
+from core.shift_service import shift_service, RESOURCE_WINDOW_DAYS
+from core.schedule_db import schedule_db_manager
+from core.scenarios import ScenarioDelta, ScenarioError, ScenarioPlanner, load_scenarios, SPOSTA, OPERAI
 
 st.set_page_config(page_title="Analisi Strategica Workflow", page_icon="⚙️", layout="wide")
 st.title("⚙️ Analisi Strategica Workflow e Risorse")
 st.markdown("Dashboard per l'analisi strategica del fabbisogno di ore, l'identificazione di colli di bottiglia futuri e l'ottimizzazione delle risorse.")
 st.divider()
 
-df_presence = st.session_state.get('df_presence', pd.DataFrame())
 df_schedule = st.session_state.get('df_schedule', pd.DataFrame())
-presence_data = df_presence.to_dict('records') if not df_presence.empty else []
 schedule_data = df_schedule.to_dict('records') if not df_schedule.empty else []
 
+# Ore consuntivate e operai per ruolo: GROUP BY in SQL sul CRM, in cache per versione dati
+allocation_data = shift_service.get_resource_allocation_data()
+
+def load_plan_inputs(start: date, days: int):
+    """Operai attivi, ore pianificate dai turni (id_dipendente, giorno, ore) e ore già lavorate per attività."""
+    workers = shift_service.get_dipendenti_df(solo_attivi=True).reset_index().to_dict('records')
+    availability = shift_service.get_disponibilita_operai(start, start + timedelta(days=days - 1))
+    return workers, availability, allocation_data['worked_hours']
+
 analysis_results = None
-if presence_data and schedule_data:
+if schedule_data:
     try:
-        analysis_results = analyze_resource_allocation(presence_data, schedule_data)
+        # Colli di bottiglia settimana per settimana: operai attivi e turni pianificati da questa settimana
+        monday = date.today() - timedelta(days=date.today().weekday())
+        workers, availability, worked_hours = load_plan_inputs(monday, DEFAULT_WEEKS * 7)
+        analysis_results = analyze_resource_aggregates(schedule_data, worked_hours, allocation_data['workers_by_role'],
+                                                       workers, availability, suggest=False)
     except Exception as e:
         st.error(f"Errore critico durante l'analisi: {e}")
         st.info("Controllare la logica in 'core/workflow_engine.py'.")
 
-tab1, tab2, tab3 = st.tabs(["📊 **Dashboard Strategica**", "🔄 **Templates Workflow**", "🎯 **Suggerimenti**"])
+def get_scenario_planner(n_trials: int) -> ScenarioPlanner:
+    """Caso base in sessione: si ricalcola solo se cambiano giorno, ore registrate, cronoprogramma o simulazioni."""
+    key = (date.today(), shift_service.get_data_version(), int(pd.util.hash_pandas_object(df_schedule, index=False).sum()), n_trials)
+    if st.session_state.get('scenario_planner_key') != key:
+        monday = date.today() - timedelta(days=date.today().weekday())
+        workers, availability, worked_hours = load_plan_inputs(monday, DEFAULT_WEEKS * 7)
+        st.session_state.scenario_planner = ScenarioPlanner(
+            workflow_engine, schedule_data, workers, worked_hours, availability,
+            hours_by_role=shift_service.get_ore_per_attivita_ruolo() if n_trials else None,
+            status_date=date.today(), n_trials=n_trials)
+        st.session_state.scenario_planner_key = key
+    return st.session_state.scenario_planner
+
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 **Dashboard Strategica**", "🔄 **Templates Workflow**", "🎯 **Suggerimenti**",
+                                        "📅 **Capacità Settimanale**", "🧪 **Scenari What-If**"])
 
 with tab1:
     st.header("Dashboard di Analisi Strategica")
@@ -44,7 +75,7 @@ with tab1:
         kpi1, kpi2, kpi3 = st.columns(3)
         kpi1.metric("⏱️ Fabbisogno Ore Residue", f"{sum(demand.values()):,.0f} h")
         kpi2.metric("🚨 Colli di Bottiglia Critici", len(crit_b))
-        kpi3.metric("👷 Operai Disponibili", sum(workers.values()))
+        kpi3.metric("👷 Operai Disponibili", sum(workers.values()), help=f"Operai attivi con ore registrate negli ultimi {RESOURCE_WINDOW_DAYS} giorni")
         st.divider()
 
         col1, col2 = st.columns(2)
@@ -57,15 +88,20 @@ with tab1:
         with col2:
             st.subheader("Analisi Colli di Bottiglia")
             if bottlenecks:
-                st.dataframe(pd.DataFrame(bottlenecks), use_container_width=True, hide_index=True, column_config={"role": "Ruolo", "severity": "Criticità", "demand_hours": "Ore Richieste", "available_workers": "Operai Disp.", "shortage_hours": "Carenza Ore"})
+                st.dataframe(pd.DataFrame(bottlenecks), use_container_width=True, hide_index=True, column_config={"role": "Ruolo", "severity": "Criticità", "demand_hours": "Ore Richieste", "available_workers": "Operai Disp.", "shortage_hours": "Carenza Ore",
+                             "critical_weeks": "Settimane Critiche", "first_week": st.column_config.DateColumn("Prima Settimana", format="DD/MM/YYYY")})
             else:
                 st.success("✅ Nessun collo di bottiglia rilevato.")
     else:
-        st.warning("⚠️ Dati insufficienti. Carica rapportino e cronoprogramma.")
+        st.warning("⚠️ Dati insufficienti. Carica il cronoprogramma.")
 
 with tab2:
     st.header("Visualizzazione Workflow Standard")
-    template_type = st.selectbox("Seleziona tipo attività", ['MON', 'FAM'], format_func=lambda x: {'MON': 'Montaggio Scafo', 'FAM': 'Fuori Apparato Motore'}[x])
+    templates = workflow_engine.templates
+    if workflow_engine.registry.last_error:
+        st.warning(f"File dei template non valido ({workflow_engine.registry.path.name}), in uso la versione "
+                   f"{workflow_engine.registry.snapshot.version}: {workflow_engine.registry.last_error}")
+    template_type = st.selectbox("Seleziona tipo attività", list(templates), format_func=lambda x: f"{x} - {templates[x].name}")
     wf_info = get_workflow_info(f"{template_type}-001")
     if 'error' not in wf_info:
         st.markdown(f"#### {wf_info.get('name', 'N/D')} (Monte Ore Standard: {wf_info.get('total_hours', 0)}h)")
@@ -79,4 +115,154 @@ with tab2:
 
 with tab3:
     st.header("Suggerimenti Allocazione Risorse")
-    st.info("Funzionalità in fase di sviluppo.")
\ No newline at end of file
+    st.caption("Piano a risorse limitate: fasi dei workflow, operai per ruolo e turni pianificati (turni_master).")
+    if not schedule_data:
+        st.warning("⚠️ Carica il cronoprogramma per calcolare il piano.")
+    else:
+        c1, c2, c3 = st.columns(3)
+        plan_start = c1.date_input("Inizio piano", date.today())
+        rule = c2.selectbox("Regola di priorità", list(PRIORITY_RULES), format_func=lambda r: {
+            'EDD': 'Scadenza più vicina', 'MTS': 'Più successori', 'MWR': 'Più lavoro residuo', 'FIFO': 'Ordine pianificato'}[r])
+        horizon = c3.number_input("Orizzonte (giorni)", 30, 1095, DEFAULT_HORIZON_DAYS, step=30)
+        if st.button("Calcola Piano Risorse", type="primary"):
+            with st.spinner("Pianificazione in corso..."):
+                workers, availability, worked_hours = load_plan_inputs(plan_start, int(horizon))
+                st.session_state.resource_plan = workflow_engine.plan_resources(
+                    schedule_data, workers, worked_hours, availability,
+                    start_date=plan_start, horizon_days=int(horizon), priority_rule=rule)
+        plan = st.session_state.get('resource_plan')
+        if plan is not None:
+            acts = plan.activities
+            k1, k2, k3 = st.columns(3)
+            k1.metric("Attività Pianificate", f"{int(acts['completata'].sum())}/{len(acts)}")
+            k2.metric("In Ritardo sulla Scadenza", int((acts['ritardo_giorni'] > 0).sum()))
+            k3.metric("Ore Oltre l'Orizzonte", f"{sum(plan.unscheduled_hours.values()):,.0f} h")
+            st.dataframe(acts, use_container_width=True, hide_index=True, column_config={
+                "id_attivita": "Attività", "inizio": "Inizio", "fine": "Fine", "scadenza": "Scadenza",
+                "ritardo_giorni": "Ritardo (gg)", "ore_residue": "Ore Non Pianificate", "completata": "Completata"})
+            st.subheader("Assegnazioni Operai per Giorno")
+            st.dataframe(plan.assignments, use_container_width=True, hide_index=True)
+
+with tab4:
+    st.header("Capacità e Domanda per Ruolo e Settimana")
+    st.caption("Capacità dai turni pianificati (oltre: calendario lun-ven senza festività); domanda dalle fasi residue distribuite sulle date del cronoprogramma.")
+    if not schedule_data:
+        st.warning("⚠️ Carica il cronoprogramma per calcolare la capacità.")
+    else:
+        c1, c2 = st.columns(2)
+        cap_start = c1.date_input("Dal giorno", date.today(), key="cap_start")
+        n_weeks = c2.number_input("Settimane", 4, 104, DEFAULT_WEEKS, step=4)
+        if st.button("Calcola Capacità", type="primary"):
+            with st.spinner("Calcolo capacità in corso..."):
+                monday = cap_start - timedelta(days=cap_start.weekday())
+                workers, availability, worked_hours = load_plan_inputs(monday, int(n_weeks) * 7)
+                st.session_state.capacity_plan = workflow_engine.plan_capacity(
+                    schedule_data, workers, worked_hours, availability, start_date=cap_start, weeks=int(n_weeks))
+        cap_plan = st.session_state.get('capacity_plan')
+        if cap_plan is not None:
+            weekly = cap_plan.to_frame()
+            critical = cap_plan.bottlenecks()
+            summary = cap_plan.summary_by_role()
+            k1, k2, k3 = st.columns(3)
+            k1.metric("Settimane-Ruolo in Sofferenza", len(critical))
+            k2.metric("Ruolo Più Scoperto", summary.iloc[0]['ruolo'] if not summary.empty and summary.iloc[0]['carenza'] > 0 else "—")
+            k3.metric("Ore Oltre l'Orizzonte", f"{sum(cap_plan.beyond_horizon_hours.values()):,.0f} h")
+            if cap_plan.undated_hours:
+                st.info(f"ℹ️ {sum(cap_plan.undated_hours.values()):,.0f} h residue su attività senza date valide: escluse dal calcolo.")
+
+            heat = weekly.pivot(index='ruolo', columns='settimana', values='utilizzo').clip(upper=2.0)
+            fig = px.imshow(heat, aspect='auto', color_continuous_scale='RdYlGn_r', zmin=0, zmax=2,
+                            labels={'color': 'Utilizzo', 'x': 'Settimana', 'y': 'Ruolo'},
+                            title="Utilizzo della capacità (domanda / ore disponibili, >1 = collo di bottiglia)")
+            st.plotly_chart(fig, use_container_width=True)
+
+            st.subheader("Riepilogo per Ruolo")
+            st.dataframe(summary, use_container_width=True, hide_index=True, column_config={
+                "ruolo": "Ruolo", "operai": "Operai", "capacita": "Ore Disponibili", "domanda": "Ore Richieste",
+                "settimane_critiche": "Settimane Critiche", "carenza": "Carenza Ore", "prima_settimana_critica": "Prima Settimana Critica"})
+            st.subheader("Settimane Critiche")
+            if critical.empty:
+                st.success("✅ Nessuna settimana con domanda oltre la capacità.")
+            else:
+                st.dataframe(critical, use_container_width=True, hide_index=True, column_config={
+                    "settimana": "Settimana", "ruolo": "Ruolo", "capacita": "Ore Disponibili", "domanda": "Ore Richieste",
+                    "utilizzo": st.column_config.NumberColumn("Utilizzo", format="%.2f"), "carenza": "Carenza Ore", "severita": "Criticità"})
+
+with tab5:
+    st.header("Scenari What-If")
+    st.caption("Varianti del cronoprogramma e della forza lavoro salvate come sole differenze: i dati reali non cambiano. "
+               "Per ogni scenario si ricalcolano solo le attività toccate (CPM, capacità settimanale, previsione).")
+    if not schedule_data:
+        st.warning("⚠️ Carica il cronoprogramma per lavorare sugli scenari.")
+    else:
+        scenari = load_scenarios(schedule_db_manager)
+        c1, c2 = st.columns([2, 1])
+        with c2:
+            with st.form("nuovo_scenario", clear_on_submit=True):
+                nome = st.text_input("Nuovo scenario")
+                descrizione = st.text_input("Descrizione")
+                if st.form_submit_button("Crea Scenario") and nome.strip():
+                    schedule_db_manager.create_scenario(nome.strip(), descrizione or None)
+                    st.rerun()
+        with c1:
+            if not scenari:
+                st.info("Nessuno scenario salvato: creane uno.")
+            else:
+                scelto = st.selectbox("Scenario", scenari, format_func=lambda sc: f"{sc.nome} ({len(sc.deltas)} differenze)")
+                righe = schedule_db_manager.get_scenario_deltas(scelto.id_scenario)
+                if righe:
+                    st.dataframe(pd.DataFrame(righe).assign(valori=lambda d: d['valori'].astype(str)),
+                                 use_container_width=True, hide_index=True,
+                                 column_config={"id_delta": "ID", "tipo": "Tipo", "chiave": "Attività / Ruolo", "valori": "Valori"})
+                tipo = st.radio("Nuova differenza", ["Sposta attività", "Operai per ruolo"], horizontal=True)
+                d1, d2, d3 = st.columns(3)
+                if tipo == "Sposta attività":
+                    act = d1.selectbox("Attività", [r['id_attivita'] for r in schedule_data])
+                    giorni = d2.number_input("Giorni (+ ritardo, - anticipo)", -365, 365, 7)
+                    delta = (SPOSTA, act, {'giorni': int(giorni)})
+                else:
+                    ruolo = d1.selectbox("Ruolo", [r.value for r in WorkRole])
+                    numero = d2.number_input("Operai (+ in più, - in meno)", -100, 100, 2)
+                    dal = d3.date_input("Dal", date.today() + timedelta(days=7 - date.today().weekday()))
+                    delta = (OPERAI, ruolo, {'numero': int(numero), 'dal': dal.isoformat(), 'al': None})
+                b1, b2, b3 = st.columns(3)
+                if b1.button("Aggiungi Differenza", type="primary"):
+                    try:
+                        ScenarioDelta.create(*delta)
+                        schedule_db_manager.add_scenario_delta(scelto.id_scenario, *delta)
+                        st.rerun()
+                    except ScenarioError as e:
+                        st.error(str(e))
+                if righe and b2.button("Rimuovi Ultima Differenza"):
+                    schedule_db_manager.delete_scenario_delta(righe[-1]['id_delta'])
+                    st.rerun()
+                if b3.button("Elimina Scenario"):
+                    schedule_db_manager.delete_scenario(scelto.id_scenario)
+                    st.rerun()
+
+        if scenari:
+            st.divider()
+            st.subheader("Confronto Affiancato")
+            s1, s2 = st.columns([3, 1])
+            nomi = s1.multiselect("Scenari da confrontare", [sc.nome for sc in scenari], default=[sc.nome for sc in scenari])
+            n_sim = s2.number_input("Simulazioni Monte Carlo", 0, 20000, 0, step=1000, help="0 = senza previsione probabilistica")
+            if st.button("Confronta Scenari", type="primary"):
+                with st.spinner("Valutazione scenari..."):
+                    planner = get_scenario_planner(int(n_sim))
+                    scelti = [sc for sc in scenari if sc.nome in nomi]
+                    st.session_state.scenario_cmp = (planner.compare(scelti), planner.weekly_shortage(scelti))
+            confronto = st.session_state.get('scenario_cmp')
+            if confronto is not None:
+                df_cmp, df_short = confronto
+                st.dataframe(df_cmp, use_container_width=True, hide_index=True, column_config={
+                    "scenario": "Scenario", "differenze": "Differenze", "attivita_toccate": "Attività Toccate",
+                    "date_cpm_cambiate": "Date CPM Cambiate", "fine_cpm": st.column_config.DateColumn("Fine CPM", format="DD/MM/YYYY"),
+                    "attivita_critiche": "Critiche", "settimane_critiche": "Settimane-Ruolo Critiche", "carenza_ore": "Carenza Ore",
+                    "picco_utilizzo": st.column_config.NumberColumn("Picco Utilizzo", format="%.2f"),
+                    "p50": st.column_config.DateColumn("P50", format="DD/MM/YYYY"), "p80": st.column_config.DateColumn("P80", format="DD/MM/YYYY"),
+                    "prob_entro_fine": st.column_config.NumberColumn("Prob. entro Fine", format="%.2f"),
+                    "scostamento_giorni": "Scostamento (gg)"})
+                if not df_short.empty:
+                    fig = px.line(df_short, x='settimana', y='carenza', color='scenario',
+                                  title="Carenza di ore per settimana (somma sui ruoli)", labels={'carenza': 'Ore scoperte', 'settimana': 'Settimana'})
+                    st.plotly_chart(fig, use_container_width=True)
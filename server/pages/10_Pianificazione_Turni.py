@@ -1,4 +1,4 @@
-# file: server/pages/10_Pianificazione_Turni.py (Versione 33.5 - Fix Reattività Squadra)
+# file: server/pages/10_Pianificazione_Turni.py (Versione 33.7 - Attività per Finestra)
 from __future__ import annotations
 import os
 import sys
@@ -64,20 +64,20 @@ def load_data():
         dip_map[index] = f"{row['cognome']} {row['nome']} | {icon} {ruolo}"
         role_map[index] = ruolo
 
-    df_sched = st.session_state.get('df_schedule', pd.DataFrame())
-    if df_sched.empty:
-        try:
-            s_data = schedule_db_manager.get_schedule_data()
-            df_sched = pd.DataFrame(s_data)
-            st.session_state.df_schedule = df_sched
-        except Exception as e:
-            # print(f"Errore schedule: {e}") 
-            df_sched = pd.DataFrame()
+    return turni, squadre, df_dip, dip_map, role_map
 
-    return turni, squadre, df_dip, dip_map, role_map, df_sched
+def load_attivita(start: date, end: date, tutte: bool = False) -> list:
+    """Solo le attività in corso nella finestra del turno (query indicizzata), oppure tutte."""
+    try:
+        if tutte:
+            return schedule_db_manager.get_schedule_range(columns=['id_attivita', 'descrizione'])
+        return schedule_db_manager.get_schedule_range(start, end, columns=['id_attivita', 'descrizione'])
+    except Exception as e:
+        # print(f"Errore schedule: {e}")
+        return []
 
 try:
-    lista_turni, lista_squadre, df_dipendenti, dipendenti_map, dip_role_map, df_schedule = load_data()
+    lista_turni, lista_squadre, df_dipendenti, dipendenti_map, dip_role_map = load_data()
     # Dizionario rapido per le squadre
     opts_sq = {s['id_squadra']: s['nome_squadra'] for s in lista_squadre}
 except Exception as e:
@@ -151,8 +151,9 @@ with tab_ord:
                 "OFFICINA": "OFFICINA (Lavoro Interno)",
                 "-1": "--- NESSUNA ATTIVITÀ SPECIFICA ---"
             }
-            if not df_schedule.empty:
-                opts_att.update({r['id_attivita']: f"({r['id_attivita']}) {r.get('descrizione','N/D')}" for _, r in df_schedule.iterrows()})
+            finestra = (d_sel, d_sel) if tipo_inserimento == "Standard (da Turni Predefiniti)" else (d_custom_start, d_custom_end)
+            tutte = st.checkbox("Mostra anche le attività fuori dalla finestra del turno", key="att_tutte")
+            opts_att.update({r['id_attivita']: f"({r['id_attivita']}) {r.get('descrizione') or 'N/D'}" for r in load_attivita(*finestra, tutte=tutte)})
             
             a_sel_id = st.selectbox("Attività", options=opts_att.keys(), format_func=lambda x: opts_att.get(x, x))
             
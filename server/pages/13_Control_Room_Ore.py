@@ -1,4 +1,4 @@
-# file: server/pages/13_✏️_Control_Room_Ore.py (Versione 16.0 - Architettura Service)
+# file: server/pages/13_✏️_Control_Room_Ore.py (Versione 16.2 - Attività per Finestra)
 
 from __future__ import annotations
 import os
@@ -33,18 +33,13 @@ def load_turni_e_attivita(giorno: date):
     df_turni_master = shift_service.get_turni_master_giorno_df(giorno)
     print(f"🔍 DEBUG: Trovati {len(df_turni_master)} turni master")
         
-    df_schedule = st.session_state.get('df_schedule', pd.DataFrame())
-    if df_schedule.empty:
-        schedule_data = schedule_db_manager.get_schedule_data()
-        df_schedule = pd.DataFrame(schedule_data)
-        st.session_state.df_schedule = df_schedule
-        
+    # Solo le attività in corso nel giorno (query indicizzata sulle date)
+    attivita_giorno = schedule_db_manager.get_schedule_range(giorno, giorno, columns=['id_attivita', 'descrizione'])
     opzioni_attivita = {"-1": "N/A (es. Officina)"}
-    if not df_schedule.empty and 'id_attivita' in df_schedule.columns:
-        opzioni_attivita.update({
-            row['id_attivita']: f"({row['id_attivita']}) {row['descrizione'][:30]}..." 
-            for _, row in df_schedule.iterrows()
-        })
+    opzioni_attivita.update({
+        row['id_attivita']: f"({row['id_attivita']}) {(row['descrizione'] or '')[:30]}..."
+        for row in attivita_giorno
+    })
     if not df_turni_master.empty and 'id_attivita' in df_turni_master.columns:
         for id_att in df_turni_master['id_attivita'].unique():
             if id_att and id_att not in opzioni_attivita:
@@ -1,4 +1,4 @@
-# file: server/pages/14_Riepilogo_Calendario.py (Fix Visualizzazione Notturna)
+# file: server/pages/14_Riepilogo_Calendario.py (Calendario Precalcolato e Paginato)
 from __future__ import annotations
 import os
 import sys
@@ -70,130 +70,55 @@ if start_date > end_date:
     st.stop()
 
 # --- 2. CARICAMENTO DATI ---
+# Matrici turni/ore già pronte dal servizio (un groupby, stili calcolati per colonne), in cache per versione dati
 try:
     with st.spinner("Caricamento dati storicizzati..."):
-        df_turni = shift_service.get_turni_master_range_df(start_date, end_date)
+        model = shift_service.get_calendario(start_date, end_date, vista=view_mode.lower())
 except Exception as e:
     st.error(f"Errore nel caricamento dati: {e}")
     st.stop()
 
-if df_turni.empty:
+if model.n_righe == 0:
     st.warning("Nessun turno pianificato trovato per il periodo selezionato.")
     st.stop()
 
-# --- 3. PREPARAZIONE DATI ---
-df_turni['giorno'] = pd.to_datetime(df_turni['data_ora_inizio_effettiva']).dt.date
-
-# Fix Mixed Types Warning: Forziamo id_attivita a stringa
-df_turni['id_attivita'] = df_turni['id_attivita'].fillna("").astype(str)
-
-# Costruzione stringa info turno
-df_turni['turno_info'] = df_turni.apply(
-    lambda row: f"{row['data_ora_inizio_effettiva'].strftime('%H:%M')}-"
-                f"{row['data_ora_fine_effettiva'].strftime('%H:%M')} "
-                f"({row['id_attivita']})",
-    axis=1
-)
-
-# ★ STORICIZZAZIONE: Usa il nome squadra salvato nel turno (o fallback 'Non Assegnata')
-df_turni['squadra_storica'] = df_turni['nome_squadra'].fillna("Non Assegnata")
-
-# Lista completa giorni
-all_days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
-
 # Formattazione Colonne
 if period_mode == "Settimana":
     col_fmt = lambda col: col.strftime('%a %d/%m') if isinstance(col, date) else col
 else:
     col_fmt = lambda col: col.strftime('%d/%m') if isinstance(col, date) else col
 
-# --- 4. FUNZIONI DI STYLING (SENZA MATPLOTLIB) ---
-
-def highlight_cells_info(val):
-    """Stile per celle di testo (info turno)."""
-    if val != '-' and val != 0: return 'background-color: #1C2A44; color: white; white-space: pre-wrap;' # pre-wrap per multiriga
-    return ''
-
-def style_squadra_hours(val):
-    """Simula una heatmap blu per le ore squadra senza dipendenze esterne."""
-    if isinstance(val, (int, float)):
-        if val == 0: return 'color: #e0e0e0'
-        # Sfumature di blu manuali
-        if val < 20: return 'background-color: #dbeafe; color: black' # Blu chiarissimo
-        if val < 50: return 'background-color: #93c5fd; color: black' # Blu medio
-        return 'background-color: #2563eb; color: white' # Blu scuro
-    return ''
-
-def style_dipendente_hours(val):
-    """Stile semaforico per ore dipendente."""
-    if isinstance(val, (int, float)):
-        if val == 0: return 'color: #e0e0e0'
-        if val > 10: return 'background-color: #fee2e2; color: black' # Rosso chiaro (Warning)
-        if val >= 8: return 'background-color: #dcfce7; color: black' # Verde chiaro (OK)
-        return 'background-color: #fef9c3; color: black' # Giallo chiaro (Parziale)
-    return ''
-
-# --- 5. VISUALIZZAZIONE ---
-
-# Funzione lambda per unire più turni nello stesso giorno (es. fine notte + inizio notte successiva)
-# Ordina i turni per orario per avere prima la mattina (00-06) e poi la sera (20-24)
-join_shifts = lambda x: " | ".join(sorted(list(set(x))))
-
+# --- 3. PAGINAZIONE ---
+# Si disegna (e si stila) solo la pagina di righe visibile, non l'intera tabella
+pg1, pg2, pg3 = st.columns([1, 1, 2])
+righe_per_pagina = pg1.selectbox("Righe per pagina", [25, 50, 100, 200], index=1)
+n_pagine = model.n_pagine(righe_per_pagina)
+n_pagina = pg2.number_input("Pagina", min_value=1, max_value=n_pagine, value=1, step=1) if n_pagine > 1 else 1
+righe = model.pagina(n_pagina - 1, righe_per_pagina)
+pg3.caption(f"{model.n_righe} righe — pagina {n_pagina} di {n_pagine}")
+
+def show_page(values: pd.DataFrame, css: pd.DataFrame, fmt=None):
+    """Pagina corrente della matrice con gli stili precalcolati (Styler solo sulle righe visibili)."""
+    labels = [col_fmt(c) for c in values.columns]
+    page, page_css = values.iloc[righe].set_axis(labels, axis=1), css.iloc[righe].set_axis(labels, axis=1)
+    styler = page.style.apply(lambda _: page_css, axis=None)
+    if fmt: styler = styler.format(fmt)
+    st.dataframe(styler, use_container_width=True)
+
+# --- 4. VISUALIZZAZIONE ---
 if view_mode == "Squadra":
     st.header("📅 Calendario per Squadra (Storicizzato)")
-    
-    # PIVOT TURNI (Info)
     st.subheader("Turni Pianificati")
-    piv_turni = df_turni.pivot_table(
-        index='squadra_storica', columns='giorno', values='turno_info',
-        aggfunc=join_shifts, # <--- FIX: Unisce i turni invece di prendere solo il primo
-        fill_value='-'
-    )
-    piv_turni = piv_turni.reindex(columns=all_days, fill_value='-')
-    piv_turni.columns = [col_fmt(c) for c in piv_turni.columns]
-    
-    st.dataframe(piv_turni.style.map(highlight_cells_info), use_container_width=True)
-
-    # PIVOT ORE (Somma)
+    show_page(model.turni, model.stile_turni)
     st.subheader("Monte Ore per Squadra")
-    piv_ore = df_turni.pivot_table(
-        index='squadra_storica', columns='giorno', values='durata_ore',
-        aggfunc='sum', fill_value=0
-    )
-    piv_ore = piv_ore.reindex(columns=all_days, fill_value=0)
-    piv_ore['TOTALE'] = piv_ore.sum(axis=1)
-    piv_ore.columns = [col_fmt(c) for c in piv_ore.columns]
-    
-    # Applica stile personalizzato invece di background_gradient
-    st.dataframe(piv_ore.style.format("{:.2f} h").map(style_squadra_hours), use_container_width=True)
+    show_page(model.ore, model.stile_ore, "{:.2f} h")
 
 else: # Dipendente
     st.header(f"📅 Calendario per Dipendente")
-    
-    # PIVOT TURNI
     st.subheader("Turni Pianificati")
-    piv_turni_dip = df_turni.pivot_table(
-        index=['squadra_storica', 'dipendente_nome'], 
-        columns='giorno', values='turno_info',
-        aggfunc=join_shifts, # <--- FIX: Unisce i turni
-        fill_value='-'
-    ).reindex(columns=all_days, fill_value='-')
-    
-    piv_turni_dip.columns = [col_fmt(c) for c in piv_turni_dip.columns]
-    st.dataframe(piv_turni_dip.style.map(highlight_cells_info), use_container_width=True)
-    
-    # PIVOT ORE
+    show_page(model.turni, model.stile_turni)
     st.subheader("Monte Ore per Dipendente")
-    piv_ore_dip = df_turni.pivot_table(
-        index=['squadra_storica', 'dipendente_nome'], 
-        columns='giorno', values='durata_ore',
-        aggfunc='sum', fill_value=0
-    ).reindex(columns=all_days, fill_value=0)
-    
-    piv_ore_dip['TOTALE'] = piv_ore_dip.sum(axis=1)
-    piv_ore_dip.columns = [col_fmt(c) for c in piv_ore_dip.columns]
-
-    st.dataframe(piv_ore_dip.style.map(style_dipendente_hours).format("{:.2f} h"), use_container_width=True)
+    show_page(model.ore, model.stile_ore, "{:.2f} h")
 
 st.divider()
 st.caption("Nota: I dati visualizzati riflettono la squadra di appartenenza al momento dell'esecuzione del turno (Storicizzazione Attiva).")
\ No newline at end of file
@@ -1,17 +1,16 @@
-# server/pages/15_Stampe_Operative.py
+# server/pages/15_Stampe_Operative.py (Versione Stampe in Blocco)
 from __future__ import annotations
 import os
 import sys
 import streamlit as st
-import pandas as pd
-from datetime import date, timedelta
-import calendar
+from datetime import date
 
 # Setup path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
 try:
     from core.shift_service import shift_service
+    from core.hour_sheets import NOMI_MESI, month_range, sheet_table, table_html, table_rows
 except ImportError as e:
     st.error(f"Errore critico: {e}")
     st.stop()
@@ -56,7 +55,7 @@ st.markdown("""
     /* STILE PER LA STAMPA (Forza Carta Bianca) */
     @media print {
         /* Nascondi interfaccia Streamlit */
-        [data-testid="stSidebar"], header, footer, .stButton, .stSelectbox, .stNumberInput, .stAlert { display: none !important; }
+        [data-testid="stSidebar"], [data-testid="stExpander"], header, footer, .stButton, .stSelectbox, .stNumberInput, .stAlert { display: none !important; }
         .block-container { padding: 0 !important; margin: 0 !important; }
         
         /* Forza BIANCO e NERO assoluto */
@@ -94,7 +93,7 @@ def_m = today.month - 1 if today.day < 10 else today.month
 def_y = today.year
 if def_m == 0: def_m=12; def_y-=1
 
-nomi_mesi = ["Gennaio", "Febbraio", "Marzo", "Aprile", "Maggio", "Giugno", "Luglio", "Agosto", "Settembre", "Ottobre", "Novembre", "Dicembre"]
+nomi_mesi = NOMI_MESI
 
 with c1:
     sel_mese = st.selectbox("Mese", options=nomi_mesi, index=def_m-1)
@@ -113,99 +112,16 @@ st.divider()
 # ==============================================================================
 # 2. LOGICA (Smart Merge + Cambio Turno)
 # ==============================================================================
-start = date(sel_anno, n_mese, 1)
-end = date(sel_anno, n_mese, calendar.monthrange(sel_anno, n_mese)[1])
+start, end = month_range(sel_anno, n_mese)
 
-df_rep = shift_service.get_report_data_df(start, end)
-df_w = df_rep[df_rep['id_dipendente'] == sel_dip].copy() if not df_rep.empty else pd.DataFrame()
+df_w = shift_service.get_riepilogo_turni(start, end, dipendenti=[sel_dip])
 
 if df_w.empty:
     st.warning("⚠️ Nessun dato trovato per il periodo selezionato.")
 else:
-    df_w.sort_values('data_ora_inizio', inplace=True)
-    
-    # UNIONE TURNI (Smart Merge)
-    merged_rows = []
-    buffer_row = None
-
-    for _, row in df_w.iterrows():
-        current_start = row['data_ora_inizio']
-        current_end = row['data_ora_fine']
-        current_hours = row['ore_presenza']
-        current_act = str(row['id_attivita'])
-        
-        if buffer_row:
-            diff_sec = (current_start - buffer_row['end']).total_seconds()
-            if (0 <= diff_sec <= 120) and (current_start.hour == 0):
-                buffer_row['end'] = current_end
-                buffer_row['hours'] += current_hours
-                continue 
-            else:
-                merged_rows.append(buffer_row)
-                buffer_row = None
-        
-        buffer_row = {
-            'start': current_start,
-            'end': current_end,
-            'hours': current_hours,
-            'activity': current_act
-        }
-    if buffer_row: merged_rows.append(buffer_row)
-
-    # VISUALIZZAZIONE
-    view_data = []
-    tot_ore = 0.0
-    prev_shift_type = None 
-
-    for item in merged_rows:
-        d_s = item['start']
-        d_e = item['end']
-        ore = item['hours']
-        att_cod = item['activity']
-        tot_ore += ore
-        
-        # Tipo Turno
-        h = d_s.hour
-        if "OFF" in att_cod: 
-            curr_type = "OFFICINA"; icon = "🔧"
-        elif "VIAGGIO" in att_cod:
-            curr_type = "TRASFERTA"; icon = "🚚"
-        elif h >= 20 or h < 6: 
-            curr_type = "NOTTE"; icon = "🌙"
-        elif 18 <= h < 20:
-            curr_type = "SERA"; icon = "🌗"
-        else:
-            curr_type = "GIORNO"; icon = "☀️"
-
-        # Descrizione
-        desc = att_cod if att_cod not in ["-1", "nan", "None"] else f"Turno {curr_type.capitalize()}"
-        if "OFF" in att_cod: desc = "Officina"
-        if "VIAGGIO" in att_cod: desc = "Trasferta"
-
-        # Rileva Cambio Turno (Giorno <-> Notte)
-        tag_cambio = ""
-        major_types = ["GIORNO", "NOTTE"]
-        if prev_shift_type and curr_type in major_types and prev_shift_type in major_types:
-            if curr_type != prev_shift_type:
-                # Usa uno span con colore del tema (o rosso soft)
-                tag_cambio = f" <span style='font-size:0.85em; opacity:0.8; margin-left:8px;'>🔀 <b>CAMBIO</b></span>"
-        
-        if ore > 4: prev_shift_type = curr_type
-
-        # Formattazione Orario
-        orario_str = f"{d_s.strftime('%H:%M')} - {d_e.strftime('%H:%M')}"
-        if d_e.date() > d_s.date():
-            orario_str += " <small>(+1)</small>"
-
-        view_data.append({
-            "DATA": f"<b>{d_s.day}</b> <small>{d_s.strftime('%a')}</small>",
-            "ATTIVITÀ": f"<span style='font-size:1.1em'>{icon}</span> {desc} {tag_cambio}",
-            "ORARIO": orario_str,
-            "ORE": f"<b>{ore:g}</b>",
-            "VISTO": "<span style='color:#ccc'>......</span>"
-        })
-        
-    df_view = pd.DataFrame(view_data)
+    # Smart Merge e tipo turno arrivano già calcolati dal servizio (ShiftEngine)
+    tot_ore = float(df_w['ore_presenza'].sum())
+    df_view = sheet_table(df_w)
 
     # OUTPUT
     info = df_dip.loc[sel_dip]
@@ -225,7 +141,7 @@ else:
     """, unsafe_allow_html=True)
     
     # TABELLA HTML PULITA
-    st.write(df_view.to_html(escape=False, index=False, classes="clean-table"), unsafe_allow_html=True)
+    st.write(table_html(table_rows(df_view)), unsafe_allow_html=True)
     
     # FOOTER
     st.markdown("---")
@@ -240,4 +156,17 @@ else:
         </div>
         """, unsafe_allow_html=True)
 
-    st.caption("💡 Premi CTRL+P per stampare (Versione Carta ottimizzata)")
\ No newline at end of file
+    st.caption("💡 Premi CTRL+P per stampare (Versione Carta ottimizzata)")
+
+# ==============================================================================
+# 3. STAMPA IN BLOCCO (tutti gli operai del mese)
+# ==============================================================================
+with st.expander(f"📦 Fogli di tutti gli operai — {sel_mese} {sel_anno}"):
+    st.caption("Un foglio per ogni operaio con ore nel mese, generati in un colpo solo (anche da riga di comando: python -m core.hour_sheets).")
+    b1, b2 = st.columns(2)
+    unico = b1.radio("Formato", ["ZIP (un file per operaio)", "Documento unico multipagina"], horizontal=True) != "ZIP (un file per operaio)"
+    if b2.button("Genera fogli", type="primary"):
+        with st.spinner("Generazione fogli in corso..."):
+            nome_file, dati = shift_service.export_hour_sheets(sel_anno, n_mese, unico=unico, processes=os.cpu_count())
+        st.download_button(f"⬇️ Scarica {nome_file}", dati, file_name=nome_file,
+                           mime="text/html" if unico else "application/zip")
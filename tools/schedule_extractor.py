@@ -1,83 +1,164 @@
-# tools/schedule_extractor.py - Aggiornato per il TUO cronoprogramma
+# tools/schedule_extractor.py - Import in streaming del TUO cronoprogramma
 from __future__ import annotations
 import io
-from typing import List, Dict, Any
+from datetime import date, datetime
+from typing import List, Dict, Any, BinaryIO, Iterator, Optional, Tuple, Union
+import numpy as np
 import pandas as pd
-from datetime import datetime
 
 class ScheduleParsingError(Exception):
     pass
 
-def parse_schedule_excel(file_bytes: bytes) -> List[Dict[str, Any]]:
+REQUIRED_COLUMNS = ['ID_Attivita', 'Descrizione', 'Data_Inizio', 'Data_Fine']
+OPTIONAL_COLUMNS = ['Stato_Avanzamento', 'Commessa', 'Predecessori']
+DATE_FORMATS = ('%d/%m/%y', '%d/%m/%Y', '%Y-%m-%d')  # il tuo formato "01/09/25", l'anno a 4 cifre, ISO (CSV e MS Project/Primavera)
+EXCEL_EPOCH = pd.Timestamp('1899-12-30')    # date salvate come numero seriale di Excel
+CHUNK_ROWS = 5000                           # righe validate per blocco
+
+
+def _is_blank(values: pd.Series) -> pd.Series:
+    return values.isna() | (values.astype(str).str.strip() == '')
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
     """
-    Analizza il cronoprogramma nel TUO formato specifico:
-    - Headers: ID_Attivita, Descrizione, Data_Inizio, Data_Fine, Stato_Avanzamento, Commessa, Predecessori
-    - Date formato: "01/09/25" (DD/MM/YY)
-    - ID con prefissi tipo: MON-001, FAM-001, ELE-001
+    Date di una colonna intera: le celle già datate da Excel passano dirette, i numeri sono
+    seriali di Excel, i testi si provano con una passata vettoriale per formato e solo il
+    residuo va al parsing automatico. NaT dove nessun formato riconosce il valore.
     """
-    try:
-        df = pd.read_excel(io.BytesIO(file_bytes), engine='openpyxl')
+    out = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    kinds = values.map(type)
+    is_date = kinds.isin([datetime, date, pd.Timestamp])
+    if is_date.any():
+        out[is_date] = pd.to_datetime(values[is_date].tolist())
+    is_num = kinds.isin([int, float]) & values.notna()
+    if is_num.any():
+        out[is_num] = EXCEL_EPOCH + pd.to_timedelta(values[is_num].astype(float), unit='D')
+
+    text = values[kinds == str].str.strip()
+    text = text[text != '']
+    for fmt in DATE_FORMATS + (None,):
+        if text.empty:
+            break
+        parsed = pd.to_datetime(text, format=fmt or 'mixed', errors='coerce')
+        ok = parsed.notna()
+        out[ok[ok].index] = parsed[ok]
+        text = text[~ok]
+    return out
+
+
+def validate_rows(rows: List[tuple], numbers: List[int], positions: Dict[str, int]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Valida un blocco di righe nel layout del cronoprogramma in modo vettoriale: (record validi, errori per riga).
+    positions: colonna -> indice nella riga (da header_positions); numbers: numero di riga nel file.
+    """
+    df = pd.DataFrame({col: [r[pos] if pos < len(r) else None for r in rows] for col, pos in positions.items()}, dtype=object)
+    for col in OPTIONAL_COLUMNS:
+        if col not in df:
+            df[col] = None
+
+    start = _parse_dates(df['Data_Inizio'])
+    end = _parse_dates(df['Data_Fine'])
+    stato = pd.to_numeric(df['Stato_Avanzamento'], errors='coerce')
+    checks = [
+        ('ID_Attivita', _is_blank(df['ID_Attivita']), "ID attività mancante"),
+        ('Data_Inizio', start.isna(), "Data di inizio mancante o non riconosciuta"),
+        ('Data_Fine', end.isna(), "Data di fine mancante o non riconosciuta"),
+        ('Stato_Avanzamento', stato.isna() & ~_is_blank(df['Stato_Avanzamento']), "Stato di avanzamento non numerico"),
+    ]
+    errors, bad = [], np.zeros(len(df), dtype=bool)
+    for col, mask, message in checks:
+        mask = mask.to_numpy()
+        for k in np.flatnonzero(mask):
+            errors.append({'riga': numbers[k], 'colonna': col, 'valore': df[col].iat[k], 'errore': message})
+        bad |= mask
+
+    keep = ~bad
+    text = lambda col: df.loc[keep, col].fillna('').astype(str)
+    records = pd.DataFrame({
+        "id_attivita": text('ID_Attivita').str.strip(),
+        "descrizione": text('Descrizione'),
+        "data_inizio": start[keep].dt.strftime('%Y-%m-%d'),
+        "data_fine": end[keep].dt.strftime('%Y-%m-%d'),
+        "stato_avanzamento": stato[keep].fillna(0).astype(int),
+        "commessa": text('Commessa'),
+        "predecessori": text('Predecessori'),
+    }).to_dict('records')
+    return records, errors
+
+
+def header_positions(row: tuple) -> Dict[str, int]:
+    """Pulizia nomi colonne e verifica colonne richieste: colonna -> indice nella riga."""
+    header = [str(v).strip() if v is not None else '' for v in row]
+    for col in REQUIRED_COLUMNS:
+        if col not in header:
+            raise ScheduleParsingError(f"Colonna richiesta mancante: '{col}'.")
+    return {col: header.index(col) for col in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if col in header}
 
-        if df.empty:
+
+def iter_schedule_chunks(file_bytes: Union[bytes, BinaryIO], chunk_size: int = CHUNK_ROWS) -> Iterator[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """
+    Legge il foglio in streaming (openpyxl read-only, una riga alla volta) e restituisce
+    a blocchi di chunk_size righe i record validi e gli errori per riga ('riga' = numero di riga Excel).
+    Accetta il contenuto del file o un file binario aperto.
+    """
+    from openpyxl import load_workbook
+    source = io.BytesIO(file_bytes) if isinstance(file_bytes, (bytes, bytearray)) else file_bytes
+    try:
+        wb = load_workbook(source, read_only=True, data_only=True)
+    except Exception as e:
+        raise ScheduleParsingError(f"Errore durante la lettura del cronoprogramma: {e}")
+    try:
+        positions: Optional[Dict[str, int]] = None
+        rows, numbers = [], []
+        for number, row in enumerate(wb.active.iter_rows(values_only=True), start=1):
+            if not any(v is not None and str(v).strip() != '' for v in row):
+                continue  # Pulizia righe vuote
+            if positions is None:
+                positions = header_positions(row)
+                continue
+            rows.append(row)
+            numbers.append(number)
+            if len(rows) >= chunk_size:
+                yield validate_rows(rows, numbers, positions)
+                rows, numbers = [], []
+        if positions is None:
             raise ScheduleParsingError("Il file Excel è vuoto o illeggibile.")
+        if rows:
+            yield validate_rows(rows, numbers, positions)
+    finally:
+        wb.close()
 
-        # Pulizia nomi colonne
-        df.columns = df.columns.str.strip()
-
-        # Verifica colonne richieste
-        required_columns = ['ID_Attivita', 'Descrizione', 'Data_Inizio', 'Data_Fine']
-        for col in required_columns:
-            if col not in df.columns:
-                raise ScheduleParsingError(f"Colonna richiesta mancante: '{col}'.")
-
-        print(f"✅ Trovate {len(df)} attività nel cronoprogramma")
-
-        # Pulizia righe vuote
-        df.dropna(how='all', inplace=True)
-
-        # PARSING DATE SPECIFICO PER IL TUO FORMATO "DD/MM/YY"
-        def parse_date_format(date_str):
-            if pd.isna(date_str):
-                return pd.NaT
-            try:
-                # Prova formato DD/MM/YY (il tuo formato)
-                return pd.to_datetime(date_str, format='%d/%m/%y')
-            except:
-                try:
-                    # Prova formato DD/MM/YYYY (alternativo)
-                    return pd.to_datetime(date_str, format='%d/%m/%Y')
-                except:
-                    # Ultimo tentativo con parsing automatico
-                    return pd.to_datetime(date_str, errors='coerce')
-
-        df['Data_Inizio'] = df['Data_Inizio'].apply(parse_date_format)
-        df['Data_Fine'] = df['Data_Fine'].apply(parse_date_format)
-
-        # Filtra solo righe con date valide
-        df.dropna(subset=['Data_Inizio', 'Data_Fine'], inplace=True)
-
-        if df.empty:
-            raise ScheduleParsingError("Nessuna attività con date valide trovata.")
-
-        print(f"✅ {len(df)} attività con date valide processate")
-
-        # Conversione finale per il database
-        records = []
-        for _, row in df.iterrows():
-            record = {
-                "id_attivita": str(row['ID_Attivita']),
-                "descrizione": str(row['Descrizione']),
-                "data_inizio": row['Data_Inizio'].strftime('%Y-%m-%d'),
-                "data_fine": row['Data_Fine'].strftime('%Y-%m-%d'),
-                "stato_avanzamento": int(row.get('Stato_Avanzamento', 0) or 0),
-                "commessa": str(row.get('Commessa', '') or ''),
-                "predecessori": str(row.get('Predecessori', '') or '')
-            }
-            records.append(record)
-
-        return records
 
+def collect_schedule(chunks: Iterator[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]],
+                     errors: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Raccoglie i blocchi (record, errori) di un lettore in streaming; se si passa una lista in errors, vi si aggiungono i dettagli."""
+    records, n_errors = [], 0
+    try:
+        for chunk_records, chunk_errors in chunks:
+            records.extend(chunk_records)
+            n_errors += len(chunk_errors)
+            if errors is not None:
+                errors.extend(chunk_errors)
     except Exception as e:
         if isinstance(e, ScheduleParsingError):
             raise
-        raise ScheduleParsingError(f"Errore durante la lettura del cronoprogramma: {e}")
\ No newline at end of file
+        raise ScheduleParsingError(f"Errore durante la lettura del cronoprogramma: {e}")
+
+    if not records:
+        raise ScheduleParsingError("Nessuna attività con date valide trovata.")
+
+    print(f"✅ {len(records)} attività con date valide processate ({n_errors} errori di riga)")
+    return records
+
+
+def parse_schedule_excel(file_bytes: bytes, errors: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    Analizza il cronoprogramma nel TUO formato specifico:
+    - Headers: ID_Attivita, Descrizione, Data_Inizio, Data_Fine, Stato_Avanzamento, Commessa, Predecessori
+    - Date formato: "01/09/25" (DD/MM/YY), oppure DD/MM/YYYY o celle data di Excel
+    - ID con prefissi tipo: MON-001, FAM-001, ELE-001
+    Le righe non valide sono scartate; se si passa una lista in errors, vi si aggiungono i dettagli.
+    Gli altri formati (MS Project XML, Primavera XER, CSV) sono in tools/schedule_importers.py.
+    """
+    return collect_schedule(iter_schedule_chunks(file_bytes), errors)
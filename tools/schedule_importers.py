@@ -0,0 +1,254 @@
+# tools/schedule_importers.py - Import del cronoprogramma da più formati (Excel, MS Project XML, Primavera XER, CSV)
+"""
+Lettori in streaming del cronoprogramma, scelti dall'estensione del file.
+
+Ogni lettore restituisce blocchi (record validi, errori per riga) come iter_schedule_chunks:
+i record hanno il layout di parse_schedule_excel e passano dalla stessa validazione
+(validate_rows), quindi finiscono in cronoprogramma con il solito upsert differenziale.
+
+- .xlsx  foglio nel TUO formato (tools/schedule_extractor.py);
+- .csv   stesse colonne del foglio, separatore ';' o ',' riconosciuto dall'intestazione;
+- .xml   MS Project XML (MSPDI), letto con iterparse: ogni Task si elabora e si scarta appena chiuso;
+- .xer   export di Primavera P6, letto riga per riga (tabelle %T / campi %F / record %R).
+
+I legami di MS Project possono puntare a task successivi nel file e in Primavera la tabella
+TASKPRED arriva dopo TASK: per questi formati si tiene in memoria una tupla per attività
+(mai l'albero XML o il file intero) e i predecessori si risolvono a fine lettura.
+"""
+from __future__ import annotations
+import csv
+import io
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from tools.schedule_extractor import (CHUNK_ROWS, OPTIONAL_COLUMNS, REQUIRED_COLUMNS, ScheduleParsingError,
+                                      collect_schedule, header_positions, iter_schedule_chunks, validate_rows)
+
+ScheduleChunks = Iterator[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]
+ScheduleSource = Union[bytes, str, Path, BinaryIO]
+
+LAYOUT = {col: i for i, col in enumerate(REQUIRED_COLUMNS + OPTIONAL_COLUMNS)}  # tuple costruite dai lettori XML/XER
+MINUTI_GIORNO = 480                       # giornata lavorativa di MS Project (8 h)
+ORE_GIORNO = 8.0                          # giornata lavorativa per i ritardi di Primavera (lag_hr_cnt)
+MSPDI_TIPI = {'0': 'FF', '1': 'FS', '2': 'SF', '3': 'SS'}
+MSPDI_LAG_TRASCORSI = {'4', '6', '8', '10', '12', '20'}  # formati "elapsed": il ritardo conta anche le ore non lavorative
+XER_TIPI = {'PR_FS': 'FS', 'PR_SS': 'SS', 'PR_FF': 'FF', 'PR_SF': 'SF'}
+XER_CAMPI = {  # tabelle lette dall'export di Primavera e campi usati (le altre colonne non si copiano)
+    'PROJECT': ('proj_id', 'proj_short_name'),
+    'TASK': ('task_id', 'proj_id', 'task_code', 'task_name', 'task_type', 'status_code', 'phys_complete_pct',
+             'act_start_date', 'act_end_date', 'early_start_date', 'early_end_date', 'target_start_date', 'target_end_date'),
+    'TASKPRED': ('task_id', 'pred_task_id', 'pred_type', 'lag_hr_cnt'),
+}
+
+IMPORTERS: Dict[str, Callable[..., ScheduleChunks]] = {}
+
+
+def register_importer(*extensions: str):
+    """Registra un lettore per una o più estensioni (senza punto)."""
+    def decorator(fn):
+        for ext in extensions:
+            IMPORTERS[ext.lower().lstrip('.')] = fn
+        return fn
+    return decorator
+
+
+def get_importer(filename: str) -> Callable[..., ScheduleChunks]:
+    ext = Path(filename).suffix.lower().lstrip('.')
+    if ext not in IMPORTERS:
+        raise ScheduleParsingError(f"Formato '.{ext}' non supportato (formati gestiti: {', '.join(sorted(IMPORTERS))}).")
+    return IMPORTERS[ext]
+
+
+def parse_schedule_file(source: ScheduleSource, filename: str,
+                        errors: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Come parse_schedule_excel, per qualsiasi formato registrato: source può essere il contenuto, un percorso o un file aperto."""
+    return collect_schedule(get_importer(filename)(source), errors)
+
+
+def _open(source: ScheduleSource) -> BinaryIO:
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    if isinstance(source, (str, Path)):
+        return open(source, 'rb')
+    source.seek(0)
+    return source
+
+
+def _format_predecessors(links: List[Tuple[str, str, int]]) -> str:
+    """Legami -> testo del campo 'predecessori' (es. "MON-001; FAM-002 SS+2"), il formato letto da critical_path."""
+    return "; ".join(pred if tipo == 'FS' and lag == 0 else f"{pred} {tipo}{lag:+d}" for pred, tipo, lag in links)
+
+
+def _resolve_chunks(rows: List[list], numbers: List[int], refs: List[str], links: Dict[str, List[Tuple[str, str, int]]],
+                    chunk_size: int) -> ScheduleChunks:
+    """
+    Traduce i legami (riferimento interno del predecessore -> ID attività) e valida a blocchi.
+    I legami verso attività assenti (o di riepilogo) si ignorano e si segnalano sulla riga del successore.
+    """
+    ids = {ref: row[LAYOUT['ID_Attivita']] for ref, row in zip(refs, rows)}
+    for start in range(0, len(rows), chunk_size):
+        block_errors = []
+        for k in range(start, min(start + chunk_size, len(rows))):
+            resolved = []
+            for pred, tipo, lag in links.get(refs[k], ()):
+                if pred in ids:
+                    resolved.append((ids[pred], tipo, lag))
+                else:
+                    block_errors.append({'riga': numbers[k], 'colonna': 'Predecessori', 'valore': pred,
+                                         'errore': "Predecessore sconosciuto, legame ignorato"})
+            rows[k][LAYOUT['Predecessori']] = _format_predecessors(resolved)
+        records, chunk_errors = validate_rows(rows[start:start + chunk_size], numbers[start:start + chunk_size], LAYOUT)
+        yield records, block_errors + chunk_errors
+
+
+register_importer('xlsx', 'xlsm')(iter_schedule_chunks)
+
+
+@register_importer('csv', 'txt')
+def iter_csv_chunks(source: ScheduleSource, chunk_size: int = CHUNK_ROWS) -> ScheduleChunks:
+    """CSV con le colonne del foglio Excel ('riga' = numero di riga del file)."""
+    stream = io.TextIOWrapper(_open(source), encoding='utf-8-sig', newline='')
+    try:
+        header_line = stream.readline()
+        if not header_line.strip():
+            raise ScheduleParsingError("Il file CSV è vuoto o illeggibile.")
+        try:
+            dialect = csv.Sniffer().sniff(header_line, delimiters=';,\t')
+        except csv.Error:
+            dialect = csv.excel
+        positions = header_positions(next(csv.reader([header_line], dialect)))
+        reader = csv.reader(stream, dialect)
+        rows, numbers = [], []
+        for row in reader:
+            if not any(v.strip() for v in row):
+                continue  # Pulizia righe vuote
+            rows.append(row)
+            numbers.append(reader.line_num + 1)  # +1: l'intestazione è già stata letta
+            if len(rows) >= chunk_size:
+                yield validate_rows(rows, numbers, positions)
+                rows, numbers = [], []
+        if rows:
+            yield validate_rows(rows, numbers, positions)
+    except UnicodeDecodeError as e:
+        raise ScheduleParsingError(f"Il file CSV non è in UTF-8: {e}")
+    finally:
+        if isinstance(source, (bytes, bytearray, str, Path)):
+            stream.close()
+        else:
+            stream.detach()  # il file aperto è del chiamante: non va chiuso
+
+
+@register_importer('xml')
+def iter_mspdi_chunks(source: ScheduleSource, chunk_size: int = CHUNK_ROWS, id_field: str = 'WBS') -> ScheduleChunks:
+    """
+    MS Project XML (MSPDI). Per ogni Task (esclusi quelli di riepilogo):
+    ID attività = campo id_field (di default la WBS, altrimenti l'UID), Name, Start/Finish, PercentComplete,
+    PredecessorLink (Type 0=FF 1=FS 2=SF 3=SS, LinkLag in decimi di minuto).
+    Commessa = Title o Name figli diretti di <Project> (non i Name di calendari, risorse o campi personalizzati).
+    'riga' negli errori = posizione del Task nel file.
+    """
+    stream = _open(source)
+    rows, numbers, refs = [], [], []
+    links: Dict[str, List[Tuple[str, str, int]]] = defaultdict(list)
+    project: Dict[str, str] = {}
+    local: Dict[str, str] = {}  # tag con namespace -> nome locale
+    n_task, depth = 0, 0  # alla chiusura, livello del genitore: 1 = figli diretti di <Project>, 2 = Task/Calendar/Resource
+    try:
+        for event, elem in ET.iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1 and depth != 2:
+                continue  # campi dei Task (letti dal Task stesso), di calendari, risorse e assegnazioni
+            tag = local.get(elem.tag) or local.setdefault(elem.tag, elem.tag.rpartition('}')[2])
+            if depth == 1:
+                # Solo Name e Title figli diretti di <Project>: non il Name di un Calendar o di un ExtendedAttribute
+                if tag in ('Title', 'Name'):
+                    project.setdefault(tag, (elem.text or '').strip())
+            elif tag == 'Task':
+                n_task += 1
+                fields, task_links = {}, []
+                for child in elem:
+                    name = local.get(child.tag) or local.setdefault(child.tag, child.tag.rpartition('}')[2])
+                    if name == 'PredecessorLink':
+                        task_links.append({local.get(c.tag) or c.tag.rpartition('}')[2]: (c.text or '').strip() for c in child})
+                    else:
+                        fields[name] = (child.text or '').strip()
+                elem.clear()  # il Task si scarta appena letto: in memoria resta solo la sua tupla
+                if fields.get('Summary') != '1' and fields.get('IsNull') != '1' and fields.get('UID'):
+                    uid = fields['UID']
+                    for link in task_links:
+                        per_day = MINUTI_GIORNO * 3 if link.get('LagFormat') in MSPDI_LAG_TRASCORSI else MINUTI_GIORNO
+                        lag = round(float(link.get('LinkLag') or 0) / 10 / per_day)
+                        links[uid].append((link.get('PredecessorUID', ''), MSPDI_TIPI.get(link.get('Type', '1'), 'FS'), lag))
+                    rows.append([fields.get(id_field) or uid, fields.get('Name', ''), fields.get('Start', '')[:10],
+                                 fields.get('Finish', '')[:10], fields.get('PercentComplete', ''),
+                                 project.get('Title') or project.get('Name', ''), ''])
+                    numbers.append(n_task)
+                    refs.append(uid)
+            elif tag in ('Resource', 'Assignment', 'Calendar'):
+                elem.clear()
+    except ET.ParseError as e:
+        raise ScheduleParsingError(f"File MS Project XML non valido: {e}")
+    finally:
+        if isinstance(source, (str, Path)):
+            stream.close()
+    if not n_task:
+        raise ScheduleParsingError("Nessun Task trovato: il file non sembra un XML di MS Project.")
+    yield from _resolve_chunks(rows, numbers, refs, links, chunk_size)
+
+
+def _xer_lines(stream: BinaryIO) -> Iterator[Tuple[int, List[str]]]:
+    """Righe dell'export XER già divise sui tab; l'encoding è UTF-8 o, per gli export classici, cp1252."""
+    for number, raw in enumerate(stream, start=1):
+        try:
+            line = raw.decode('utf-8')
+        except UnicodeDecodeError:
+            line = raw.decode('cp1252', errors='replace')
+        yield number, line.rstrip('\r\n').split('\t')
+
+
+@register_importer('xer')
+def iter_xer_chunks(source: ScheduleSource, chunk_size: int = CHUNK_ROWS) -> ScheduleChunks:
+    """
+    Export di Primavera P6 (XER): PROJECT (proj_short_name = commessa), TASK e TASKPRED; le altre tabelle si saltano.
+    ID attività = task_code; date effettive, poi early, poi pianificate; avanzamento = phys_complete_pct.
+    Le attività di WBS (TT_WBS) non sono attività. 'riga' negli errori = numero di riga del file.
+    """
+    stream = _open(source)
+    rows, numbers, refs = [], [], []
+    links: Dict[str, List[Tuple[str, str, int]]] = defaultdict(list)
+    projects: Dict[str, str] = {}
+    table, fields = None, {}
+    first_date = lambda rec, *cols: next((rec[c][:10] for c in cols if c in rec and rec[c]), '')
+    try:
+        for number, cells in _xer_lines(stream):
+            kind = cells[0]
+            if kind == '%T':
+                table, fields = cells[1] if len(cells) > 1 else None, {}
+            elif kind == '%F' and table in XER_CAMPI:
+                fields = {name: i for i, name in enumerate(cells) if i and name in XER_CAMPI[table]}
+            elif kind == '%R' and table in XER_CAMPI:
+                rec = {name: cells[i] if i < len(cells) else '' for name, i in fields.items()}
+                if table == 'PROJECT':
+                    projects[rec.get('proj_id', '')] = rec.get('proj_short_name', '')
+                elif table == 'TASK' and rec.get('task_type') != 'TT_WBS':
+                    stato = '100' if rec.get('status_code') == 'TK_Complete' else rec.get('phys_complete_pct', '')
+                    rows.append([rec.get('task_code', ''), rec.get('task_name', ''),
+                                 first_date(rec, 'act_start_date', 'early_start_date', 'target_start_date'),
+                                 first_date(rec, 'act_end_date', 'early_end_date', 'target_end_date'),
+                                 stato, projects.get(rec.get('proj_id', ''), ''), ''])
+                    numbers.append(number)
+                    refs.append(rec.get('task_id', ''))
+                elif table == 'TASKPRED':
+                    lag = round(float(rec.get('lag_hr_cnt') or 0) / ORE_GIORNO)
+                    links[rec.get('task_id', '')].append((rec.get('pred_task_id', ''), XER_TIPI.get(rec.get('pred_type'), 'FS'), lag))
+    finally:
+        if isinstance(source, (str, Path)):
+            stream.close()
+    if not rows and not projects:
+        raise ScheduleParsingError("Nessuna tabella PROJECT/TASK trovata: il file non sembra un export XER di Primavera.")
+    yield from _resolve_chunks(rows, numbers, refs, links, chunk_size)